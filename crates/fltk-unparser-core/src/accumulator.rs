@@ -1,4 +1,4 @@
-//! The immutable [`DocAccumulator`] document builder.
+//! The immutable [`DocAccumulator`] and mutable [`DocBuilder`] document builders.
 //!
 //! Direct port of `fltk/unparse/accumulator.py`. The accumulator builds a `Doc`
 //! incrementally while preventing consecutive trivia nodes and tracking open
@@ -9,7 +9,12 @@
 //! (most-recently-added first) plus a `last_was_trivia` flag, an optional `parent`
 //! accumulator, and an optional `nesting_doc` placeholder that records which kind of
 //! wrapper (`Group`/`Nest`/`Join`) this level is accumulating into.
+//!
+//! [`DocBuilder`] has the same API over one growing `Vec`: every handle to it shares the
+//! buffer, so a discarded attempt is undone through [`DocBuilder::checkpoint`] and
+//! [`DocBuilder::rollback`] rather than by keeping the prior value.
 
+use std::cell::RefCell;
 use std::rc::Rc;
 
 use crate::doc::{concat, Doc};
@@ -259,6 +264,237 @@ impl DocAccumulator {
     }
 }
 
+/// A [`DocBuilder`] state to roll back to, from [`DocBuilder::checkpoint`].
+///
+/// Port of `accumulator.py`'s `Checkpoint`: the doc count, the trivia flag, and the open
+/// levels, identified by the depth and the serial number of the innermost one (`0` for
+/// none) so a rollback can tell that level is still the same one.
+#[derive(Clone, Copy, Debug, PartialEq, Eq)]
+pub struct Checkpoint {
+    size: usize,
+    last_was_trivia: bool,
+    depth: usize,
+    top: u64,
+}
+
+/// An open group/nest/join level: where its docs start, its placeholder wrapper, and a
+/// serial number unique within the builder.
+#[derive(Debug)]
+struct Level {
+    start: usize,
+    nesting_doc: Doc,
+    serial: u64,
+}
+
+#[derive(Debug, Default)]
+struct BuilderState {
+    docs: Vec<Doc>,
+    last_was_trivia: bool,
+    levels: Vec<Level>,
+    pushes: u64,
+}
+
+/// Mutable document accumulator: the [`DocAccumulator`] API over one growing `Vec`.
+///
+/// Port of `accumulator.py`'s `DocBuilder`. A `DocBuilder` is a shared handle, so the
+/// generated unparser threads it exactly like a `DocAccumulator` (every mutator takes
+/// `&self` and returns a handle), but adding a doc is a `Vec` push instead of an `Rc`
+/// allocation. Because clones share the buffer, an attempt whose output must be
+/// discarded is undone explicitly: take a [`checkpoint`](Self::checkpoint) before it and
+/// [`rollback`](Self::rollback) to it afterwards.
+#[derive(Clone, Debug, Default)]
+pub struct DocBuilder(Rc<RefCell<BuilderState>>);
+
+impl DocBuilder {
+    /// Create an empty builder with no open nesting.
+    pub fn new() -> Self {
+        DocBuilder::default()
+    }
+
+    /// Create an empty builder with room for `capacity` docs before it reallocates.
+    pub fn with_capacity(capacity: usize) -> Self {
+        DocBuilder(Rc::new(RefCell::new(BuilderState {
+            docs: Vec::with_capacity(capacity),
+            ..BuilderState::default()
+        })))
+    }
+
+    /// Whether the most recently added content was trivia (a separator/spacing node).
+    pub fn last_was_trivia(&self) -> bool {
+        self.0.borrow().last_was_trivia
+    }
+
+    /// Add non-trivia content.
+    pub fn add_non_trivia(&self, doc: Doc) -> DocBuilder {
+        self.push_doc(doc, false)
+    }
+
+    /// Add trivia content.
+    pub fn add_trivia(&self, doc: Doc) -> DocBuilder {
+        self.push_doc(doc, true)
+    }
+
+    /// Merge another (already-flattened) builder, preserving its trivia state.
+    ///
+    /// Panics if `other` still has open nesting, like [`DocAccumulator::add_accumulator`].
+    pub fn add_accumulator(&self, other: &DocBuilder) -> DocBuilder {
+        let (other_doc, other_trivia) = {
+            let state = other.0.borrow();
+            assert!(
+                state.levels.is_empty(),
+                "Attempt to merge a non-flattened accumulator: {state:?}"
+            );
+            (concat(state.docs.clone()), state.last_was_trivia)
+        };
+        let mut state = self.0.borrow_mut();
+        // A NIL merge contributes no content, so it must not clobber our trivia state.
+        if !matches!(other_doc, Doc::Nil) {
+            state.last_was_trivia = other_trivia;
+        }
+        state.docs.push(other_doc);
+        drop(state);
+        self.clone()
+    }
+
+    /// Start a new group nesting level.
+    pub fn push_group(&self) -> DocBuilder {
+        self.push_level(Doc::Group(Rc::new(Doc::Nil)))
+    }
+
+    /// Start a new nest nesting level.
+    pub fn push_nest(&self, indent: u32) -> DocBuilder {
+        self.push_level(Doc::Nest {
+            indent,
+            content: Rc::new(Doc::Nil),
+        })
+    }
+
+    /// Start a new join nesting level.
+    pub fn push_join(&self, separator: Doc) -> DocBuilder {
+        self.push_level(Doc::Join {
+            docs: Vec::new(),
+            separator: Rc::new(separator),
+        })
+    }
+
+    /// End the current group level, wrapping its content in a `Group`.
+    ///
+    /// Panics if the current level is not a group (improperly nested tree).
+    pub fn pop_group(&self) -> DocBuilder {
+        self.pop_level("Group", |doc| matches!(doc, Doc::Group(_)))
+    }
+
+    /// End the current nest level, wrapping its content in a `Nest`.
+    ///
+    /// Panics if the current level is not a nest (improperly nested tree).
+    pub fn pop_nest(&self) -> DocBuilder {
+        self.pop_level("Nest", |doc| matches!(doc, Doc::Nest { .. }))
+    }
+
+    /// End the current join level, converting its content into the join's docs list.
+    ///
+    /// Panics if the current level is not a join (improperly nested tree).
+    pub fn pop_join(&self) -> DocBuilder {
+        self.pop_level("Join", |doc| matches!(doc, Doc::Join { .. }))
+    }
+
+    /// The current state, for a later [`rollback`](Self::rollback).
+    pub fn checkpoint(&self) -> Checkpoint {
+        let state = self.0.borrow();
+        Checkpoint {
+            size: state.docs.len(),
+            last_was_trivia: state.last_was_trivia,
+            depth: state.levels.len(),
+            top: state.levels.last().map_or(0, |level| level.serial),
+        }
+    }
+
+    /// Discard everything added since `mark` was taken, with any levels pushed since.
+    ///
+    /// Panics when a level that was open at `mark` has been popped since: its content was
+    /// folded into a wrapper and cannot be restored.
+    pub fn rollback(&self, mark: &Checkpoint) -> DocBuilder {
+        let mut state = self.0.borrow_mut();
+        let intact = state.levels.len() >= mark.depth
+            && (mark.depth == 0 || state.levels[mark.depth - 1].serial == mark.top);
+        assert!(
+            intact,
+            "Cannot roll back: a nesting level open at the checkpoint has since been closed"
+        );
+        state.levels.truncate(mark.depth);
+        state.docs.truncate(mark.size);
+        state.last_was_trivia = mark.last_was_trivia;
+        drop(state);
+        self.clone()
+    }
+
+    /// Build the `Doc` for the innermost open level (the whole builder when none is open).
+    pub fn doc(&self) -> Doc {
+        let state = self.0.borrow();
+        let start = state.levels.last().map_or(0, |level| level.start);
+        concat(state.docs[start..].to_vec())
+    }
+
+    fn push_doc(&self, doc: Doc, trivia: bool) -> DocBuilder {
+        let mut state = self.0.borrow_mut();
+        state.docs.push(doc);
+        state.last_was_trivia = trivia;
+        drop(state);
+        self.clone()
+    }
+
+    fn push_level(&self, nesting_doc: Doc) -> DocBuilder {
+        let mut state = self.0.borrow_mut();
+        state.pushes += 1;
+        let level = Level {
+            start: state.docs.len(),
+            nesting_doc,
+            serial: state.pushes,
+        };
+        state.levels.push(level);
+        state.last_was_trivia = false;
+        drop(state);
+        self.clone()
+    }
+
+    /// Close the innermost level (checked by `is_kind`), replacing its docs with the
+    /// wrapped content. The level's trivia state carries over, as in `DocAccumulator`.
+    fn pop_level(&self, expected: &str, is_kind: impl Fn(&Doc) -> bool) -> DocBuilder {
+        let mut state = self.0.borrow_mut();
+        let nesting_doc = state.levels.last().map(|level| &level.nesting_doc);
+        assert!(
+            nesting_doc.is_some_and(&is_kind),
+            "Improperly nested tree: Expected {expected} but have {nesting_doc:?}"
+        );
+        let level = state.levels.pop().expect("checked above");
+        let content: Vec<Doc> = state.docs.drain(level.start..).collect();
+        let mut content = concat(content);
+        let wrapped = match &level.nesting_doc {
+            Doc::Group(_) => Doc::Group(Rc::new(content)),
+            Doc::Nest { indent, .. } => Doc::Nest {
+                indent: *indent,
+                content: Rc::new(content),
+            },
+            Doc::Join { separator, .. } => {
+                // Same splice as `DocAccumulator::pop_join`.
+                let docs: Vec<Rc<Doc>> = match &mut content {
+                    Doc::Concat(inner) => std::mem::take(inner),
+                    Doc::Nil => Vec::new(),
+                    other => vec![Rc::new(std::mem::replace(other, Doc::Nil))],
+                };
+                Doc::Join {
+                    docs,
+                    separator: separator.clone(),
+                }
+            }
+            _ => unreachable!("levels hold only Group/Nest/Join placeholders"),
+        };
+        state.docs.push(wrapped);
+        drop(state);
+        self.clone()
+    }
+}
+
 #[cfg(test)]
 mod tests {
     use super::*;
@@ -428,4 +664,83 @@ mod tests {
         }
         drop(acc);
     }
+
+    #[test]
+    fn builder_matches_accumulator() {
+        let acc = DocAccumulator::new()
+            .add_non_trivia(text("a"))
+            .push_group()
+            .add_trivia(text(" "))
+            .push_join(text(","))
+            .add_non_trivia(text("b"))
+            .add_non_trivia(text("c"))
+            .pop_join()
+            .pop_group()
+            .push_nest(2)
+            .add_non_trivia(text("d"))
+            .pop_nest()
+            .add_accumulator(&DocAccumulator::new().add_trivia(text("e")));
+        let builder = DocBuilder::with_capacity(4)
+            .add_non_trivia(text("a"))
+            .push_group()
+            .add_trivia(text(" "))
+            .push_join(text(","))
+            .add_non_trivia(text("b"))
+            .add_non_trivia(text("c"))
+            .pop_join()
+            .pop_group()
+            .push_nest(2)
+            .add_non_trivia(text("d"))
+            .pop_nest()
+            .add_accumulator(&DocBuilder::new().add_trivia(text("e")));
+        assert_eq!(builder.doc(), acc.doc());
+        assert_eq!(builder.last_was_trivia(), acc.last_was_trivia());
+    }
+
+    #[test]
+    fn builder_clones_share_the_buffer() {
+        let builder = DocBuilder::new();
+        let _ = builder.clone().add_non_trivia(text("a"));
+        assert_eq!(builder.doc(), text("a"));
+    }
+
+    #[test]
+    fn builder_rollback_discards_docs_and_levels() {
+        let builder = DocBuilder::new().add_trivia(text(" "));
+        let mark = builder.checkpoint();
+        builder
+            .add_non_trivia(text("x"))
+            .push_group()
+            .add_non_trivia(text("y"));
+        builder.rollback(&mark);
+        assert!(builder.last_was_trivia());
+        assert_eq!(
+            builder.add_non_trivia(text("z")).doc(),
+            concat(vec![text(" "), text("z")])
+        );
+    }
+
+    #[test]
+    fn builder_rollback_inside_open_level_keeps_it() {
+        let builder = DocBuilder::new().push_group().add_non_trivia(text("a"));
+        let mark = builder.checkpoint();
+        builder.add_non_trivia(text("b")).push_nest(2);
+        builder.rollback(&mark).pop_group();
+        assert_eq!(builder.doc(), Doc::Group(Rc::new(text("a"))));
+    }
+
+    #[test]
+    #[should_panic(expected = "Cannot roll back")]
+    fn builder_rollback_rejects_closed_level() {
+        let builder = DocBuilder::new().push_group();
+        let mark = builder.checkpoint();
+        builder.pop_group().push_group();
+        builder.rollback(&mark);
+    }
+
+    #[test]
+    #[should_panic(expected = "Expected Nest")]
+    fn builder_pop_rejects_wrong_nesting() {
+        let _ = DocBuilder::new().push_group().pop_nest();
+    }
 }
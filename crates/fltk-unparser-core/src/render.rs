@@ -2,14 +2,20 @@
 //!
 //! Direct port of `fltk/unparse/renderer.py`. It turns a resolved [`Doc`] tree (no
 //! spacing-control nodes left) into a string, making flat-vs-break decisions per
-//! `Group` against the configured `max_width`. The Python renderer is already
-//! iterative (a working queue, not the call stack); this port preserves that.
+//! `Group` against the configured `max_width`. The Python renderer is iterative (a
+//! working stack, not the call stack); this port preserves that. Each group's fit
+//! decision reads a flat-width measurement cached per composite node for the
+//! render, so nested groups never re-walk their content.
 
-use std::collections::VecDeque;
+use std::collections::HashMap;
+use std::io;
 use std::rc::Rc;
 
 use crate::doc::Doc;
 
+/// Bytes buffered before [`Renderer::render_to`] hands a chunk to its writer.
+pub const STREAM_CHUNK_BYTES: usize = 1 << 16;
+
 /// Configuration for the renderer.
 ///
 /// Port of `RendererConfig` (`renderer.py:21`); defaults are `indent_width = 4`,
@@ -31,7 +37,7 @@ impl Default for RendererConfig {
     }
 }
 
-/// Rendering mode for a queued item. Port of `renderer.Mode`.
+/// Rendering mode for a pending item. Port of `renderer.Mode`.
 #[derive(Clone, Copy, Debug, PartialEq, Eq)]
 enum Mode {
     /// Render soft line breaks as spaces / nothing.
@@ -40,7 +46,7 @@ enum Mode {
     Break,
 }
 
-/// One item on the rendering queue: `(indent, mode, doc)`. Port of `RenderItem`.
+/// One item on the rendering stack: `(indent, mode, doc)`. Port of `RenderItem`.
 type RenderItem = (usize, Mode, Rc<Doc>);
 
 /// Mutable output state shared by the two output helpers, `break_line` and
@@ -102,19 +108,52 @@ impl Renderer {
         Self { config }
     }
 
-    /// Render a document into a string. Port of `Renderer.render` (`renderer.py:47`).
+    /// Render a document into a string. Port of `Renderer.render` (`renderer.py`).
     pub fn render(&self, doc: &Doc) -> String {
         let mut out = Output::new();
+        // An unbounded buffer is never flushed, so the sink is never called.
+        let streamed = self.render_into(doc, &mut out, usize::MAX, &mut |_| Ok(()));
+        debug_assert!(streamed.is_ok());
+        out.result
+    }
 
-        // Queue of items to process. Items expand at the *front* (push_front) and are
-        // taken from the front (pop_front), mirroring Python's `pop(0)`/`insert(0, …)`.
-        // The root is wrapped in a Group so the top level gets a fit check, exactly as
-        // the Python renderer does. The wrapping clone is shallow (one node; children
-        // are Rc-bumped).
-        let mut queue: VecDeque<RenderItem> = VecDeque::new();
-        queue.push_back((0, Mode::Flat, Rc::new(Doc::Group(Rc::new(doc.clone())))));
+    /// Render a document into `writer` in chunks of about [`STREAM_CHUNK_BYTES`].
+    /// Port of `Renderer.render_to`.
+    ///
+    /// Only the current chunk is buffered, never the whole output. Stops at the first
+    /// write error and returns it.
+    pub fn render_to(&self, doc: &Doc, writer: &mut dyn io::Write) -> io::Result<()> {
+        let mut out = Output::new();
+        self.render_into(doc, &mut out, STREAM_CHUNK_BYTES, &mut |chunk| {
+            writer.write_all(chunk.as_bytes())
+        })?;
+        writer.write_all(out.result.as_bytes())
+    }
 
-        while let Some((indent, mode, doc)) = queue.pop_front() {
+    /// The render loop: appends to `out.result`, handing it to `sink` and clearing it
+    /// whenever it reaches `flush_at` bytes. The last partial chunk stays in `out`.
+    fn render_into(
+        &self,
+        doc: &Doc,
+        out: &mut Output,
+        flush_at: usize,
+        sink: &mut dyn FnMut(&str) -> io::Result<()>,
+    ) -> io::Result<()> {
+        // Pending items, next item last, as in the Python renderer's stack. The root is
+        // wrapped in a Group so the top level gets a fit check, exactly as the Python
+        // renderer does. The wrapping clone is shallow (one node; children are
+        // Rc-bumped).
+        let mut stack: Vec<RenderItem> =
+            vec![(0, Mode::Flat, Rc::new(Doc::Group(Rc::new(doc.clone()))))];
+        // Flat widths measured so far, by node address; every doc they describe stays
+        // alive (held by `stack` or an ancestor on it) until the render returns.
+        let mut widths = FlatWidths::new();
+
+        while let Some((indent, mode, doc)) = stack.pop() {
+            if out.result.len() >= flush_at {
+                sink(&out.result)?;
+                out.result.clear();
+            }
             match &*doc {
                 Doc::Nil => {}
                 // Text and Comment render identically here (both newline-aware,
@@ -153,30 +192,26 @@ impl Renderer {
                 }
                 Doc::Concat(docs) => {
                     // Push in reverse so children pop in order.
-                    for d in docs.iter().rev() {
-                        queue.push_front((indent, mode, d.clone()));
-                    }
+                    stack.extend(docs.iter().rev().map(|d| (indent, mode, d.clone())));
                 }
                 Doc::Nest {
                     indent: nest_indent,
                     content,
                 } => {
                     let new_indent = indent + (*nest_indent as usize) * self.config.indent_width;
-                    queue.push_front((new_indent, mode, content.clone()));
+                    stack.push((new_indent, mode, content.clone()));
                 }
                 Doc::Group(content) => {
                     // Negative remaining width is meaningful: `fits` short-circuits to
                     // false on it, distinct from a remaining width of exactly zero.
                     let remaining_width =
                         self.config.max_width as isize - out.current_column as isize;
-                    let mut test_queue: VecDeque<RenderItem> = VecDeque::new();
-                    test_queue.push_back((indent, Mode::Flat, content.clone()));
-                    let chosen = if self.fits(remaining_width, test_queue) {
+                    let chosen = if self.fits(remaining_width, content, &mut widths) {
                         Mode::Flat
                     } else {
                         Mode::Break
                     };
-                    queue.push_front((indent, chosen, content.clone()));
+                    stack.push((indent, chosen, content.clone()));
                 }
                 // Spacing-control nodes and Join must be resolved away before rendering;
                 // reaching one here is a generator/pipeline bug (the Python renderer
@@ -193,81 +228,158 @@ impl Renderer {
             }
         }
 
-        out.result
+        Ok(())
     }
 
-    /// Check whether `items` fit in `width` remaining columns when rendered flat.
+    /// Check whether `doc` fits in `width` remaining columns when rendered flat.
     ///
-    /// Port of `Renderer._fits` (`renderer.py:147`). A negative `width` never fits.
-    /// Everything is measured flat: `mode` is carried on each item but never
-    /// consulted, and `indent` is threaded for `Nest` sub-items without affecting the
-    /// column count. Unhandled node types (spacing specs, joins) contribute zero
-    /// width; `fits` is intentionally lenient about them rather than asserting they
-    /// were resolved.
-    fn fits(&self, width: isize, mut items: VecDeque<RenderItem>) -> bool {
-        if width < 0 {
-            return false;
+    /// Port of `Renderer._fits` (`renderer.py`). A negative `width` never fits.
+    /// `widths` caches each measured composite node's [`FlatWidth`] by address;
+    /// `render` passes one cache for the whole render, so nested groups' content is
+    /// measured once rather than once per enclosing group. The cache is only valid
+    /// while the measured docs are alive.
+    fn fits(&self, width: isize, doc: &Rc<Doc>, widths: &mut FlatWidths) -> bool {
+        width >= 0 && flat_width(doc, widths).fits(width as usize)
+    }
+}
+
+/// The widths of a doc's lines when rendered flat. Port of `FlatWidth`.
+///
+/// Flat mode breaks only at newlines embedded in `Text` and `Comment` content, so a
+/// doc's flat rendering is one line or several. `first` and `last` are the widths of
+/// its first and last lines (equal, for one line) and `widest` the widest of all of
+/// them; `hard` records a `HardLine`, which no flat rendering fits around.
+#[derive(Clone, Copy, Debug, PartialEq, Eq)]
+struct FlatWidth {
+    hard: bool,
+    multiline: bool,
+    first: usize,
+    widest: usize,
+    last: usize,
+}
+
+impl FlatWidth {
+    const EMPTY: Self = Self::span(0);
+    const HARD: Self = Self {
+        hard: true,
+        ..Self::EMPTY
+    };
+
+    const fn span(width: usize) -> Self {
+        Self {
+            hard: false,
+            multiline: false,
+            first: width,
+            widest: width,
+            last: width,
         }
+    }
 
-        let mut column: isize = 0;
+    fn of_text(content: &str) -> Self {
+        let mut lines = content.split('\n').map(|line| line.chars().count());
+        // `split` always yields at least one (possibly empty) piece.
+        let first = lines.next().unwrap_or(0);
+        let (mut widest, mut last, mut multiline) = (first, first, false);
+        for width in lines {
+            widest = widest.max(width);
+            last = width;
+            multiline = true;
+        }
+        Self {
+            hard: false,
+            multiline,
+            first,
+            widest,
+            last,
+        }
+    }
 
-        while let Some((indent, mode, doc)) = items.pop_front() {
-            match &*doc {
-                Doc::Nil => {}
-                Doc::Text(content) | Doc::Comment(content) => {
-                    for (i, line) in content.split('\n').enumerate() {
-                        if i > 0 {
-                            // Newline resets the column to 0.
-                            column = 0;
-                        }
-                        column += line.chars().count() as isize;
-                        if column > width {
-                            return false;
-                        }
-                    }
-                }
-                Doc::Line => {
-                    column += 1; // Space in flat mode.
-                    if column > width {
-                        return false;
-                    }
-                }
-                Doc::SoftLine => {
-                    // Nothing in flat mode.
-                }
-                Doc::Nbsp => {
-                    column += 1;
-                    if column > width {
-                        return false;
-                    }
-                }
-                Doc::HardLine { .. } => return false, // Forces a break.
-                Doc::Concat(docs) => {
-                    for d in docs.iter().rev() {
-                        items.push_front((indent, mode, d.clone()));
+    /// The flat width of this doc followed by `following` on the same line.
+    fn then(self, following: Self) -> Self {
+        let joined = self.last + following.first;
+        Self {
+            hard: self.hard || following.hard,
+            multiline: self.multiline || following.multiline,
+            first: if self.multiline { self.first } else { joined },
+            widest: self.widest.max(following.widest).max(joined),
+            last: if following.multiline {
+                following.last
+            } else {
+                joined
+            },
+        }
+    }
+
+    fn fits(self, width: usize) -> bool {
+        !self.hard && self.widest <= width
+    }
+}
+
+/// Measured composite nodes, keyed by `Rc` address.
+type FlatWidths = HashMap<*const Doc, FlatWidth>;
+
+fn leaf_width(doc: &Doc) -> FlatWidth {
+    match doc {
+        Doc::Text(content) | Doc::Comment(content) => FlatWidth::of_text(content),
+        Doc::Line | Doc::Nbsp => FlatWidth::span(1),
+        Doc::HardLine { .. } => FlatWidth::HARD,
+        // Nil and SoftLine are empty flat. Unresolved spacing specs and joins are
+        // skipped rather than asserted on, as the Python helper does.
+        _ => FlatWidth::EMPTY,
+    }
+}
+
+fn children(doc: &Doc) -> Option<&[Rc<Doc>]> {
+    match doc {
+        Doc::Concat(docs) => Some(docs),
+        // Indentation only applies after a line break, and flat mode has none.
+        Doc::Nest { content, .. } | Doc::Group(content) => Some(std::slice::from_ref(content)),
+        _ => None,
+    }
+}
+
+/// Measure `doc` flat, reusing and filling `widths`. Port of `flat_width`.
+///
+/// Children are folded left to right with an explicit stack, so deep documents do
+/// not recurse, and a fold stops at its first hard line: a hard measurement's widths
+/// cover only the prefix before it, which is all a fit decision needs.
+fn flat_width(doc: &Rc<Doc>, widths: &mut FlatWidths) -> FlatWidth {
+    if let Some(found) = widths.get(&Rc::as_ptr(doc)) {
+        return *found;
+    }
+    let Some(kids) = children(doc) else {
+        return leaf_width(doc);
+    };
+    // Frames of (composite node, its children, index of the next child, width of those before it).
+    let mut stack: Vec<(&Rc<Doc>, &[Rc<Doc>], usize, FlatWidth)> =
+        vec![(doc, kids, 0, FlatWidth::EMPTY)];
+    while let Some(frame) = stack.last_mut() {
+        let (node, kids, index, measured) = frame;
+        let mut pending = None;
+        while *index < kids.len() && !measured.hard {
+            let child = &kids[*index];
+            let child_width = match widths.get(&Rc::as_ptr(child)) {
+                Some(found) => *found,
+                None => match children(child) {
+                    Some(grandchildren) => {
+                        pending = Some((child, grandchildren));
+                        break;
                     }
-                }
-                Doc::Nest {
-                    indent: nest_indent,
-                    content,
-                } => {
-                    let new_indent = indent + (*nest_indent as usize) * self.config.indent_width;
-                    items.push_front((new_indent, mode, content.clone()));
-                }
-                Doc::Group(content) => {
-                    items.push_front((indent, Mode::Flat, content.clone()));
-                }
-                // Mirrors the Python helper: unhandled types are simply skipped (no
-                // contribution to width), never raised on.
-                Doc::Join { .. }
-                | Doc::AfterSpec { .. }
-                | Doc::BeforeSpec { .. }
-                | Doc::SeparatorSpec { .. } => {}
+                    None => leaf_width(child),
+                },
+            };
+            *measured = measured.then(child_width);
+            *index += 1;
+        }
+        match pending {
+            Some((child, grandchildren)) => stack.push((child, grandchildren, 0, FlatWidth::EMPTY)),
+            None => {
+                widths.insert(Rc::as_ptr(node), *measured);
+                stack.pop();
             }
         }
-
-        true
     }
+    widths[&Rc::as_ptr(doc)]
 }
 
 #[cfg(test)]
@@ -1037,4 +1149,145 @@ mod tests {
             "short one\nalso short\ntiny"
         );
     }
+
+    fn measure(doc: Doc) -> FlatWidth {
+        flat_width(&Rc::new(doc), &mut FlatWidths::new())
+    }
+
+    #[test]
+    fn flat_width_tracks_first_widest_and_last_lines() {
+        let doc = concat(vec![
+            text("ab"),
+            line(),
+            text("c\ndefgh\ni"),
+            nbsp(),
+            text("jk"),
+        ]);
+        assert_eq!(
+            measure(doc),
+            FlatWidth {
+                hard: false,
+                multiline: true,
+                first: 4,
+                widest: 5,
+                last: 4
+            }
+        );
+        assert_eq!(measure(text("")), FlatWidth::EMPTY);
+        assert!(measure(concat(vec![text("a"), hardline(0), text("b")])).hard);
+    }
+
+    #[test]
+    fn flat_width_counts_chars_not_bytes() {
+        assert_eq!(measure(text("héllo")), FlatWidth::span(5));
+    }
+
+    #[test]
+    fn shared_subdoc_is_measured_once_per_cache() {
+        let shared = Rc::new(group(concat(vec![text("ab"), line(), text("cd")])));
+        let doc = Rc::new(Doc::Concat(vec![
+            shared.clone(),
+            Rc::new(nbsp()),
+            shared.clone(),
+        ]));
+        let mut widths = FlatWidths::new();
+        assert_eq!(flat_width(&doc, &mut widths), FlatWidth::span(11));
+        assert_eq!(widths[&Rc::as_ptr(&shared)], FlatWidth::span(5));
+        // The root, the shared group, and the group's inner concat.
+        assert_eq!(widths.len(), 3);
+    }
+
+    /// Each nested group's fit is read from the cache, so this stays linear: the old
+    /// per-group walk re-measured every enclosed group.
+    #[test]
+    fn deeply_nested_groups_decide_from_cached_widths() {
+        let depth = 3000;
+        let mut doc = concat(vec![text(&"x".repeat(10)), line(), text("y")]);
+        for _ in 0..depth {
+            doc = group(concat(vec![text("("), doc, text(")")]));
+        }
+        let wide = render_with(
+            RendererConfig {
+                indent_width: 4,
+                max_width: depth * 2 + 12,
+            },
+            doc.clone(),
+        );
+        assert_eq!(
+            wide,
+            format!("{}xxxxxxxxxx y{}", "(".repeat(depth), ")".repeat(depth))
+        );
+        let narrow = render_with(
+            RendererConfig {
+                indent_width: 4,
+                max_width: depth + 12,
+            },
+            doc,
+        );
+        assert_eq!(
+            narrow,
+            format!("{}xxxxxxxxxx\ny{}", "(".repeat(depth), ")".repeat(depth))
+        );
+    }
+
+    #[test]
+    fn render_to_streams_the_same_text_as_render() {
+        let mut items = Vec::new();
+        for i in 0..20_000 {
+            items.push(group(concat(vec![
+                text(format!("item_{i}(")),
+                nest(1, concat(vec![softline(), text("argument")])),
+                softline(),
+                text(")"),
+            ])));
+            items.push(hardline(0));
+        }
+        let doc = concat(items);
+        let renderer = Renderer::new(RendererConfig::default());
+        let whole = renderer.render(&doc);
+        assert!(whole.len() > 2 * STREAM_CHUNK_BYTES);
+
+        /// Records the size of every write so the test can see the output was chunked.
+        struct Recorder(Vec<u8>, Vec<usize>);
+        impl io::Write for Recorder {
+            fn write(&mut self, buf: &[u8]) -> io::Result<usize> {
+                self.0.extend_from_slice(buf);
+                self.1.push(buf.len());
+                Ok(buf.len())
+            }
+            fn flush(&mut self) -> io::Result<()> {
+                Ok(())
+            }
+        }
+        let mut recorder = Recorder(Vec::new(), Vec::new());
+        renderer.render_to(&doc, &mut recorder).unwrap();
+        assert_eq!(String::from_utf8(recorder.0).unwrap(), whole);
+        assert!(recorder.1.len() > 2);
+        assert!(recorder.1.iter().all(|&n| n < 2 * STREAM_CHUNK_BYTES));
+    }
+
+    #[test]
+    fn render_to_stops_at_the_first_write_error() {
+        struct Failing(usize);
+        impl io::Write for Failing {
+            fn write(&mut self, _buf: &[u8]) -> io::Result<usize> {
+                self.0 += 1;
+                Err(io::Error::other("disk full"))
+            }
+            fn flush(&mut self) -> io::Result<()> {
+                Ok(())
+            }
+        }
+        let doc = concat(vec![
+            text("x".repeat(STREAM_CHUNK_BYTES)),
+            hardline(0),
+            text("y"),
+        ]);
+        let mut failing = Failing(0);
+        let err = Renderer::default()
+            .render_to(&doc, &mut failing)
+            .unwrap_err();
+        assert_eq!(err.to_string(), "disk full");
+        assert_eq!(failing.0, 1);
+    }
 }
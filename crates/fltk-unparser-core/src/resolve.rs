@@ -10,6 +10,12 @@
 //! 3. resolve the remaining specs by pattern matching,
 //! 4. collapse `HardLine` + soft-break sequences.
 //!
+//! The Python module has since fused these passes into one bottom-up pass with the
+//! same output; the `resolve_specs.py` names and line numbers cited below refer to
+//! the multi-pass version this file was ported from. `_resolve_trivia` in the fused
+//! version documents the one behavior it keeps from running pass 4 over the whole
+//! tree: Groups inside preserved trivia are collapsed twice.
+//!
 //! The internal passes operate on `Rc<Doc>` rather than `&Doc`/owned `Doc` so that
 //! unchanged subtrees are shared by refcount bump, mirroring Python's frozen-dataclass
 //! sharing (a leaf "passes through unchanged" as the same object). Recursion is left
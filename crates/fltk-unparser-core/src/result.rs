@@ -7,30 +7,40 @@
 //! its own walk from where this one stopped.
 
 use crate::doc::Doc;
-use crate::DocAccumulator;
+use crate::{DocAccumulator, DocBuilder};
 
 /// Result from unparsing a CST node: the accumulated `Doc` plus the new position.
 ///
 /// Port of `pyrt.py`'s `UnparseResult`. `accumulator` holds the [`Doc`] result and
 /// trivia state for the consumed children; `new_pos` is the index after the children
-/// this unparse consumed from the node's child list.
+/// this unparse consumed from the node's child list. `A` is the accumulator type the
+/// unparser was generated against: [`DocAccumulator`] by default, or [`DocBuilder`].
 #[derive(Clone, Debug)]
-pub struct UnparseResult {
+pub struct UnparseResult<A = DocAccumulator> {
     /// The accumulator holding the `Doc` result and trivia state.
-    pub accumulator: DocAccumulator,
+    pub accumulator: A,
     /// The position after consuming children from the CST node.
     pub new_pos: usize,
 }
 
-impl UnparseResult {
+impl<A> UnparseResult<A> {
     /// Construct a result from an accumulator and the new position.
-    pub fn new(accumulator: DocAccumulator, new_pos: usize) -> Self {
+    pub fn new(accumulator: A, new_pos: usize) -> Self {
         UnparseResult {
             accumulator,
             new_pos,
         }
     }
+}
+
+impl UnparseResult<DocAccumulator> {
+    /// Convenience accessor for the accumulated `Doc` (port of `UnparseResult.doc`).
+    pub fn doc(&self) -> Doc {
+        self.accumulator.doc()
+    }
+}
 
+impl UnparseResult<DocBuilder> {
     /// Convenience accessor for the accumulated `Doc` (port of `UnparseResult.doc`).
     pub fn doc(&self) -> Doc {
         self.accumulator.doc()
@@ -64,4 +74,10 @@ mod tests {
         let result = UnparseResult::new(DocAccumulator::new(), 0);
         assert_eq!(result.doc(), Doc::Nil);
     }
+
+    #[test]
+    fn builder_result_doc_matches_builder_doc() {
+        let result = UnparseResult::new(DocBuilder::new().add_non_trivia(text("a")), 1);
+        assert_eq!(result.doc(), text("a"));
+    }
 }
@@ -0,0 +1,81 @@
+"""Helpers shared by the CLIs that process many files per run.
+
+Both the ``unparse`` and ``fltk-highlight`` CLIs take files and directories, expand them to a
+sorted file list, optionally fan the work out to spawned worker processes, and print each
+file's output under a ``==> path <==`` header. The pieces they share live here.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from fltk.fegen.pyrt.errors import escape_control_chars
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator, Sequence
+    from pathlib import Path
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+# Files handed to a worker per round trip: enough to amortize the pickling overhead on small files.
+CHUNK_SIZE = 8
+
+
+def expand_inputs(inputs: list[Path], suffixes: list[str]) -> list[Path]:
+    """The files to process: each file input, plus the matching files under each directory.
+
+    A directory contributes every file below it, sorted, whose suffix is one of ``suffixes`` (any
+    file when none are given), skipping dot-files and dot-directories.
+    """
+    files: list[Path] = []
+    for path in inputs:
+        if not path.is_dir():
+            files.append(path)
+            continue
+        found = [
+            candidate
+            for candidate in path.rglob("*")
+            if candidate.is_file()
+            and not any(part.startswith(".") for part in candidate.relative_to(path).parts)
+            and (not suffixes or candidate.suffix in suffixes)
+        ]
+        files.extend(sorted(found))
+    return files
+
+
+def sanitize(text: str) -> str:
+    """Escape terminal-control and bidi characters in untrusted text, keeping newlines and tabs.
+
+    Emitting workspace text verbatim would let embedded escape sequences drive the terminal
+    (clipboard, title, cursor) or restyle malicious code as a comment. Newlines are preserved so
+    multi-line source still renders; ``escape_control_chars`` keeps tabs and escapes ``\\x1b``
+    and the rest of the control/bidi set.
+    """
+    return "\n".join(escape_control_chars(line) for line in text.split("\n"))
+
+
+def header(path: Path) -> str:
+    """The ``==> path <==`` line introducing a file's output, with the path sanitized."""
+    return f"==> {sanitize(str(path))} <==\n"
+
+
+def map_in_workers(
+    function: Callable[[_T], _R],
+    items: Sequence[_T],
+    *,
+    jobs: int,
+    initializer: Callable[..., None],
+    initargs: tuple[Any, ...],
+) -> Iterator[_R]:
+    """Apply ``function`` to ``items`` across ``jobs`` spawned worker processes, yielding in order.
+
+    Each worker runs ``initializer(*initargs)`` once at startup. Workers are spawned, not forked,
+    so each builds its own generated modules rather than inheriting the parent's; ``function``
+    and ``initargs`` must therefore be picklable.
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(jobs, mp_context=context, initializer=initializer, initargs=initargs) as pool:
+        yield from pool.map(function, items, chunksize=CHUNK_SIZE)
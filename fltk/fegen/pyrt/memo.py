@@ -1,4 +1,5 @@
 import logging
+import time
 from collections.abc import Callable, MutableMapping
 from dataclasses import dataclass
 from typing import (
@@ -74,10 +75,64 @@ class ApplyResult(Generic[PosType, ResultType]):
 RuleCallable = Callable[[PosType], ApplyResult[PosType, ResultType] | None]
 
 
+class ParseCancelledError(Exception):
+    """Raised out of :meth:`Packrat.apply` when the parse's :class:`ParseBudget` is exhausted.
+
+    The parse is abandoned mid-flight; no partial result or error-tracker state is meaningful.
+    """
+
+
+class ParseBudget:
+    """A wall-clock deadline and cooperative cancellation flag for one parse.
+
+    ``Packrat.apply`` consults the budget every ``check_interval`` rule applications, so the cost
+    on the hot path is a counter decrement. The clock runs from :meth:`start` (called by whoever
+    begins the parse), not from construction, so a budget may be created before its parse is
+    scheduled. :meth:`cancel` may be called from any thread: it only sets a flag the parsing
+    thread polls.
+
+    The check is cooperative: a single terminal match that never returns (a catastrophically
+    backtracking regex) is not interrupted until it does.
+    """
+
+    def __init__(self, timeout: float | None = None, *, check_interval: int = 1024) -> None:
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self._deadline: float | None = None
+        self._cancelled = False
+
+    def start(self) -> None:
+        """Start the clock: the parse may run for ``timeout`` seconds from now."""
+        if self.timeout is not None:
+            self._deadline = time.monotonic() + self.timeout
+
+    def cancel(self) -> None:
+        """Ask the parse to stop at its next check."""
+        self._cancelled = True
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether :meth:`cancel` was called (as opposed to the deadline passing)."""
+        return self._cancelled
+
+    def check(self) -> None:
+        """Raise :class:`ParseCancelledError` if the budget is cancelled or past its deadline."""
+        if self._cancelled:
+            msg = "parse cancelled"
+            raise ParseCancelledError(msg)
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            msg = f"parse exceeded its {self.timeout}s time budget"
+            raise ParseCancelledError(msg)
+
+
 class Packrat(Generic[RuleId, PosType]):
-    def __init__(self) -> None:
+    def __init__(self, budget: ParseBudget | None = None) -> None:
         self.invocation_stack: list[RuleId] = []
         self._recursions: dict[PosType, RecursionInfo[RuleId]] = {}
+        # Optional parse budget, checked every ``budget.check_interval`` applications. Generated
+        # parsers construct their Packrat without one; callers assign it before parsing.
+        self.budget = budget
+        self._until_check = 0
 
     def apply(
         self,
@@ -86,7 +141,16 @@ class Packrat(Generic[RuleId, PosType]):
         rule_cache: CacheType[PosType, RuleId, ResultType],
         pos: PosType,
     ) -> ApplyResult[PosType, ResultType] | None:
-        """Apply a parser rule with memoization and left-recursion support."""
+        """Apply a parser rule with memoization and left-recursion support.
+
+        Raises:
+            ParseCancelledError: the :attr:`budget` was cancelled or its deadline passed.
+        """
+        if self.budget is not None:
+            self._until_check -= 1
+            if self._until_check <= 0:
+                self._until_check = self.budget.check_interval
+                self.budget.check()
         LOG.debug("apply_rule %d at %s", rule_id, pos)
         start_pos = pos
         memo: MemoEntry[RuleId, PosType, ResultType] | None = self._recall(
@@ -90,6 +90,14 @@ class Span:
         """Return ``True`` if a source string is attached to this span."""
         return self._source is not None
 
+    def source(self) -> str | None:
+        """Return the whole source string attached to this span, or ``None`` if sourceless.
+
+        Python-backend only: the string ``start``/``end`` index, for callers that read many
+        offsets from it without a per-span ``text()`` copy.
+        """
+        return self._source
+
     def len(self) -> int:
         """Return the span length in codepoints.
 
@@ -4,6 +4,8 @@ import logging
 from collections.abc import Callable, Sequence
 from typing import Final, TypeVar
 
+import pytest
+
 from fltk.fegen.pyrt import memo
 
 LOG: Final = logging.getLogger(__name__)
@@ -251,3 +253,57 @@ def test_fail() -> None:
     apply_result = test.indirect_a(0)
     LOG.info("parse result: '%s'", apply_result)
     assert apply_result is None
+
+
+def test_budget_unexhausted_parse_succeeds() -> None:
+    test = Parser("0+1+2+3+4+i")
+    budget = memo.ParseBudget(60.0, check_interval=1)
+    budget.start()
+    test.packrat.budget = budget
+    apply_result = test.rule_expr(0)
+    assert apply_result is not None
+    assert apply_result.pos == 9
+
+
+def test_budget_cancelled_aborts_parse() -> None:
+    test = Parser("0+1+2+3+4+i")
+    budget = memo.ParseBudget()
+    budget.cancel()
+    test.packrat.budget = budget
+    with pytest.raises(memo.ParseCancelledError, match="cancelled"):
+        test.rule_expr(0)
+    assert budget.cancelled
+
+
+def test_budget_deadline_aborts_parse() -> None:
+    test = Parser("0+1+2+3+4+i")
+    budget = memo.ParseBudget(-1.0)
+    budget.start()
+    test.packrat.budget = budget
+    with pytest.raises(memo.ParseCancelledError, match="time budget"):
+        test.rule_expr(0)
+    assert not budget.cancelled
+
+
+def test_budget_checked_every_interval() -> None:
+    checks = 0
+
+    class CountingBudget(memo.ParseBudget):
+        def check(self) -> None:
+            nonlocal checks
+            checks += 1
+
+    applications = 0
+    test = Parser("0+1+2+3+4+i")
+    original = test.packrat.apply
+
+    def counting_apply(*args, **kwargs):  # type: ignore[no-untyped-def]
+        nonlocal applications
+        applications += 1
+        return original(*args, **kwargs)
+
+    test.packrat.apply = counting_apply  # type: ignore[method-assign]
+    test.packrat.budget = CountingBudget(check_interval=3)
+    test.rule_expr(0)
+    # The first application checks, then every third one after it.
+    assert checks == (applications + 2) // 3
@@ -4,12 +4,14 @@ The default layer assigns a semantic-token type to every terminal span and trivi
 analysis-grammar CST, using only the grammar's own structure — no ``.fltklsp`` spec. A terminal
 span classifies by *provenance* (which grammar item the parser matched: a ``Literal`` or a
 ``Regex``) and then by the matched text's shape; a trivia node paints a single ``comment`` over
-its whole span. The explicit-paint painter layer is layered on top of this elsewhere.
+its whole span. The explicit-paint painter layer is layered on top of this by :func:`layer_tokens`;
+the tree walk that collects both layers' intervals is :mod:`fltk.lsp.traversal`.
 """
 
 from __future__ import annotations
 
 import dataclasses
+import heapq
 import itertools
 import re
 import typing
@@ -19,7 +21,7 @@ from fltk.fegen.pyrt.span_protocol import SpanKind
 from fltk.lsp import lsp_config
 
 if typing.TYPE_CHECKING:
-    from collections.abc import Iterator, Mapping
+    from collections.abc import Mapping
 
     from fltk.lsp.symbols import SymbolTable
 
@@ -132,7 +134,7 @@ def _classify_regex_text(text: str) -> str:
     return "text"
 
 
-def _classify_span_text(
+def classify_span_text(
     full_text: str, start: int, end: int, label_name: str | None, table: _TerminalTable
 ) -> str | None:
     r"""Classify one terminal span by provenance (literal-first) then text shape.
@@ -201,32 +203,8 @@ def child_surface(
     return is_span, cstart, cend, child_text, child_rule_name, label_name
 
 
-def _default_intervals(node: typing.Any, tables: GrammarTables, text: str) -> Iterator[tuple[int, int, str]]:
-    """Yield ``(start, end, token_type)`` default intervals for a CST node, depth-first.
-
-    A trivia node emits at most one ``comment`` interval over its whole span and is not descended
-    into (so terminals inside a comment never repaint). Every other node classifies its own
-    terminal (span) children and recurses into its node children.
-    """
-    rule = rule_for_node(node, tables)
-    if rule.is_trivia_rule:
-        start, end = node.span.start, node.span.end
-        if text[start:end].strip():
-            yield (start, end, "comment")
-        return
-
-    table = tables.tables[rule.name]
-    for label, child in node.children:
-        if child.kind == SpanKind.SPAN:
-            start, end = child.start, child.end
-            if not text[start:end].strip():
-                continue
-            label_name = label.name if label is not None else None
-            token_type = _classify_span_text(text, start, end, label_name, table)
-            if token_type is not None:
-                yield (start, end, token_type)
-        else:
-            yield from _default_intervals(child, tables, text)
+# A default-layer interval: ``(start, end, token_type)``.
+DefaultInterval: typing.TypeAlias = "tuple[int, int, str]"
 
 
 def default_tokens(
@@ -240,52 +218,27 @@ def default_tokens(
     sorted, non-overlapping, adjacent-merged token stream with empty modifiers, all within
     ``[0, len(text))``.
     """
+    # Deferred: the traversal module imports this one for the classification primitives it calls.
+    from fltk.lsp import traversal  # noqa: PLC0415
+
     if tables is None:
         tables = build_grammar_tables(grammar)
-    intervals = _default_intervals(tree, tables, text)
-    return _merge_tokens([Token(start, end, token_type, ()) for start, end, token_type in intervals])
+    # Neither layer the spec drives is collected, so an empty config stands in for one.
+    empty = lsp_config.ResolvedLspConfig(node_paints={}, child_matchers={}, global_child_matchers=())
+    walked = traversal.walk(tree, tables, empty, text, collect_symbols=False, collect_paints=False)
+    return layer_tokens([], walked.defaults)
 
 
 # --- Explicit painter layer -----------------------------------------------------------------------
 
 # An explicit interval and its precedence key. The key is (tree depth of the matched node/child,
 # resolution-time tier); larger wins, so an innermost match and a higher-tier statement win.
-_Key: typing.TypeAlias = "tuple[int, lsp_config.Tier]"
-_Interval: typing.TypeAlias = "tuple[int, int, lsp_config.Paint, _Key]"
-
-
-def _explicit_intervals(
-    node: typing.Any,
-    depth: int,
-    *,
-    tables: GrammarTables,
-    resolved: lsp_config.ResolvedLspConfig,
-    text: str,
-    out: list[_Interval],
-) -> None:
-    """Collect explicit paint intervals over ``node`` and its subtree, depth-first.
-
-    A whole-node paint (from a global rule-name anchor) is recorded at the node's own depth; a
-    child match (from a rule-block or global label/literal/rule anchor) is recorded at the child's
-    depth (``depth + 1``), so a deeper match outranks a shallower one over their overlap.
-    """
-    rule = rule_for_node(node, tables)
-    for node_paint in resolved.node_paints.get(rule.name, ()):
-        out.append((node.span.start, node.span.end, node_paint.paint, (depth, node_paint.tier)))
-    matchers = resolved.child_matchers.get(rule.name, ())
-
-    child_depth = depth + 1
-    for label, child in node.children:
-        is_span, cstart, cend, child_text, child_rule_name, label_name = child_surface(label, child, text, tables)
-        for matcher in itertools.chain(matchers, resolved.global_child_matchers):
-            if lsp_config.match_applies(matcher.match, label_name, child_text, child_rule_name):
-                out.append((cstart, cend, matcher.paint, (child_depth, matcher.tier)))
-        if not is_span:
-            _explicit_intervals(child, child_depth, tables=tables, resolved=resolved, text=text, out=out)
+Key: typing.TypeAlias = "tuple[int, lsp_config.Tier]"
+Interval: typing.TypeAlias = "tuple[int, int, lsp_config.Paint, Key]"
 
 
-def _ref_intervals(symbol_table: SymbolTable, out: list[_Interval]) -> None:
-    """Append one explicit-layer interval per resolved, in-legend reference to ``out``.
+def ref_intervals(symbol_table: SymbolTable) -> list[Interval]:
+    """One explicit-layer interval per resolved, in-legend reference.
 
     A resolved reference inherits its defining kind's first segment as its token; the extractor
     already carried the reference's ``depth`` and ``tier`` so the painter never re-matches. A
@@ -293,89 +246,107 @@ def _ref_intervals(symbol_table: SymbolTable, out: list[_Interval]) -> None:
     on the same element always wins. Unresolved references and out-of-legend kinds contribute
     nothing and fall through to the defaults.
     """
+    out: list[Interval] = []
     for ref in symbol_table.references:
         symbol = ref.symbol
         if symbol is None or not symbol.kind or symbol.kind[0] not in lsp_config.TOKEN_LEGEND:
             continue
         paint = lsp_config.Paint(token=symbol.kind[0], modifiers=())
         out.append((ref.start, ref.end, paint, (ref.depth, ref.tier)))
+    return out
 
 
-def _winner_segments(intervals: list[_Interval]) -> list[tuple[int, int, lsp_config.Paint]]:
+def _winner_segments(intervals: list[Interval]) -> list[tuple[int, int, lsp_config.Paint]]:
     """Resolve overlapping explicit intervals into a partition of winning paints.
 
     Between consecutive interval endpoints the covering set is constant; the max-key interval wins
     (including a ``none`` paint, which still occupies the segment so it occludes losers and
-    suppresses defaults). Adjacent segments with the same paint are merged.
+    suppresses defaults), and among equal keys the earliest-collected interval wins. A sweep over
+    the sorted endpoints keeps the active set in a heap ordered by that precedence, dropping an
+    interval lazily once the sweep passes its end, so resolution is O(n log n). Adjacent segments
+    with the same paint are merged.
     """
-    # TODO(lsp-classify-hotpath): this rescans all intervals per boundary pair (O(n^2)); a
-    # sweep line maintaining the active set would reach the intended O(n log n).
     if not intervals:
         return []
+    # Rank 0 is the strongest interval: key descending, collection order among equal keys (the
+    # sort is stable, and stays stable under reverse=True).
+    by_precedence = sorted(range(len(intervals)), key=lambda i: intervals[i][3], reverse=True)
+    rank = [0] * len(intervals)
+    for position, i in enumerate(by_precedence):
+        rank[i] = position
+    by_start = sorted(range(len(intervals)), key=lambda i: intervals[i][0])
     boundaries = sorted({b for start, end, _, _ in intervals for b in (start, end)})
+
+    active: list[tuple[int, int]] = []  # (rank, interval index) min-heap
+    next_start = 0
     segments: list[tuple[int, int, lsp_config.Paint]] = []
     for a, b in itertools.pairwise(boundaries):
-        best: tuple[_Key, lsp_config.Paint] | None = None
-        for start, end, paint, key in intervals:
-            if start <= a and b <= end and (best is None or key > best[0]):
-                best = (key, paint)
-        if best is not None:
-            paint = best[1]
-            if segments and segments[-1][2] == paint and segments[-1][1] == a:
-                prev_start = segments[-1][0]
-                segments[-1] = (prev_start, b, paint)
-            else:
-                segments.append((a, b, paint))
+        while next_start < len(by_start) and intervals[by_start[next_start]][0] <= a:
+            i = by_start[next_start]
+            heapq.heappush(active, (rank[i], i))
+            next_start += 1
+        while active and intervals[active[0][1]][1] <= a:
+            heapq.heappop(active)
+        if not active:
+            continue
+        paint = intervals[active[0][1]][2]
+        if segments and segments[-1][2] == paint and segments[-1][1] == a:
+            segments[-1] = (segments[-1][0], b, paint)
+        else:
+            segments.append((a, b, paint))
     return segments
 
 
-def _merge_ranges(ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
-    """Merge a list of ``[start, end)`` ranges into sorted, non-overlapping coverage."""
-    merged: list[tuple[int, int]] = []
-    for start, end in sorted(ranges):
-        if start >= end:
-            continue
-        if merged and start <= merged[-1][1]:
-            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
-        else:
-            merged.append((start, end))
-    return merged
+def layer_tokens(explicit: list[Interval], defaults: typing.Sequence[DefaultInterval]) -> list[Token]:
+    """Layer explicit paints over default intervals into the final token stream, in one sweep.
 
+    ``defaults`` must be sorted and non-overlapping (the walk emits them in document order).
+    Explicit paints win over defaults across their whole span -- a ``none`` paint emits no token
+    but still suppresses the defaults under it -- and positions no explicit paint covers keep their
+    default. The winner segments and the defaults are merged as two sorted streams, so each default
+    interval is clipped against only the segments it overlaps, and contiguous runs sharing a token
+    type and modifiers are merged as they are emitted. Returns a sorted, non-overlapping token
+    stream.
+    """
+    segments = _winner_segments(explicit)
+    tokens: list[Token] = []
 
-def _subtract(interval: tuple[int, int], covered: list[tuple[int, int]]) -> Iterator[tuple[int, int]]:
-    """Yield the parts of ``interval`` not overlapping any range in sorted, merged ``covered``."""
-    start, end = interval
-    cursor = start
-    for cstart, cend in covered:
-        if cend <= cursor:
-            continue
-        if cstart >= end:
-            break
-        if cstart > cursor:
-            yield (cursor, min(cstart, end))
-        cursor = max(cursor, cend)
-        if cursor >= end:
-            return
-    if cursor < end:
-        yield (cursor, end)
-
-
-def _merge_tokens(tokens: list[Token]) -> list[Token]:
-    """Sort tokens and merge contiguous runs sharing a token type and modifiers."""
-    tokens.sort(key=lambda t: (t.start, t.end))
-    merged: list[Token] = []
-    for token in tokens:
-        if (
-            merged
-            and merged[-1].end == token.start
-            and merged[-1].token_type == token.token_type
-            and merged[-1].modifiers == token.modifiers
-        ):
-            prev = merged[-1]
-            merged[-1] = Token(prev.start, token.end, prev.token_type, prev.modifiers)
-        else:
-            merged.append(token)
-    return merged
+    def emit(start: int, end: int, token_type: str, modifiers: tuple[str, ...]) -> None:
+        if tokens:
+            prev = tokens[-1]
+            if prev.end == start and prev.token_type == token_type and prev.modifiers == modifiers:
+                tokens[-1] = Token(prev.start, end, token_type, modifiers)
+                return
+        tokens.append(Token(start, end, token_type, modifiers))
+
+    def emit_segment(segment: tuple[int, int, lsp_config.Paint]) -> None:
+        start, end, paint = segment
+        if paint.token != "none":
+            emit(start, end, paint.token, paint.modifiers)
+
+    i = 0
+    for dstart, dend, token_type in defaults:
+        while i < len(segments) and segments[i][1] <= dstart:
+            emit_segment(segments[i])
+            i += 1
+        cursor = dstart
+        while i < len(segments) and segments[i][0] < dend:
+            sstart, send, _paint = segments[i]
+            if sstart > cursor:
+                emit(cursor, sstart, token_type, ())
+            if send > dend:
+                # The segment runs past this default: it is emitted once a later default (or the
+                # final flush) passes its end.
+                cursor = dend
+                break
+            emit_segment(segments[i])
+            cursor = max(cursor, send)
+            i += 1
+        if cursor < dend:
+            emit(cursor, dend, token_type, ())
+    for segment in segments[i:]:
+        emit_segment(segment)
+    return tokens
 
 
 def classify(
@@ -391,34 +362,24 @@ def classify(
 
     ``grammar`` must be the trivia-classified analysis grammar the parser was generated from
     (``ParserResult.grammar``). Pass ``tables`` (from :func:`build_grammar_tables`) to reuse a
-    precomputed grammar table across calls -- the hot-path caller (``AnalysisEngine``) builds it
-    once per grammar; when omitted it is built from ``grammar``. Pass ``symbol_table`` (from
-    :func:`~fltk.lsp.symbols.extract`) to paint resolved references with their defining kind's
-    token; omitting it (the default) reproduces the reference-free output exactly. Explicit paints
-    win over defaults across their whole span (a ``none`` paint suppresses both defaults and losing
-    paints but emits no token); positions no explicit paint covers fall back to the built-in
-    defaults. Returns a sorted, non-overlapping, adjacent-merged token stream, all within
-    ``[0, len(text))``.
+    precomputed grammar table across calls; when omitted it is built from ``grammar``. Pass
+    ``symbol_table`` (from :func:`~fltk.lsp.symbols.extract`) to paint resolved references with
+    their defining kind's token; omitting it (the default) reproduces the reference-free output
+    exactly. Explicit paints win over defaults across their whole span (a ``none`` paint suppresses
+    both defaults and losing paints but emits no token); positions no explicit paint covers fall
+    back to the built-in defaults. Returns a sorted, non-overlapping, adjacent-merged token stream,
+    all within ``[0, len(text))``.
+
+    The hot-path caller (``AnalysisEngine``) does not come through here: it runs
+    :func:`fltk.lsp.traversal.analyze_tree`, which extracts symbols in the same walk.
     """
+    # Deferred: the traversal module imports this one for the classification primitives it calls.
+    from fltk.lsp import traversal  # noqa: PLC0415
+
     if tables is None:
         tables = build_grammar_tables(grammar)
-
-    explicit: list[_Interval] = []
-    _explicit_intervals(tree, 0, tables=tables, resolved=resolved_config, text=text, out=explicit)
+    walked = traversal.walk(tree, tables, resolved_config, text, collect_symbols=False)
+    explicit = walked.explicit
     if symbol_table is not None:
-        _ref_intervals(symbol_table, explicit)
-    covered = _merge_ranges([(start, end) for start, end, _, _ in explicit])
-
-    tokens: list[Token] = []
-    for start, end, paint in _winner_segments(explicit):
-        if paint.token != "none":
-            tokens.append(Token(start, end, paint.token, paint.modifiers))
-
-    # TODO(lsp-classify-hotpath): second full tree traversal; fold default emission into the
-    # explicit walk above. With symbol extraction (symbols.extract) this is the third O(tree)
-    # walk per analysis (extraction, explicit paints, defaults); the same unification folds it in.
-    for start, end, token_type in _default_intervals(tree, tables, text):
-        for dstart, dend in _subtract((start, end), covered):
-            tokens.append(Token(dstart, dend, token_type, ()))
-
-    return _merge_tokens(tokens)
+        explicit.extend(ref_intervals(symbol_table))
+    return layer_tokens(explicit, walked.defaults)
@@ -14,9 +14,11 @@ import logging
 from typing import TYPE_CHECKING, Any
 
 from fltk import plumbing
-from fltk.lsp import classify, symbols
+from fltk.fegen.pyrt import memo
+from fltk.lsp import classify, symbols, traversal
 from fltk.lsp.analysis import prepare_analysis_grammar
 from fltk.lsp.lsp_config import ResolvedLspConfig, load_lsp_config
+from fltk.lsp.telemetry import Telemetry
 
 if TYPE_CHECKING:
     from pathlib import Path
@@ -105,6 +107,7 @@ class AnalysisEngine:
         )
         self._resolved_config = resolved_config
         self._start_rule = start_rule
+        self._telemetry = Telemetry()
 
     @classmethod
     def from_paths(
@@ -129,6 +132,14 @@ class AnalysisEngine:
         """The start-rule override this engine parses with; None means the grammar's first rule."""
         return self._start_rule
 
+    @property
+    def telemetry(self) -> Telemetry:
+        """The phase timings of every analysis this engine ran (``parse``, ``walk``, ``layer``).
+
+        A server shares it to record its own phases alongside, so one snapshot covers both.
+        """
+        return self._telemetry
+
     @property
     def source_grammar(self) -> gsm.Grammar:
         """The original grammar passed to ``__init__``, before the analysis transform.
@@ -146,7 +157,7 @@ class AnalysisEngine:
         """
         return self._trivia_kind_names
 
-    def analyze(self, text: str) -> DocumentAnalysis:
+    def analyze(self, text: str, *, budget: memo.ParseBudget | None = None) -> DocumentAnalysis:
         """Analyze ``text`` into a CST, semantic tokens, and any structured parse error.
 
         Returns one of the three :class:`DocumentAnalysis` shapes. A complete parse yields the
@@ -158,25 +169,20 @@ class AnalysisEngine:
 
         The grammar, spec, and input are all workspace-supplied and untrusted. A deeply nested
         input that exhausts the parser's recursion is caught and reported as a parse failure. A
-        grammar regex that backtracks catastrophically or a non-terminating recursive parse is
-        *not* bounded here -- a wall-clock/cancellation budget is the concern of the long-lived
-        server layer that wraps this engine, not the one-shot classification seam.
+        runaway parse is bounded only by ``budget``: a parse that outlives its deadline is reported
+        as a failed outcome with ``offset`` ``None``, while a *cancelled* budget re-raises
+        :class:`~fltk.fegen.pyrt.memo.ParseCancelledError` -- the caller asked for no result.
         """
         try:
-            parsed = plumbing.parse_text(self._parser_result, text, self._start_rule)
+            with self._telemetry.phase("parse"):
+                parsed = plumbing.parse_text(self._parser_result, text, self._start_rule, budget=budget)
             if not parsed.success:
                 error = ParseErrorInfo(message=parsed.error_message or "", offset=parsed.error_pos)
                 if parsed.prefix_cst is None:
                     return DocumentAnalysis(tree=None, tokens=None, error=error)
                 try:
-                    prefix_symbols = symbols.extract(parsed.prefix_cst, self._tables, self._resolved_config, text)
-                    prefix_tokens = classify.classify(
-                        parsed.prefix_cst,
-                        self._parser_result.grammar,
-                        self._resolved_config,
-                        text,
-                        tables=self._tables,
-                        symbol_table=prefix_symbols,
+                    prefix_symbols, prefix_tokens = traversal.analyze_tree(
+                        parsed.prefix_cst, self._tables, self._resolved_config, text, telemetry=self._telemetry
                     )
                 except RecursionError:
                     # Classifying the prefix overflowed while the parse itself did not: degrade to the
@@ -196,14 +202,8 @@ class AnalysisEngine:
                     symbols=prefix_symbols,
                     prefix_end=parsed.prefix_pos,
                 )
-            symbol_table = symbols.extract(parsed.cst, self._tables, self._resolved_config, text)
-            tokens = classify.classify(
-                parsed.cst,
-                self._parser_result.grammar,
-                self._resolved_config,
-                text,
-                tables=self._tables,
-                symbol_table=symbol_table,
+            symbol_table, tokens = traversal.analyze_tree(
+                parsed.cst, self._tables, self._resolved_config, text, telemetry=self._telemetry
             )
         except RecursionError:
             return DocumentAnalysis(
@@ -214,6 +214,18 @@ class AnalysisEngine:
                     offset=None,
                 ),
             )
+        except memo.ParseCancelledError:
+            assert budget is not None
+            if budget.cancelled:
+                raise
+            return DocumentAnalysis(
+                tree=None,
+                tokens=None,
+                error=ParseErrorInfo(
+                    message=f"Parsing took longer than the {budget.timeout:g} second analysis time limit",
+                    offset=None,
+                ),
+            )
         return DocumentAnalysis(tree=parsed.cst, tokens=tokens, error=None, symbols=symbol_table)
 
     def highlight(self, text: str) -> HighlightResult:
@@ -1,4 +1,4 @@
-"""Pure feature logic: analysis results to LSP semantic tokens, folding, and selection.
+"""Pure feature logic: analysis results to LSP semantic tokens, folding, selection, and edits.
 
 Each function maps an analysis (its CST or token stream) plus a :class:`~fltk.lsp.positions.LineIndex`
 and a negotiated :class:`~fltk.lsp.positions.PositionEncoding` to lsprotocol values, with no server
@@ -10,12 +10,13 @@ world and the LSP wire shapes.
 from __future__ import annotations
 
 import dataclasses
+import difflib
 import logging
 from typing import TYPE_CHECKING, Any
 
 from lsprotocol import types as lsp
 
-from fltk.fegen.pyrt.span_protocol import SpanKind
+from fltk.lsp.node_index import NodeIndex
 
 if TYPE_CHECKING:
     from collections.abc import Iterable, Iterator, Sequence
@@ -124,8 +125,8 @@ def _line_segments(
         seg_end = token.end if line == end_line else content_end
         if seg_end <= seg_start:
             continue
-        _, char_start = line_index.offset_to_position(seg_start, enc)
-        _, char_end = line_index.offset_to_position(seg_end, enc)
+        char_start = line_index.column(line, seg_start, enc)
+        char_end = line_index.column(line, seg_end, enc)
         length = char_end - char_start
         if length <= 0:
             continue
@@ -188,6 +189,93 @@ def encode_semantic_tokens(tokens: Iterable[classify.Token], line_index: LineInd
     return delta_encode_segments(absolute_segments(tokens, line_index, enc))
 
 
+def semantic_tokens_edits(previous: Sequence[int], current: Sequence[int]) -> list[lsp.SemanticTokensEdit]:
+    """The edits turning the ``previous`` token ``data`` array into ``current``.
+
+    One edit replaces everything between the arrays' longest common prefix and suffix, both
+    trimmed to whole five-int tokens so a client never splices into the middle of a token. Equal
+    arrays need no edits. Typing touches a few tokens, and (relative encoding) everything after
+    the first changed line is unchanged, so the single edit is usually tiny.
+    """
+    if len(previous) == len(current) and previous == current:
+        return []
+    prefix = _common_prefix_length(previous, current)
+    prefix -= prefix % 5
+    suffix = _common_suffix_length(previous, current, min(len(previous), len(current)) - prefix)
+    suffix -= suffix % 5
+    return [
+        lsp.SemanticTokensEdit(
+            start=prefix,
+            delete_count=len(previous) - prefix - suffix,
+            data=list(current[prefix : len(current) - suffix]),
+        )
+    ]
+
+
+def _common_prefix_length(a: Sequence[Any], b: Sequence[Any]) -> int:
+    """The length of the longest common prefix of ``a`` and ``b``.
+
+    Binary search over slice comparisons: each probe is a C-level compare, so this beats an
+    element-by-element Python loop on the large arrays and texts it is used for.
+    """
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix_length(a: Sequence[Any], b: Sequence[Any], limit: int) -> int:
+    """The length (at most ``limit``) of the longest common suffix of ``a`` and ``b``."""
+    lo, hi = 0, limit
+    len_a, len_b = len(a), len(b)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len_a - mid : len_a - lo] == b[len_b - mid : len_b - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def shift_stale_segments(
+    stale: list[TokenSegment],
+    old_index: LineIndex,
+    new_index: LineIndex,
+    enc: PositionEncoding,
+) -> list[TokenSegment]:
+    """Move ``stale`` segments (rendered against ``old_index``'s text) onto ``new_index``'s text.
+
+    The edit between the two texts is recovered as their common prefix and suffix around one
+    changed region. Segments starting in the unchanged suffix move by the edit's delta, so a stale
+    tail past an insertion or deletion lands on the same text it painted. Segments in the common
+    prefix need no move, and segments inside the changed region have no counterpart and keep their
+    old coordinates, unless that would put them at or past the first shifted segment. The result
+    is sorted and non-overlapping, ready for :func:`merge_stale_segments`.
+    """
+    old_text, new_text = old_index.text, new_index.text
+    prefix = _common_prefix_length(old_text, new_text)
+    suffix = _common_suffix_length(old_text, new_text, min(len(old_text), len(new_text)) - prefix)
+    old_tail = len(old_text) - suffix
+    delta = len(new_text) - len(old_text)
+    kept: list[TokenSegment] = []
+    shifted: list[TokenSegment] = []
+    for seg in stale:
+        start = old_index.position_to_offset(seg.line, seg.char, enc)
+        if start < old_tail:
+            kept.append(seg)
+            continue
+        line, char = new_index.offset_to_position(start + delta, enc)
+        shifted.append(dataclasses.replace(seg, line=line, char=char))
+    if shifted:
+        first = (shifted[0].line, shifted[0].char)
+        kept = [seg for seg in kept if (seg.line, seg.char + seg.length) <= first]
+    return kept + shifted
+
+
 def merge_stale_segments(
     fresh: list[TokenSegment],
     stale: list[TokenSegment],
@@ -196,12 +284,11 @@ def merge_stale_segments(
     """Fresh prefix segments plus the stale segments at or past ``boundary``.
 
     ``fresh`` is computed against the current text, ``stale`` against the last successfully analyzed
-    text; ``boundary`` is the ``(line, char)`` of the fresh prefix's end in the current text. A stale
-    segment is kept iff its ``(line, char)`` start is ``>=`` the floor -- the max of ``boundary`` and
-    the end position of the last fresh segment -- so the result stays sorted and non-overlapping even
-    when an edit shifted the stale coordinates backward. No attempt is made to shift stale positions:
-    the server uses full-document sync and has no edit deltas, so kept stale segments carry positions
-    from the old text, clamped or ignored client-side past the current document's end.
+    text -- moved onto the current text by :func:`shift_stale_segments` first, where the server has
+    both texts; ``boundary`` is the ``(line, char)`` of the fresh prefix's end in the current text. A
+    stale segment is kept iff its ``(line, char)`` start is ``>=`` the floor -- the max of
+    ``boundary`` and the end position of the last fresh segment -- so the result stays sorted and
+    non-overlapping even when a stale coordinate was not shifted.
     """
     floor = boundary
     if fresh:
@@ -214,25 +301,27 @@ def merge_stale_segments(
     return result
 
 
-def _walk_nodes(node: Any) -> Iterator[Any]:
-    """Yield every non-span CST node in ``node``'s subtree, pre-order (outermost first)."""
-    yield node
-    for _label, child in node.children:
-        if child.kind != SpanKind.SPAN:
-            yield from _walk_nodes(child)
-
-
-def folding_ranges(tree: Any, trivia_kind_names: frozenset[str], line_index: LineIndex) -> list[lsp.FoldingRange]:
+def folding_ranges(
+    tree: Any,
+    trivia_kind_names: frozenset[str],
+    line_index: LineIndex,
+    *,
+    index: NodeIndex | None = None,
+) -> list[lsp.FoldingRange]:
     """Emit a folding range for every CST node covering more than one line.
 
     A node's fold runs from the line of its span start to the line of its last covered codepoint;
     single-line nodes are skipped. Nodes whose ``kind`` names a trivia rule get
     ``FoldingRangeKind.Comment``; others get no kind. Duplicate ``(start_line, end_line)`` extents
-    (nested nodes sharing line bounds) keep the first, outermost node.
+    (nested nodes sharing line bounds) keep the first, outermost node. Pass ``index`` (a
+    :class:`~fltk.lsp.node_index.NodeIndex` over ``tree``) to reuse its pre-order node list; when
+    omitted one is built.
     """
+    if index is None:
+        index = NodeIndex(tree)
     seen: set[tuple[int, int]] = set()
     out: list[lsp.FoldingRange] = []
-    for node in _walk_nodes(tree):
+    for node in index.nodes():
         span = node.span
         start_line = line_index.line_of(span.start)
         end_line = line_index.line_of(max(span.start, span.end - 1))
@@ -468,24 +557,22 @@ def rename_edits(
     return lsp.WorkspaceEdit(changes={uri: changes})
 
 
-def _spans_containing(node: Any, offset: int) -> list[tuple[int, int]]:
+def _spans_containing(index: NodeIndex, offset: int) -> list[tuple[int, int]]:
     """Codepoint ``(start, end)`` spans on the root-to-innermost path whose ``[start, end)`` holds ``offset``.
 
-    CST children are sorted and non-overlapping, so at most one child on each level contains
-    ``offset``; a terminal ``Span`` child is the innermost element (word-level selection).
+    CST children are sorted and non-overlapping, so the path is the innermost containing node and
+    its ancestors; a terminal ``Span`` child of that node, when one holds ``offset``, is the
+    innermost element (word-level selection).
     """
-    start, end = node.span.start, node.span.end
-    if not (start <= offset < end):
+    node = index.node_at(offset)
+    if node is None:
         return []
-    chain: list[tuple[int, int]] = [(start, end)]
-    for _label, child in node.children:
-        if child.kind == SpanKind.SPAN:
-            if child.start <= offset < child.end:
-                chain.append((child.start, child.end))
-                break
-        elif child.span.start <= offset < child.span.end:
-            chain.extend(_spans_containing(child, offset))
-            break
+    chain: list[tuple[int, int]] = [(ancestor.span.start, ancestor.span.end) for ancestor in index.ancestors(node)]
+    chain.reverse()
+    chain.append((node.span.start, node.span.end))
+    span = index.span_child_at(node, offset)
+    if span is not None:
+        chain.append((span.start, span.end))
     return chain
 
 
@@ -500,18 +587,26 @@ def _render_range(start: int, end: int, line_index: LineIndex, enc: PositionEnco
 
 
 def selection_ranges(
-    tree: Any, offsets: Sequence[int], line_index: LineIndex, enc: PositionEncoding
+    tree: Any,
+    offsets: Sequence[int],
+    line_index: LineIndex,
+    enc: PositionEncoding,
+    *,
+    index: NodeIndex | None = None,
 ) -> list[lsp.SelectionRange]:
     """For each requested codepoint ``offset``, the innermost-to-outermost ``SelectionRange`` chain.
 
     The head range is the innermost element containing the offset; each ``parent`` widens strictly
     outward (ancestors with an identical span are collapsed, since LSP requires strictly-widening
     ranges). An offset that no element contains (e.g. end-of-document) yields a zero-width range at
-    that position.
+    that position. Pass ``index`` (a :class:`~fltk.lsp.node_index.NodeIndex` over ``tree``) so each
+    offset costs a bisect plus the path length rather than a descent; when omitted one is built.
     """
+    if index is None:
+        index = NodeIndex(tree)
     result: list[lsp.SelectionRange] = []
     for offset in offsets:
-        chain = _spans_containing(tree, offset)
+        chain = _spans_containing(index, offset)
         unique: list[tuple[int, int]] = []
         for span in chain:
             if not unique or unique[-1] != span:
@@ -525,3 +620,60 @@ def selection_ranges(
             selection = lsp.SelectionRange(range=lsp.Range(start=position, end=position), parent=None)
         result.append(selection)
     return result
+
+
+# --- Formatting edits ----------------------------------------------------------------------------
+
+
+def formatting_edits(
+    original: str,
+    formatted: str,
+    line_index: LineIndex,
+    enc: PositionEncoding,
+    *,
+    offset: int = 0,
+) -> list[lsp.TextEdit]:
+    """The non-overlapping edits turning ``original`` into ``formatted``, in document order.
+
+    ``original`` is the text at codepoint ``offset`` of the document ``line_index`` indexes (the
+    whole document by default). The two are diffed by line -- after trimming their common leading
+    and trailing lines, so an edit touching a few lines of a large file diffs only those -- and
+    each changed run of lines is then narrowed to the characters that differ, never to a boundary
+    inside a ``\\r\\n`` pair. Editors keep cursors, folds, and markers outside the edited spans,
+    which one whole-buffer replacement would reset.
+    """
+    old_lines = original.splitlines(keepends=True)
+    new_lines = formatted.splitlines(keepends=True)
+    head = _common_prefix_length(old_lines, new_lines)
+    tail = _common_suffix_length(old_lines, new_lines, min(len(old_lines), len(new_lines)) - head)
+    old_middle = old_lines[head : len(old_lines) - tail]
+    new_middle = new_lines[head : len(new_lines) - tail]
+    position = offset + sum(len(line) for line in old_lines[:head])
+    old_starts = [position]
+    for line in old_middle:
+        old_starts.append(old_starts[-1] + len(line))
+    matcher = difflib.SequenceMatcher(None, old_middle, new_middle, autojunk=False)
+    edits: list[lsp.TextEdit] = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        old_text = "".join(old_middle[i1:i2])
+        new_text = "".join(new_middle[j1:j2])
+        prefix = _common_prefix_length(old_text, new_text)
+        suffix = _common_suffix_length(old_text, new_text, min(len(old_text), len(new_text)) - prefix)
+        # No LSP position lies between the `\r` and `\n` of a pair (clients clamp one to the line
+        # end), so a boundary falling there widens the edit over the pair's near half instead.
+        if 0 < prefix < len(old_text) and old_text[prefix - 1 : prefix + 1] == "\r\n":
+            prefix -= 1
+        cut = len(old_text) - suffix
+        if 0 < cut < len(old_text) and old_text[cut - 1 : cut + 1] == "\r\n":
+            suffix -= 1
+        start = old_starts[i1] + prefix
+        end = old_starts[i2] - suffix
+        edits.append(
+            lsp.TextEdit(
+                range=_render_range(start, end, line_index, enc),
+                new_text=new_text[prefix : len(new_text) - suffix],
+            )
+        )
+    return edits
@@ -6,19 +6,36 @@ legend member, with the ``declaration`` modifier rendered bold and unpainted tex
 through unchanged. A ``.fltklsp`` load error prints to stderr and exits 1 with no stdout. An input
 parse failure exits 1 with the error on stderr; if the parse assembled a prefix, the prefix is
 painted and the (uncolored) tail is still written to stdout, otherwise stdout is empty.
+
+Given several inputs or a directory, it runs in batch mode: the engine is built once and every
+file is highlighted with it (or, with ``--jobs N``, with one warm engine per worker process).
+Outputs are written in input order -- ANSI under a ``==> path <==`` header per file, or with
+``--format jsonl`` one JSON object per file -- and errors are reported per file, prefixed by its
+path. A failed file does not stop the batch; the exit status is 1 if any file failed.
+``--stats`` reports each file's and the whole run's throughput on stderr.
 """
 
 from __future__ import annotations
 
+import dataclasses
+import enum
+import functools
+import json
 import sys
+import time
 from pathlib import Path
-from typing import Annotated
+from typing import TYPE_CHECKING, Annotated
 
 import typer
 
-from fltk.fegen.pyrt.errors import escape_control_chars
-from fltk.lsp.classify import Token
+from fltk.batch import expand_inputs, header, map_in_workers, sanitize
 from fltk.lsp.engine import AnalysisEngine
+from fltk.lsp.workers import EngineSpec
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+    from fltk.lsp.classify import Token
 
 app = typer.Typer(
     name="fltk-highlight",
@@ -50,17 +67,6 @@ _THEME: dict[str, str] = {
 _RESET = "\x1b[0m"
 
 
-def _sanitize(text: str) -> str:
-    """Escape terminal-control and bidi characters in workspace text, keeping newlines and tabs.
-
-    The input file is untrusted; emitting it verbatim would let embedded escape sequences drive
-    the terminal (clipboard, title, cursor) or restyle malicious code as a comment. Newlines are
-    preserved so multi-line source still renders; ``escape_control_chars`` keeps tabs and escapes
-    ``\\x1b`` and the rest of the control/bidi set.
-    """
-    return "\n".join(escape_control_chars(line) for line in text.split("\n"))
-
-
 def _render(text: str, tokens: list[Token]) -> str:
     """Wrap each token's source slice in its ANSI color; pass unpainted gaps through sanitized.
 
@@ -74,8 +80,8 @@ def _render(text: str, tokens: list[Token]) -> str:
     for token in tokens:
         assert token.start >= cursor, f"tokens not sorted/non-overlapping: {token.start} < {cursor}"
         if token.start > cursor:
-            out.append(_sanitize(text[cursor : token.start]))
-        segment = _sanitize(text[token.start : token.end])
+            out.append(sanitize(text[cursor : token.start]))
+        segment = sanitize(text[token.start : token.end])
         code = _THEME.get(token.token_type)
         if code is None:
             out.append(segment)
@@ -84,39 +90,173 @@ def _render(text: str, tokens: list[Token]) -> str:
             out.append(f"\x1b[{sgr}m{segment}{_RESET}")
         cursor = token.end
     if cursor < len(text):
-        out.append(_sanitize(text[cursor:]))
+        out.append(sanitize(text[cursor:]))
     return "".join(out)
 
 
+class OutputFormat(str, enum.Enum):
+    ANSI = "ansi"
+    JSONL = "jsonl"
+
+
+@dataclasses.dataclass(frozen=True)
+class _Highlighted:
+    """One input's highlighting: the rendered output plus what the throughput report needs.
+
+    ``output`` is the ANSI rendering or JSON line (empty when nothing could be rendered);
+    ``error`` the read or parse failure, if any; ``size`` the input's UTF-8 length in bytes;
+    ``seconds`` the time spent reading, analyzing, and rendering it.
+    """
+
+    path: Path
+    output: str
+    error: str | None
+    size: int
+    tokens: int
+    seconds: float
+
+
+def _json_line(path: Path, tokens: list[Token] | None, error: str | None) -> str:
+    """One JSON object: the path, ``[start, end, type, modifiers]`` per token, and the error."""
+    encoded = [[t.start, t.end, t.token_type, list(t.modifiers)] for t in tokens or ()]
+    return json.dumps({"path": str(path), "tokens": encoded, "error": error}) + "\n"
+
+
+def _highlight(engine: AnalysisEngine, path: Path, output_format: OutputFormat) -> _Highlighted:
+    """Read, analyze, and render ``path``; read failures are reported, not raised."""
+    started = time.perf_counter()
+    try:
+        text = path.read_text()
+    except (ValueError, OSError) as exc:
+        error = str(exc)
+        output = _json_line(path, None, error) if output_format is OutputFormat.JSONL else ""
+        return _Highlighted(path, output, error, 0, 0, time.perf_counter() - started)
+    analysis = engine.analyze(text)
+    error = analysis.error.message if analysis.error is not None else None
+    tokens = analysis.tokens
+    if output_format is OutputFormat.JSONL:
+        output = _json_line(path, tokens, error)
+    else:
+        # A partial analysis still carries prefix tokens: paint them (the tail past the prefix
+        # passes through uncolored) so the manual-highlighting harness shows what did parse.
+        output = _render(text, tokens) if tokens is not None else ""
+    size = len(text.encode("utf-8", "surrogatepass"))
+    return _Highlighted(path, output, error, size, len(tokens or ()), time.perf_counter() - started)
+
+
+# The engine of a batch worker process, built once by `_init_worker`.
+_worker_engine: AnalysisEngine | None = None
+
+
+def _init_worker(spec: EngineSpec) -> None:
+    global _worker_engine  # noqa: PLW0603 -- one engine per worker process, built at startup
+    _worker_engine = spec.build()
+
+
+def _highlight_in_worker(path: Path, *, output_format: OutputFormat) -> _Highlighted:
+    assert _worker_engine is not None
+    return _highlight(_worker_engine, path, output_format)
+
+
+def _highlight_all(
+    engine: AnalysisEngine, spec: EngineSpec, files: list[Path], output_format: OutputFormat, jobs: int
+) -> Iterator[_Highlighted]:
+    """Highlight ``files`` in order, in this process or across ``jobs`` worker processes."""
+    if jobs == 0:
+        return (_highlight(engine, path, output_format) for path in files)
+    return map_in_workers(
+        functools.partial(_highlight_in_worker, output_format=output_format),
+        files,
+        jobs=jobs,
+        initializer=_init_worker,
+        initargs=(spec,),
+    )
+
+
+def _rate(amount: float, seconds: float) -> str:
+    return f"{amount / seconds:,.0f}" if seconds > 0 else "inf"
+
+
+def _report(result: _Highlighted) -> str:
+    return (
+        f"{result.path}: {result.size} bytes, {result.tokens} tokens in {result.seconds * 1000:.1f} ms "
+        f"({_rate(result.size, result.seconds)} bytes/s, {_rate(result.tokens, result.seconds)} tokens/s)"
+    )
+
+
+def _write_results(results: Iterable[_Highlighted], output_format: OutputFormat, *, batch: bool, stats: bool) -> bool:
+    """Write each result and its errors; return whether every file succeeded.
+
+    In ``batch`` mode each ANSI output gets a ``==> path <==`` header and each error its path as a
+    prefix. With ``stats``, each file's throughput and then the run's (over wall-clock time, so
+    worker parallelism shows up) go to stderr.
+    """
+    started = time.perf_counter()
+    ok = True
+    total_files = total_bytes = total_tokens = 0
+    for result in results:
+        headed = batch and output_format is OutputFormat.ANSI
+        if headed:
+            sys.stdout.write(header(result.path))
+        sys.stdout.write(result.output)
+        if headed and result.output and not result.output.endswith("\n"):
+            sys.stdout.write("\n")
+        if result.error is not None:
+            ok = False
+            typer.echo(f"{result.path}: {result.error}" if batch else result.error, err=True)
+        if stats:
+            typer.echo(_report(result), err=True)
+        total_files += 1
+        total_bytes += result.size
+        total_tokens += result.tokens
+    if stats:
+        elapsed = time.perf_counter() - started
+        typer.echo(
+            f"total: {total_files} files, {total_bytes} bytes, {total_tokens} tokens in {elapsed:.2f} s "
+            f"({_rate(total_bytes, elapsed)} bytes/s, {_rate(total_tokens, elapsed)} tokens/s)",
+            err=True,
+        )
+    return ok
+
+
 @app.command()
 def main(
-    file: Annotated[Path, typer.Argument(help="Path to the source file to highlight")],
+    inputs: Annotated[
+        list[Path], typer.Argument(help="Source files to highlight, or directories to highlight the files of")
+    ],
     grammar: Annotated[Path, typer.Option("--grammar", help="Path to the grammar file (.fltkg)")],
+    *,
     lsp: Annotated[Path | None, typer.Option("--lsp", help="Path to the editor-tooling spec file (.fltklsp)")] = None,
     rule: Annotated[str | None, typer.Option("--rule", help="Start rule name")] = None,
+    output_format: Annotated[
+        OutputFormat, typer.Option("--format", help="Write ANSI-colored source or one JSON object of tokens per file")
+    ] = OutputFormat.ANSI,
+    suffix: Annotated[
+        list[str] | None,
+        typer.Option("--suffix", help="Only highlight directory files with this suffix, e.g. .greet (repeatable)"),
+    ] = None,
+    jobs: Annotated[
+        int, typer.Option("--jobs", help="Highlight in N worker processes (0 highlights in this process)")
+    ] = 0,
+    stats: Annotated[bool, typer.Option("--stats", help="Report per-file and total throughput on stderr")] = False,
 ) -> None:
-    """Highlight FILE using GRAMMAR and an optional .fltklsp spec, writing ANSI to stdout."""
+    """Highlight INPUTS using GRAMMAR and an optional .fltklsp spec, writing ANSI or JSON lines to stdout."""
+    if jobs < 0:
+        typer.echo(f"--jobs must be zero or positive, got {jobs}", err=True)
+        raise typer.Exit(1)
     try:
         engine = AnalysisEngine.from_paths(grammar, lsp, start_rule=rule)
-        text = file.read_text()
     except (ValueError, OSError) as exc:
-        # ValueError covers grammar/.fltklsp content errors (LspConfigError is a ValueError,
-        # UnicodeDecodeError too); OSError covers missing/unreadable --grammar, --lsp, and FILE.
+        # ValueError covers grammar/.fltklsp content errors (LspConfigError is a ValueError);
+        # OSError covers a missing/unreadable --grammar or --lsp.
         typer.echo(str(exc), err=True)
         raise typer.Exit(1) from exc
 
-    analysis = engine.analyze(text)
-    if analysis.error is None:
-        assert analysis.tokens is not None
-        sys.stdout.write(_render(text, analysis.tokens))
-        return
-
-    # Parse failed. A partial analysis still carries prefix tokens: paint them (the tail past the
-    # prefix passes through uncolored) so the manual-highlighting harness shows what did parse.
-    if analysis.tokens is not None:
-        sys.stdout.write(_render(text, analysis.tokens))
-    typer.echo(analysis.error.message, err=True)
-    raise typer.Exit(1)
+    batch = len(inputs) > 1 or inputs[0].is_dir()
+    files = expand_inputs(inputs, suffix or [])
+    results = _highlight_all(engine, EngineSpec(grammar, lsp, rule), files, output_format, jobs)
+    if not _write_results(results, output_format, batch=batch, stats=stats):
+        raise typer.Exit(1)
 
 
 if __name__ == "__main__":
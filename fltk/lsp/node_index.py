@@ -0,0 +1,113 @@
+"""Per-tree node index: kind lookup, parent links, and offset queries over one analysis CST.
+
+Features that care about a handful of node kinds, or about the node under a cursor, would
+otherwise each recurse over the whole tree on every request. ``NodeIndex`` pays for one
+iterative pre-order pass per analyzed tree and then answers ``nodes_of_kind`` in O(k),
+``ancestors`` in O(depth), and ``node_at`` in O(log n + depth). The index is read-only and
+holds the tree's nodes directly, so it is valid exactly as long as the tree it was built from
+is not mutated -- which analysis trees never are once the engine returns them.
+"""
+
+from __future__ import annotations
+
+import bisect
+from typing import TYPE_CHECKING, Any
+
+from fltk.fegen.pyrt.span_protocol import SpanKind
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+
+
+class NodeIndex:
+    """A kind map, parent links, and a start-offset table over a CST's non-span nodes.
+
+    Nodes are numbered in pre-order (outermost first, children in document order), which for a
+    CST -- whose children are sorted and non-overlapping -- is also ascending span-start order.
+    Kinds are keyed by ``kind.name`` because analysis CSTs are per-grammar exec'd classes with no
+    shared ``NodeKind`` enum. Terminal span children are not indexed; :meth:`span_child_at`
+    reaches them from their parent node.
+    """
+
+    def __init__(self, tree: Any) -> None:
+        nodes: list[Any] = []
+        parents: list[int] = []
+        by_kind: dict[str, list[int]] = {}
+        # Iterative pre-order walk: analysis trees can be deep enough that a recursive walk hits
+        # the interpreter's recursion limit even though the parser itself did not.
+        stack: list[tuple[Any, int]] = [(tree, -1)]
+        while stack:
+            node, parent = stack.pop()
+            position = len(nodes)
+            nodes.append(node)
+            parents.append(parent)
+            by_kind.setdefault(node.kind.name, []).append(position)
+            node_children = [child for _label, child in node.children if child.kind != SpanKind.SPAN]
+            stack.extend((child, position) for child in reversed(node_children))
+        self._nodes = nodes
+        self._parents = parents
+        self._by_kind = by_kind
+        self._starts = [node.span.start for node in nodes]
+        self._positions = {id(node): position for position, node in enumerate(nodes)}
+
+    @property
+    def root(self) -> Any:
+        """The tree the index was built from."""
+        return self._nodes[0]
+
+    def nodes(self) -> Sequence[Any]:
+        """Every indexed node in pre-order (outermost first, document order)."""
+        return self._nodes
+
+    def nodes_of_kind(self, *kind_names: str) -> list[Any]:
+        """Every node whose ``kind.name`` is one of ``kind_names``, in pre-order.
+
+        A single kind is a direct lookup; several kinds are merged back into pre-order so callers
+        see the same order they would get from a full walk.
+        """
+        if len(kind_names) == 1:
+            return [self._nodes[position] for position in self._by_kind.get(kind_names[0], ())]
+        positions = sorted(position for name in kind_names for position in self._by_kind.get(name, ()))
+        return [self._nodes[position] for position in positions]
+
+    def parent(self, node: Any) -> Any | None:
+        """The node's parent, or ``None`` for the root. ``node`` must belong to the indexed tree."""
+        parent = self._parents[self._position(node)]
+        return self._nodes[parent] if parent >= 0 else None
+
+    def ancestors(self, node: Any) -> Iterator[Any]:
+        """The node's proper ancestors, innermost first, ending at the root."""
+        parent = self._parents[self._position(node)]
+        while parent >= 0:
+            yield self._nodes[parent]
+            parent = self._parents[parent]
+
+    def node_at(self, offset: int) -> Any | None:
+        """The innermost node whose ``[start, end)`` span contains ``offset``, else ``None``.
+
+        The last node in pre-order starting at or before ``offset`` lies inside the innermost
+        containing node's subtree (later subtrees start at or past that node's end), so the answer
+        is that node or its nearest ancestor containing ``offset``.
+        """
+        position = bisect.bisect_right(self._starts, offset) - 1
+        while position >= 0:
+            span = self._nodes[position].span
+            if span.start <= offset < span.end:
+                return self._nodes[position]
+            position = self._parents[position]
+        return None
+
+    @staticmethod
+    def span_child_at(node: Any, offset: int) -> Any | None:
+        """The terminal span child of ``node`` whose ``[start, end)`` contains ``offset``, else ``None``."""
+        for _label, child in node.children:
+            if child.kind == SpanKind.SPAN and child.start <= offset < child.end:
+                return child
+        return None
+
+    def _position(self, node: Any) -> int:
+        position = self._positions.get(id(node))
+        if position is None:
+            msg = f"node {node!r} is not part of the indexed tree"
+            raise ValueError(msg)
+        return position
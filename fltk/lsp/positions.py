@@ -6,16 +6,21 @@ line table once per document text -- recognizing all three LSP line separators (
 ``\r\n``, and a lone ``\r``), unlike the parser's ``\n``-only utilities -- and converts
 between codepoint offsets and LSP ``(line, character)`` positions, clamping out-of-bounds
 inputs the way a racy LSP server must (client and server momentarily disagree while an edit
-is in flight).
+is in flight).  Under incremental sync, :meth:`LineIndex.edited` derives the index of an edited
+text by patching the line table around the edit instead of rescanning the whole document.
 """
 
 from __future__ import annotations
 
 import bisect
 import enum
+import re
 
-# Highest Basic Multilingual Plane codepoint; anything above needs a utf-16 surrogate pair.
-_BMP_MAX = 0xFFFF
+# An astral (non-BMP) character: two utf-16 code units.
+_ASTRAL = re.compile("[\U00010000-\U0010ffff]")
+
+# One LSP line separator. `\r\n` is tried first, so a CRLF pair is one break, not two.
+_LINE_BREAK = re.compile(r"\r\n?|\n")
 
 
 class PositionEncoding(enum.Enum):
@@ -30,29 +35,58 @@ class LineIndex:
 
     Built once per analyzed document; all conversions clamp rather than raise. Columns are
     codepoints under ``UTF32`` (free, since FLTK offsets are codepoints) and utf-16 code
-    units under ``UTF16`` (astral characters count as two units).
+    units under ``UTF16`` (astral characters count as two units). On the first utf-16
+    conversion one scan records the offsets of every astral character by line: a pure-BMP line
+    (every line, in most documents) then converts with plain arithmetic, and a line holding
+    astral characters with a bisect over its own offsets.
     """
 
     def __init__(self, text: str) -> None:
         self._text = text
-        starts = [0]
-        i = 0
-        n = len(text)
-        while i < n:
-            ch = text[i]
-            if ch == "\n":
-                starts.append(i + 1)
-                i += 1
-            elif ch == "\r":
-                if i + 1 < n and text[i + 1] == "\n":
-                    starts.append(i + 2)
-                    i += 2
-                else:
-                    starts.append(i + 1)
-                    i += 1
-            else:
-                i += 1
-        self._line_starts = starts
+        self._line_starts = [0, *(match.end() for match in _LINE_BREAK.finditer(text))]
+        self._astral: dict[int, list[int]] | None = None
+
+    @classmethod
+    def _from_parts(cls, text: str, line_starts: list[int]) -> LineIndex:
+        index = cls.__new__(cls)
+        index._text = text
+        index._line_starts = line_starts
+        index._astral = None
+        return index
+
+    @property
+    def text(self) -> str:
+        """The text this index was built over."""
+        return self._text
+
+    def edited(self, start: int, end: int, replacement: str) -> LineIndex:
+        """The index of this text with codepoints ``[start, end)`` replaced by ``replacement``.
+
+        Equivalent to ``LineIndex(new_text)`` but rescans only the edited region plus one
+        character either side (an edit can join or split a ``\r\n`` pair at either boundary);
+        line starts past the region are shifted, not rediscovered. ``self`` is left unchanged,
+        so snapshots holding it stay valid.
+        """
+        text = self._text
+        start = max(0, min(start, len(text)))
+        end = max(start, min(end, len(text)))
+        new_text = text[:start] + replacement + text[end:]
+        delta = len(replacement) - (end - start)
+        # Starts at or before `lo` come from breaks ending before it, followed by the unchanged
+        # character at `lo`, so they are unaffected. Rescan `[lo, hi)` of the new text, where `hi`
+        # covers the first unchanged character after the edit (and the `\n` completing a `\r\n`
+        # that begins there).
+        lo = max(0, start - 1)
+        hi = min(len(new_text), start + len(replacement) + 1)
+        if hi < len(new_text) and new_text[hi - 1] == "\r" and new_text[hi] == "\n":
+            hi += 1
+        starts = self._line_starts
+        keep = bisect.bisect_right(starts, lo)
+        shift_from = bisect.bisect_right(starts, hi - delta)
+        patched = starts[:keep]
+        patched.extend(match.end() for match in _LINE_BREAK.finditer(new_text, lo, hi))
+        patched.extend(line_start + delta for line_start in starts[shift_from:])
+        return LineIndex._from_parts(new_text, patched)
 
     def line_of(self, offset: int) -> int:
         """The 0-based line containing ``offset`` (clamped into ``[0, len(text)]``)."""
@@ -75,18 +109,33 @@ class LineIndex:
             end = len(self._text)
         return (start, end)
 
-    def _column(self, start: int, offset: int, enc: PositionEncoding) -> int:
-        prefix = self._text[start:offset]
+    def _astral_offsets(self, line: int) -> list[int] | None:
+        """The sorted offsets of ``line``'s astral characters, or ``None`` for a pure-BMP line."""
+        astral = self._astral
+        if astral is None:
+            astral = {}
+            starts = self._line_starts
+            for match in _ASTRAL.finditer(self._text):
+                offset = match.start()
+                astral.setdefault(bisect.bisect_right(starts, offset) - 1, []).append(offset)
+            self._astral = astral
+        return astral.get(line)
+
+    def column(self, line: int, offset: int, enc: PositionEncoding) -> int:
+        """The ``enc``-unit column of codepoint ``offset``, which must lie on ``line``."""
+        start = self._line_starts[line]
         if enc is PositionEncoding.UTF32:
-            return len(prefix)
-        return sum(1 + (ord(c) > _BMP_MAX) for c in prefix)
+            return offset - start
+        astral = self._astral_offsets(line)
+        if astral is None:
+            return offset - start
+        return offset - start + bisect.bisect_left(astral, offset)
 
     def offset_to_position(self, offset: int, enc: PositionEncoding) -> tuple[int, int]:
         """Convert a codepoint ``offset`` to an LSP ``(line, character)`` in ``enc`` units."""
         offset = max(0, min(offset, len(self._text)))
         line = self.line_of(offset)
-        start = self._line_starts[line]
-        return (line, self._column(start, offset, enc))
+        return (line, self.column(line, offset, enc))
 
     def position_to_offset(self, line: int, character: int, enc: PositionEncoding) -> int:
         """Convert an LSP ``(line, character)`` in ``enc`` units to a codepoint offset.
@@ -102,17 +151,17 @@ class LineIndex:
         start, end = self.line_bounds(line)
         if character <= 0:
             return start
-        if enc is PositionEncoding.UTF32:
+        astral = self._astral_offsets(line) if enc is PositionEncoding.UTF16 else None
+        if astral is None:
             return min(start + character, end)
-        units = 0
-        offset = start
-        while offset < end and units < character:
-            width = 1 + (ord(self._text[offset]) > _BMP_MAX)
-            if units + width > character:
-                break
-            units += width
-            offset += 1
-        return offset
+        # The i-th astral character starts at utf-16 column `astral[i] - start + i`. Those that end
+        # at or before `character` each shift the offset back by one; one straddling it clamps to
+        # its own start.
+        columns = range(len(astral))
+        passed = bisect.bisect_right(columns, character - 2, key=lambda i: astral[i] - start + i)
+        if passed < len(astral) and astral[passed] - start + passed < character:
+            return astral[passed]
+        return min(start + character - passed, end)
 
     def end_position(self, enc: PositionEncoding) -> tuple[int, int]:
         """The LSP ``(line, character)`` of the end of the document."""
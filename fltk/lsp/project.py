@@ -5,6 +5,10 @@ caches other files a resolver asks about, reading open-editor buffers over disk,
 the workspace files matching the resolver's suffixes. ``ProjectNavigator`` is the generic,
 lsprotocol-free query layer over ``(ProjectHost, Resolver)`` that turns a cursor position into a
 cross-file definition target or the deduplicated set of cross-file reference occurrences.
+``WorkspaceIndex`` is the long-lived companion that lets a references query analyze only the
+files whose resolution can reach the target, instead of every workspace file; an
+``AnalysisCache`` persists its per-file summaries so a restarted server need not rebuild it by
+re-analyzing the whole workspace.
 
 Both are touched only from the server's single analysis worker (never the protocol loop), so
 neither locks. The host consults an immutable snapshot of the open-document map handed to it at
@@ -14,10 +18,19 @@ concurrently.
 
 from __future__ import annotations
 
+import contextlib
 import enum
+import fnmatch
+import hashlib
+import importlib.metadata
+import json
 import logging
 import os
 import pathlib
+import sys
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from typing import TYPE_CHECKING, NamedTuple
 
 from pygls import uris
@@ -27,7 +40,7 @@ from fltk.lsp.positions import LineIndex
 from fltk.lsp.resolver import CrossFileResolution, ExternalTarget, ResolvedDocument
 
 if TYPE_CHECKING:
-    from collections.abc import Iterator, Mapping, Sequence
+    from collections.abc import Iterable, Iterator, Mapping, Sequence
 
     from fltk.lsp.engine import AnalysisEngine
     from fltk.lsp.resolver import Resolver
@@ -65,6 +78,14 @@ Occurrence = tuple[str, int, int]
 # size)`` for a file read from disk. An access whose key differs from the cached one re-analyzes.
 _VersionKey = tuple[object, ...]
 
+# The persisted summary layout; part of every cache fingerprint, so bumping it orphans old entries.
+_CACHE_FORMAT = 1
+# Entries an AnalysisCache keeps by default: a few thousand-file workspaces' worth, with room for
+# the versions a session's edits leave behind.
+_MAX_CACHE_ENTRIES = 20_000
+# Stores between two prunes of an AnalysisCache, bounding what one long session can add.
+_PRUNE_INTERVAL = 1_000
+
 
 class _CachedDoc(NamedTuple):
     """One analyzed document plus its cache-validity key and line table."""
@@ -74,6 +95,233 @@ class _CachedDoc(NamedTuple):
     line_index: LineIndex
 
 
+# Analyses a WorkspaceIndex keeps for the hosts built over it: the files one request touches (a
+# target, its readers, and what resolving them reads) with room to spare, not the whole workspace.
+_MAX_SHARED_ANALYSES = 256
+
+
+class _AnalysisLru:
+    """A ``uri -> _CachedDoc`` map holding at most ``capacity`` entries, least recently used first out.
+
+    Each entry holds a whole CST, text, symbol table, and line table, so a cache shared for a
+    server session cannot keep one per workspace file. A dropped entry is only re-analyzed on its
+    next use.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self._capacity = capacity
+        self._entries: OrderedDict[str, _CachedDoc] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, uri: object) -> bool:
+        return uri in self._entries
+
+    def get(self, uri: str) -> _CachedDoc | None:
+        entry = self._entries.get(uri)
+        if entry is not None:
+            self._entries.move_to_end(uri)
+        return entry
+
+    def __setitem__(self, uri: str, entry: _CachedDoc) -> None:
+        self._entries[uri] = entry
+        self._entries.move_to_end(uri)
+        while len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
+
+    def pop(self, uri: str, default: _CachedDoc | None = None) -> _CachedDoc | None:
+        return self._entries.pop(uri, default)
+
+
+# Directory names skipped anywhere in the workspace on top of its `.gitignore` rules: dependency
+# trees and build outputs that never hold a project's own sources.
+_DEFAULT_IGNORES = ("node_modules", "__pycache__", "bazel-*")
+
+# Threads listing directories during a workspace scan; `os.scandir` releases the GIL while it waits
+# on the filesystem, so a few threads overlap the per-directory latency of a large tree.
+_SCAN_THREADS = 8
+
+
+class _IgnoreRule(NamedTuple):
+    """One ignore pattern from a ``.gitignore`` in directory ``base`` (or a built-in default).
+
+    ``anchored`` patterns (those containing a ``/`` before their end) match the path relative to
+    ``base``; the rest match any single path component below it. ``dir_only`` patterns (a trailing
+    ``/``) match only directories.
+    """
+
+    base: str
+    pattern: str
+    anchored: bool
+    dir_only: bool
+
+    def matches(self, path: str, name: str, *, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        if not self.anchored:
+            return fnmatch.fnmatchcase(name, self.pattern)
+        relative = os.path.relpath(path, self.base).replace(os.sep, "/")
+        return fnmatch.fnmatchcase(relative, self.pattern)
+
+
+def _parse_ignore_file(directory: str) -> list[_IgnoreRule]:
+    """The rules of ``directory``'s ``.gitignore``, or none when it has no readable one.
+
+    A subset of the gitignore syntax: comments, blank lines, leading-``/`` anchoring, trailing-``/``
+    directory patterns, and ``fnmatch`` globs (a ``*`` may cross ``/``, so ``**`` works as expected).
+    Negated (``!``) patterns are skipped, so a re-included file stays ignored.
+    """
+    try:
+        with open(os.path.join(directory, ".gitignore"), encoding="utf-8") as stream:
+            lines = stream.read().splitlines()
+    except (OSError, UnicodeDecodeError):
+        return []
+    rules: list[_IgnoreRule] = []
+    for raw in lines:
+        line = raw.strip()
+        if not line or line.startswith(("#", "!")):
+            continue
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        anchored = "/" in line
+        if line:
+            rules.append(_IgnoreRule(directory, line.lstrip("/"), anchored, dir_only))
+    return rules
+
+
+class WorkspaceFiles:
+    """The registry of workspace files matching a resolver's suffixes, listed once and kept current.
+
+    :meth:`scan` lists the tree under ``root`` with ``os.scandir`` on a small thread pool, skipping
+    dot-directories, the built-in build-output directories, and whatever each directory's
+    ``.gitignore`` excludes; :meth:`update` then applies one created or deleted file, so a caller fed
+    by file-watch notifications never walks the tree again. Ignore rules are read during the scan:
+    a later ``.gitignore`` edit takes effect at the next :meth:`scan`.
+    """
+
+    def __init__(
+        self, root: pathlib.Path, suffixes: Sequence[str], *, ignores: Sequence[str] = _DEFAULT_IGNORES
+    ) -> None:
+        self._root = str(root)
+        self._suffixes = tuple(suffixes)
+        self._defaults = [_IgnoreRule(self._root, pattern, anchored=False, dir_only=True) for pattern in ignores]
+        self._files: set[str] | None = None
+        self._sorted: tuple[str, ...] | None = None
+        self._warnings: list[str] = []
+
+    @property
+    def scanned(self) -> bool:
+        """Whether :meth:`scan` has run."""
+        return self._files is not None
+
+    def drain_warnings(self) -> list[str]:
+        """Return and clear the directory-scan errors gathered so far."""
+        warnings = self._warnings
+        self._warnings = []
+        return warnings
+
+    def files(self) -> tuple[str, ...]:
+        """Every registered file URI, sorted; scans first if needed."""
+        if self._files is None:
+            self.scan()
+        if self._sorted is None:
+            assert self._files is not None
+            self._sorted = tuple(sorted(self._files))
+        return self._sorted
+
+    def scan(self) -> None:
+        """List the workspace afresh, replacing the registry."""
+        found: set[str] = set()
+        with ThreadPoolExecutor(max_workers=_SCAN_THREADS, thread_name_prefix="fltk-lsp-scan") as pool:
+            pending: set[Future[_ScannedDir]] = {pool.submit(self._scan_dir, self._root, self._defaults)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, subdirs, warning = future.result()
+                    found.update(files)
+                    if warning is not None:
+                        self._warnings.append(warning)
+                    pending.update(pool.submit(self._scan_dir, path, rules) for path, rules in subdirs)
+        self._files = found
+        self._sorted = None
+
+    def update(self, uri: str, *, exists: bool) -> bool:
+        """Record that ``uri`` was created/changed (``exists``) or deleted; whether it is tracked.
+
+        A URI is tracked when it has a registered suffix, lies under the root, and is not ignored
+        (by dot-directory, default, or the ``.gitignore`` files on its way down from the root).
+        """
+        if not self.tracks(uri):
+            return False
+        if self._files is not None:
+            before = len(self._files)
+            if exists:
+                self._files.add(uri)
+            else:
+                self._files.discard(uri)
+            if len(self._files) != before:
+                self._sorted = None
+        return True
+
+    def tracks(self, uri: str) -> bool:
+        """Whether ``uri`` is a file this registry would list."""
+        if not uri.endswith(self._suffixes):
+            return False
+        path = uri_to_path(uri)
+        if path is None:
+            return False
+        relative = os.path.relpath(path, self._root)
+        if relative == os.curdir or relative.startswith(os.pardir + os.sep) or relative == os.pardir:
+            return False
+        parts = relative.split(os.sep)
+        directory = self._root
+        rules = self._defaults + _parse_ignore_file(self._root)
+        for index, part in enumerate(parts):
+            is_dir = index < len(parts) - 1
+            current = os.path.join(directory, part)
+            if (is_dir and part.startswith(".")) or any(rule.matches(current, part, is_dir=is_dir) for rule in rules):
+                return False
+            if is_dir:
+                rules.extend(_parse_ignore_file(current))
+            directory = current
+        return True
+
+    def _scan_dir(self, directory: str, inherited: list[_IgnoreRule]) -> _ScannedDir:
+        """One directory's matching files and the subdirectories to descend into, with their rules."""
+        rules = inherited + _parse_ignore_file(directory)
+        files: list[str] = []
+        subdirs: list[tuple[str, list[_IgnoreRule]]] = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if is_dir and entry.name.startswith("."):
+                        continue
+                    if not is_dir and not entry.name.endswith(self._suffixes):
+                        continue
+                    if any(rule.matches(entry.path, entry.name, is_dir=is_dir) for rule in rules):
+                        continue
+                    if is_dir:
+                        subdirs.append((entry.path, rules))
+                    else:
+                        uri = uris.from_fs_path(entry.path)
+                        if uri:
+                            files.append(uri)
+        except OSError as error:
+            # Recorded rather than raised so the omission of a whole subtree is visible in the client's log.
+            return files, subdirs, f"fltk-lsp: could not scan {getattr(error, 'filename', None) or directory}: {error}"
+        return files, subdirs, None
+
+
+# What listing one directory produced: matching file URIs, subdirectories with the ignore rules in
+# force below them, and a scan error (or ``None``).
+_ScannedDir = tuple[list[str], list[tuple[str, list[_IgnoreRule]]], str | None]
+
+
 class ProjectHost:
     """The server's :class:`~fltk.lsp.resolver.ResolverHost`, over a snapshot + disk.
 
@@ -82,7 +330,9 @@ class ProjectHost:
     ``root_path`` is the workspace root captured at ``initialize`` (``None`` if the client
     provided none). Analysis reuses the single ``engine``; only complete analyses are cached and
     returned -- a partial or failed parse yields ``None`` and is not cached, so a later fix
-    re-analyzes.
+    re-analyzes. With an ``index``, the host shares the index's analysis cache (entries are keyed
+    by version, so open-buffer and disk analyses never mix) and :meth:`reference_candidates`
+    consults it. Cache hits and misses are counted in the engine's telemetry.
     """
 
     def __init__(
@@ -92,6 +342,7 @@ class ProjectHost:
         *,
         root_path: pathlib.Path | None,
         open_docs: Mapping[str, tuple[int, str]] | None = None,
+        index: WorkspaceIndex | None = None,
     ) -> None:
         self._engine = engine
         self._resolver = resolver
@@ -99,11 +350,16 @@ class ProjectHost:
         self._open_docs: Mapping[str, tuple[int, str]] = (
             {canonical_uri(uri): value for uri, value in open_docs.items()} if open_docs else {}
         )
-        self._cache: dict[str, _CachedDoc] = {}
+        self._index = index
+        self._cache: _AnalysisLru | dict[str, _CachedDoc] = index.cache if index is not None else {}
         self._warned_unreadable: set[str] = set()
         # Client-surfacable warnings (unreadable workspace files, directory-scan errors) accumulated
         # since the last drain; the server emits them as ``window/logMessage``.
         self._warnings: list[str] = []
+        # While a WorkspaceIndex resolves one file through this host: every URI the resolver asked
+        # for, and whether it listed the workspace. ``None`` when not recording.
+        self._touched: set[str] | None = None
+        self._listed = False
 
     def drain_warnings(self) -> list[str]:
         """Return and clear the client-surfacable warnings gathered while serving requests."""
@@ -112,6 +368,8 @@ class ProjectHost:
         return warnings
 
     def document(self, uri: str) -> ResolvedDocument | None:
+        if self._touched is not None:
+            self._touched.add(canonical_uri(uri))
         entry = self._ensure(uri)
         return entry.document if entry is not None else None
 
@@ -121,24 +379,31 @@ class ProjectHost:
         return entry.line_index if entry is not None else None
 
     def workspace_files(self) -> Sequence[str]:
+        """The workspace's resolver files: the index's registry when there is one, else a fresh scan."""
+        self._listed = True
         if self._root_path is None:
             return ()
-        suffixes = tuple(self._resolver.file_suffixes)
-
-        def _on_scan_error(error: OSError) -> None:
-            # os.walk otherwise swallows a permission/vanished-directory error, silently dropping a
-            # whole subtree; record it so the omission is at least visible in the client's log.
-            where = getattr(error, "filename", None) or self._root_path
-            self._warnings.append(f"fltk-lsp: could not scan {where}: {error}")
-
-        result: list[str] = []
-        for dirpath, dirnames, filenames in os.walk(self._root_path, onerror=_on_scan_error):
-            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
-            for filename in filenames:
-                if filename.endswith(suffixes):
-                    result.append(self.path_to_uri(pathlib.Path(dirpath) / filename))
-        result.sort()
-        return tuple(result)
+        registry = (
+            self._index.files
+            if self._index is not None
+            else WorkspaceFiles(self._root_path, self._resolver.file_suffixes)
+        )
+        result = registry.files()
+        self._warnings.extend(registry.drain_warnings())
+        return result
+
+    def reference_candidates(self, target_uri: str) -> Sequence[str]:
+        """The workspace files that may hold an occurrence of a symbol declared in ``target_uri``.
+
+        Every workspace file without an index, or while the index has not yet listed the
+        workspace; otherwise the index's answer, which always includes every open document.
+        """
+        if self._index is not None:
+            candidates = self._index.candidates(target_uri, self._open_docs.keys())
+            self._warnings.extend(self._index.drain_warnings())
+            if candidates is not None:
+                return candidates
+        return self.workspace_files()
 
     def root_path(self) -> pathlib.Path | None:
         return self._root_path
@@ -169,9 +434,12 @@ class ProjectHost:
         text, version_key = source
 
         cached = self._cache.get(uri)
+        telemetry = self._engine.telemetry
         if cached is not None and cached.version_key == version_key:
+            telemetry.count("project.analysis_hit")
             return cached
 
+        telemetry.count("project.analysis_miss")
         analysis = self._engine.analyze(text)
         if analysis.error is not None or analysis.tree is None or analysis.symbols is None:
             return None
@@ -312,22 +580,24 @@ class ProjectNavigator:
                     if is_target and (start, end) == declaration and not include_declaration:
                         continue
                     results.add((scanned.uri, start, end))
-            for ref in scanned.symbols.references:
-                if ref.symbol is None:
-                    redirect = resolution.ref_targets.get(ref)
-                    if redirect is not None and _identity(redirect) == target_id:
-                        results.add((scanned.uri, ref.start, ref.end))
+            for ref in scanned.symbols.unresolved_references():
+                redirect = resolution.ref_targets.get(ref)
+                if redirect is not None and _identity(redirect) == target_id:
+                    results.add((scanned.uri, ref.start, ref.end))
         return sorted(results)
 
     def _scan_docs(self, doc: ResolvedDocument, target: ExternalTarget) -> Iterator[ResolvedDocument]:
-        """The target's home document, the requesting document, and every workspace file, once each.
+        """The target's home document, the requesting document, and every candidate file, once each.
+
+        Candidates are every workspace file, or -- with a :class:`WorkspaceIndex` -- only those
+        whose resolution can reach the target's home document.
 
         The requesting document is served from the passed-in ``doc`` (the server's
         current-or-last-good snapshot), never re-read from the host, so the read-only stale-serving
         policy holds for it while other documents come from the host cache.
         """
         seen: set[str] = set()
-        for uri in (target.uri, doc.uri, *self._host.workspace_files()):
+        for uri in (target.uri, doc.uri, *self._host.reference_candidates(target.uri)):
             if uri in seen:
                 continue
             seen.add(uri)
@@ -377,3 +647,353 @@ class ProjectNavigator:
             cached = self._resolver.resolve(doc, self._host)
             resolutions[doc.uri] = cached
         return cached
+
+
+def content_digest(text: str) -> str:
+    """The hex SHA-256 of ``text``'s UTF-8 encoding."""
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class AnalysisCache:
+    """A persistent directory of per-file workspace-index summaries, shared across server restarts.
+
+    A summary records what resolving one workspace file read: every dependency URI with the content
+    digest it had (``None`` when it was missing or unreadable). Entries are addressed by the file's
+    URI and text plus a ``fingerprint`` of everything else the answer depends on -- grammar,
+    ``.fltklsp`` spec, start rule, resolver code, fltk version -- so changing any of them simply
+    misses. A hit is used only while every recorded dependency still has its recorded digest.
+
+    Each entry is a small JSON file, written to a temporary name and renamed into place so a
+    concurrent reader never sees half of one. A missing, corrupt, or unreadable entry is a miss, and
+    a failed write is logged and dropped: the cache can only save work, never change an answer.
+
+    Every edited version of a file leaves one more entry, so the directory is bounded: a hit
+    refreshes its entry's modification time, and :meth:`prune` deletes the least recently used
+    entries beyond ``max_entries``. It runs every ``_PRUNE_INTERVAL`` stores, and the workspace
+    index runs it whenever it lists the workspace.
+    """
+
+    def __init__(self, directory: pathlib.Path, fingerprint: str, *, max_entries: int = _MAX_CACHE_ENTRIES) -> None:
+        self._directory = directory
+        self._fingerprint = fingerprint
+        self._max_entries = max_entries
+        self._stores = 0
+        self._warned_write = False
+
+    @classmethod
+    def for_inputs(
+        cls,
+        directory: pathlib.Path,
+        *,
+        grammar_path: pathlib.Path,
+        lsp_path: pathlib.Path | None,
+        start_rule: str | None,
+        resolver: Resolver,
+    ) -> AnalysisCache:
+        """A cache in ``directory`` fingerprinted by the server's analysis inputs.
+
+        The resolver contributes its class's qualified name and, when it was loaded from a file, that
+        file's bytes, so editing a resolver invalidates what it previously computed.
+        """
+        digest = hashlib.sha256()
+        try:
+            version = importlib.metadata.version("fltk")
+        except importlib.metadata.PackageNotFoundError:
+            version = "unknown"
+        resolver_type = type(resolver)
+        parts: list[bytes] = [
+            str(_CACHE_FORMAT).encode(),
+            version.encode(),
+            grammar_path.read_bytes(),
+            lsp_path.read_bytes() if lsp_path is not None else b"",
+            (start_rule or "").encode(),
+            f"{resolver_type.__module__}.{resolver_type.__qualname__}".encode(),
+        ]
+        module_file = getattr(sys.modules.get(resolver_type.__module__), "__file__", None)
+        if module_file is not None:
+            try:
+                parts.append(pathlib.Path(module_file).read_bytes())
+            except OSError:
+                parts.append(b"")
+        for part in parts:
+            digest.update(len(part).to_bytes(8, "little"))
+            digest.update(part)
+        return cls(directory, digest.hexdigest())
+
+    def key(self, uri: str, text: str) -> str:
+        """The entry key for ``uri`` holding ``text``, under this cache's fingerprint."""
+        return content_digest(f"{self._fingerprint}\0{uri}\0{text}")
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self._directory / key[:2] / f"{key[2:]}.json"
+
+    def load(self, key: str) -> dict[str, str | None] | None:
+        """The dependency digests stored under ``key``, or ``None`` on a miss."""
+        path = self._path(key)
+        try:
+            with path.open(encoding="utf-8") as stream:
+                stored = json.load(stream)
+        except (OSError, ValueError):
+            return None
+        dependencies = stored.get("dependencies") if isinstance(stored, dict) else None
+        if not isinstance(dependencies, dict):
+            return None
+        # Mark the entry used, so pruning keeps it over entries no run has read lately
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return dependencies
+
+    def store(self, key: str, dependencies: Mapping[str, str | None]) -> None:
+        """Persist ``dependencies`` under ``key``, replacing any previous entry."""
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=path.parent, suffix=".tmp", delete=False
+            ) as stream:
+                json.dump({"dependencies": dict(dependencies)}, stream, sort_keys=True)
+            os.replace(stream.name, path)
+        except OSError:
+            if not self._warned_write:
+                self._warned_write = True
+                _LOGGER.warning("fltk-lsp: could not write the analysis cache in %s", self._directory, exc_info=True)
+        self._stores += 1
+        if self._stores % _PRUNE_INTERVAL == 0:
+            self.prune()
+
+    def prune(self) -> None:
+        """Delete the least recently used entries beyond ``max_entries``; failures are ignored."""
+        entries: list[tuple[int, pathlib.Path]] = []
+        for path in self._directory.glob("*/*.json"):
+            with contextlib.suppress(OSError):
+                entries.append((path.stat().st_mtime_ns, path))
+        excess = len(entries) - self._max_entries
+        if excess <= 0:
+            return
+        entries.sort()
+        for _mtime, path in entries[:excess]:
+            with contextlib.suppress(OSError):
+                path.unlink()
+
+
+class _IndexEntry(NamedTuple):
+    """What resolving one workspace file reached: the URIs it read, and whether it listed the workspace."""
+
+    dependencies: frozenset[str]
+    listed: bool
+
+
+class WorkspaceIndex:
+    """A long-lived reverse-dependency index over the workspace's resolver files.
+
+    A symbol declared in file ``T`` can only occur in another file ``F`` if resolving ``F`` reaches
+    ``T`` -- resolvers copy targets out of ``host.document(T)``, so ``F``'s resolution must read it.
+    Indexing ``F`` resolves it once through a recording host and stores the URIs it read;
+    :meth:`candidates` answers a references query with the files that reach the target, directly or
+    through a chain of indexed files, so the query analyzes those instead of the whole workspace.
+    A file whose resolution listed the workspace (or failed) may depend on anything and is always a
+    candidate. Every open document is always a candidate too: its buffer may differ from the disk
+    text the index saw, and files reaching an open document are included for the same reason.
+
+    The index is built from disk and kept current by :meth:`invalidate` (the server forwards
+    ``didSave`` and ``workspace/didChangeWatchedFiles``); a changed file is re-indexed together with
+    every file that read it. The initial build is incremental -- :meth:`discover` lists the
+    workspace, then :meth:`index_pending` indexes a bounded batch per call -- and a query indexes
+    whatever is still pending before answering, so an answer is never based on a partial build.
+    Like :class:`ProjectHost`, the index is touched only from the server's analysis worker.
+
+    With a ``disk_cache``, indexing a file whose text, and whose recorded dependencies' texts, are
+    unchanged since some earlier run reuses that run's summary instead of analyzing and resolving
+    it. Files whose resolution listed the workspace are never persisted: what they read depends on
+    the workspace's membership, which the summary does not record.
+    """
+
+    def __init__(
+        self,
+        engine: AnalysisEngine,
+        resolver: Resolver,
+        *,
+        root_path: pathlib.Path,
+        disk_cache: AnalysisCache | None = None,
+    ) -> None:
+        self._engine = engine
+        self._resolver = resolver
+        self._root_path = root_path
+        self._disk_cache = disk_cache
+        # The workspace file registry, listed by `discover` and kept current by `invalidate`.
+        self.files = WorkspaceFiles(root_path, resolver.file_suffixes)
+        # Content digests of disk files, keyed by URI and valid while their stat key matches.
+        self._digests: dict[str, tuple[_VersionKey, str]] = {}
+        # The analysis cache shared with every per-request ProjectHost built over this index. Only
+        # the dependency sets in `_entries` must outlive a request, so it keeps a bounded few.
+        self.cache = _AnalysisLru(_MAX_SHARED_ANALYSES)
+        self._files: set[str] | None = None
+        self._entries: dict[str, _IndexEntry] = {}
+        self._readers: dict[str, set[str]] = {}
+        self._listers: set[str] = set()
+        self._pending: set[str] = set()
+        self._warnings: list[str] = []
+
+    @property
+    def discovered(self) -> bool:
+        """Whether the workspace has been listed; before that, :meth:`candidates` answers ``None``."""
+        return self._files is not None
+
+    @property
+    def pending(self) -> int:
+        """How many files await (re)indexing."""
+        return len(self._pending)
+
+    def drain_warnings(self) -> list[str]:
+        """Return and clear the client-surfacable warnings gathered while indexing."""
+        warnings = self._warnings
+        self._warnings = []
+        return warnings
+
+    def discover(self) -> None:
+        """List the workspace and queue every file for indexing."""
+        self.files.scan()
+        self._warnings.extend(self.files.drain_warnings())
+        if self._disk_cache is not None:
+            self._disk_cache.prune()
+        files = set(self.files.files())
+        self._files = files
+        self._pending |= files
+
+    def index_pending(self, limit: int | None = None) -> bool:
+        """Index up to ``limit`` pending files (all when ``None``); whether any remain pending."""
+        host = self._host()
+        count = 0
+        while self._pending and (limit is None or count < limit):
+            self._index_file(host, min(self._pending))
+            count += 1
+        self._warnings.extend(host.drain_warnings())
+        return bool(self._pending)
+
+    def invalidate(self, uri: str, *, exists: bool = True) -> None:
+        """Record that ``uri`` was created, changed, or (``exists=False``) deleted on disk.
+
+        The file itself and every file whose resolution read it are queued for re-indexing; a
+        creation or deletion also re-queues every file that listed the workspace.
+        """
+        uri = canonical_uri(uri)
+        if self._files is None or not self.files.update(uri, exists=exists):
+            return
+        membership_changed = (uri in self._files) != exists
+        if exists:
+            self._files.add(uri)
+            self._pending.add(uri)
+        else:
+            self._files.discard(uri)
+            self._pending.discard(uri)
+            self._drop(uri)
+        self.cache.pop(uri, None)
+        self._digests.pop(uri, None)
+        self._pending |= self._readers.get(uri, set()) & self._files
+        if membership_changed:
+            self._pending |= self._listers
+
+    def candidates(self, target_uri: str, open_uris: Iterable[str]) -> list[str] | None:
+        """Files that may hold an occurrence of a symbol declared in ``target_uri``, sorted.
+
+        ``None`` until :meth:`discover` has run. Pending files are indexed first, so the answer
+        reflects every change reported so far.
+        """
+        if self._files is None:
+            return None
+        self.index_pending()
+        seeds = {canonical_uri(target_uri), *(canonical_uri(uri) for uri in open_uris)}
+        reached = set(seeds)
+        frontier = list(seeds)
+        while frontier:
+            for reader in self._readers.get(frontier.pop(), ()):
+                if reader not in reached:
+                    reached.add(reader)
+                    frontier.append(reader)
+        reached |= self._listers
+        return sorted(reached & self._files)
+
+    def _host(self) -> ProjectHost:
+        # Disk only: open buffers are always candidates, so the index never needs their text.
+        return ProjectHost(self._engine, self._resolver, root_path=self._root_path, index=self)
+
+    def _index_file(self, host: ProjectHost, uri: str) -> None:
+        self._pending.discard(uri)
+        self._drop(uri)
+        disk_cache = self._disk_cache
+        key: str | None = None
+        if disk_cache is not None:
+            source = host._source(uri)
+            if source is not None:
+                key = disk_cache.key(uri, source[0])
+                stored = disk_cache.load(key)
+                if stored is not None and all(self._digest(dep) == digest for dep, digest in stored.items()):
+                    self._engine.telemetry.count("index.disk_hit")
+                    self._record(uri, _IndexEntry(dependencies=frozenset(stored), listed=False))
+                    return
+                self._engine.telemetry.count("index.disk_miss")
+        cached = host._ensure(uri)
+        if cached is None:
+            # Unreadable or unparseable: it can hold no occurrence until it changes on disk.
+            self._entries[uri] = _IndexEntry(dependencies=frozenset(), listed=False)
+            if disk_cache is not None and key is not None:
+                disk_cache.store(key, {})
+            return
+        host._touched = set()
+        host._listed = False
+        try:
+            self._resolver.resolve(cached.document, host)
+        except Exception as exc:
+            # Whatever the resolver would have read is unknown, so the file is always a candidate.
+            self._warnings.append(f"fltk-lsp: resolver failed while indexing {uri}; always scanning it ({exc})")
+            host._listed = True
+        finally:
+            touched = host._touched
+            host._touched = None
+        entry = _IndexEntry(dependencies=frozenset(touched - {uri}), listed=host._listed)
+        self._record(uri, entry)
+        if disk_cache is not None and key is not None and not entry.listed:
+            disk_cache.store(key, {dep: self._digest(dep) for dep in entry.dependencies})
+
+    def _record(self, uri: str, entry: _IndexEntry) -> None:
+        self._entries[uri] = entry
+        for dependency in entry.dependencies:
+            self._readers.setdefault(dependency, set()).add(uri)
+        if entry.listed:
+            self._listers.add(uri)
+
+    def _digest(self, uri: str) -> str | None:
+        """The content digest of ``uri`` on disk, or ``None`` when it is missing or unreadable.
+
+        The file is read here rather than through a host, which would serve an open buffer's text:
+        the digest is cached under the disk stat key and persisted as a description of the disk
+        content, so it must never come from an unsaved buffer.
+        """
+        path = uri_to_path(uri)
+        if path is None:
+            return None
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        version_key: _VersionKey = ("disk", stat.st_mtime_ns, stat.st_size)
+        known = self._digests.get(uri)
+        if known is not None and known[0] == version_key:
+            return known[1]
+        try:
+            text = path.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            return None
+        digest = content_digest(text)
+        self._digests[uri] = (version_key, digest)
+        return digest
+
+    def _drop(self, uri: str) -> None:
+        entry = self._entries.pop(uri, None)
+        if entry is None:
+            return
+        for dependency in entry.dependencies:
+            readers = self._readers.get(dependency)
+            if readers is not None:
+                readers.discard(uri)
+        self._listers.discard(uri)
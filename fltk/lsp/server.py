@@ -18,11 +18,13 @@ import bisect
 import dataclasses
 import functools
 import importlib.metadata
+import itertools
 import logging
 import pathlib
+import time
 import traceback
 from concurrent.futures import ThreadPoolExecutor
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, TypeVar
 
 import pygls.capabilities as _pygls_capabilities
 from lsprotocol import types as lsp
@@ -31,22 +33,31 @@ from pygls.exceptions import JsonRpcException
 from pygls.lsp.server import LanguageServer
 
 from fltk import plumbing
+from fltk.fegen import naming
+from fltk.fegen.pyrt.memo import ParseBudget, ParseCancelledError
+from fltk.fegen.pyrt.span_protocol import SpanKind
 from fltk.lsp import features
+from fltk.lsp.node_index import NodeIndex
 from fltk.lsp.positions import LineIndex, PositionEncoding
-from fltk.lsp.project import Hazard, ProjectHost, ProjectNavigator, canonical_uri, uri_to_path
+from fltk.lsp.project import Hazard, ProjectHost, ProjectNavigator, WorkspaceIndex, canonical_uri, uri_to_path
 from fltk.lsp.resolver import ResolvedDocument
 
 if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
     from fltk.lsp import symbols
+    from fltk.lsp.classify import Token
     from fltk.lsp.engine import AnalysisEngine, DocumentAnalysis
+    from fltk.lsp.project import AnalysisCache
     from fltk.lsp.resolver import Resolver
     from fltk.lsp.symbols import Symbol
+    from fltk.lsp.workers import AnalysisPool
     from fltk.plumbing_types import ParserResult, UnparserResult
     from fltk.unparse.fmt_config import FormatterConfig
     from fltk.unparse.renderer import RendererConfig
 
-    # Worker output: the analysis, its line index, the served tokens (absolute segments plus their
-    # delta encoding, or ``None`` when the analysis produced no tokens), and the analyzed text.
+    # Worker output: the analysis, its line index, the served tokens (``None`` when the analysis
+    # produced no tokens), and the analyzed text.
     _AnalysisResult = tuple[DocumentAnalysis, LineIndex, "_ServedTokens | None", str]
 
 
@@ -54,6 +65,15 @@ _LOGGER = logging.getLogger(__name__)
 
 _SERVER_NAME = "fltk-lsp"
 
+# Registration id for the workspace file watchers backing the workspace index.
+_WATCHED_FILES_REGISTRATION = "fltk-lsp-workspace-files"
+# Files indexed per worker submission while building the workspace index.
+_INDEX_BATCH = 16
+# The `workspace/executeCommand` command returning the telemetry snapshot.
+TELEMETRY_COMMAND = "fltk.telemetry"
+
+_T = TypeVar("_T")
+
 
 def _server_version() -> str:
     """The installed ``fltk`` package version, or ``"unknown"`` outside an installed environment."""
@@ -67,6 +87,10 @@ def _server_version() -> str:
 # into one parse. Module constant, not configurable.
 _DEBOUNCE_SECONDS = 0.2
 
+# Default wall-clock budget for one analysis parse. A parse past it is abandoned and reported as a
+# parse-failure diagnostic, so a runaway document cannot hold the single analysis worker forever.
+_ANALYSIS_TIMEOUT_SECONDS = 10.0
+
 
 def _constrain_pygls_encodings() -> None:
     """Restrict pygls's negotiated position encodings to the two ``LineIndex`` implements.
@@ -100,10 +124,10 @@ _constrain_pygls_encodings()
 class _GoodAnalysis:
     """A snapshot of the last complete analysis, self-consistent across one document version.
 
-    The text, line index, tree, segments, and symbols are all computed against the *same* document
+    The text, line index, tree, tokens, and symbols are all computed against the *same* document
     version, so serving any of them for a stale version can never mix coordinates from two versions.
-    Its ``segments`` are the fresh absolute segments of that complete analysis -- the stale input a
-    later partial analysis merges its fresh prefix with. ``text`` is the analyzed source, so a
+    Its ``served`` tokens are that complete analysis's fresh stream -- whose segments are the stale
+    input a later partial analysis merges its fresh prefix with. ``text`` is the analyzed source, so a
     cross-file resolver query can build a self-consistent ``ResolvedDocument`` (text + tree +
     symbols + line index all from one version) rather than pairing the live buffer with a stale tree.
     """
@@ -111,10 +135,19 @@ class _GoodAnalysis:
     version: int | None
     line_index: LineIndex
     tree: Any
-    segments: list[features.TokenSegment]
+    served: _ServedTokens
     symbols: symbols.SymbolTable
     text: str
 
+    @functools.cached_property
+    def node_index(self) -> NodeIndex:
+        """The tree's :class:`NodeIndex`, built on first use and shared by every later request.
+
+        The snapshot is immutable, so one index serves every folding/selection request against
+        this version instead of each request re-walking the tree.
+        """
+        return NodeIndex(self.tree)
+
     def resolved_document(self, uri: str) -> ResolvedDocument:
         """A :class:`ResolvedDocument` view of this snapshot -- text, tree, and symbols all from the
         one analyzed version, never the live buffer paired with a stale tree."""
@@ -123,17 +156,61 @@ class _GoodAnalysis:
 
 @dataclasses.dataclass(frozen=True)
 class _ServedTokens:
-    """What the semantic-token handlers serve: absolute segments plus their wire encoding.
-
-    Either a complete analysis's fresh segments, or a partial analysis's fresh-prefix segments
-    merged with the clipped stale tail of the previous complete analysis. Both the segments and
-    their delta encoding are computed on the worker thread; the handlers only read them. Staleness
-    ordering is enforced by ``_store``'s ``analyzed_version`` guard before this record is written,
-    so it carries no version of its own.
+    """What the semantic-token handlers serve: a document's absolute segments and their encoding.
+
+    Either a complete analysis's fresh stream, or a partial analysis's fresh-prefix segments merged
+    with the clipped stale tail of the previous complete analysis (``merged``). A fresh stream is
+    kept as its codepoint-offset ``tokens`` and rendered on demand: a range request renders only the
+    tokens on the requested lines (:meth:`range_segments`), and the whole-document ``segments`` and
+    ``encoded`` are materialized once, on the worker thread, only when a full request or a later
+    partial analysis's merge needs them. A merged stream is built eagerly, since the merge itself
+    needs both sides' segments. Staleness ordering is enforced by ``_store``'s ``analyzed_version``
+    guard before this record is written, so it carries no version of its own.
     """
 
-    segments: list[features.TokenSegment]
-    encoded: list[int]
+    line_index: LineIndex
+    encoding: PositionEncoding
+    tokens: list[Token] | None = None
+    merged: list[features.TokenSegment] | None = None
+
+    @functools.cached_property
+    def segments(self) -> list[features.TokenSegment]:
+        """Every absolute segment of the document, sorted and non-overlapping."""
+        if self.merged is not None:
+            return self.merged
+        assert self.tokens is not None
+        return features.absolute_segments(self.tokens, self.line_index, self.encoding)
+
+    @functools.cached_property
+    def encoded(self) -> list[int]:
+        """The whole-document delta encoding of :attr:`segments`."""
+        return features.delta_encode_segments(self.segments)
+
+    def range_segments(self, start: tuple[int, int], end: tuple[int, int]) -> list[features.TokenSegment]:
+        """The segments overlapping the ``[start, end)`` client-position range, in order.
+
+        A fresh stream renders only the tokens touching lines ``start[0]`` through ``end[0]``; a
+        merged stream (or one already materialized) is sliced directly. Either way the result is
+        narrowed by position, so both paths serve exactly the segments a whole-document slice would.
+        """
+        if self.tokens is None or "segments" in self.__dict__:
+            candidates = self.segments
+        else:
+            # Whole requested lines, in offsets: a conservative superset of the tokens overlapping
+            # the range, trimmed below by position once rendered.
+            lo_offset = self.line_index.position_to_offset(start[0], 0, self.encoding)
+            hi_offset = self.line_index.position_to_offset(end[0] + 1, 0, self.encoding)
+            tokens = self.tokens
+            lo = bisect.bisect_right(tokens, lo_offset, key=lambda t: t.end)
+            hi = bisect.bisect_left(tokens, hi_offset, key=lambda t: t.start)
+            candidates = features.absolute_segments(tokens[lo:hi], self.line_index, self.encoding)
+        # Segments are sorted and non-overlapping by (line, char), so their end positions are
+        # monotonic too: the overlap window {s : s.end_pos > start and s.start_pos < end} is the
+        # slice [lo:hi] found by two bisects on position tuples -- correct for a stale tail too (its
+        # positions are already client-coordinate approximations).
+        lo = bisect.bisect_right(candidates, start, key=lambda s: (s.line, s.char + s.length))
+        hi = bisect.bisect_left(candidates, end, key=lambda s: (s.line, s.char))
+        return candidates[lo:hi]
 
 
 @dataclasses.dataclass
@@ -145,6 +222,9 @@ class _DocState:
     line_index: LineIndex | None = None
     last_good: _GoodAnalysis | None = None
     served_tokens: _ServedTokens | None = None
+    # The result id and data array of the last full or delta semantic-tokens response, which a
+    # `full/delta` request names as its base. Touched only on the worker thread.
+    sent_tokens: tuple[str, list[int]] | None = None
 
 
 class FltkLanguageServer(LanguageServer):
@@ -162,11 +242,15 @@ class FltkLanguageServer(LanguageServer):
         renderer_config: RendererConfig,
         *,
         resolver: Resolver | None = None,
+        analysis_timeout: float | None = _ANALYSIS_TIMEOUT_SECONDS,
+        pool: AnalysisPool | None = None,
+        analysis_cache: AnalysisCache | None = None,
+        telemetry_interval: float | None = None,
     ) -> None:
         super().__init__(
             name=_SERVER_NAME,
             version=_server_version(),
-            text_document_sync_kind=lsp.TextDocumentSyncKind.Full,
+            text_document_sync_kind=lsp.TextDocumentSyncKind.Incremental,
         )
         self._engine = engine
         self._formatter_config = formatter_config
@@ -180,11 +264,28 @@ class FltkLanguageServer(LanguageServer):
         self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fltk-lsp-analysis")
         self._docs: dict[str, _DocState] = {}
         self._debounce: dict[str, asyncio.Task[None]] = {}
-        self._inflight: dict[str, tuple[int | None, asyncio.Future[_AnalysisResult]]] = {}
+        # Per-URI in-flight analysis: its version, worker future, and parse budget. Submitting a
+        # different version cancels the budget, so a superseded parse stops at its next check
+        # instead of occupying the worker (or, if still queued, stops before it starts).
+        self._inflight: dict[str, tuple[int | None, asyncio.Future[_AnalysisResult], ParseBudget]] = {}
+        self._analysis_timeout = analysis_timeout
+        # Worker processes that parse instead of the analysis thread, or None. Their trees are
+        # outlines (no labels), which folding and selection walk but a resolver cannot.
+        if pool is not None and resolver is not None:
+            msg = "an analysis pool cannot serve a cross-file resolver: pooled analyses carry no CST"
+            raise ValueError(msg)
+        self._pool = pool
+        # The on-disk store of workspace-index summaries, or None; only the index consults it.
+        self._analysis_cache = analysis_cache
         # Per-URI epoch, bumped on drop: an analysis captures it at submit and its result is
         # discarded if a close advanced the epoch meanwhile, so closed-document state is never
         # resurrected by a late-completing analysis.
         self._epochs: dict[str, int] = {}
+        # Per-URI line index over the live buffer, patched edit by edit on `didChange` so an
+        # analysis of the current text starts from it instead of rescanning the document.
+        self._live_lines: dict[str, LineIndex] = {}
+        # Semantic-token result ids, unique across documents for the server's lifetime.
+        self._result_ids = itertools.count(1)
         # Formatting pipeline, built once on first request; a build failure is memoized so a
         # per-keystroke format request never retries multi-second codegen that cannot succeed
         # (its inputs -- grammar and .fltkfmt -- are fixed at startup).
@@ -193,6 +294,16 @@ class FltkLanguageServer(LanguageServer):
         # Emitted at most once: a resolver is configured but the client gave no workspace root, so
         # cross-file navigation is limited to open buffers and same-file results.
         self._warned_no_root = False
+        # The workspace reverse-dependency index, started at `initialized` when a resolver, a
+        # workspace root, and client-side file watching are all available (without watching, an
+        # external change could leave it silently stale). Touched only on the worker thread.
+        self._workspace_index: WorkspaceIndex | None = None
+        self._index_task: asyncio.Task[None] | None = None
+        # Phase timings and counters, shared with the engine so one snapshot covers both. With an
+        # interval, a summary line is logged to the client that often, started at `initialized`.
+        self._telemetry = engine.telemetry
+        self._telemetry_interval = telemetry_interval
+        self._telemetry_task: asyncio.Task[None] | None = None
 
     # -- encoding ---------------------------------------------------------------------------
 
@@ -211,40 +322,105 @@ class FltkLanguageServer(LanguageServer):
             )
         return PositionEncoding.UTF16
 
+    # -- worker thread and telemetry ----------------------------------------------------------
+
+    def _run_blocking(self, phase: str, fn: Callable[..., _T], *args: Any) -> asyncio.Future[_T]:
+        """Run ``fn(*args)`` on the worker thread, recording its queue wait and its run as ``phase``.
+
+        Must be called on the event loop thread. The wait (``queue_wait``) is how long the job sat
+        behind earlier ones on the single worker, which is where a slow phase shows up as lag in
+        every other request.
+        """
+        telemetry = self._telemetry
+        submitted = time.perf_counter()
+
+        def timed() -> _T:
+            started = time.perf_counter()
+            telemetry.record("queue_wait", started - submitted)
+            try:
+                return fn(*args)
+            finally:
+                telemetry.record(phase, time.perf_counter() - started)
+
+        return asyncio.get_running_loop().run_in_executor(self._executor, timed)
+
+    def telemetry_snapshot(self) -> dict[str, Any]:
+        """The server's and engine's phase histograms and counters (see :class:`Telemetry`)."""
+        return self._telemetry.snapshot()
+
+    def start_telemetry_log(self) -> None:
+        """Start logging a telemetry summary every ``telemetry_interval`` seconds, if configured."""
+        interval = self._telemetry_interval
+        if interval is None or self._telemetry_task is not None:
+            return
+        self._telemetry_task = asyncio.ensure_future(self._log_telemetry(interval))
+
+    async def _log_telemetry(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            message = f"fltk-lsp telemetry: {self._telemetry.summary()}"
+            self.window_log_message(lsp.LogMessageParams(type=lsp.MessageType.Log, message=message))
+
     # -- analysis scheduling ----------------------------------------------------------------
 
-    def _analyze_blocking(self, text: str, stale: _GoodAnalysis | None) -> _AnalysisResult:
+    def _analyze_blocking(
+        self,
+        text: str,
+        stale: _GoodAnalysis | None,
+        budget: ParseBudget | None = None,
+        line_index: LineIndex | None = None,
+    ) -> _AnalysisResult:
         """Run the engine, build the line index, and compute served tokens; on the worker thread.
 
-        The whole semantic-token pipeline -- absolute segments, the stale-tail merge for a partial
-        analysis, and delta encoding -- runs here, not on the loop thread, so its O(tokens) cost
-        never blocks the protocol loop even for clients that never request tokens. A complete
-        analysis serves its own fresh segments; a partial one serves its fresh prefix merged with
-        ``stale``'s segments clipped at the prefix boundary; a failed one serves nothing.
-
-        A single non-terminating parse (catastrophic regex backtracking, unbounded recursion the
-        engine does not catch) starves every later analysis: Python worker threads cannot be
-        preempted. The protocol loop stays responsive, but that document stops updating.
-        TODO(lsp-analysis-watchdog): bound analysis wall-clock via process isolation or a
-        parser-level budget so one runaway document cannot wedge the worker.
+        Whole-document semantic-token work runs on this thread, never the loop thread, so its
+        O(tokens) cost never blocks the protocol loop. A complete analysis serves its own fresh
+        tokens, rendered to segments only when first needed (a range request renders just its
+        lines); a partial one serves its fresh prefix merged here with ``stale``'s segments clipped
+        at the prefix boundary; a failed one serves nothing.
+
+        Python worker threads cannot be preempted, so the parse polls ``budget`` instead: past
+        its deadline the engine reports a failed outcome, and a cancelled budget (a newer version
+        was submitted) raises :class:`ParseCancelledError` out of here. The poll is per rule
+        application, so a single terminal regex that backtracks catastrophically still holds the
+        worker until that one match returns.
         """
-        analysis = self._engine.analyze(text)
-        line_index = LineIndex(text)
+        return self._serve_blocking(self._engine.analyze(text, budget=budget), text, stale, line_index)
+
+    def _serve_blocking(
+        self,
+        analysis: DocumentAnalysis,
+        text: str,
+        stale: _GoodAnalysis | None,
+        line_index: LineIndex | None = None,
+    ) -> _AnalysisResult:
+        """Build the served tokens for a finished ``analysis`` of ``text``.
+
+        ``line_index`` is the incrementally maintained index of the live buffer; it is used when
+        it indexes exactly ``text`` and rebuilt otherwise.
+        """
+        if line_index is None or line_index.text != text:
+            line_index = LineIndex(text)
         served: _ServedTokens | None = None
         if analysis.tokens is not None:
             enc = self._encoding()
-            fresh = features.absolute_segments(analysis.tokens, line_index, enc)
             if analysis.error is None:
-                segments = fresh
+                # Rendered lazily: a client that only asks for viewport ranges never pays for
+                # converting and encoding the whole document.
+                served = _ServedTokens(line_index=line_index, encoding=enc, tokens=analysis.tokens)
             else:
                 # A partial outcome guarantees prefix_end is set (DocumentAnalysis invariant); trust
                 # it rather than defaulting, so a contract break crashes here instead of silently
                 # computing a zero boundary that keeps the whole stale stream.
                 assert analysis.prefix_end is not None
                 boundary = line_index.offset_to_position(analysis.prefix_end, enc)
-                stale_segments = stale.segments if stale is not None else []
-                segments = features.merge_stale_segments(fresh, stale_segments, boundary)
-            served = _ServedTokens(segments=segments, encoded=features.delta_encode_segments(segments))
+                fresh = features.absolute_segments(analysis.tokens, line_index, enc)
+                stale_segments = (
+                    features.shift_stale_segments(stale.served.segments, stale.line_index, line_index, enc)
+                    if stale is not None
+                    else []
+                )
+                merged = features.merge_stale_segments(fresh, stale_segments, boundary)
+                served = _ServedTokens(line_index=line_index, encoding=enc, merged=merged)
         return analysis, line_index, served, text
 
     def _store(
@@ -276,14 +452,14 @@ class FltkLanguageServer(LanguageServer):
         if served is not None:
             state.served_tokens = served
             if analysis.error is None and analysis.tree is not None and analysis.symbols is not None:
-                # Complete analysis: its served segments are the fresh segment list, the stale input
-                # a later partial analysis merges against. A partial analysis (error set) never
+                # Complete analysis: its served stream is the fresh one, the stale input a later
+                # partial analysis merges against. A partial analysis (error set) never
                 # promotes to last_good, so navigation/folding keep serving the last complete tree.
                 state.last_good = _GoodAnalysis(
                     version=version,
                     line_index=line_index,
                     tree=analysis.tree,
-                    segments=served.segments,
+                    served=served,
                     symbols=analysis.symbols,
                     text=text,
                 )
@@ -293,29 +469,55 @@ class FltkLanguageServer(LanguageServer):
         """Analyze ``text`` on the worker thread, reusing an in-flight run for the same version.
 
         Single-flight per URI: a request and the debounce timer racing on the same version share
-        one worker submission rather than doing the parse twice.
+        one worker submission rather than doing the parse twice. A submission for a different
+        version cancels the one in flight; its waiters get the URI's current state instead (the
+        newer analysis publishes for itself).
         """
         epoch = self._epochs.get(uri, 0)
         inflight = self._inflight.get(uri)
-        if inflight is not None and inflight[0] == version:
-            analysis, line_index, served, analyzed_text = await inflight[1]
-        else:
-            loop = asyncio.get_running_loop()
-            # Snapshot last_good on the loop thread at submit time; only _store (also on the loop
-            # thread) ever writes it, so the worker reads a race-free stale-tail source.
-            existing = self._docs.get(uri)
-            stale = existing.last_good if existing is not None else None
-            future = loop.run_in_executor(self._executor, self._analyze_blocking, text, stale)
-            self._inflight[uri] = (version, future)
-            try:
-                analysis, line_index, served, analyzed_text = await future
-            finally:
-                if self._inflight.get(uri) is not None and self._inflight[uri][1] is future:
-                    del self._inflight[uri]
+        try:
+            if inflight is not None and inflight[0] == version:
+                analysis, line_index, served, analyzed_text = await inflight[1]
+            else:
+                if inflight is not None:
+                    inflight[2].cancel()
+                # Snapshot last_good on the loop thread at submit time; only _store (also on the loop
+                # thread) ever writes it, so the worker reads a race-free stale-tail source.
+                existing = self._docs.get(uri)
+                stale = existing.last_good if existing is not None else None
+                budget = ParseBudget(self._analysis_timeout)
+                lines = self._live_lines.get(uri)
+                future: asyncio.Future[_AnalysisResult]
+                if self._pool is None:
+                    future = self._run_blocking("analyze", self._analyze_blocking, text, stale, budget, lines)
+                else:
+                    future = asyncio.ensure_future(self._pooled_analysis(uri, text, stale, budget, lines))
+                self._inflight[uri] = (version, future, budget)
+                try:
+                    analysis, line_index, served, analyzed_text = await future
+                finally:
+                    if self._inflight.get(uri) is not None and self._inflight[uri][1] is future:
+                        del self._inflight[uri]
+        except ParseCancelledError:
+            return self._docs.get(uri) or _DocState()
         return self._store(
             uri, version, analysis, line_index=line_index, served=served, text=analyzed_text, epoch=epoch
         )
 
+    async def _pooled_analysis(
+        self,
+        uri: str,
+        text: str,
+        stale: _GoodAnalysis | None,
+        budget: ParseBudget,
+        lines: LineIndex | None,
+    ) -> _AnalysisResult:
+        """Parse in ``uri``'s pool worker, then build the served state on the analysis thread."""
+        assert self._pool is not None
+        with self._telemetry.phase("pool.analyze"):
+            analysis = await self._pool.analyze(uri, text, budget)
+        return await self._run_blocking("serve", self._serve_blocking, analysis, text, stale, lines)
+
     async def _ensure_analyzed(self, uri: str, version: int | None, text: str) -> _DocState:
         """Return state whose analysis matches ``version``, analyzing if necessary."""
         state = self._docs.get(uri)
@@ -392,6 +594,32 @@ class FltkLanguageServer(LanguageServer):
                 )
             )
 
+    def track_open(self, uri: str, text: str) -> None:
+        """Start the live line index for a newly opened buffer."""
+        self._live_lines[uri] = LineIndex(text)
+
+    def track_changes(self, uri: str, changes: Sequence[lsp.TextDocumentContentChangeEvent]) -> None:
+        """Patch ``uri``'s live line index with one ``didChange`` batch, in order.
+
+        A ranged change is applied with :meth:`LineIndex.edited`; a whole-document change
+        rebuilds. The workspace has already applied the batch, and if the patched index does not
+        reproduce the workspace text (a client sending out-of-range positions the two sides clamp
+        differently) it is rebuilt from that text, so the live index never drifts.
+        """
+        lines = self._live_lines.get(uri)
+        enc = self._encoding()
+        for change in changes:
+            if isinstance(change, lsp.TextDocumentContentChangePartial) and lines is not None:
+                start = lines.position_to_offset(change.range.start.line, change.range.start.character, enc)
+                end = lines.position_to_offset(change.range.end.line, change.range.end.character, enc)
+                lines = lines.edited(start, end, change.text)
+            elif isinstance(change, lsp.TextDocumentContentChangeWholeDocument):
+                lines = LineIndex(change.text)
+        source = self.workspace.get_text_document(uri).source
+        if lines is None or lines.text != source:
+            lines = LineIndex(source)
+        self._live_lines[uri] = lines
+
     def schedule_debounced(self, uri: str) -> None:
         """(Re)schedule a debounced analysis for ``uri``, cancelling any pending one."""
         existing = self._debounce.pop(uri, None)
@@ -408,9 +636,30 @@ class FltkLanguageServer(LanguageServer):
         if existing is not None:
             existing.cancel()
         self._docs.pop(uri, None)
-        self._inflight.pop(uri, None)
+        self._live_lines.pop(uri, None)
+        inflight = self._inflight.pop(uri, None)
+        if inflight is not None:
+            inflight[2].cancel()
         self.text_document_publish_diagnostics(lsp.PublishDiagnosticsParams(uri=uri, diagnostics=[], version=None))
 
+    def _semantic_tokens_blocking(
+        self, state: _DocState, served: _ServedTokens, previous_result_id: str | None
+    ) -> lsp.SemanticTokens | lsp.SemanticTokensDelta:
+        """The response for ``served`` under a fresh result id, recorded as ``state``'s last sent.
+
+        Runs on the worker thread: materializing the whole-document encoding is O(tokens). When
+        ``previous_result_id`` names the last response sent for this document, the answer is the
+        edits from that response's data; otherwise (a full request, or a base the server no longer
+        holds) it is the whole array.
+        """
+        encoded = served.encoded
+        previous = state.sent_tokens
+        result_id = str(next(self._result_ids))
+        state.sent_tokens = (result_id, encoded)
+        if previous_result_id is None or previous is None or previous[0] != previous_result_id:
+            return lsp.SemanticTokens(data=list(encoded), result_id=result_id)
+        return lsp.SemanticTokensDelta(edits=features.semantic_tokens_edits(previous[1], encoded), result_id=result_id)
+
     # -- stale-serving accessors ------------------------------------------------------------
 
     def _serveable(self, state: _DocState) -> _GoodAnalysis | None:
@@ -503,9 +752,61 @@ class FltkLanguageServer(LanguageServer):
         A resolver is present whenever this is called (the handlers gate on ``self._resolver``).
         """
         assert self._resolver is not None
-        host = ProjectHost(self._engine, self._resolver, root_path=root, open_docs=open_docs)
+        index = self._workspace_index if root == self._workspace_root() else None
+        host = ProjectHost(self._engine, self._resolver, root_path=root, open_docs=open_docs, index=index)
         return host, ProjectNavigator(host, self._resolver)
 
+    async def start_workspace_index(self) -> None:
+        """Register workspace file watchers, then build the workspace index in the background.
+
+        A no-op without a resolver or a workspace root, or when the client cannot watch files for
+        us: the index is only consulted while ``workspace/didChangeWatchedFiles`` keeps it current.
+        The build runs on the worker thread in bounded batches, so document analyses queued meanwhile
+        interleave with it instead of waiting for the whole workspace.
+        """
+        root = self._workspace_root()
+        if self._resolver is None or root is None:
+            return
+        if not get_capability(
+            self.client_capabilities, "workspace.did_change_watched_files.dynamic_registration", False
+        ):
+            return
+        watchers = [lsp.FileSystemWatcher(glob_pattern=f"**/*{suffix}") for suffix in self._resolver.file_suffixes]
+        registration = lsp.Registration(
+            id=_WATCHED_FILES_REGISTRATION,
+            method=lsp.WORKSPACE_DID_CHANGE_WATCHED_FILES,
+            register_options=lsp.DidChangeWatchedFilesRegistrationOptions(watchers=watchers),
+        )
+        try:
+            await self.client_register_capability_async(lsp.RegistrationParams(registrations=[registration]))
+        except Exception:
+            _LOGGER.warning(
+                "fltk-lsp: file-watcher registration failed; scanning the workspace per query", exc_info=True
+            )
+            return
+        index = WorkspaceIndex(self._engine, self._resolver, root_path=root, disk_cache=self._analysis_cache)
+        self._workspace_index = index
+        self._index_task = asyncio.ensure_future(self._build_workspace_index(index))
+
+    async def _build_workspace_index(self, index: WorkspaceIndex) -> None:
+        await self._run_blocking("index.discover", index.discover)
+        while await self._run_blocking("index.batch", index.index_pending, _INDEX_BATCH):
+            pass
+        for message in await self._run_blocking("index.warnings", index.drain_warnings):
+            self.window_log_message(lsp.LogMessageParams(type=lsp.MessageType.Warning, message=message))
+
+    async def invalidate_workspace_files(self, changes: list[tuple[str, bool]]) -> None:
+        """Forward on-disk ``(uri, exists)`` changes to the workspace index, on the worker thread."""
+        index = self._workspace_index
+        if index is None:
+            return
+
+        def apply() -> None:
+            for uri, exists in changes:
+                index.invalidate(uri, exists=exists)
+
+        await self._run_blocking("index.invalidate", apply)
+
     def _definition_blocking(
         self,
         doc: ResolvedDocument,
@@ -623,9 +924,8 @@ class FltkLanguageServer(LanguageServer):
         open_docs = self._open_docs_snapshot()
         root = self._workspace_root()
         self._maybe_warn_no_root(root)
-        loop = asyncio.get_running_loop()
-        location, degraded, logs = await loop.run_in_executor(
-            self._executor,
+        location, degraded, logs = await self._run_blocking(
+            "definition",
             functools.partial(
                 self._definition_blocking,
                 doc,
@@ -655,9 +955,8 @@ class FltkLanguageServer(LanguageServer):
         open_docs = self._open_docs_snapshot()
         root = self._workspace_root()
         self._maybe_warn_no_root(root)
-        loop = asyncio.get_running_loop()
-        locations, degraded, logs = await loop.run_in_executor(
-            self._executor,
+        locations, degraded, logs = await self._run_blocking(
+            "references",
             lambda: self._references_blocking(
                 doc,
                 offset,
@@ -732,9 +1031,8 @@ class FltkLanguageServer(LanguageServer):
             open_docs = self._open_docs_snapshot()
             root = self._workspace_root()
             self._maybe_warn_no_root(root)
-            guard_loop = asyncio.get_running_loop()
-            hazard, guard_logs = await guard_loop.run_in_executor(
-                self._executor, self._rename_guard_blocking, doc, symbol, offset, open_docs, root
+            hazard, guard_logs = await self._run_blocking(
+                "rename.guard", self._rename_guard_blocking, doc, symbol, offset, open_docs, root
             )
             for level, message in guard_logs:
                 self.window_log_message(lsp.LogMessageParams(type=level, message=message))
@@ -748,8 +1046,7 @@ class FltkLanguageServer(LanguageServer):
                 msg = "document changed during rename; retry"
                 raise JsonRpcException(msg, code=lsp.LSPErrorCodes.RequestFailed)
         renamed = _apply_edits(text, occurrences, new_name)
-        loop = asyncio.get_running_loop()
-        verify = await loop.run_in_executor(self._executor, self._engine.analyze, renamed)
+        verify = await self._run_blocking("rename.verify", self._engine.analyze, renamed)
         if verify.error is not None:
             msg = "cannot rename: the new name would leave the document unparseable"
             raise JsonRpcException(msg, code=lsp.LSPErrorCodes.RequestFailed)
@@ -788,18 +1085,13 @@ class FltkLanguageServer(LanguageServer):
         self._fmt_pipeline = (parser, unparser)
         return self._fmt_pipeline
 
-    def _format_blocking(self, text: str) -> tuple[list[lsp.TextEdit] | None, list[tuple[lsp.MessageType, str]]]:
-        """Format ``text`` on the worker thread; return edits (or None) plus messages to log.
-
-        Every failure mode -- unbuildable pipeline, unparseable input, an unparser/render
-        exception, or output that fails to reparse -- degrades to ``None`` (no edits) so a broken
-        or mis-formatted document is never written. Protocol I/O (logging) is deferred to the
-        caller on the loop thread.
-        """
-        logs: list[tuple[lsp.MessageType, str]] = []
+    def _format_parse(
+        self, text: str, logs: list[tuple[lsp.MessageType, str]]
+    ) -> tuple[ParserResult, UnparserResult, Any] | None:
+        """The formatting pipeline plus the CST of ``text``, or None (with a log) when unavailable."""
         pipeline = self._ensure_format_pipeline(logs)
         if pipeline is None:
-            return None, logs
+            return None
         parser, unparser = pipeline
         try:
             # A valid but deeply nested document can raise RecursionError from the generated parser;
@@ -807,12 +1099,28 @@ class FltkLanguageServer(LanguageServer):
             parsed = plumbing.parse_text(parser, text, self._start_rule)
         except Exception as exc:
             logs.append((lsp.MessageType.Error, f"fltk-lsp: formatting failed while parsing input: {exc!r}"))
-            return None, logs
+            return None
         if not parsed.success:
             logs.append((lsp.MessageType.Info, "fltk-lsp: not formatting an unparseable document"))
+            return None
+        return parser, unparser, parsed.cst
+
+    def _format_blocking(self, text: str) -> tuple[list[lsp.TextEdit] | None, list[tuple[lsp.MessageType, str]]]:
+        """Format ``text`` on the worker thread; return edits (or None) plus messages to log.
+
+        Every failure mode -- unbuildable pipeline, unparseable input, an unparser/render
+        exception, or output that fails to reparse -- degrades to ``None`` (no edits) so a broken
+        or mis-formatted document is never written. The edits are the line-and-character diff of
+        the formatted output against ``text``, so the editor only sees the spans that changed.
+        Protocol I/O (logging) is deferred to the caller on the loop thread.
+        """
+        logs: list[tuple[lsp.MessageType, str]] = []
+        prepared = self._format_parse(text, logs)
+        if prepared is None:
             return None, logs
+        parser, unparser, cst = prepared
         try:
-            doc = plumbing.unparse_cst(unparser, parsed.cst, text, self._start_rule)
+            doc = plumbing.unparse_cst(unparser, cst, text, self._start_rule)
             rendered = plumbing.render_doc(doc, self._renderer_config)
         except Exception as exc:
             logs.append((lsp.MessageType.Error, f"fltk-lsp: formatting failed during unparse/render: {exc!r}"))
@@ -827,18 +1135,71 @@ class FltkLanguageServer(LanguageServer):
             return None, logs
         if rendered == text:
             return [], logs
-        end_line, end_char = LineIndex(text).end_position(self._encoding())
-        whole = lsp.Range(
-            start=lsp.Position(line=0, character=0),
-            end=lsp.Position(line=end_line, character=end_char),
-        )
-        return [lsp.TextEdit(range=whole, new_text=rendered)], logs
-
-    async def format_document(self, uri: str) -> list[lsp.TextEdit] | None:
-        """Run the formatting pipeline for ``uri`` on the worker thread and emit any log messages."""
+        return features.formatting_edits(text, rendered, LineIndex(text), self._encoding()), logs
+
+    def _range_format_blocking(
+        self, text: str, start: int, end: int
+    ) -> tuple[list[lsp.TextEdit] | None, list[tuple[lsp.MessageType, str]]]:
+        """Format the top-level nodes of ``text`` overlapping codepoints ``[start, end)``.
+
+        Each overlapping child of the start rule's node (or, for an empty range, the child holding
+        ``start``) is unparsed and rendered on its own with its rule's unparser, checked by
+        reparsing the rendered text with that rule, and diffed against its original span; the
+        text between children is left alone. Only those nodes are rendered and reparsed, so the
+        cost follows the range, not the document. Fails closed like :meth:`_format_blocking`: any
+        node that cannot be formatted and verified cancels every edit.
+        """
+        logs: list[tuple[lsp.MessageType, str]] = []
+        prepared = self._format_parse(text, logs)
+        if prepared is None:
+            return None, logs
+        parser, unparser, cst = prepared
+        rule_names = {naming.snake_to_upper_camel(rule.name).upper(): rule.name for rule in parser.grammar.rules}
+        line_index = LineIndex(text)
+        enc = self._encoding()
+        edits: list[lsp.TextEdit] = []
+        for _label, child in cst.children:
+            if child.kind == SpanKind.SPAN:
+                continue
+            child_start, child_end = child.span.start, child.span.end
+            if not (child_start < max(end, start + 1) and start < child_end):
+                continue
+            rule_name = rule_names.get(child.kind.name)
+            if rule_name is None or rule_name.startswith("_"):
+                # Trivia between items is laid out by the enclosing rule, not formatted on its own.
+                continue
+            original = text[child_start:child_end]
+            try:
+                doc = plumbing.unparse_cst(unparser, child, text, rule_name)
+                rendered = plumbing.render_doc(doc, self._renderer_config)
+                verify = plumbing.parse_text(parser, rendered, rule_name)
+            except Exception as exc:
+                logs.append((lsp.MessageType.Error, f"fltk-lsp: range formatting failed on {rule_name}: {exc!r}"))
+                return None, logs
+            if not verify.success:
+                logs.append(
+                    (lsp.MessageType.Error, f"fltk-lsp: formatted {rule_name} does not parse; discarding edits")
+                )
+                return None, logs
+            if rendered != original:
+                edits.extend(features.formatting_edits(original, rendered, line_index, enc, offset=child_start))
+        return edits, logs
+
+    async def format_document(self, uri: str, rng: lsp.Range | None = None) -> list[lsp.TextEdit] | None:
+        """Run the formatting pipeline for ``uri`` (or only over ``rng``) on the worker thread and
+        emit any log messages."""
         document = self.workspace.get_text_document(uri)
-        loop = asyncio.get_running_loop()
-        edits, logs = await loop.run_in_executor(self._executor, self._format_blocking, document.source)
+        text = document.source
+        if rng is None:
+            edits, logs = await self._run_blocking("format", self._format_blocking, text)
+        else:
+            line_index = self._live_lines.get(uri)
+            if line_index is None or line_index.text != text:
+                line_index = LineIndex(text)
+            enc = self._encoding()
+            start = line_index.position_to_offset(rng.start.line, rng.start.character, enc)
+            end = line_index.position_to_offset(rng.end.line, rng.end.character, enc)
+            edits, logs = await self._run_blocking("format.range", self._range_format_blocking, text, start, end)
         for level, message in logs:
             self.window_log_message(lsp.LogMessageParams(type=level, message=message))
         return edits
@@ -876,15 +1237,30 @@ def create_server(
     renderer_config: RendererConfig,
     *,
     resolver: Resolver | None = None,
+    pool: AnalysisPool | None = None,
+    analysis_cache: AnalysisCache | None = None,
+    telemetry_interval: float | None = None,
 ) -> FltkLanguageServer:
     """Build and wire an :class:`FltkLanguageServer`; the caller runs ``start_io``.
 
     Kept separate from the CLI so the server can be constructed and driven in-process by tests. The
     start rule comes from ``engine``; there is no separate parameter to keep in sync with it. An
     optional ``resolver`` turns on the cross-file definition/references paths and the rename guard;
-    without one, every handler keeps its same-file-only behavior.
+    without one, every handler keeps its same-file-only behavior. An optional ``pool`` moves analysis
+    parsing into worker processes; it cannot be combined with a resolver. An optional
+    ``analysis_cache`` lets the workspace index reuse summaries persisted by earlier runs. Phase
+    timings are always recorded and served by the ``fltk.telemetry`` command; a
+    ``telemetry_interval`` also logs a summary to the client every that many seconds.
     """
-    server = FltkLanguageServer(engine, formatter_config, renderer_config, resolver=resolver)
+    server = FltkLanguageServer(
+        engine,
+        formatter_config,
+        renderer_config,
+        resolver=resolver,
+        pool=pool,
+        analysis_cache=analysis_cache,
+        telemetry_interval=telemetry_interval,
+    )
     legend = lsp.SemanticTokensLegend(
         token_types=list(features.SEMANTIC_TOKEN_TYPES),
         token_modifiers=list(features.SEMANTIC_TOKEN_MODIFIERS),
@@ -893,23 +1269,68 @@ def create_server(
     @server.feature(lsp.TEXT_DOCUMENT_DID_OPEN)
     async def did_open(params: lsp.DidOpenTextDocumentParams) -> None:
         document = params.text_document
+        server.track_open(document.uri, document.text)
         await server.analyze_and_publish(document.uri, document.version, document.text)
 
     @server.feature(lsp.TEXT_DOCUMENT_DID_CHANGE)
     async def did_change(params: lsp.DidChangeTextDocumentParams) -> None:
+        server.track_changes(params.text_document.uri, params.content_changes)
         server.schedule_debounced(params.text_document.uri)
 
     @server.feature(lsp.TEXT_DOCUMENT_DID_CLOSE)
     async def did_close(params: lsp.DidCloseTextDocumentParams) -> None:
         server.drop(params.text_document.uri)
 
+    @server.feature(lsp.INITIALIZED)
+    async def initialized(params: lsp.InitializedParams) -> None:  # noqa: ARG001
+        server.start_telemetry_log()
+        await server.start_workspace_index()
+
+    @server.command(TELEMETRY_COMMAND)
+    async def telemetry(*options: dict) -> dict[str, Any]:
+        """Return the telemetry snapshot; an argument ``{"reset": true}`` clears it afterwards."""
+        snapshot = server.telemetry_snapshot()
+        if any(option.get("reset") for option in options):
+            server._telemetry.reset()
+        return snapshot
+
+    @server.feature(lsp.TEXT_DOCUMENT_DID_SAVE)
+    async def did_save(params: lsp.DidSaveTextDocumentParams) -> None:
+        await server.invalidate_workspace_files([(params.text_document.uri, True)])
+
+    @server.feature(lsp.WORKSPACE_DID_CHANGE_WATCHED_FILES)
+    async def did_change_watched_files(params: lsp.DidChangeWatchedFilesParams) -> None:
+        await server.invalidate_workspace_files(
+            [(change.uri, change.type != lsp.FileChangeType.Deleted) for change in params.changes]
+        )
+
     @server.feature(lsp.TEXT_DOCUMENT_SEMANTIC_TOKENS_FULL, legend)
     async def semantic_tokens_full(params: lsp.SemanticTokensParams) -> lsp.SemanticTokens:
         uri = params.text_document.uri
         document = server.workspace.get_text_document(uri)
         state = await server._ensure_analyzed(uri, document.version, document.source)
         served = state.served_tokens
-        return lsp.SemanticTokens(data=list(served.encoded) if served is not None else [])
+        if served is None:
+            return lsp.SemanticTokens(data=[])
+        # Materialize (once) on the worker thread: whole-document rendering is O(tokens) and must
+        # not block the protocol loop.
+        response = await server._run_blocking("semantic_tokens", server._semantic_tokens_blocking, state, served, None)
+        assert isinstance(response, lsp.SemanticTokens)
+        return response
+
+    @server.feature(lsp.TEXT_DOCUMENT_SEMANTIC_TOKENS_FULL_DELTA)
+    async def semantic_tokens_full_delta(
+        params: lsp.SemanticTokensDeltaParams,
+    ) -> lsp.SemanticTokens | lsp.SemanticTokensDelta:
+        uri = params.text_document.uri
+        document = server.workspace.get_text_document(uri)
+        state = await server._ensure_analyzed(uri, document.version, document.source)
+        served = state.served_tokens
+        if served is None:
+            return lsp.SemanticTokens(data=[])
+        return await server._run_blocking(
+            "semantic_tokens", server._semantic_tokens_blocking, state, served, params.previous_result_id
+        )
 
     @server.feature(lsp.TEXT_DOCUMENT_SEMANTIC_TOKENS_RANGE)
     async def semantic_tokens_range(params: lsp.SemanticTokensRangeParams) -> lsp.SemanticTokens:
@@ -919,16 +1340,9 @@ def create_server(
         served = state.served_tokens
         if served is None:
             return lsp.SemanticTokens(data=[])
-        # Segments are sorted and non-overlapping by (line, char), so their end positions are
-        # monotonic too: the overlap window {s : s.end_pos > range.start and s.start_pos < range.end}
-        # is the slice [lo:hi] found by two bisects on position tuples -- no line index needed, which
-        # is correct for the stale tail too (its positions are already client-coordinate approximations).
-        segments = served.segments
         start_pos = (params.range.start.line, params.range.start.character)
         end_pos = (params.range.end.line, params.range.end.character)
-        lo = bisect.bisect_right(segments, start_pos, key=lambda s: (s.line, s.char + s.length))
-        hi = bisect.bisect_left(segments, end_pos, key=lambda s: (s.line, s.char))
-        return lsp.SemanticTokens(data=features.delta_encode_segments(segments[lo:hi]))
+        return lsp.SemanticTokens(data=features.delta_encode_segments(served.range_segments(start_pos, end_pos)))
 
     @server.feature(lsp.TEXT_DOCUMENT_FOLDING_RANGE)
     async def folding_range(params: lsp.FoldingRangeParams) -> list[lsp.FoldingRange] | None:
@@ -936,7 +1350,7 @@ def create_server(
         if ready is None:
             return None
         good, _enc = ready
-        return features.folding_ranges(good.tree, engine.trivia_kind_names, good.line_index)
+        return features.folding_ranges(good.tree, engine.trivia_kind_names, good.line_index, index=good.node_index)
 
     @server.feature(lsp.TEXT_DOCUMENT_SELECTION_RANGE)
     async def selection_range(params: lsp.SelectionRangeParams) -> list[lsp.SelectionRange] | None:
@@ -945,12 +1359,16 @@ def create_server(
             return None
         good, enc = ready
         offsets = [good.line_index.position_to_offset(pos.line, pos.character, enc) for pos in params.positions]
-        return features.selection_ranges(good.tree, offsets, good.line_index, enc)
+        return features.selection_ranges(good.tree, offsets, good.line_index, enc, index=good.node_index)
 
     @server.feature(lsp.TEXT_DOCUMENT_FORMATTING)
     async def formatting(params: lsp.DocumentFormattingParams) -> list[lsp.TextEdit] | None:
         return await server.format_document(params.text_document.uri)
 
+    @server.feature(lsp.TEXT_DOCUMENT_RANGE_FORMATTING)
+    async def range_formatting(params: lsp.DocumentRangeFormattingParams) -> list[lsp.TextEdit] | None:
+        return await server.format_document(params.text_document.uri, params.range)
+
     @server.feature(lsp.TEXT_DOCUMENT_DOCUMENT_SYMBOL)
     async def document_symbol(
         params: lsp.DocumentSymbolParams,
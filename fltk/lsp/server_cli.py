@@ -1,7 +1,8 @@
 """``fltk-lsp``: a generic pygls language server for any FLTK grammar.
 
 Invoked as ``bazel run //:fltk_lsp -- --grammar lang.fltkg [--lsp lang.fltklsp]
-[--fmt lang.fltkfmt] [--rule START_RULE] [--width N] [--indent N]``. One process serves one
+[--fmt lang.fltkfmt] [--rule START_RULE] [--width N] [--indent N] [--workers N]
+[--resolver SPEC [--cache-dir DIR]] [--telemetry-interval SECONDS]``. One process serves one
 language (one grammar); editors spawn a separate server per language, the LSP-standard shape.
 
 Startup is fail-fast: the grammar, optional ``.fltklsp`` spec, optional ``.fltkfmt`` config, and
@@ -21,6 +22,7 @@ import typer
 from fltk import plumbing
 from fltk.lsp.engine import AnalysisEngine
 from fltk.lsp.resolver import load_resolver
+from fltk.lsp.workers import AnalysisPool, EngineSpec
 from fltk.unparse.renderer import RendererConfig
 
 app = typer.Typer(
@@ -40,19 +42,40 @@ def serve(
     width: int = 80,
     indent: int = 2,
     resolver_spec: str | None = None,
+    workers: int = 0,
+    cache_dir: Path | None = None,
+    telemetry_interval: float | None = None,
 ) -> None:
     """Validate the given spec files and run the LSP server on stdio, or fail fast.
 
     Shared by ``fltk-lsp`` and ``fltk-grammar-lsp``: the grammar, optional ``.fltklsp``/``.fltkfmt``
     specs, ``rule`` override, and resolver spec are all validated before any protocol I/O, so a
     misconfiguration surfaces as a stderr message and a non-zero exit rather than a broken server.
+    A positive ``workers`` analyzes in that many worker processes instead of the server's thread.
+    A ``cache_dir`` persists the resolver's workspace-index summaries there across restarts. A
+    ``telemetry_interval`` logs a phase-timing summary to the client every that many seconds.
     """
     try:
+        from fltk.lsp.project import AnalysisCache  # noqa: PLC0415 -- lazy, like the server import
         from fltk.lsp.server import create_server  # noqa: PLC0415 -- lazy so a missing pygls is a message, not a crash
     except ImportError:
         typer.echo("fltk-lsp requires the 'lsp' extra: pip install 'fltk[lsp]'", err=True)
         raise typer.Exit(1) from None
 
+    if workers < 0:
+        typer.echo(f"--workers must be zero or positive, got {workers}", err=True)
+        raise typer.Exit(1)
+    if workers and resolver_spec is not None:
+        # Pooled analyses carry an outline of the tree, not the CST a resolver walks.
+        typer.echo("--workers cannot be combined with --resolver", err=True)
+        raise typer.Exit(1)
+    if telemetry_interval is not None and telemetry_interval <= 0:
+        typer.echo(f"--telemetry-interval must be positive, got {telemetry_interval:g}", err=True)
+        raise typer.Exit(1)
+    if cache_dir is not None and resolver_spec is None:
+        # The cache holds what resolving each workspace file read; without a resolver there is none.
+        typer.echo("--cache-dir requires --resolver", err=True)
+        raise typer.Exit(1)
     try:
         engine = AnalysisEngine.from_paths(grammar, lsp, start_rule=rule)
         if rule is not None:
@@ -65,6 +88,13 @@ def serve(
         # ResolverError subclasses ValueError, so a broken resolver spec falls into the handler below --
         # a resolver that will not load is a startup error, never a half-working server.
         resolver_obj = load_resolver(resolver_spec) if resolver_spec is not None else None
+        analysis_cache = (
+            AnalysisCache.for_inputs(
+                cache_dir, grammar_path=grammar, lsp_path=lsp, start_rule=rule, resolver=resolver_obj
+            )
+            if cache_dir is not None and resolver_obj is not None
+            else None
+        )
     except (ValueError, OSError) as exc:
         # ValueError covers grammar/.fltklsp/.fltkfmt content errors (LspConfigError is a
         # ValueError) and resolver-spec errors (ResolverError); OSError covers missing/unreadable
@@ -73,8 +103,21 @@ def serve(
         raise typer.Exit(1) from exc
 
     renderer_config = RendererConfig(max_width=width, indent_width=indent)
-    server = create_server(engine, formatter_config, renderer_config, resolver=resolver_obj)
-    server.start_io()
+    pool = AnalysisPool(EngineSpec(grammar, lsp, rule), workers) if workers else None
+    server = create_server(
+        engine,
+        formatter_config,
+        renderer_config,
+        resolver=resolver_obj,
+        pool=pool,
+        analysis_cache=analysis_cache,
+        telemetry_interval=telemetry_interval,
+    )
+    try:
+        server.start_io()
+    finally:
+        if pool is not None:
+            pool.close()
 
 
 @app.command()
@@ -90,9 +133,32 @@ def main(
         str | None,
         typer.Option("--resolver", help="Cross-file resolver spec ('module.path:attr' or 'file.py:attr')"),
     ] = None,
+    workers: Annotated[
+        int,
+        typer.Option("--workers", help="Analyze in N worker processes (0 analyzes on the server's own thread)"),
+    ] = 0,
+    cache_dir: Annotated[
+        Path | None,
+        typer.Option("--cache-dir", help="Persist the resolver's workspace index summaries in this directory"),
+    ] = None,
+    telemetry_interval: Annotated[
+        float | None,
+        typer.Option("--telemetry-interval", help="Log a phase-timing summary to the client every N seconds"),
+    ] = None,
 ) -> None:
     """Serve GRAMMAR over LSP on stdio, applying optional .fltklsp and .fltkfmt specs."""
-    serve(grammar, lsp=lsp, fmt=fmt, rule=rule, width=width, indent=indent, resolver_spec=resolver)
+    serve(
+        grammar,
+        lsp=lsp,
+        fmt=fmt,
+        rule=rule,
+        width=width,
+        indent=indent,
+        resolver_spec=resolver,
+        workers=workers,
+        cache_dir=cache_dir,
+        telemetry_interval=telemetry_interval,
+    )
 
 
 if __name__ == "__main__":
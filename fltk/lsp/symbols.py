@@ -4,15 +4,22 @@
 :class:`Symbol` declarations, ``ref``-matched children into :class:`Reference` occurrences,
 and namespace-rule nodes into nested lexical :class:`Scope`\\ s, then resolves each reference
 to a symbol by walking outward from its innermost scope. The result is a :class:`SymbolTable`
-the classifier (ref-site paint) and the LSP feature layer both consume.
+the classifier (ref-site paint) and the LSP feature layer both consume. The walk itself is the
+shared :mod:`fltk.lsp.traversal` pass; this module owns the per-child matching and resolution
+it calls into.
 """
 
 from __future__ import annotations
 
+import bisect
 import dataclasses
+import heapq
 import typing
 
-from fltk.lsp import classify, lsp_config
+from fltk.lsp import lsp_config
+
+if typing.TYPE_CHECKING:
+    from fltk.lsp import classify
 
 
 @dataclasses.dataclass(frozen=True)
@@ -62,25 +69,47 @@ class Scope:
 
 @dataclasses.dataclass(frozen=True)
 class SymbolTable:
-    """Every symbol, reference, and scope extracted from one document."""
+    """Every symbol, reference, and scope extracted from one document.
+
+    Position queries and the symbol-to-references map are indexed once at construction, so the
+    per-request feature handlers (hover, definition, highlight, rename) cost O(log n + k) instead
+    of a scan over every symbol or reference in the document.
+    """
 
     root: Scope
     symbols: tuple[Symbol, ...]
     references: tuple[Reference, ...]
+    # Built in ``__post_init__``; excluded from equality/repr so the by-value identity stays the
+    # three fields above.
+    _symbol_spans: _SpanIndex[Symbol] = dataclasses.field(init=False, compare=False, repr=False)
+    _reference_spans: _SpanIndex[Reference] = dataclasses.field(init=False, compare=False, repr=False)
+    _references_by_symbol: dict[Symbol | None, tuple[Reference, ...]] = dataclasses.field(
+        init=False, compare=False, repr=False
+    )
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_symbol_spans", _SpanIndex([(s.name_start, s.name_end, s) for s in self.symbols]))
+        object.__setattr__(self, "_reference_spans", _SpanIndex([(r.start, r.end, r) for r in self.references]))
+        by_symbol: dict[Symbol | None, list[Reference]] = {}
+        for ref in self.references:
+            by_symbol.setdefault(ref.symbol, []).append(ref)
+        object.__setattr__(self, "_references_by_symbol", {k: tuple(v) for k, v in by_symbol.items()})
 
     def symbol_at(self, offset: int) -> Symbol | None:
         """The definition whose name span most tightly contains ``offset``, else ``None``."""
-        return _smallest_containing(
-            ((s.name_start, s.name_end, s) for s in self.symbols),
-            offset,
-        )
+        return self._symbol_spans.smallest_containing(offset)
 
     def reference_at(self, offset: int) -> Reference | None:
         """The reference whose span most tightly contains ``offset``, else ``None``."""
-        return _smallest_containing(
-            ((r.start, r.end, r) for r in self.references),
-            offset,
-        )
+        return self._reference_spans.smallest_containing(offset)
+
+    def references_to(self, symbol: Symbol) -> tuple[Reference, ...]:
+        """Every reference resolved to ``symbol``, in ``references`` order."""
+        return self._references_by_symbol.get(symbol, ())
+
+    def unresolved_references(self) -> tuple[Reference, ...]:
+        """Every reference that resolved to no symbol, in ``references`` order."""
+        return self._references_by_symbol.get(None, ())
 
     def occurrences(self, symbol: Symbol) -> list[tuple[int, int]]:
         """The symbol's name span plus every resolved reference to it, deduped and sorted.
@@ -90,12 +119,11 @@ class SymbolTable:
         """
         seen = {(symbol.name_start, symbol.name_end)}
         result = [(symbol.name_start, symbol.name_end)]
-        for ref in self.references:
-            if ref.symbol == symbol:
-                key = (ref.start, ref.end)
-                if key not in seen:
-                    seen.add(key)
-                    result.append(key)
+        for ref in self.references_to(symbol):
+            key = (ref.start, ref.end)
+            if key not in seen:
+                seen.add(key)
+                result.append(key)
         result.sort()
         return result
 
@@ -103,19 +131,50 @@ class SymbolTable:
 _T = typing.TypeVar("_T")
 
 
-def _smallest_containing(candidates: typing.Iterable[tuple[int, int, _T]], offset: int) -> _T | None:
-    """The value whose ``[start, end]`` span contains ``offset`` with the smallest width."""
-    best: tuple[int, _T] | None = None
-    for start, end, value in candidates:
-        if start <= offset <= end:
-            width = end - start
-            if best is None or width < best[0]:
-                best = (width, value)
-    return best[1] if best is not None else None
+class _SpanIndex(typing.Generic[_T]):
+    """Closed ``[start, end]`` spans, answering smallest-containing queries in O(log n).
+
+    Spans may nest or overlap (a node-anchored and a span-anchored reference can cover one range),
+    and one wide span (a document-wide scope) may contain all the others. The answer can only
+    change at a span endpoint, so construction sweeps the distinct endpoints once with a heap of
+    the spans open there, ordered by width and then by entry. It records the answer at each
+    endpoint and in the gap after it. A query is then a bisect over the endpoints.
+    """
+
+    def __init__(self, entries: typing.Sequence[tuple[int, int, _T]]) -> None:
+        by_start = sorted(range(len(entries)), key=lambda i: entries[i][0])
+        points = sorted({bound for start, end, _value in entries for bound in (start, end)})
+        self._points = points
+        # The answer at points[i], and strictly between points[i] and points[i + 1]
+        self._at: list[_T | None] = []
+        self._after: list[_T | None] = []
+        # (width, entry position, end): the narrowest open span first, the earliest entry on ties
+        open_spans: list[tuple[int, int, int]] = []
+        next_start = 0
+        for point in points:
+            while next_start < len(by_start) and entries[by_start[next_start]][0] == point:
+                position = by_start[next_start]
+                start, end, _value = entries[position]
+                heapq.heappush(open_spans, (end - start, position, end))
+                next_start += 1
+            # Spans are dropped lazily, once they reach the top of the heap
+            while open_spans and open_spans[0][2] < point:
+                heapq.heappop(open_spans)
+            self._at.append(entries[open_spans[0][1]][2] if open_spans else None)
+            while open_spans and open_spans[0][2] <= point:
+                heapq.heappop(open_spans)
+            self._after.append(entries[open_spans[0][1]][2] if open_spans else None)
+
+    def smallest_containing(self, offset: int) -> _T | None:
+        """The value whose span contains ``offset`` with the smallest width, earliest entry on ties."""
+        index = bisect.bisect_right(self._points, offset) - 1
+        if index < 0:
+            return None
+        return self._at[index] if self._points[index] == offset else self._after[index]
 
 
 @dataclasses.dataclass
-class _PendingRef:
+class PendingRef:
     """A reference collected during the walk, awaiting outward-scope resolution."""
 
     name: str
@@ -135,13 +194,83 @@ def extract(
 ) -> SymbolTable:
     """Build the :class:`SymbolTable` for ``tree`` under ``resolved_config``.
 
-    One depth-first walk opens namespace scopes, creates symbols and references from matched
-    children, then a resolution pass links each reference to a symbol.
+    Runs the shared analysis walk (:func:`fltk.lsp.traversal.walk`) with paint collection off:
+    one depth-first pass opens namespace scopes and creates symbols and references from matched
+    children, then :func:`build_table` links each reference to a symbol.
     """
-    root = Scope(start=0, end=len(text), parent=None, children=[], symbols=[])
-    pending: list[_PendingRef] = []
-    _walk(tree, 0, scope=root, tables=tables, resolved=resolved_config, text=text, pending=pending)
+    # Deferred: the traversal module imports this one for the scope and symbol types it builds.
+    from fltk.lsp import traversal  # noqa: PLC0415
+
+    table = traversal.walk(tree, tables, resolved_config, text, collect_paints=False).symbols
+    assert table is not None
+    return table
+
+
+def new_root_scope(text: str) -> Scope:
+    """The document-wide root scope an extraction walk starts in."""
+    return Scope(start=0, end=len(text), parent=None, children=[], symbols=[])
+
+
+def open_scope(node: typing.Any, scope: Scope, resolved: lsp_config.ResolvedLspConfig, rule_name: str) -> Scope:
+    """The scope ``node``'s children belong to: a new child of ``scope`` for a namespace rule, else ``scope``."""
+    if rule_name not in resolved.namespace_rules:
+        return scope
+    child_scope = Scope(start=node.span.start, end=node.span.end, parent=scope, children=[], symbols=[])
+    scope.children.append(child_scope)
+    return child_scope
 
+
+def match_child(
+    node: typing.Any,
+    surface: tuple[bool, int, int, str | None, str | None, str | None],
+    child_depth: int,
+    *,
+    def_matchers: typing.Sequence[lsp_config.DefMatcher],
+    ref_matchers: typing.Sequence[lsp_config.RefMatcher],
+    scope: Scope,
+    child_scope: Scope,
+    text: str,
+    pending: list[PendingRef],
+) -> None:
+    """Record the definition or reference one child of ``node`` produces, if any.
+
+    ``surface`` is the child's :func:`~fltk.lsp.classify.child_surface` decoding. Symbols defined
+    by ``node`` always append to ``scope`` (the current scope): a def anchored in a namespace rule
+    thereby hoists to the scope enclosing that node's own namespace scope, while a def in an
+    ordinary rule lands in the current scope -- both are ``scope``. References resolve from
+    ``child_scope``, so a ref inside a namespace node sees that namespace's members.
+    """
+    _is_span, cstart, cend, child_text, child_rule_name, label_name = surface
+    def_match = _best_match(def_matchers, label_name, child_text, child_rule_name)
+    if def_match is not None:
+        scope.symbols.append(
+            Symbol(
+                name=text[cstart:cend],
+                kind=def_match.kind,
+                name_start=cstart,
+                name_end=cend,
+                range_start=node.span.start,
+                range_end=node.span.end,
+            )
+        )
+        return
+    ref_match = _best_match(ref_matchers, label_name, child_text, child_rule_name)
+    if ref_match is not None:
+        pending.append(
+            PendingRef(
+                name=text[cstart:cend],
+                start=cstart,
+                end=cend,
+                depth=child_depth,
+                kinds=ref_match.kinds,
+                tier=ref_match.tier,
+                scope=child_scope,
+            )
+        )
+
+
+def build_table(root: Scope, pending: typing.Iterable[PendingRef]) -> SymbolTable:
+    """Finish an extraction walk: order scope symbols, resolve references, and assemble the table."""
     # Order every scope's symbols by name position so resolution scans document order.
     _sort_scope_symbols(root)
 
@@ -170,74 +299,6 @@ def extract(
     return SymbolTable(root=root, symbols=tuple(all_symbols), references=references)
 
 
-def _walk(
-    node: typing.Any,
-    depth: int,
-    *,
-    scope: Scope,
-    tables: classify.GrammarTables,
-    resolved: lsp_config.ResolvedLspConfig,
-    text: str,
-    pending: list[_PendingRef],
-) -> None:
-    """Collect symbols, references, and scopes over ``node`` and its subtree, depth-first.
-
-    Symbols defined by ``node`` always append to ``scope`` (the current scope): a def anchored
-    in a namespace rule thereby hoists to the scope enclosing that node's own namespace scope,
-    while a def in an ordinary rule lands in the current scope -- both are ``scope``. Node
-    children recurse into the inner scope when ``node`` is a namespace node, so members defined
-    deeper belong to the namespace's own scope.
-    """
-    rule = classify.rule_for_node(node, tables)
-    if rule.is_trivia_rule:
-        return  # defs/refs inside comments do not exist
-
-    if rule.name in resolved.namespace_rules:
-        child_scope = Scope(start=node.span.start, end=node.span.end, parent=scope, children=[], symbols=[])
-        scope.children.append(child_scope)
-    else:
-        child_scope = scope
-
-    def_matchers = resolved.def_matchers.get(rule.name, ())
-    ref_matchers = resolved.ref_matchers.get(rule.name, ())
-    child_depth = depth + 1
-
-    for label, child in node.children:
-        is_span, cstart, cend, child_text, child_rule_name, label_name = classify.child_surface(
-            label, child, text, tables
-        )
-
-        def_match = _best_match(def_matchers, label_name, child_text, child_rule_name)
-        if def_match is not None:
-            scope.symbols.append(
-                Symbol(
-                    name=text[cstart:cend],
-                    kind=def_match.kind,
-                    name_start=cstart,
-                    name_end=cend,
-                    range_start=node.span.start,
-                    range_end=node.span.end,
-                )
-            )
-        else:
-            ref_match = _best_match(ref_matchers, label_name, child_text, child_rule_name)
-            if ref_match is not None:
-                pending.append(
-                    _PendingRef(
-                        name=text[cstart:cend],
-                        start=cstart,
-                        end=cend,
-                        depth=child_depth,
-                        kinds=ref_match.kinds,
-                        tier=ref_match.tier,
-                        scope=child_scope,
-                    )
-                )
-
-        if not is_span:
-            _walk(child, child_depth, scope=child_scope, tables=tables, resolved=resolved, text=text, pending=pending)
-
-
 _M = typing.TypeVar("_M", lsp_config.DefMatcher, lsp_config.RefMatcher)
 
 
@@ -260,7 +321,7 @@ def _best_match(
     return best
 
 
-def _resolve(ref: _PendingRef) -> Symbol | None:
+def _resolve(ref: PendingRef) -> Symbol | None:
     """Resolve a reference by scanning its scope and each enclosing scope outward.
 
     In each scope, the first document-order symbol whose name matches and whose kind is
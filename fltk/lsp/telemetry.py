@@ -0,0 +1,146 @@
+"""Phase timings and counters for the language server and the analysis engine.
+
+A :class:`Telemetry` accumulates, per named phase, a fixed-bucket latency histogram, and per named
+event, a counter. Recording is a lock plus a few integer updates, cheap enough to leave on for every
+request. The engine times its parse, walk, and layering phases; the server times the wait and the
+run of each job on its worker thread; the project host counts its analysis-cache hits and misses.
+:meth:`Telemetry.snapshot` is the JSON-ready view the server returns from its telemetry command, and
+:meth:`Telemetry.summary` the one-line form of its periodic log message.
+"""
+
+from __future__ import annotations
+
+import bisect
+import contextlib
+import threading
+import time
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+# Upper bucket bounds in milliseconds, roughly three per decade; a last bucket holds the rest.
+BUCKET_BOUNDS_MS: tuple[float, ...] = (
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    25.0,
+    50.0,
+    100.0,
+    250.0,
+    500.0,
+    1000.0,
+    2500.0,
+    5000.0,
+)
+
+
+class _Histogram:
+    """Count, total, maximum, and per-bucket counts of one phase's durations."""
+
+    __slots__ = ("buckets", "count", "max_ms", "total_ms")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+
+    def add(self, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+
+    def quantile(self, q: float) -> float:
+        """The upper bound of the bucket holding the ``q`` quantile, capped at the maximum.
+
+        No sample exceeds the maximum, so neither does the estimate; the overflow bucket, which
+        has no upper bound, reports the maximum outright.
+        """
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min(BUCKET_BOUNDS_MS[index], self.max_ms) if index < len(BUCKET_BOUNDS_MS) else self.max_ms
+        return self.max_ms
+
+    def view(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5), 3),
+            "p90_ms": round(self.quantile(0.9), 3),
+            "p99_ms": round(self.quantile(0.99), 3),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": list(self.buckets),
+        }
+
+
+class Telemetry:
+    """Thread-safe latency histograms per phase and counters per event.
+
+    The engine's ``parse``, ``walk``, and ``layer`` phases time every analysis it runs, not only
+    those of edited buffers: the project host's analyses of workspace files for the index and
+    cross-file lookups, and the reanalysis that verifies a rename, are recorded there too. The
+    server's per-job phases (such as ``rename.verify``) tell those callers apart.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._phases: dict[str, _Histogram] = {}
+        self._counters: dict[str, int] = {}
+
+    def record(self, phase: str, seconds: float) -> None:
+        """Add one ``seconds``-long run of ``phase``."""
+        with self._lock:
+            histogram = self._phases.get(phase)
+            if histogram is None:
+                histogram = self._phases[phase] = _Histogram()
+            histogram.add(seconds * 1000.0)
+
+    @contextlib.contextmanager
+    def phase(self, phase: str) -> Iterator[None]:
+        """Time the ``with`` body as one run of ``phase``, whether or not it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - started)
+
+    def count(self, event: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[event] = self._counters.get(event, 0) + n
+
+    def snapshot(self) -> dict[str, Any]:
+        """Every phase's histogram and every counter, as plain JSON-ready data.
+
+        ``phases`` maps a phase to its ``count``, ``total_ms``, ``mean_ms``, bucket-bound
+        ``p50_ms``/``p90_ms``/``p99_ms`` (never above the maximum), exact ``max_ms``, and ``buckets`` (counts per
+        :data:`BUCKET_BOUNDS_MS` bound, plus one overflow bucket).
+        """
+        with self._lock:
+            phases = {name: histogram.view() for name, histogram in sorted(self._phases.items())}
+            counters = dict(sorted(self._counters.items()))
+        return {"bucket_bounds_ms": list(BUCKET_BOUNDS_MS), "phases": phases, "counters": counters}
+
+    def summary(self) -> str:
+        """One line: each phase's count and p50/p90/max, then the counters."""
+        snapshot = self.snapshot()
+        parts = [
+            f"{name} n={view['count']} p50={view['p50_ms']:g}ms p90={view['p90_ms']:g}ms max={view['max_ms']:g}ms"
+            for name, view in snapshot["phases"].items()
+        ]
+        parts.extend(f"{name}={value}" for name, value in snapshot["counters"].items())
+        return "; ".join(parts) if parts else "no activity"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._phases.clear()
+            self._counters.clear()
@@ -6,7 +6,10 @@ to ``analyze``); the richer ``analyze`` result carries the CST and a structured
 
 from __future__ import annotations
 
+import pytest
+
 from fltk import plumbing
+from fltk.fegen.pyrt import memo
 from fltk.lsp import engine as engine_module
 from fltk.lsp.conftest import HELLO_LSP as _LSP
 from fltk.lsp.conftest import build_hello_engine
@@ -78,6 +81,30 @@ def test_analyze_recursion_error_reports_offset_none(monkeypatch) -> None:
     assert "nesting depth" in analysis.error.message
 
 
+def test_analyze_expired_budget_reports_time_limit() -> None:
+    engine, _ = _engine(_LSP)
+    analysis = engine.analyze("hello world !", budget=memo.ParseBudget(-1.0))
+    assert analysis.tree is None
+    assert analysis.tokens is None
+    assert analysis.error is not None
+    assert analysis.error.offset is None
+    assert "time limit" in analysis.error.message
+
+
+def test_analyze_cancelled_budget_raises() -> None:
+    engine, _ = _engine(_LSP)
+    budget = memo.ParseBudget(60.0)
+    budget.cancel()
+    with pytest.raises(memo.ParseCancelledError):
+        engine.analyze("hello world !", budget=budget)
+
+
+def test_analyze_within_budget_matches_unbudgeted() -> None:
+    engine, _ = _engine(_LSP)
+    text = "hello world !\nhello again !\n"
+    assert engine.analyze(text, budget=memo.ParseBudget(60.0, check_interval=1)) == engine.analyze(text)
+
+
 def test_highlight_delegates_to_analyze_on_success() -> None:
     engine, _ = _engine(_LSP)
     text = "hello world !"
@@ -131,14 +158,15 @@ def test_analyze_failure_has_no_symbol_table() -> None:
 
 
 def test_analyze_extraction_recursion_error_reports_offset_none(monkeypatch) -> None:
-    # A RecursionError raised by symbol extraction (not just parsing) is caught by the same guard
-    # and degrades to the structured offset-None failure with tree/tokens/symbols all None.
+    # A RecursionError raised by the analysis walk (symbol extraction and paint collection, not just
+    # parsing) is caught by the same guard and degrades to the structured offset-None failure with
+    # tree/tokens/symbols all None.
     engine = _ref_engine()
 
     def _raise(*_args, **_kwargs):
         raise RecursionError
 
-    monkeypatch.setattr(engine_module.symbols, "extract", _raise)
+    monkeypatch.setattr(engine_module.traversal, "walk", _raise)
     analysis = engine.analyze("let x ;\nuse x ;\n")  # parses cleanly, so extraction is reached
     assert analysis.tree is None
     assert analysis.tokens is None
@@ -149,15 +177,15 @@ def test_analyze_extraction_recursion_error_reports_offset_none(monkeypatch) ->
 
 
 def test_analyze_classification_recursion_error_on_complete_parse_degrades(monkeypatch) -> None:
-    # The outer try guards classify.classify on the *complete* (non-prefix) path too: a RecursionError
+    # The outer try guards token layering on the *complete* (non-prefix) path too: a RecursionError
     # there still degrades to the failed outcome with the nesting-depth message rather than escaping
-    # analyze(). Sibling to the extraction test, but hitting the classify call on a fully-parsed text.
+    # analyze(). Sibling to the extraction test, but hitting the layering sweep on a fully-parsed text.
     engine = _ref_engine()
 
     def _raise(*_args, **_kwargs):
         raise RecursionError
 
-    monkeypatch.setattr(engine_module.classify, "classify", _raise)
+    monkeypatch.setattr(engine_module.classify, "layer_tokens", _raise)
     analysis = engine.analyze("let x ;\nuse x ;\n")  # parses cleanly, so classify is reached
     assert analysis.tree is None
     assert analysis.tokens is None
@@ -256,7 +284,7 @@ def test_analyze_prefix_classification_recursion_degrades_to_parse_error(monkeyp
     def _raise(*_args, **_kwargs):
         raise RecursionError
 
-    monkeypatch.setattr(engine_module.classify, "classify", _raise)
+    monkeypatch.setattr(engine_module.traversal, "walk", _raise)
     analysis = engine.analyze("let a ;\nlet ;\n")
     assert analysis.tree is None
     assert analysis.tokens is None
@@ -8,11 +8,13 @@ hand-built CST-shaped trees so spans, kinds, and nesting are fully controlled.
 from __future__ import annotations
 
 import itertools
+import random
 
 from lsprotocol.types import (
     DocumentHighlightKind,
     FoldingRangeKind,
     SelectionRange,
+    SemanticTokensEdit,
     SymbolKind,
     TextDocumentEdit,
     TextEdit,
@@ -251,6 +253,77 @@ def test_merge_result_sorted_and_non_overlapping() -> None:
         assert (a.line, a.char + a.length) <= (b.line, b.char)
 
 
+def test_shift_stale_segments_moves_tail_past_an_insertion() -> None:
+    old = "ab cd\nef"
+    new = "ab\nxx cd\nef"
+    stale = [_seg(0, 0, 2, "keyword"), _seg(0, 3, 2, "variable"), _seg(1, 0, 2, "type")]
+    shifted = features.shift_stale_segments(stale, LineIndex(old), LineIndex(new), PositionEncoding.UTF16)
+    # `ab` is in the unchanged prefix; `cd` and `ef` follow the inserted "\nxx" onto the next line.
+    assert shifted == [_seg(0, 0, 2, "keyword"), _seg(1, 3, 2, "variable"), _seg(2, 0, 2, "type")]
+
+
+def test_shift_stale_segments_drops_changed_region_segments_overtaken_by_the_tail() -> None:
+    old = "abcdef gh"
+    new = "a gh"
+    stale = [_seg(0, 0, 6, "keyword"), _seg(0, 7, 2, "variable")]
+    shifted = features.shift_stale_segments(stale, LineIndex(old), LineIndex(new), PositionEncoding.UTF16)
+    # `gh` moves back to column 2; the old `abcdef` would now overlap it, so it is dropped.
+    assert shifted == [_seg(0, 2, 2, "variable")]
+
+
+def test_shift_stale_segments_counts_encoding_units() -> None:
+    old = "x yy"
+    new = "\U0001f600 yy"
+    stale = [_seg(0, 2, 2, "variable")]
+    index_old, index_new = LineIndex(old), LineIndex(new)
+    assert features.shift_stale_segments(stale, index_old, index_new, PositionEncoding.UTF16) == [
+        _seg(0, 3, 2, "variable")
+    ]
+    assert features.shift_stale_segments(stale, index_old, index_new, PositionEncoding.UTF32) == [
+        _seg(0, 2, 2, "variable")
+    ]
+
+
+# --- Semantic-token deltas ----------------------------------------------------------------------
+
+
+def _apply_edits(data: list[int], edits: list[SemanticTokensEdit]) -> list[int]:
+    out = list(data)
+    for edit in sorted(edits, key=lambda e: e.start, reverse=True):
+        out[edit.start : edit.start + edit.delete_count] = edit.data or []
+    return out
+
+
+def test_semantic_tokens_edits_equal_arrays_need_none() -> None:
+    data = [0, 0, 3, 1, 0, 1, 2, 4, 0, 0]
+    assert features.semantic_tokens_edits(data, list(data)) == []
+
+
+def test_semantic_tokens_edits_replace_only_changed_tokens() -> None:
+    previous = [0, 0, 3, 1, 0, 0, 4, 5, 6, 0, 1, 0, 2, 2, 0]
+    current = [0, 0, 3, 1, 0, 0, 4, 6, 6, 0, 1, 0, 2, 2, 0]
+    edits = features.semantic_tokens_edits(previous, current)
+    assert [(e.start, e.delete_count, e.data) for e in edits] == [(5, 5, [0, 4, 6, 6, 0])]
+
+
+def test_semantic_tokens_edits_align_to_whole_tokens() -> None:
+    # The arrays share a partial token at both ends (`0, 0` before and `2, 0` after the change);
+    # the edit still starts and ends on token boundaries.
+    previous = [0, 0, 3, 1, 0, 0, 0, 1, 2, 0]
+    current = [0, 0, 3, 1, 0, 0, 0, 7, 2, 0, 1, 0, 1, 2, 0]
+    edits = features.semantic_tokens_edits(previous, current)
+    assert all(e.start % 5 == 0 and e.delete_count % 5 == 0 for e in edits)
+    assert _apply_edits(previous, edits) == current
+
+
+def test_semantic_tokens_edits_round_trip_random_arrays() -> None:
+    rng = random.Random(7)  # noqa: S311 -- reproducible fixture data, not security
+    for _ in range(200):
+        previous = [rng.randrange(3) for _ in range(5 * rng.randrange(6))]
+        current = [rng.randrange(3) for _ in range(5 * rng.randrange(6))]
+        assert _apply_edits(previous, features.semantic_tokens_edits(previous, current)) == current
+
+
 # --- Folding ------------------------------------------------------------------------------------
 
 _FOLD_TEXT = "line0\nline1\nline2\nline3\n"  # four lines, starts at 0, 6, 12, 18
@@ -564,3 +637,50 @@ def test_rename_edits_empty_occurrences_plain_changes() -> None:
     assert edit.document_changes is None
     assert edit.changes is not None
     assert edit.changes[URI] == []
+
+
+# --- Formatting edits ---------------------------------------------------------------------------
+
+
+def _apply_text_edits(text: str, edits: list[TextEdit]) -> str:
+    index = LineIndex(text)
+    for edit in reversed(edits):
+        start = index.position_to_offset(edit.range.start.line, edit.range.start.character, UTF32)
+        end = index.position_to_offset(edit.range.end.line, edit.range.end.character, UTF32)
+        text = text[:start] + edit.new_text + text[end:]
+    return text
+
+
+def test_formatting_edits_touch_only_changed_characters() -> None:
+    original = "a  = 1\nb = 2\nc=3\n"
+    formatted = "a = 1\nb = 2\nc = 3\n"
+    edits = features.formatting_edits(original, formatted, LineIndex(original), UTF32)
+    spans = [(e.range.start.line, e.range.start.character, e.range.end.line, e.range.end.character) for e in edits]
+    assert spans == [(0, 2, 0, 3), (2, 1, 2, 2)]
+    assert [e.new_text for e in edits] == ["", " = "]
+    assert _apply_text_edits(original, edits) == formatted
+
+
+def test_formatting_edits_at_an_offset_address_the_whole_document() -> None:
+    document = "keep\nx  y\nkeep\n"
+    start = document.index("x")
+    end = document.index("\nkeep", start)
+    edits = features.formatting_edits(document[start:end], "x y", LineIndex(document), UTF32, offset=start)
+    assert _apply_text_edits(document, edits) == "keep\nx y\nkeep\n"
+
+
+def test_formatting_edits_keep_crlf_pairs_whole() -> None:
+    original = "greet alice.\r\ngreet bob.\r\n"
+    formatted = "greet alice.\ngreet bob.\n"
+    edits = features.formatting_edits(original, formatted, LineIndex(original), UTF32)
+    assert _apply_text_edits(original, edits) == formatted
+
+
+def test_formatting_edits_round_trip_random_texts() -> None:
+    rng = random.Random(11)  # noqa: S311 -- reproducible fixture data, not security
+    alphabet = ["a", "b", " ", "\n", "\r", "\r\n"]
+    for _ in range(500):
+        original = "".join(rng.choice(alphabet) for _ in range(rng.randrange(20)))
+        formatted = "".join(rng.choice(alphabet) for _ in range(rng.randrange(20)))
+        edits = features.formatting_edits(original, formatted, LineIndex(original), UTF32)
+        assert _apply_text_edits(original, edits) == formatted
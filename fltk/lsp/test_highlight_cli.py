@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import json
 from pathlib import Path
 
 from typer.testing import CliRunner
@@ -140,3 +141,71 @@ def test_theme_covers_the_legend() -> None:
     # The theme must map exactly the legend members, so a legend change that forgets a theme
     # entry (silently rendering that type uncolored) is caught here rather than by a squinting user.
     assert set(_THEME) == TOKEN_LEGEND
+
+
+def _batch_tree(tmp_path: Path) -> tuple[Path, Path]:
+    grammar = _write(tmp_path, "lang.fltkg", _GRAMMAR)
+    src = tmp_path / "src"
+    (src / "nested").mkdir(parents=True)
+    (src / ".hidden").mkdir()
+    _write(src, "a.hello", "hello world !")
+    _write(src, "nested/b.hello", "hello there !\nhello 4 !\n")
+    _write(src, "skipped.txt", "hello world !")
+    _write(src, ".hidden/c.hello", "hello world !")
+    return grammar, src
+
+
+def _jsonl(stdout: str) -> list[dict]:
+    return [json.loads(line) for line in stdout.splitlines()]
+
+
+def test_batch_directory_writes_json_lines_and_reports_failures(tmp_path: Path) -> None:
+    grammar, src = _batch_tree(tmp_path)
+    args = [str(src), "--grammar", str(grammar), "--rule", "top", "--suffix", ".hello", "--format", "jsonl"]
+
+    result = CliRunner().invoke(app, args)
+
+    # The broken second file fails the run but does not stop it; dot-directories and other
+    # suffixes are skipped.
+    assert result.exit_code == 1
+    records = _jsonl(result.stdout)
+    assert [r["path"] for r in records] == [str(src / "a.hello"), str(src / "nested" / "b.hello")]
+    assert records[0]["error"] is None
+    assert records[0]["tokens"] == [[0, 5, "keyword", []], [6, 11, "variable", []], [12, 13, "operator", []]]
+    assert records[1]["error"] is not None
+    assert records[1]["tokens"][0] == [0, 5, "keyword", []]
+    assert result.stderr.startswith(f"{src / 'nested' / 'b.hello'}: ")
+
+
+def test_batch_ansi_headers_each_file(tmp_path: Path) -> None:
+    grammar = _write(tmp_path, "lang.fltkg", _GRAMMAR)
+    first = _write(tmp_path, "a.hello", "hello a !")
+    second = _write(tmp_path, "b.hello", "hello b !\n")
+
+    result = CliRunner().invoke(app, [str(first), str(second), "--grammar", str(grammar), "--rule", "top"])
+
+    assert result.exit_code == 0
+    assert result.stdout.startswith(f"==> {first} <==\n" + _colored("keyword", "hello"))
+    assert f"{_colored('operator', '!')}\n==> {second} <==\n" in result.stdout
+
+
+def test_batch_workers_match_in_process_and_report_throughput(tmp_path: Path) -> None:
+    grammar, src = _batch_tree(tmp_path)
+    args = [str(src), "--grammar", str(grammar), "--rule", "top", "--suffix", ".hello", "--format", "jsonl"]
+
+    local = CliRunner().invoke(app, args)
+    pooled = CliRunner().invoke(app, [*args, "--jobs", "2", "--stats"])
+
+    assert pooled.stdout == local.stdout
+    assert "bytes/s" in pooled.stderr
+    assert pooled.stderr.splitlines()[-1].startswith("total: 2 files, ")
+
+
+def test_negative_jobs_exits_1(tmp_path: Path) -> None:
+    grammar = _write(tmp_path, "lang.fltkg", _GRAMMAR)
+    src = _write(tmp_path, "in.txt", "hello world !")
+
+    result = CliRunner().invoke(app, [str(src), "--grammar", str(grammar), "--jobs", "-1"])
+
+    assert result.exit_code == 1
+    assert "--jobs" in result.stderr
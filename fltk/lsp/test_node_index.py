@@ -0,0 +1,139 @@
+"""Tests for ``NodeIndex`` -- kind lookup, parent links, and offset queries over a CST."""
+
+from __future__ import annotations
+
+import sys
+
+import pytest
+
+from fltk.fegen.pyrt.span_protocol import SpanKind
+from fltk.lsp.conftest import build_hello_engine
+from fltk.lsp.node_index import NodeIndex
+
+# --- Fake CST shapes ------------------------------------------------------------------------------
+# The index touches only `.kind`, `.span`/`.start`/`.end`, and `.children`.
+
+
+class _Span:
+    kind = SpanKind.SPAN
+
+    def __init__(self, start: int, end: int) -> None:
+        self.start = start
+        self.end = end
+
+
+class _Bounds:
+    def __init__(self, start: int, end: int) -> None:
+        self.start = start
+        self.end = end
+
+
+class _Kind:
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+
+class _Node:
+    def __init__(self, name: str, start: int, end: int, children: list | None = None) -> None:
+        self.kind = _Kind(name)
+        self.span = _Bounds(start, end)
+        self.children = children if children is not None else []
+
+    def __repr__(self) -> str:
+        return f"_Node({self.kind.name}, {self.span.start}, {self.span.end})"
+
+
+def _two_greetings() -> tuple[_Node, _Node, _Node]:
+    # "hello a !  hello b !": two greetings separated by a gap the root covers.
+    first = _Node("GREETING", 0, 9, [(None, _Span(0, 5)), (None, _Span(6, 7)), (None, _Span(8, 9))])
+    second = _Node("GREETING", 11, 20, [(None, _Span(11, 16)), (None, _Span(17, 18)), (None, _Span(19, 20))])
+    root = _Node("TOP", 0, 20, [(None, first), (None, second)])
+    return root, first, second
+
+
+def test_nodes_are_pre_order() -> None:
+    root, first, second = _two_greetings()
+    index = NodeIndex(root)
+    assert list(index.nodes()) == [root, first, second]
+    assert index.root is root
+
+
+def test_nodes_of_kind_in_document_order() -> None:
+    root, first, second = _two_greetings()
+    index = NodeIndex(root)
+    assert index.nodes_of_kind("GREETING") == [first, second]
+    assert index.nodes_of_kind("MISSING") == []
+    assert index.nodes_of_kind("GREETING", "TOP") == [root, first, second]
+
+
+def test_parent_and_ancestors() -> None:
+    leaf = _Node("LEAF", 2, 3)
+    mid = _Node("MID", 1, 4, [(None, leaf)])
+    root = _Node("TOP", 0, 5, [(None, mid)])
+    index = NodeIndex(root)
+    assert index.parent(root) is None
+    assert index.parent(leaf) is mid
+    assert list(index.ancestors(leaf)) == [mid, root]
+    assert list(index.ancestors(root)) == []
+
+
+def test_foreign_node_is_rejected() -> None:
+    root, _first, _second = _two_greetings()
+    index = NodeIndex(root)
+    with pytest.raises(ValueError, match="not part of the indexed tree"):
+        index.parent(_Node("TOP", 0, 1))
+
+
+def test_node_at_innermost_and_gaps() -> None:
+    root, first, second = _two_greetings()
+    index = NodeIndex(root)
+    assert index.node_at(6) is first
+    assert index.node_at(12) is second
+    # The gap between greetings belongs only to the root.
+    assert index.node_at(10) is root
+    # End-of-document is outside every half-open span.
+    assert index.node_at(20) is None
+    assert index.node_at(-1) is None
+
+
+def test_node_at_after_a_sibling_subtree_walks_up() -> None:
+    # The last node starting at or before offset 8 is LEAF [2,3), which ends before it: the answer
+    # is LEAF's nearest containing ancestor, not LEAF.
+    leaf = _Node("LEAF", 2, 3)
+    mid = _Node("MID", 1, 9, [(None, leaf)])
+    root = _Node("TOP", 0, 10, [(None, mid)])
+    index = NodeIndex(root)
+    assert index.node_at(8) is mid
+
+
+def test_span_child_at() -> None:
+    root, first, _second = _two_greetings()
+    span = NodeIndex.span_child_at(first, 6)
+    assert span is not None
+    assert (span.start, span.end) == (6, 7)
+    assert NodeIndex.span_child_at(first, 5) is None
+    assert NodeIndex.span_child_at(root, 6) is None  # spans belong to their own parent only
+
+
+def test_deep_tree_does_not_recurse() -> None:
+    depth = sys.getrecursionlimit() * 2
+    node = _Node("LEAF", 0, 1)
+    for _ in range(depth):
+        node = _Node("WRAP", 0, 1, [(None, node)])
+    index = NodeIndex(node)
+    assert len(index.nodes()) == depth + 1
+    assert index.node_at(0).kind.name == "LEAF"
+
+
+def test_index_over_real_engine_tree() -> None:
+    engine, _grammar = build_hello_engine()
+    text = "hello a !\nhello bb !\n"
+    analysis = engine.analyze(text)
+    assert analysis.tree is not None
+    index = NodeIndex(analysis.tree)
+    greetings = index.nodes_of_kind("GREETING")
+    assert [(g.span.start, g.span.end) for g in greetings] == [(0, 10), (10, 21)]
+    inner = index.node_at(text.index("bb"))
+    assert inner is not None
+    assert inner.kind.name == "WORD"
+    assert [a.kind.name for a in index.ancestors(inner)] == ["GREETING", "TOP"]
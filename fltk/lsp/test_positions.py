@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import random
+
 import pytest
 
 from fltk.lsp.positions import LineIndex, PositionEncoding
@@ -82,6 +84,45 @@ def test_position_to_offset_clamps_inside_surrogate_pair() -> None:
     assert idx.position_to_offset(0, 2, UTF16) == 1
 
 
+def _naive_utf16_position_to_offset(text: str, start: int, end: int, character: int) -> int:
+    units = 0
+    offset = start
+    while offset < end:
+        width = 1 + (ord(text[offset]) > 0xFFFF)
+        if units + width > character:
+            break
+        units += width
+        offset += 1
+    return offset
+
+
+def test_utf16_columns_match_a_per_character_count() -> None:
+    rng = random.Random(1)  # noqa: S311 -- reproducible test text, not security
+    alphabet = ["a", "\u00e9", "\uffff", ASTRAL, "\U0001f600", "\n", "\r\n"]
+    for _ in range(200):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        idx = LineIndex(text)
+        for offset in range(len(text) + 1):
+            line, char = idx.offset_to_position(offset, UTF16)
+            start = idx.line_bounds(line)[0]
+            assert char == len(text[start:offset].encode("utf-16-le")) // 2
+        for line in range(idx.line_of(len(text)) + 1):
+            start, end = idx.line_bounds(line)
+            for character in range(2 * (end - start) + 2):
+                expected = _naive_utf16_position_to_offset(text, start, end, character)
+                assert idx.position_to_offset(line, character, UTF16) == expected
+
+
+def test_edited_index_tracks_astral_characters() -> None:
+    idx = LineIndex(f"a{ASTRAL}b\nc")
+    assert idx.offset_to_position(2, UTF16) == (0, 3)
+    edited = idx.edited(1, 2, "")
+    assert edited.offset_to_position(1, UTF16) == (0, 1)
+    moved = edited.edited(3, 3, ASTRAL)
+    assert moved.offset_to_position(4, UTF16) == (1, 2)
+    assert idx.offset_to_position(2, UTF16) == (0, 3)
+
+
 @pytest.mark.parametrize("enc", [UTF16, UTF32])
 def test_offset_position_roundtrip_lf_only(enc: PositionEncoding) -> None:
     text = "hello\nworld\nfoo"
@@ -111,3 +152,51 @@ def test_clamp_negative_inputs() -> None:
     assert idx.offset_to_position(-1, UTF32) == (0, 0)
     assert idx.position_to_offset(-1, 0, UTF32) == 0
     assert idx.position_to_offset(0, -5, UTF32) == 0
+
+
+@pytest.mark.parametrize(
+    ("text", "start", "end", "replacement"),
+    [
+        ("a\nb\nc", 2, 3, "x\ny"),  # split a line
+        ("a\nb\nc", 1, 4, ""),  # join three lines into one
+        ("a\rb", 2, 2, "\n"),  # a \n inserted after a lone \r completes a CRLF pair
+        ("a\r\nb", 2, 2, "x"),  # text inserted inside a CRLF pair splits it into two breaks
+        ("a\r", 2, 2, "\nb"),  # an edit at end of text joins the trailing \r
+        ("", 0, 0, "a\r\n\rb\n"),
+    ],
+)
+def test_edited_matches_rebuild_at_crlf_boundaries(text: str, start: int, end: int, replacement: str) -> None:
+    edited = LineIndex(text).edited(start, end, replacement)
+    new_text = text[:start] + replacement + text[end:]
+    rebuilt = LineIndex(new_text)
+    assert edited.text == new_text
+    assert [edited.line_bounds(line) for line in range(new_text.count("\n") + new_text.count("\r") + 1)] == [
+        rebuilt.line_bounds(line) for line in range(new_text.count("\n") + new_text.count("\r") + 1)
+    ]
+    assert [edited.line_of(offset) for offset in range(len(new_text) + 1)] == [
+        rebuilt.line_of(offset) for offset in range(len(new_text) + 1)
+    ]
+
+
+def test_edited_random_edits_match_rebuild() -> None:
+    rng = random.Random(0)  # noqa: S311 -- reproducible test edits, not security
+    alphabet = "ab\r\n"
+    index = LineIndex("")
+    for _ in range(2000):
+        text = index.text
+        start = rng.randint(0, len(text))
+        end = rng.randint(start, min(len(text), start + 4))
+        replacement = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 4)))
+        index = index.edited(start, end, replacement)
+        rebuilt = LineIndex(index.text)
+        assert [index.line_of(offset) for offset in range(len(index.text) + 1)] == [
+            rebuilt.line_of(offset) for offset in range(len(index.text) + 1)
+        ]
+        assert index.end_position(UTF16) == rebuilt.end_position(UTF16)
+
+
+def test_edited_leaves_the_original_index_unchanged() -> None:
+    original = LineIndex("a\nb")
+    original.edited(1, 1, "\n\n")
+    assert original.text == "a\nb"
+    assert original.line_of(2) == 1
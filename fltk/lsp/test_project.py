@@ -9,6 +9,7 @@ selection-range-only identity rule) and ``ref_targets`` (the hook the gear demo
 from __future__ import annotations
 
 import dataclasses
+import os
 import pathlib
 from typing import TYPE_CHECKING
 
@@ -16,10 +17,20 @@ import pytest
 from pygls import uris
 
 from fltk import plumbing
+from fltk.lsp import project
 from fltk.lsp.conftest import nth_offset
 from fltk.lsp.engine import AnalysisEngine
 from fltk.lsp.lsp_config import load_lsp_config
-from fltk.lsp.project import Hazard, ProjectHost, ProjectNavigator, canonical_uri
+from fltk.lsp.project import (
+    AnalysisCache,
+    Hazard,
+    ProjectHost,
+    ProjectNavigator,
+    WorkspaceFiles,
+    WorkspaceIndex,
+    canonical_uri,
+    content_digest,
+)
 from fltk.lsp.resolver import CrossFileResolution, ExternalTarget
 
 if TYPE_CHECKING:
@@ -398,3 +409,263 @@ def test_rename_hazard_flags_cross_file_definition(tmp_path: pathlib.Path) -> No
     offset = nth_offset(fx.lib_text, "Gear", 0)
     # `Gear` is defined here but imported/referenced in main.fix -- a same-file rename is unsafe.
     assert fx.navigator.rename_hazard(lib_doc, gear, offset) is Hazard.CROSS_FILE
+
+
+# --- WorkspaceIndex ----------------------------------------------------------------------------
+
+
+class _FileImportResolver:
+    """Resolves ``use Name;`` to the ``def Name;`` in ``<root>/Name.fix``, reading only that file.
+
+    Unlike ``_NameResolver`` it never lists the workspace, so the index can prune by what each
+    file's resolution actually reads.
+    """
+
+    file_suffixes: Sequence[str] = (".fix",)
+
+    def resolve(self, doc: ResolvedDocument, host: ResolverHost) -> CrossFileResolution:
+        root = host.root_path()
+        assert root is not None
+        symbol_targets = {}
+        for symbol in doc.symbols.symbols:
+            if symbol.kind != ("import",):
+                continue
+            target_uri = host.path_to_uri(root / f"{symbol.name}.fix")
+            target_doc = host.document(target_uri)
+            if target_doc is None:
+                continue
+            for target in target_doc.symbols.symbols:
+                if target.kind == ("symbol",) and target.name == symbol.name:
+                    symbol_targets[symbol] = ExternalTarget(
+                        uri=target_uri,
+                        name_start=target.name_start,
+                        name_end=target.name_end,
+                        range_start=target.range_start,
+                        range_end=target.range_end,
+                    )
+                    break
+        return CrossFileResolution(symbol_targets=symbol_targets)
+
+
+def _import_workspace(tmp_path: pathlib.Path) -> tuple[str, str, str, str]:
+    gear = _write(tmp_path, "Gear.fix", "def Gear;\n")
+    user = _write(tmp_path, "user.fix", "use Gear;\nref Gear;\n")
+    chain = _write(tmp_path, "Hub.fix", "def Hub;\nuse Gear;\n")
+    other = _write(tmp_path, "other.fix", "def Other;\nuse Hub;\n")
+    return gear, user, chain, other
+
+
+def test_index_candidates_are_files_reaching_the_target(tmp_path: pathlib.Path) -> None:
+    gear, user, hub, other = _import_workspace(tmp_path)
+    index = WorkspaceIndex(_engine(), _FileImportResolver(), root_path=tmp_path)
+    assert index.candidates(gear, ()) is None  # not discovered yet
+    index.discover()
+    assert index.pending == 4
+    assert index.index_pending(limit=3)
+    assert not index.index_pending()
+    # `other` reads Hub.fix, which reads Gear.fix: reached through the chain.
+    assert index.candidates(gear, ()) == sorted([gear, user, hub, other])
+    assert index.candidates(hub, ()) == sorted([hub, other])
+    assert index.candidates(user, ()) == [user]
+    # Open documents (and what reaches them) are always candidates.
+    assert index.candidates(user, [other]) == sorted([user, other])
+
+
+def test_index_keeps_a_bounded_number_of_analyses(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(project, "_MAX_SHARED_ANALYSES", 2)
+    gear, user, hub, other = _import_workspace(tmp_path)
+    index = WorkspaceIndex(_engine(), _FileImportResolver(), root_path=tmp_path)
+    index.discover()
+    index.index_pending()
+    # Every file was analyzed, but only the most recently used analyses are kept; the
+    # dependency sets answering candidates survive regardless.
+    assert len(index.cache) == 2
+    assert index.candidates(gear, ()) == sorted([gear, user, hub, other])
+    host = ProjectHost(_engine(), _FileImportResolver(), root_path=tmp_path, index=index)
+    assert host.document(gear) is not None
+    assert gear in index.cache
+    assert len(index.cache) == 2
+
+
+def test_index_reindexes_changed_file_and_its_readers(tmp_path: pathlib.Path) -> None:
+    gear, user, hub, other = _import_workspace(tmp_path)
+    index = WorkspaceIndex(_engine(), _FileImportResolver(), root_path=tmp_path)
+    index.discover()
+    index.index_pending()
+    assert user not in index.candidates(hub, ())
+    (tmp_path / "user.fix").write_text("use Hub;\n", encoding="utf-8")
+    index.invalidate(user)
+    assert index.pending == 1
+    assert index.candidates(hub, ()) == sorted([hub, user, other])
+    # It no longer reads Gear.fix itself, but still reaches it through Hub.fix.
+    assert index.candidates(gear, ()) == sorted([gear, hub, user, other])
+
+    # Deleting the target re-queues its readers; a recreated file is picked up again.
+    (tmp_path / "Gear.fix").unlink()
+    index.invalidate(gear, exists=False)
+    assert index.pending == 1  # Hub.fix read it
+    assert index.candidates(gear, ()) == sorted([hub, user, other])
+    created = _write(tmp_path, "late.fix", "use Gear;\n")
+    index.invalidate(created)
+    assert created in index.candidates(gear, ())
+    index.invalidate(_uri(tmp_path / "notes.txt"))
+    assert index.pending == 0
+
+
+def test_index_treats_workspace_listing_resolvers_as_always_candidates(tmp_path: pathlib.Path) -> None:
+    fx = _fixture(tmp_path)
+    index = WorkspaceIndex(_engine(), _NameResolver(), root_path=tmp_path)
+    index.discover()
+    # `_NameResolver` lists the workspace, so every file may depend on any other.
+    assert index.candidates(fx.extra_uri, ()) == sorted([fx.lib_uri, fx.extra_uri, fx.main_uri])
+
+
+def test_references_through_index_match_full_scan(tmp_path: pathlib.Path) -> None:
+    gear, _user, _hub, _other = _import_workspace(tmp_path)
+    engine = _engine()
+    resolver = _FileImportResolver()
+    index = WorkspaceIndex(engine, resolver, root_path=tmp_path)
+    index.discover()
+    indexed_host = ProjectHost(engine, resolver, root_path=tmp_path, index=index)
+    plain_host = ProjectHost(engine, resolver, root_path=tmp_path)
+    doc = plain_host.document(gear)
+    assert doc is not None
+    offset = nth_offset(doc.text, "Gear")
+    expected = ProjectNavigator(plain_host, resolver).references(doc, offset, include_declaration=True)
+    got = ProjectNavigator(indexed_host, resolver).references(doc, offset, include_declaration=True)
+    assert got == expected
+    assert len({uri for uri, _start, _end in got or ()}) == 3
+
+
+class _CountingResolver(_FileImportResolver):
+    def __init__(self) -> None:
+        self.resolved: list[str] = []
+
+    def resolve(self, doc: ResolvedDocument, host: ResolverHost) -> CrossFileResolution:
+        self.resolved.append(doc.uri)
+        return super().resolve(doc, host)
+
+
+def _cache(directory: pathlib.Path, resolver: Resolver) -> AnalysisCache:
+    grammar = directory / "grammar.fltkg"
+    grammar.write_text(FIX_GRAMMAR, encoding="utf-8")
+    return AnalysisCache.for_inputs(
+        directory / "cache", grammar_path=grammar, lsp_path=None, start_rule=None, resolver=resolver
+    )
+
+
+def _built_index(root: pathlib.Path, resolver: Resolver, cache: AnalysisCache) -> WorkspaceIndex:
+    index = WorkspaceIndex(_engine(), resolver, root_path=root, disk_cache=cache)
+    index.discover()
+    index.index_pending()
+    return index
+
+
+def test_index_reuses_persisted_summaries_across_instances(tmp_path: pathlib.Path) -> None:
+    root = tmp_path / "ws"
+    root.mkdir()
+    gear, user, hub, other = _import_workspace(root)
+    cold_resolver = _CountingResolver()
+    cold = _built_index(root, cold_resolver, _cache(tmp_path, cold_resolver))
+    assert len(cold_resolver.resolved) == 4
+
+    warm_resolver = _CountingResolver()
+    warm = _built_index(root, warm_resolver, _cache(tmp_path, warm_resolver))
+    assert warm_resolver.resolved == []
+    for target in (gear, user, hub, other):
+        assert warm.candidates(target, ()) == cold.candidates(target, ())
+
+
+def test_persisted_summary_is_rejected_when_a_dependency_changed(tmp_path: pathlib.Path) -> None:
+    root = tmp_path / "ws"
+    root.mkdir()
+    gear, user, hub, _other = _import_workspace(root)
+    resolver = _CountingResolver()
+    _built_index(root, resolver, _cache(tmp_path, resolver))
+    # Gear.fix changed while no server ran: everything that read it re-resolves, nothing else does.
+    _write(root, "Gear.fix", "def Gear;\ndef Cog;\n")
+    resolver = _CountingResolver()
+    index = _built_index(root, resolver, _cache(tmp_path, resolver))
+    assert sorted(resolver.resolved) == sorted([gear, user, hub])
+    assert user in index.candidates(gear, ())
+
+
+def test_analysis_cache_treats_corrupt_entries_as_misses(tmp_path: pathlib.Path) -> None:
+    cache = AnalysisCache(tmp_path, "fingerprint")
+    key = cache.key("file:///a.fix", "def A;\n")
+    assert cache.load(key) is None
+    cache.store(key, {"file:///b.fix": None})
+    assert cache.load(key) == {"file:///b.fix": None}
+    assert (
+        AnalysisCache(tmp_path, "other").load(AnalysisCache(tmp_path, "other").key("file:///a.fix", "def A;\n")) is None
+    )
+    entry = next(tmp_path.rglob("*.json"))
+    entry.write_text("{not json", encoding="utf-8")
+    assert cache.load(key) is None
+
+
+def test_analysis_cache_prunes_least_recently_used_entries(tmp_path: pathlib.Path) -> None:
+    cache = AnalysisCache(tmp_path, "fingerprint", max_entries=2)
+    keys = [cache.key(f"file:///{name}.fix", "def A;\n") for name in "abc"]
+    for age, key in enumerate(keys):
+        cache.store(key, {})
+        entry = next(tmp_path.rglob(f"{key[2:]}.json"))
+        os.utime(entry, ns=(age * 10**9, age * 10**9))
+    # Reading the oldest entry makes it the most recently used.
+    assert cache.load(keys[0]) == {}
+    cache.prune()
+    assert [cache.load(key) for key in keys] == [{}, None, {}]
+
+
+def test_index_digests_dependencies_from_disk(tmp_path: pathlib.Path) -> None:
+    uri = _write(tmp_path, "a.fix", "def A;\n")
+    index = WorkspaceIndex(_engine(), _NameResolver(), root_path=tmp_path)
+    assert index._digest(uri) == content_digest("def A;\n")
+
+
+# --- WorkspaceFiles ----------------------------------------------------------------------------
+
+
+def test_workspace_files_honor_gitignore_and_default_ignores(tmp_path: pathlib.Path) -> None:
+    kept = _write(tmp_path, "src/a.fix", "def A;\n")
+    nested = _write(tmp_path, "src/deep/b.fix", "def B;\n")
+    _write(tmp_path, "out/gen.fix", "def Gen;\n")
+    _write(tmp_path, "src/scratch.fix", "def Scratch;\n")
+    _write(tmp_path, "src/deep/local.fix", "def Local;\n")
+    _write(tmp_path, "node_modules/pkg/c.fix", "def C;\n")
+    (tmp_path / ".gitignore").write_text("# build output\n/out/\nscratch.fix\n", encoding="utf-8")
+    (tmp_path / "src" / "deep" / ".gitignore").write_text("local.fix\n", encoding="utf-8")
+    registry = WorkspaceFiles(tmp_path, (".fix",))
+    assert registry.files() == tuple(sorted([kept, nested]))
+    # The same rules decide what an incremental update tracks.
+    assert not registry.update(_uri(tmp_path / "out" / "new.fix"), exists=True)
+    assert not registry.update(_uri(tmp_path / "src" / "deep" / "local.fix"), exists=True)
+    assert not registry.update(_uri(tmp_path / "node_modules" / "d.fix"), exists=True)
+    assert not registry.update(_uri(tmp_path / "src" / "notes.txt"), exists=True)
+    assert registry.files() == tuple(sorted([kept, nested]))
+
+
+def test_workspace_files_update_without_rescanning(tmp_path: pathlib.Path) -> None:
+    a = _write(tmp_path, "a.fix", "def A;\n")
+    registry = WorkspaceFiles(tmp_path, (".fix",))
+    assert registry.files() == (a,)
+    # Files appearing on disk are picked up only through `update` (or a new scan).
+    b = _write(tmp_path, "sub/b.fix", "def B;\n")
+    assert registry.files() == (a,)
+    assert registry.update(b, exists=True)
+    assert registry.files() == tuple(sorted([a, b]))
+    assert registry.update(a, exists=False)
+    assert registry.files() == (b,)
+
+
+def test_index_keeps_its_registry_current(tmp_path: pathlib.Path) -> None:
+    gear, user, hub, other = _import_workspace(tmp_path)
+    index = WorkspaceIndex(_engine(), _FileImportResolver(), root_path=tmp_path)
+    index.discover()
+    host = ProjectHost(_engine(), _FileImportResolver(), root_path=tmp_path, index=index)
+    assert host.workspace_files() == tuple(sorted([gear, user, hub, other]))
+    created = _write(tmp_path, "late.fix", "use Gear;\n")
+    index.invalidate(created)
+    (tmp_path / "user.fix").unlink()
+    index.invalidate(user, exists=False)
+    assert host.workspace_files() == tuple(sorted([gear, hub, other, created]))
@@ -12,6 +12,8 @@ from __future__ import annotations
 import asyncio
 import contextlib
 import sys
+import threading
+import time
 import types
 from pathlib import Path
 
@@ -22,9 +24,11 @@ from pygls.exceptions import JsonRpcException
 from pytest_lsp import ClientServerConfig, LanguageClient
 
 from fltk import plumbing
+from fltk.fegen.pyrt.memo import ParseBudget
 from fltk.lsp.engine import AnalysisEngine
 from fltk.lsp.positions import LineIndex, PositionEncoding
 from fltk.lsp.server import _DocState, _GoodAnalysis, create_server
+from fltk.lsp.workers import AnalysisPool, EngineSpec, OutlineNode
 from fltk.unparse.renderer import RendererConfig
 
 _DATA = Path(__file__).parent / "test_data"
@@ -104,6 +108,16 @@ def _line_col(text: str, offset: int, enc: t.PositionEncodingKind) -> t.Position
     return t.Position(line=line, character=character)
 
 
+def _apply_edits(text: str, edits: list[t.TextEdit]) -> str:
+    """``text`` with utf-32 ``edits`` (non-overlapping, in document order) applied."""
+    index = LineIndex(text)
+    for edit in reversed(edits):
+        start = index.position_to_offset(edit.range.start.line, edit.range.start.character, PositionEncoding.UTF32)
+        end = index.position_to_offset(edit.range.end.line, edit.range.end.character, PositionEncoding.UTF32)
+        text = text[:start] + edit.new_text + text[end:]
+    return text
+
+
 async def _open(client: LanguageClient, text: str, *, version: int = 1) -> None:
     client.text_document_did_open(
         t.DidOpenTextDocumentParams(
@@ -224,8 +238,11 @@ async def test_breaking_edit_reports_error_and_serves_stale_tokens(client: Langu
     # `123` starts at column 6 on line 0.
     assert diagnostics[0].range.start == t.Position(line=0, character=6)
 
-    # Stale tokens from the last good parse are still served rather than a blank document.
-    assert await _tokens(client) == good
+    # Stale tokens from the last good parse are still served rather than a blank document, moved
+    # onto the current text: `greet` is in the unchanged prefix, the final `.` shifts back to
+    # column 9, and the stale tokens of the rewritten middle would overlap it and are dropped.
+    stale = _decode(good)
+    assert _decode(await _tokens(client)) == [stale[0], (0, 9, *stale[-1][2:])]
 
 
 @pytest.mark.asyncio
@@ -278,9 +295,8 @@ async def test_formatting_reformats_and_is_idempotent(client: LanguageClient) ->
         )
     )
     assert edits is not None
-    assert len(edits) == 1
     canonical = "\ngreet alice.\ngreet bob.\n"
-    assert edits[0].new_text == canonical
+    assert _apply_edits("greet   alice.\ngreet bob.", edits) == canonical
 
     # The already-canonical form yields no edits.
     await _change(client, canonical, version=2)
@@ -294,6 +310,22 @@ async def test_formatting_reformats_and_is_idempotent(client: LanguageClient) ->
     assert len(edits2) == 0
 
 
+@pytest.mark.asyncio
+async def test_range_formatting_edits_only_the_selected_item(client: LanguageClient) -> None:
+    await client.initialize_session(_init_params([t.PositionEncodingKind.Utf32]))
+    text = "greet   alice.\ngreet   bob.\n"
+    await _open(client, text)
+    edits = await client.text_document_range_formatting_async(
+        t.DocumentRangeFormattingParams(
+            text_document=t.TextDocumentIdentifier(uri=_URI),
+            range=t.Range(start=t.Position(line=1, character=0), end=t.Position(line=1, character=3)),
+            options=t.FormattingOptions(tab_size=8, insert_spaces=True),
+        )
+    )
+    assert edits is not None
+    assert _apply_edits(text, edits) == "greet   alice.\ngreet bob.\n"
+
+
 @pytest.mark.asyncio
 async def test_formatting_unparseable_document_returns_none(client: LanguageClient) -> None:
     await client.initialize_session(_init_params([t.PositionEncodingKind.Utf32]))
@@ -611,6 +643,72 @@ def test_formatting_without_fmt_uses_default_config(monkeypatch: pytest.MonkeyPa
     assert not any(level == t.MessageType.Error for level, _ in logs)
 
 
+def test_format_crlf_document_yields_the_formatted_text(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Edits narrowed to the changed characters must not end between a `\r` and its `\n`: a client
+    # clamps that position to the line end, leaving a stray `\r\n` after the formatted text.
+    server = _fixture_server()
+    monkeypatch.setattr(server, "_encoding", lambda: PositionEncoding.UTF32)
+    lf = "greet alice.\ngreet bob.\n"
+    crlf = lf.replace("\n", "\r\n")
+    lf_edits, _logs = server._format_blocking(lf)
+    edits, logs = server._format_blocking(crlf)
+    assert not logs
+    assert _apply_edits(crlf, edits or []) == _apply_edits(lf, lf_edits or [])
+
+
+def test_range_format_covers_only_overlapping_items(monkeypatch: pytest.MonkeyPatch) -> None:
+    server = _fixture_server()
+    monkeypatch.setattr(server, "_encoding", lambda: PositionEncoding.UTF32)
+    text = "greet   alice.\ngreet   bob.\ngreet   carol.\n"
+    second = text.index("bob")
+    # An empty range formats the item holding the cursor.
+    edits, logs = server._range_format_blocking(text, second, second)
+    assert not logs
+    assert _apply_edits(text, edits or []) == "greet   alice.\ngreet bob.\ngreet   carol.\n"
+    # A range spanning two items formats both, and nothing outside them.
+    edits, _logs = server._range_format_blocking(text, 0, second)
+    assert _apply_edits(text, edits or []) == "greet alice.\ngreet bob.\ngreet   carol.\n"
+
+
+def test_range_format_discards_every_edit_when_a_node_fails(monkeypatch: pytest.MonkeyPatch) -> None:
+    server = _fixture_server()
+    monkeypatch.setattr(server, "_encoding", lambda: PositionEncoding.UTF32)
+    original = plumbing.render_doc
+    calls = {"n": 0}
+
+    def _second_fails(*args, **kwargs):
+        calls["n"] += 1
+        if calls["n"] == 2:
+            msg = "synthetic render failure"
+            raise ValueError(msg)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(plumbing, "render_doc", _second_fails)
+    text = "greet   alice.\ngreet   bob.\n"
+    edits, logs = server._range_format_blocking(text, 0, len(text))
+    assert edits is None
+    assert any(level == t.MessageType.Error for level, _ in logs)
+
+
+@pytest.mark.asyncio
+async def test_telemetry_interval_logs_summary_lines(monkeypatch: pytest.MonkeyPatch) -> None:
+    engine = AnalysisEngine.from_paths(Path(_GRAMMAR), Path(_LSP))
+    server = create_server(engine, None, RendererConfig(max_width=80, indent_width=2), telemetry_interval=0.01)
+    logged: list[t.LogMessageParams] = []
+    monkeypatch.setattr(server, "window_log_message", logged.append)
+    engine.analyze(_CLEAN)
+    server.start_telemetry_log()
+    task = server._telemetry_task
+    assert task is not None
+    try:
+        while not logged:
+            await asyncio.sleep(0.01)
+    finally:
+        task.cancel()
+    assert logged[0].type == t.MessageType.Log
+    assert "parse n=1" in logged[0].message
+
+
 def test_store_ignores_older_version_result(monkeypatch: pytest.MonkeyPatch) -> None:
     # The out-of-order-version guard: an analysis for an older version must not clobber a newer one.
     server = _fixture_server()
@@ -636,6 +734,24 @@ def test_store_after_drop_does_not_resurrect_state(monkeypatch: pytest.MonkeyPat
     assert _URI not in server._docs
 
 
+def test_range_segments_render_only_the_window(monkeypatch: pytest.MonkeyPatch) -> None:
+    # A complete analysis renders just the requested lines for a range request, never the whole
+    # document, yet serves exactly the segments a slice of the full stream would.
+    server = _fixture_server()
+    monkeypatch.setattr(server, "_encoding", lambda: PositionEncoding.UTF32)
+    text = "\n".join(f"greet name{chr(ord('a') + i % 26)}." for i in range(12))
+    analysis, _line_index, served, _text = server._analyze_blocking(text, None)
+    assert analysis.error is None
+    assert served is not None
+    windows = [((0, 0), (0, 5)), ((3, 2), (5, 8)), ((4, 7), (4, 7)), ((10, 0), (40, 0)), ((0, 0), (99, 0))]
+    lazy = [served.range_segments(start, end) for start, end in windows]
+    assert "segments" not in served.__dict__
+    full = served.segments
+    for (start, end), got in zip(windows, lazy, strict=True):
+        expected = [s for s in full if (s.line, s.char + s.length) > start and (s.line, s.char) < end]
+        assert got == expected
+
+
 @pytest.mark.asyncio
 async def test_debounce_reschedule_cancels_prior_and_keeps_replacement() -> None:
     # correctness of the debounce bookkeeping: rescheduling cancels the pending task, and the
@@ -663,9 +779,9 @@ async def test_analysis_for_single_flight_shares_one_submission(monkeypatch: pyt
     calls = {"n": 0}
     real = server._analyze_blocking
 
-    def _counting(text: str, stale: _GoodAnalysis | None):
+    def _counting(text: str, stale: _GoodAnalysis | None, budget: ParseBudget | None = None, lines=None):
         calls["n"] += 1
-        return real(text, stale)
+        return real(text, stale, budget, lines)
 
     monkeypatch.setattr(server, "_analyze_blocking", _counting)
     states = await asyncio.gather(
@@ -676,6 +792,105 @@ async def test_analysis_for_single_flight_shares_one_submission(monkeypatch: pyt
     assert all(s.last_good is not None for s in states)
 
 
+@pytest.mark.asyncio
+async def test_analysis_for_newer_version_cancels_superseded_parse(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Submitting version 2 cancels version 1's budget: the stale parse aborts instead of running to
+    # completion on the only worker, and its waiter gets the current state rather than an error.
+    server = _fixture_server()
+    monkeypatch.setattr(server, "_encoding", lambda: PositionEncoding.UTF32)
+    started = threading.Event()
+    real = server._analyze_blocking
+
+    def _held(text: str, stale: _GoodAnalysis | None, budget: ParseBudget | None = None, lines=None):
+        if text == _BROKEN:
+            assert budget is not None
+            started.set()
+            deadline = time.monotonic() + 5
+            while not budget.cancelled and time.monotonic() < deadline:
+                time.sleep(0.005)
+        return real(text, stale, budget, lines)
+
+    monkeypatch.setattr(server, "_analyze_blocking", _held)
+    superseded = asyncio.ensure_future(server._analysis_for(_URI, 1, _BROKEN))
+    await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+    current = await server._analysis_for(_URI, 2, _CLEAN)
+    stale_state = await superseded
+    assert current.analyzed_version == 2
+    assert stale_state.analyzed_version in (None, 2)
+    assert server._docs[_URI].analyzed_version == 2
+    assert _URI not in server._inflight
+
+
+@pytest.mark.asyncio
+async def test_analysis_for_through_pool_serves_same_tokens(monkeypatch: pytest.MonkeyPatch) -> None:
+    # A pool-backed server parses in a worker process and serves the same tokens and symbols as the
+    # in-thread path; its snapshot tree is an outline rather than the analysis CST.
+    engine = AnalysisEngine.from_paths(Path(_GRAMMAR), Path(_LSP))
+    pool = AnalysisPool(EngineSpec(Path(_GRAMMAR), Path(_LSP)), 1)
+    server = create_server(engine, None, RendererConfig(max_width=80, indent_width=2), pool=pool)
+    monkeypatch.setattr(server, "_encoding", lambda: PositionEncoding.UTF32)
+    try:
+        state = await server._analysis_for(_URI, 1, _CLEAN)
+    finally:
+        pool.close()
+    _analysis, _line_index, local_served, _text = server._analyze_blocking(_CLEAN, None)
+    assert state.last_good is not None
+    assert isinstance(state.last_good.tree, OutlineNode)
+    assert state.served_tokens is not None
+    assert local_served is not None
+    assert state.served_tokens.segments == local_served.segments
+    assert state.last_good.symbols.symbols == _analysis.symbols.symbols
+
+
+def test_pool_with_resolver_is_rejected() -> None:
+    engine = AnalysisEngine.from_paths(Path(_GRAMMAR), Path(_LSP))
+    pool = AnalysisPool(EngineSpec(Path(_GRAMMAR), Path(_LSP)), 1)
+    with pytest.raises(ValueError, match="resolver"):
+        create_server(engine, None, RendererConfig(max_width=80, indent_width=2), resolver=object(), pool=pool)
+    pool.close()
+
+
+def test_analyze_blocking_past_budget_serves_nothing(monkeypatch: pytest.MonkeyPatch) -> None:
+    server = _fixture_server()
+    monkeypatch.setattr(server, "_encoding", lambda: PositionEncoding.UTF32)
+    analysis, _line_index, served, _text = server._analyze_blocking(_CLEAN, None, ParseBudget(-1.0))
+    assert analysis.error is not None
+    assert "time limit" in analysis.error.message
+    assert served is None
+
+
+@pytest.mark.asyncio
+async def test_incremental_changes_match_whole_document_sync(client: LanguageClient) -> None:
+    # Ranged edits (including one that inserts a CRLF-terminated line) are applied to the buffer
+    # and to the live line index; the result must serve exactly what a whole-document sync does.
+    result = await client.initialize_session(_init_params([t.PositionEncodingKind.Utf16]))
+    sync = result.capabilities.text_document_sync
+    assert isinstance(sync, t.TextDocumentSyncOptions)
+    assert sync.change == t.TextDocumentSyncKind.Incremental
+    await _open(client, _CLEAN)  # "greet alice.\ngreet bob."
+    client.text_document_did_change(
+        t.DidChangeTextDocumentParams(
+            text_document=t.VersionedTextDocumentIdentifier(uri=_URI, version=2),
+            content_changes=[
+                t.TextDocumentContentChangePartial(
+                    range=t.Range(start=t.Position(line=1, character=6), end=t.Position(line=1, character=9)),
+                    text="robert",
+                ),
+                t.TextDocumentContentChangePartial(
+                    range=t.Range(start=t.Position(line=0, character=0), end=t.Position(line=0, character=0)),
+                    text="greet zed.\r\n",
+                ),
+            ],
+        )
+    )
+    await client.wait_for_notification(_PUBLISH)
+    incremental = await _tokens(client)
+    await _change(client, "greet zed.\r\ngreet alice.\ngreet robert.", version=3)
+    assert await _tokens(client) == incremental
+    assert _decode(incremental)[0][:2] == (0, 0)
+    assert len(_decode(incremental)) == 9
+
+
 @pytest.mark.asyncio
 async def test_semantic_tokens_range_returns_line_subset(client: LanguageClient) -> None:
     await client.initialize_session(_init_params([t.PositionEncodingKind.Utf32]))
@@ -738,6 +953,55 @@ async def test_partial_after_good_merges_fresh_prefix_with_stale_tail(client: La
     assert any(line == 1 for line, *_rest in decoded)
 
 
+@pytest.mark.asyncio
+async def test_partial_stale_tail_follows_an_inserted_line(client: LanguageClient) -> None:
+    await client.initialize_session(_init_params([t.PositionEncodingKind.Utf32]))
+    await _open(client, _CLEAN)  # "greet alice.\ngreet bob."
+    clean = _decode(await _tokens(client))
+    # A broken new first line leaves a zero-length prefix: everything served is the stale tail,
+    # shifted down one line to the text it painted.
+    await _change(client, "greet 1.\n" + _CLEAN, version=2)
+    shifted = _decode(await _tokens(client))
+    assert [(line + 1, *rest) for line, *rest in clean[1:]] == [tuple(seg) for seg in shifted[1:]]
+
+
+@pytest.mark.asyncio
+async def test_semantic_tokens_delta_round_trip(client: LanguageClient) -> None:
+    result = await client.initialize_session(_init_params([t.PositionEncodingKind.Utf16]))
+    provider = result.capabilities.semantic_tokens_provider
+    assert provider is not None
+    assert isinstance(provider.full, t.SemanticTokensFullDelta)
+    assert provider.full.delta
+    await _open(client, _CLEAN)
+    first = await client.text_document_semantic_tokens_full_async(
+        t.SemanticTokensParams(text_document=t.TextDocumentIdentifier(uri=_URI))
+    )
+    assert first is not None
+    assert first.result_id is not None
+    await _change(client, "greet alice.\ngreet bobby.", version=2)
+    delta = await client.text_document_semantic_tokens_full_delta_async(
+        t.SemanticTokensDeltaParams(
+            text_document=t.TextDocumentIdentifier(uri=_URI), previous_result_id=first.result_id
+        )
+    )
+    assert isinstance(delta, t.SemanticTokensDelta)
+    assert delta.result_id not in (None, first.result_id)
+    data = list(first.data)
+    for edit in sorted(delta.edits, key=lambda e: e.start, reverse=True):
+        data[edit.start : edit.start + edit.delete_count] = edit.data or []
+    assert data == await _tokens(client)
+    # Only the renamed `bobby` token and the `.` whose relative column it moved are resent.
+    assert sum(len(edit.data or []) for edit in delta.edits) == 10
+    # A base the server no longer holds (the full request above superseded it) gets full tokens.
+    fallback = await client.text_document_semantic_tokens_full_delta_async(
+        t.SemanticTokensDeltaParams(
+            text_document=t.TextDocumentIdentifier(uri=_URI), previous_result_id=delta.result_id
+        )
+    )
+    assert isinstance(fallback, t.SemanticTokens)
+    assert list(fallback.data) == data
+
+
 @pytest.mark.asyncio
 async def test_semantic_tokens_range_on_partial_state(client: LanguageClient) -> None:
     await client.initialize_session(_init_params([t.PositionEncodingKind.Utf32]))
@@ -843,3 +1107,22 @@ def test_create_server_reads_start_rule_from_engine(monkeypatch: pytest.MonkeyPa
     # Formatting parses with the engine's start rule, so a bare greeting formats without error.
     assert edits is not None
     assert not any(level == t.MessageType.Error for level, _ in logs)
+
+
+@pytest.mark.asyncio
+async def test_telemetry_command_reports_phase_timings(client: LanguageClient) -> None:
+    result = await client.initialize_session(_init_params([t.PositionEncodingKind.Utf16]))
+    provider = result.capabilities.execute_command_provider
+    assert provider is not None
+    assert "fltk.telemetry" in provider.commands
+    await _open(client, _CLEAN)
+    await _tokens(client)
+    snapshot = await client.workspace_execute_command_async(
+        t.ExecuteCommandParams(command="fltk.telemetry", arguments=[{"reset": True}])
+    )
+    phases = snapshot["phases"]
+    for phase in ("parse", "walk", "layer", "analyze", "semantic_tokens", "queue_wait"):
+        assert phases[phase]["count"] >= 1, phase
+    # The reset argument cleared the recorder after the snapshot was taken.
+    after = await client.workspace_execute_command_async(t.ExecuteCommandParams(command="fltk.telemetry"))
+    assert "parse" not in after["phases"]
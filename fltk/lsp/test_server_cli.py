@@ -102,6 +102,24 @@ def test_resolver_missing_attr_exits_1(tmp_path: Path) -> None:
     assert "create_resolver" in result.output
 
 
+def test_workers_with_resolver_exits_1() -> None:
+    result = runner.invoke(server_cli.app, ["--grammar", _GRAMMAR, "--workers", "2", "--resolver", "x:y"])
+    assert result.exit_code == 1
+    assert "--workers cannot be combined with --resolver" in result.output
+
+
+def test_negative_workers_exits_1() -> None:
+    result = runner.invoke(server_cli.app, ["--grammar", _GRAMMAR, "--workers", "-1"])
+    assert result.exit_code == 1
+    assert "--workers" in result.output
+
+
+def test_cache_dir_without_resolver_exits_1(tmp_path: Path) -> None:
+    result = runner.invoke(server_cli.app, ["--grammar", _GRAMMAR, "--cache-dir", str(tmp_path)])
+    assert result.exit_code == 1
+    assert "--cache-dir requires --resolver" in result.output
+
+
 def test_missing_pygls_prints_install_hint(monkeypatch: pytest.MonkeyPatch) -> None:
     real_import = builtins.__import__
 
@@ -115,3 +133,9 @@ def test_missing_pygls_prints_install_hint(monkeypatch: pytest.MonkeyPatch) -> N
     result = runner.invoke(server_cli.app, ["--grammar", _GRAMMAR])
     assert result.exit_code == 1
     assert "fltk[lsp]" in result.output
+
+
+def test_non_positive_telemetry_interval_exits_1() -> None:
+    result = runner.invoke(server_cli.app, ["--grammar", _GRAMMAR, "--telemetry-interval", "0"])
+    assert result.exit_code == 1
+    assert "--telemetry-interval" in result.output
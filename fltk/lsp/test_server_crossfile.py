@@ -212,6 +212,37 @@ async def test_references_span_into_unopened_file(client: LanguageClient) -> Non
     assert len(without_decl) == 2
 
 
+@pytest.mark.asyncio
+async def test_references_through_workspace_index(client: LanguageClient) -> None:
+    # A client that can watch files gets watchers registered at `initialized`, which turns on the
+    # background workspace index; references answered through it match the full-scan answer.
+    registered: list[t.Registration] = []
+
+    @client.feature(t.CLIENT_REGISTER_CAPABILITY)
+    def register(params: t.RegistrationParams) -> None:
+        registered.extend(params.registrations)
+
+    params = _init_params()
+    params.capabilities.workspace = t.WorkspaceClientCapabilities(
+        did_change_watched_files=t.DidChangeWatchedFilesClientCapabilities(dynamic_registration=True)
+    )
+    await client.initialize_session(params)
+    await _open(client, _SHAPES_URI, _SHAPES_TEXT)
+    assert [r.method for r in registered] == [t.WORKSPACE_DID_CHANGE_WATCHED_FILES]
+    pos = _pos(_SHAPES_TEXT, _SHAPES_TEXT.index("Circle") + 1)
+    with_decl = await _references(client, _SHAPES_URI, pos, include_declaration=True)
+    assert with_decl is not None
+    assert sum(loc.uri == _MAIN_URI for loc in with_decl) == 2  # import binding + field type
+    assert sum(loc.uri == _SHAPES_URI for loc in with_decl) == 1  # the declaration
+
+    # A reported on-disk change re-indexes the file; the answer is unchanged for unchanged text.
+    client.workspace_did_change_watched_files(
+        t.DidChangeWatchedFilesParams(changes=[t.FileEvent(uri=_MAIN_URI, type=t.FileChangeType.Changed)])
+    )
+    again = await _references(client, _SHAPES_URI, pos, include_declaration=True)
+    assert again == with_decl
+
+
 @pytest.mark.asyncio
 async def test_definition_follows_unsaved_buffer_edit(client: LanguageClient) -> None:
     # An unsaved edit to the target file participates: after inserting a blank line before the
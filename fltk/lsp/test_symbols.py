@@ -318,3 +318,71 @@ def test_occurrences_dedupes_overlapping_spans() -> None:
     r_a = text.index("r a") + 2
     assert (r_a, r_a + 1) in occ
     assert (symbol.name_start, symbol.name_end) in occ
+
+
+def test_references_to_and_unresolved_references() -> None:
+    text = "let a ;\nuse a ;\nuse b ;\nuse a ;\n"
+    table = _extract(_FLAT_GRAMMAR, _FLAT_CONFIG, text, "program")
+    a = _sym(table, "a")
+    assert [r.start for r in table.references_to(a)] == [
+        text.index("use a") + 4,
+        text.rindex("use a") + 4,
+    ]
+    assert [r.name for r in table.unresolved_references()] == ["b"]
+
+
+def _synthetic_ref(start: int, end: int) -> symbols.Reference:
+    tier = lsp_config.Tier(source_rank=1, anchor_rank=1, block_rank=1, stmt_index=0)
+    return symbols.Reference(name="x", start=start, end=end, depth=0, kinds="*", tier=tier, symbol=None)
+
+
+def test_reference_at_matches_a_linear_scan_over_nested_spans() -> None:
+    # Nested, overlapping, touching, and identical spans, deliberately out of order: the index must
+    # pick the narrowest closed span containing the offset, and the earliest entry among equals.
+    spans = [(10, 20), (0, 30), (12, 14), (12, 14), (14, 18), (25, 25), (3, 40), (20, 22)]
+    references = tuple(_synthetic_ref(start, end) for start, end in spans)
+    root = symbols.Scope(start=0, end=50, parent=None, children=[], symbols=[])
+    table = symbols.SymbolTable(root=root, symbols=(), references=references)
+    for offset in range(-1, 45):
+        containing = [r for r in references if r.start <= offset <= r.end]
+        expected = min(containing, key=lambda r: r.end - r.start) if containing else None
+        assert table.reference_at(offset) is expected, offset
+
+
+class _CountingOffset(int):
+    """An offset that counts the comparisons made against it."""
+
+    comparisons = 0
+
+    def _count(self, other: object, op: str) -> bool:
+        _CountingOffset.comparisons += 1
+        return getattr(int(self), op)(other)
+
+    def __lt__(self, other: object) -> bool:
+        return self._count(other, "__lt__")
+
+    def __le__(self, other: object) -> bool:
+        return self._count(other, "__le__")
+
+    def __gt__(self, other: object) -> bool:
+        return self._count(other, "__gt__")
+
+    def __ge__(self, other: object) -> bool:
+        return self._count(other, "__ge__")
+
+    def __eq__(self, other: object) -> bool:
+        return self._count(other, "__eq__")
+
+    __hash__ = int.__hash__
+
+
+def test_reference_at_under_a_whole_file_span_is_logarithmic() -> None:
+    # A document-wide span encloses thousands of small ones; a query must not walk them all.
+    count = 4096
+    references = (_synthetic_ref(0, 10 * count), *(_synthetic_ref(10 * i + 2, 10 * i + 5) for i in range(count)))
+    root = symbols.Scope(start=0, end=10 * count, parent=None, children=[], symbols=[])
+    table = symbols.SymbolTable(root=root, symbols=(), references=references)
+    for offset, expected in [(10 * count - 7, references[-1]), (10 * count - 2, references[0])]:
+        _CountingOffset.comparisons = 0
+        assert table.reference_at(_CountingOffset(offset)) is expected
+        assert _CountingOffset.comparisons <= 2 * (2 * count).bit_length()
@@ -0,0 +1,63 @@
+"""Tests for the phase histograms and counters in ``fltk.lsp.telemetry``."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from fltk.lsp.conftest import build_hello_engine
+from fltk.lsp.telemetry import BUCKET_BOUNDS_MS, Telemetry
+
+
+def test_histogram_counts_bucket_and_quantiles() -> None:
+    telemetry = Telemetry()
+    for ms in (0.05, 0.3, 0.3, 4.0, 7000.0):
+        telemetry.record("parse", ms / 1000.0)
+    view = telemetry.snapshot()["phases"]["parse"]
+    assert view["count"] == 5
+    assert view["max_ms"] == pytest.approx(7000.0)
+    assert sum(view["buckets"]) == 5
+    # Buckets are per upper bound, plus one overflow bucket for anything past the last bound.
+    assert view["buckets"][BUCKET_BOUNDS_MS.index(0.5)] == 2
+    assert view["buckets"][-1] == 1
+    assert view["p50_ms"] == 0.5
+    assert view["p90_ms"] == pytest.approx(7000.0)
+
+
+def test_quantiles_never_exceed_the_maximum() -> None:
+    telemetry = Telemetry()
+    telemetry.record("parse", 0.003)
+    view = telemetry.snapshot()["phases"]["parse"]
+    # The sample falls in the 5 ms bucket, but no quantile can lie above the only sample.
+    assert view["max_ms"] == pytest.approx(3.0)
+    assert view["p50_ms"] == view["p90_ms"] == view["p99_ms"] == view["max_ms"]
+
+
+def test_phase_context_records_even_when_the_body_raises() -> None:
+    telemetry = Telemetry()
+    with pytest.raises(RuntimeError), telemetry.phase("format"):
+        raise RuntimeError
+    assert telemetry.snapshot()["phases"]["format"]["count"] == 1
+
+
+def test_snapshot_is_json_ready_and_reset_clears_it() -> None:
+    telemetry = Telemetry()
+    telemetry.record("walk", 0.002)
+    telemetry.count("project.analysis_hit")
+    telemetry.count("project.analysis_hit", 2)
+    snapshot = telemetry.snapshot()
+    assert json.loads(json.dumps(snapshot)) == snapshot
+    assert snapshot["counters"] == {"project.analysis_hit": 3}
+    assert "walk n=1" in telemetry.summary()
+    assert "project.analysis_hit=3" in telemetry.summary()
+    telemetry.reset()
+    assert telemetry.summary() == "no activity"
+
+
+def test_engine_records_its_analysis_phases() -> None:
+    engine, _grammar = build_hello_engine("", start_rule="top")
+    engine.analyze("hello world !\n")
+    engine.analyze("hello a !\nhello 4 !\n")  # a partial outcome walks its prefix too
+    phases = engine.telemetry.snapshot()["phases"]
+    assert phases["parse"]["count"] == phases["walk"]["count"] == phases["layer"]["count"] == 2
@@ -0,0 +1,88 @@
+"""Tests for the fused analysis walk and the sweep-line paint layering."""
+
+from __future__ import annotations
+
+from fltk import plumbing
+from fltk.lsp import classify, lsp_config, symbols, traversal
+from fltk.lsp.analysis import prepare_analysis_grammar
+from fltk.lsp.classify import Token
+from fltk.lsp.conftest import HELLO_GRAMMAR
+
+_TIER = lsp_config.Tier(source_rank=2, anchor_rank=1, block_rank=1, stmt_index=0)
+_HIGH_TIER = lsp_config.Tier(source_rank=2, anchor_rank=1, block_rank=1, stmt_index=1)
+
+
+def _paint(token: str) -> lsp_config.Paint:
+    return lsp_config.Paint(token=token, modifiers=())
+
+
+def test_analyze_tree_matches_separate_passes() -> None:
+    grammar = plumbing.parse_grammar(HELLO_GRAMMAR)
+    resolved = lsp_config.load_lsp_config("rule greeting {\n  def name: type;\n  scope punct: none;\n}\n", grammar)
+    parser = plumbing.generate_parser(prepare_analysis_grammar(grammar))
+    text = "hello a !\n// hello b !\nhello bb !\n"
+    parsed = plumbing.parse_text(parser, text, "top")
+    assert parsed.success, parsed.error_message
+    tables = classify.build_grammar_tables(parser.grammar)
+
+    table, tokens = traversal.analyze_tree(parsed.cst, tables, resolved, text)
+
+    separate = symbols.extract(parsed.cst, tables, resolved, text)
+    assert (table.symbols, table.references) == (separate.symbols, separate.references)
+    assert tokens == classify.classify(parsed.cst, parser.grammar, resolved, text, tables=tables, symbol_table=separate)
+    assert [s.name for s in table.symbols] == ["a", "bb"]
+    # The trivia run (newline plus comment) is one default interval; nothing inside it is a definition.
+    trivia_start = text.index("\n")
+    trivia_end = text.index("\n", text.index("//")) + 1
+    assert Token(trivia_start, trivia_end, "comment", ()) in tokens
+
+
+def test_walk_without_symbols_or_paints_collects_only_defaults() -> None:
+    grammar = plumbing.parse_grammar(HELLO_GRAMMAR)
+    resolved = lsp_config.load_lsp_config("rule greeting {\n  scope name: type;\n}\n", grammar)
+    parser = plumbing.generate_parser(prepare_analysis_grammar(grammar))
+    text = "hello a !\n"
+    parsed = plumbing.parse_text(parser, text, "top")
+    assert parsed.success, parsed.error_message
+    tables = classify.build_grammar_tables(parser.grammar)
+
+    walked = traversal.walk(parsed.cst, tables, resolved, text, collect_symbols=False, collect_paints=False)
+    assert walked.symbols is None
+    assert walked.explicit == []
+    assert [token_type for _start, _end, token_type in walked.defaults] == ["keyword", "variable", "operator"]
+
+
+def test_layer_tokens_deeper_key_wins_only_over_overlap() -> None:
+    explicit = [
+        (0, 10, _paint("type"), (1, _TIER)),
+        (3, 5, _paint("function"), (2, _TIER)),
+    ]
+    assert classify.layer_tokens(explicit, []) == [
+        Token(0, 3, "type", ()),
+        Token(3, 5, "function", ()),
+        Token(5, 10, "type", ()),
+    ]
+
+
+def test_layer_tokens_equal_keys_keep_first_collected() -> None:
+    explicit = [
+        (0, 4, _paint("type"), (1, _TIER)),
+        (2, 6, _paint("function"), (1, _TIER)),
+        (2, 6, _paint("macro"), (1, _HIGH_TIER)),
+    ]
+    assert classify.layer_tokens(explicit[:2], []) == [Token(0, 4, "type", ()), Token(4, 6, "function", ())]
+    # A later statement (higher tier) outranks the earlier one at the same depth.
+    assert classify.layer_tokens(explicit, []) == [Token(0, 2, "type", ()), Token(2, 6, "macro", ())]
+
+
+def test_layer_tokens_none_suppresses_defaults_and_segments_straddle_defaults() -> None:
+    defaults = [(0, 3, "keyword"), (4, 8, "variable"), (9, 10, "operator")]
+    explicit = [
+        (2, 6, _paint("type"), (1, _TIER)),
+        (9, 10, _paint("none"), (1, _TIER)),
+    ]
+    assert classify.layer_tokens(explicit, defaults) == [
+        Token(0, 2, "keyword", ()),
+        Token(2, 6, "type", ()),
+        Token(6, 8, "variable", ()),
+    ]
@@ -0,0 +1,117 @@
+"""Tests for the multi-process analysis pool and the outline trees its workers return."""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+from fltk.fegen.pyrt import memo
+from fltk.lsp import features, workers
+from fltk.lsp.engine import AnalysisEngine
+from fltk.lsp.positions import LineIndex, PositionEncoding
+from fltk.lsp.workers import AnalysisPool, EngineSpec, Outline, OutlineNode
+
+_DATA = Path(__file__).parent / "test_data"
+_SPEC = EngineSpec(_DATA / "greet.fltkg", _DATA / "greet.fltklsp")
+_TEXT = "greet alice.\ngreet bob.\n// a comment\ngreet carol.\n"
+
+
+def _selection_spans(selection) -> list[tuple[int, int, int, int]]:
+    spans = []
+    while selection is not None:
+        rng = selection.range
+        spans.append((rng.start.line, rng.start.character, rng.end.line, rng.end.character))
+        selection = selection.parent
+    return spans
+
+
+def test_outline_round_trip_serves_folding_and_selection_identically() -> None:
+    engine = _SPEC.build()
+    analysis = engine.analyze(_TEXT)
+    assert analysis.tree is not None
+    outline = Outline.of(analysis.tree).build()
+    line_index = LineIndex(_TEXT)
+    trivia = engine.trivia_kind_names
+    assert features.folding_ranges(outline, trivia, line_index) == features.folding_ranges(
+        analysis.tree, trivia, line_index
+    )
+    offsets = list(range(len(_TEXT) + 1))
+    enc = PositionEncoding.UTF16
+    expected = features.selection_ranges(analysis.tree, offsets, line_index, enc)
+    got = features.selection_ranges(outline, offsets, line_index, enc)
+    assert [_selection_spans(s) for s in got] == [_selection_spans(s) for s in expected]
+
+
+def test_outline_of_deep_tree_does_not_recurse() -> None:
+    node = OutlineNode(workers.OutlineKind("LEAF"), workers.OutlineSpan(0, 1))
+    depth = sys.getrecursionlimit() * 2
+    for _ in range(depth):
+        node = OutlineNode(workers.OutlineKind("WRAP"), workers.OutlineSpan(0, 1), [(None, node)])
+    rebuilt = Outline.of(node).build()
+    for _ in range(depth):
+        rebuilt = rebuilt.children[0][1]
+    assert rebuilt.kind.name == "LEAF"
+
+
+def test_pool_rejects_zero_workers() -> None:
+    with pytest.raises(ValueError, match="at least one worker"):
+        AnalysisPool(_SPEC, 0)
+
+
+@pytest.mark.asyncio
+async def test_pool_matches_in_process_analysis() -> None:
+    engine = _SPEC.build()
+    pool = AnalysisPool(_SPEC, 2)
+    try:
+        texts = {"file:///a.greet": _TEXT, "file:///b.greet": "greet x.\ngreet 1.\n"}
+        results = await asyncio.gather(
+            *(pool.analyze(uri, text, memo.ParseBudget(30.0)) for uri, text in texts.items())
+        )
+    finally:
+        pool.close()
+    for text, pooled in zip(texts.values(), results, strict=True):
+        local = engine.analyze(text)
+        assert (pooled.tokens, pooled.symbols, pooled.error, pooled.prefix_end) == (
+            local.tokens,
+            local.symbols,
+            local.error,
+            local.prefix_end,
+        )
+        assert (pooled.tree is None) == (local.tree is None)
+
+
+@pytest.mark.asyncio
+async def test_pool_cancelled_budget_raises() -> None:
+    pool = AnalysisPool(_SPEC, 1)
+    budget = memo.ParseBudget(30.0)
+    budget.cancel()
+    try:
+        with pytest.raises(memo.ParseCancelledError):
+            await pool.analyze("file:///a.greet", _TEXT, budget)
+    finally:
+        pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_kills_a_worker_stuck_past_its_deadline(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # A nested-quantifier regex backtracks exponentially inside one `re.match`, where the
+    # cooperative budget check never runs: only the hard kill can end it.
+    grammar = tmp_path / "slow.fltkg"
+    grammar.write_text("top := word:/(a+)+b/ ;\n")
+    monkeypatch.setattr(workers, "_KILL_GRACE_SECONDS", 0.2)
+    spec = EngineSpec(grammar)
+    pool = AnalysisPool(spec, 1)
+    try:
+        stuck = await pool.analyze("file:///slow", "a" * 64, memo.ParseBudget(0.2))
+        assert stuck.tree is None
+        assert stuck.error is not None
+        assert "restarted" in stuck.error.message
+        # The next job runs on a freshly spawned worker.
+        fine = await pool.analyze("file:///slow", "aab", memo.ParseBudget(30.0))
+        assert fine.error is None
+        assert fine.tokens == AnalysisEngine.from_paths(grammar).analyze("aab").tokens
+    finally:
+        pool.close()
@@ -0,0 +1,182 @@
+"""The single analysis walk: symbols, references, explicit paints, and default intervals at once.
+
+Symbol extraction, the explicit painter, and the default classifier all decode the same
+``(label, child)`` pairs of the same tree. Walking it three times per keystroke tripled the
+dominant cost of analysis, so :func:`walk` visits every node once and feeds each decoded child
+to all three consumers: the explicit layer sees every node (paints apply inside comments too),
+while symbol extraction and the default layer stop at the outermost trivia node -- a comment is
+one ``comment`` default interval and holds no definitions or references. :func:`analyze_tree`
+is the engine's entry point: one walk, reference resolution, then one layering sweep
+(:func:`~fltk.lsp.classify.layer_tokens`).
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import itertools
+import time
+import typing
+
+from fltk.lsp import classify, lsp_config, symbols
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from fltk.lsp.telemetry import Telemetry
+
+
+@dataclasses.dataclass(frozen=True)
+class TreeWalk:
+    """Everything one walk over an analysis CST collected.
+
+    ``symbols`` is the resolved symbol table (``None`` when symbol collection was off);
+    ``explicit`` the explicit-paint intervals in collection order, before reference paints are
+    added; ``defaults`` the default-layer intervals, sorted and non-overlapping.
+    """
+
+    symbols: symbols.SymbolTable | None
+    explicit: list[classify.Interval]
+    defaults: list[classify.DefaultInterval]
+
+
+class _Walker:
+    """The per-walk state: configuration plus the three output lists."""
+
+    def __init__(
+        self,
+        tables: classify.GrammarTables,
+        resolved: lsp_config.ResolvedLspConfig,
+        text: str,
+        *,
+        collect_paints: bool,
+    ) -> None:
+        self.tables = tables
+        self.resolved = resolved
+        self.text = text
+        self.collect_paints = collect_paints
+        self.explicit: list[classify.Interval] = []
+        self.defaults: list[classify.DefaultInterval] = []
+        self.pending: list[symbols.PendingRef] = []
+
+    def visit(self, node: typing.Any, depth: int, scope: symbols.Scope | None, *, in_trivia: bool) -> None:
+        """Collect every layer's output over ``node`` and its subtree, depth-first.
+
+        ``scope`` is the current lexical scope, or ``None`` when symbols are not being collected.
+        ``in_trivia`` is set below the outermost trivia node, where only explicit paints apply.
+
+        A whole-node paint (from a global rule-name anchor) is recorded at the node's own depth; a
+        child match (from a rule-block or global label/literal/rule anchor) at the child's depth
+        (``depth + 1``), so a deeper match outranks a shallower one over their overlap.
+        """
+        tables = self.tables
+        resolved = self.resolved
+        text = self.text
+        rule = classify.rule_for_node(node, tables)
+        if self.collect_paints:
+            for node_paint in resolved.node_paints.get(rule.name, ()):
+                self.explicit.append((node.span.start, node.span.end, node_paint.paint, (depth, node_paint.tier)))
+
+        if not in_trivia and rule.is_trivia_rule:
+            # The outermost trivia node: one comment interval over its whole span, and no defaults,
+            # definitions, or references below it (terminals inside a comment never repaint).
+            in_trivia = True
+            start, end = node.span.start, node.span.end
+            if text[start:end].strip():
+                self.defaults.append((start, end, "comment"))
+            if not self.collect_paints:
+                return
+
+        if in_trivia:
+            table = None
+            child_scope = None
+            def_matchers: Sequence[lsp_config.DefMatcher] = ()
+            ref_matchers: Sequence[lsp_config.RefMatcher] = ()
+        else:
+            table = tables.tables[rule.name]
+            child_scope = symbols.open_scope(node, scope, resolved, rule.name) if scope is not None else None
+            def_matchers = resolved.def_matchers.get(rule.name, ())
+            ref_matchers = resolved.ref_matchers.get(rule.name, ())
+        paint_matchers = (
+            tuple(itertools.chain(resolved.child_matchers.get(rule.name, ()), resolved.global_child_matchers))
+            if self.collect_paints
+            else ()
+        )
+
+        child_depth = depth + 1
+        for label, child in node.children:
+            surface = classify.child_surface(label, child, text, tables)
+            is_span, cstart, cend, child_text, child_rule_name, label_name = surface
+            for matcher in paint_matchers:
+                if lsp_config.match_applies(matcher.match, label_name, child_text, child_rule_name):
+                    self.explicit.append((cstart, cend, matcher.paint, (child_depth, matcher.tier)))
+            if scope is not None and child_scope is not None and (def_matchers or ref_matchers):
+                symbols.match_child(
+                    node,
+                    surface,
+                    child_depth,
+                    def_matchers=def_matchers,
+                    ref_matchers=ref_matchers,
+                    scope=scope,
+                    child_scope=child_scope,
+                    text=text,
+                    pending=self.pending,
+                )
+            if is_span:
+                if table is not None and child_text is not None and child_text.strip():
+                    token_type = classify.classify_span_text(text, cstart, cend, label_name, table)
+                    if token_type is not None:
+                        self.defaults.append((cstart, cend, token_type))
+            else:
+                self.visit(child, child_depth, child_scope, in_trivia=in_trivia)
+
+
+def walk(
+    tree: typing.Any,
+    tables: classify.GrammarTables,
+    resolved_config: lsp_config.ResolvedLspConfig,
+    text: str,
+    *,
+    collect_symbols: bool = True,
+    collect_paints: bool = True,
+) -> TreeWalk:
+    """Walk ``tree`` once, collecting default intervals plus the requested symbol and paint layers.
+
+    Default intervals are always collected. ``collect_symbols`` builds and resolves the symbol
+    table; ``collect_paints`` gathers the explicit-paint intervals. Turning a layer off skips its
+    matching entirely, which is how the standalone :func:`~fltk.lsp.symbols.extract` and
+    :func:`~fltk.lsp.classify.classify` entry points reuse this walk without paying for the other.
+    """
+    walker = _Walker(tables, resolved_config, text, collect_paints=collect_paints)
+    root = symbols.new_root_scope(text) if collect_symbols else None
+    walker.visit(tree, 0, root, in_trivia=False)
+    table = symbols.build_table(root, walker.pending) if root is not None else None
+    return TreeWalk(symbols=table, explicit=walker.explicit, defaults=walker.defaults)
+
+
+def analyze_tree(
+    tree: typing.Any,
+    tables: classify.GrammarTables,
+    resolved_config: lsp_config.ResolvedLspConfig,
+    text: str,
+    *,
+    telemetry: Telemetry | None = None,
+) -> tuple[symbols.SymbolTable, list[classify.Token]]:
+    """The symbol table and classified token stream for ``tree``, from one walk.
+
+    Equivalent to :func:`~fltk.lsp.symbols.extract` followed by
+    :func:`~fltk.lsp.classify.classify` with that symbol table, but the tree is traversed once:
+    resolved references are painted from the walk's own symbol table before the layering sweep.
+    With ``telemetry``, the walk (symbols, paints, defaults) and the layering are timed as the
+    ``walk`` and ``layer`` phases.
+    """
+    started = time.perf_counter()
+    walked = walk(tree, tables, resolved_config, text)
+    assert walked.symbols is not None
+    walked_at = time.perf_counter()
+    explicit = walked.explicit
+    explicit.extend(classify.ref_intervals(walked.symbols))
+    tokens = classify.layer_tokens(explicit, walked.defaults)
+    if telemetry is not None:
+        telemetry.record("walk", walked_at - started)
+        telemetry.record("layer", time.perf_counter() - walked_at)
+    return walked.symbols, tokens
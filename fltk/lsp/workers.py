@@ -0,0 +1,314 @@
+"""A multi-process analysis pool for the language server.
+
+The pure-Python parser holds the GIL, so the server's analysis thread runs one parse at a time and
+a big document being analyzed delays every other document's results. :class:`AnalysisPool` runs
+analyses in worker *processes* instead. Each worker builds its own :class:`AnalysisEngine` once
+(from an :class:`EngineSpec`) and keeps it warm; each URI is pinned to one worker, so a
+document's analyses run in submission order while different documents analyze in parallel.
+
+Analysis CSTs are per-grammar classes generated at runtime and cannot be pickled, so a worker
+returns the compact part of a :class:`DocumentAnalysis` -- tokens, symbols, error, prefix
+boundary -- plus an :class:`Outline` of the tree: node kinds and spans in flat arrays, rebuilt
+on arrival into lightweight nodes with the ``kind``/``span``/``children`` surface that folding,
+selection, and :class:`~fltk.lsp.node_index.NodeIndex` walk. Child labels and node-specific
+accessors are not carried, so consumers that need the real CST (a cross-file resolver) cannot
+run on pooled analyses.
+
+A worker parses under a cooperative :class:`~fltk.fegen.pyrt.memo.ParseBudget` whose
+cancellation is relayed through shared memory. A worker that is still busy well past its
+budget's deadline (a terminal regex that never returns) is killed and respawned on next use.
+"""
+
+from __future__ import annotations
+
+import array
+import asyncio
+import dataclasses
+import multiprocessing
+import threading
+import time
+import traceback
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from fltk.fegen.pyrt import memo
+from fltk.fegen.pyrt.span_protocol import SpanKind
+from fltk.lsp.engine import AnalysisEngine, DocumentAnalysis, ParseErrorInfo
+
+if TYPE_CHECKING:
+    from multiprocessing.connection import Connection
+    from multiprocessing.sharedctypes import Synchronized
+    from pathlib import Path
+
+# How often a dispatcher thread wakes while waiting on its worker, to relay a cancellation and
+# enforce the hard deadline.
+_POLL_SECONDS = 0.05
+# A worker still busy this long past its budget's deadline is killed: the cooperative check has
+# had every chance to fire, so the parse is stuck somewhere it never reaches.
+_KILL_GRACE_SECONDS = 2.0
+
+
+@dataclasses.dataclass(frozen=True)
+class EngineSpec:
+    """The picklable inputs that rebuild an :class:`AnalysisEngine` inside a worker process."""
+
+    grammar_path: Path
+    lsp_path: Path | None = None
+    start_rule: str | None = None
+
+    def build(self) -> AnalysisEngine:
+        return AnalysisEngine.from_paths(self.grammar_path, self.lsp_path, start_rule=self.start_rule)
+
+
+class OutlineKind(NamedTuple):
+    """An outline node's kind: only the ``name`` an analysis-CST ``kind`` exposes."""
+
+    name: str
+
+
+class OutlineSpan(NamedTuple):
+    """A terminal span child of an outline node."""
+
+    start: int
+    end: int
+
+    @property
+    def kind(self) -> SpanKind:
+        return SpanKind.SPAN
+
+
+@dataclasses.dataclass(eq=False)
+class OutlineNode:
+    """A rebuilt tree node: kind name, span, and ``(None, child)`` children -- no labels."""
+
+    kind: OutlineKind
+    span: OutlineSpan
+    children: list[tuple[None, OutlineNode | OutlineSpan]] = dataclasses.field(default_factory=list)
+
+
+@dataclasses.dataclass(frozen=True)
+class Outline:
+    """A CST's nodes and terminal spans in pre-order, as flat arrays that pickle compactly.
+
+    ``kinds[i]`` indexes ``names``, or is ``-1`` for a terminal span; ``parents[i]`` is the index of
+    entry ``i``'s parent (``-1`` for the root).
+    """
+
+    names: tuple[str, ...]
+    kinds: array.array
+    starts: array.array
+    ends: array.array
+    parents: array.array
+
+    @classmethod
+    def of(cls, tree: Any) -> Outline:
+        """Flatten ``tree`` (iteratively: analysis trees can outgrow the recursion limit)."""
+        name_ids: dict[str, int] = {}
+        kinds = array.array("i")
+        starts = array.array("q")
+        ends = array.array("q")
+        parents = array.array("q")
+        stack: list[tuple[Any, int]] = [(tree, -1)]
+        while stack:
+            node, parent = stack.pop()
+            position = len(kinds)
+            parents.append(parent)
+            if node.kind == SpanKind.SPAN:
+                kinds.append(-1)
+                starts.append(node.start)
+                ends.append(node.end)
+                continue
+            kinds.append(name_ids.setdefault(node.kind.name, len(name_ids)))
+            starts.append(node.span.start)
+            ends.append(node.span.end)
+            stack.extend((child, position) for _label, child in reversed(node.children))
+        return cls(tuple(name_ids), kinds, starts, ends, parents)
+
+    def build(self) -> OutlineNode:
+        """Rebuild the tree as :class:`OutlineNode` objects, children in document order."""
+        kinds = [OutlineKind(name) for name in self.names]
+        entries: list[OutlineNode | OutlineSpan] = []
+        for kind, start, end, parent in zip(self.kinds, self.starts, self.ends, self.parents, strict=True):
+            entry: OutlineNode | OutlineSpan = (
+                OutlineSpan(start, end) if kind < 0 else OutlineNode(kinds[kind], OutlineSpan(start, end))
+            )
+            entries.append(entry)
+            if parent >= 0:
+                parent_node = entries[parent]
+                assert isinstance(parent_node, OutlineNode)
+                parent_node.children.append((None, entry))
+        root = entries[0]
+        assert isinstance(root, OutlineNode)
+        return root
+
+
+class _JobBudget(memo.ParseBudget):
+    """A worker-side budget cancelled when the dispatcher writes this job's id to ``flag``."""
+
+    def __init__(self, timeout: float | None, flag: Synchronized[int], job: int) -> None:
+        super().__init__(timeout)
+        self._flag = flag
+        self._job = job
+
+    def check(self) -> None:
+        if self._flag.value == self._job:
+            self.cancel()
+        super().check()
+
+
+def _worker_main(conn: Connection, spec: EngineSpec, flag: Synchronized[int]) -> None:
+    """A worker process: build the engine once, then serve ``(job, text, timeout)`` requests.
+
+    A ``None`` message announces the engine is ready. Replies are ``(job, analysis, outline)``
+    with the tree stripped from ``analysis``, ``(job, None, None)`` for a cancelled job, or
+    ``(job, None, traceback_text)`` for a failure.
+    """
+    engine = spec.build()
+    conn.send(None)
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        job, text, timeout = request
+        try:
+            analysis = engine.analyze(text, budget=_JobBudget(timeout, flag, job))
+        except memo.ParseCancelledError:
+            conn.send((job, None, None))
+            continue
+        except Exception:
+            conn.send((job, None, traceback.format_exc()))
+            continue
+        outline = Outline.of(analysis.tree) if analysis.tree is not None else None
+        conn.send((job, dataclasses.replace(analysis, tree=None), outline))
+
+
+def _failed(message: str) -> DocumentAnalysis:
+    return DocumentAnalysis(tree=None, tokens=None, error=ParseErrorInfo(message=message, offset=None))
+
+
+class _Worker:
+    """One worker process plus the dispatcher thread that talks to it, one job at a time.
+
+    The process is started on first use and after a kill. Everything but :meth:`close` runs on the
+    dispatcher thread, so the pipe and process handles need no locking.
+    """
+
+    def __init__(self, spec: EngineSpec, index: int) -> None:
+        self._spec = spec
+        self._context = multiprocessing.get_context("spawn")
+        self._flag = self._context.Value("q", 0, lock=False)
+        self.dispatcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"fltk-lsp-pool-{index}")
+        self._process: multiprocessing.process.BaseProcess | None = None
+        self._conn: Connection | None = None
+        self._job = 0
+        self._lock = threading.Lock()
+
+    def call(self, text: str, budget: memo.ParseBudget) -> DocumentAnalysis:
+        """Analyze ``text`` in the worker process; on the dispatcher thread.
+
+        Raises ``ParseCancelledError`` when ``budget`` is cancelled before or during the job, and
+        ``RuntimeError`` (carrying the worker's traceback) when the engine raised.
+        """
+        if budget.cancelled:
+            # Superseded while queued behind other jobs: never send it.
+            budget.check()
+        conn = self._ensure_started()
+        self._job += 1
+        job = self._job
+        conn.send((job, text, budget.timeout))
+        hard_deadline = None if budget.timeout is None else time.monotonic() + budget.timeout + _KILL_GRACE_SECONDS
+        while not conn.poll(_POLL_SECONDS):
+            if budget.cancelled:
+                self._flag.value = job
+            if self._process is None or not self._process.is_alive():
+                self._stop()
+                return _failed("The analysis worker exited unexpectedly")
+            if hard_deadline is not None and time.monotonic() > hard_deadline:
+                self._stop()
+                return _failed(
+                    f"Parsing took longer than the {budget.timeout:g} second analysis time limit; "
+                    "the analysis worker was restarted"
+                )
+        reply_job, analysis, detail = conn.recv()
+        assert reply_job == job
+        if analysis is None:
+            if detail is None:
+                msg = "analysis cancelled"
+                raise memo.ParseCancelledError(msg)
+            msg = f"analysis worker failed:\n{detail}"
+            raise RuntimeError(msg)
+        if detail is not None:
+            analysis = dataclasses.replace(analysis, tree=detail.build())
+        return analysis
+
+    def _ensure_started(self) -> Connection:
+        """The live worker's pipe, starting a process and waiting out its engine build if needed.
+
+        The build is not charged to any job's deadline: it happens once per process.
+        """
+        if self._conn is not None:
+            return self._conn
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_worker_main, args=(child_conn, self._spec, self._flag), daemon=True)
+        process.start()
+        child_conn.close()
+        try:
+            parent_conn.recv()
+        except EOFError:
+            process.join()
+            parent_conn.close()
+            msg = f"analysis worker failed to start (exit code {process.exitcode})"
+            raise RuntimeError(msg) from None
+        with self._lock:
+            self._process, self._conn = process, parent_conn
+        return parent_conn
+
+    def _stop(self) -> None:
+        """Kill the process (if any) and forget it; the next job starts a fresh one."""
+        with self._lock:
+            process, conn = self._process, self._conn
+            self._process = self._conn = None
+        if process is not None:
+            process.kill()
+            process.join()
+        if conn is not None:
+            conn.close()
+
+    def close(self) -> None:
+        self._stop()
+        self.dispatcher.shutdown(wait=False, cancel_futures=True)
+
+
+class AnalysisPool:
+    """``workers`` warm analysis processes, with each URI pinned to one of them.
+
+    Pinning keeps a document's analyses ordered (one dispatcher thread per worker runs its jobs
+    in submission order) and spreads different documents across processes.
+    """
+
+    def __init__(self, spec: EngineSpec, workers: int) -> None:
+        if workers < 1:
+            msg = f"an analysis pool needs at least one worker, got {workers}"
+            raise ValueError(msg)
+        self._workers = [_Worker(spec, index) for index in range(workers)]
+
+    def _route(self, uri: str) -> _Worker:
+        return self._workers[zlib.crc32(uri.encode()) % len(self._workers)]
+
+    def analyze(self, uri: str, text: str, budget: memo.ParseBudget) -> asyncio.Future[DocumentAnalysis]:
+        """Analyze ``text`` for ``uri`` on its worker; cancel ``budget`` to abandon the job.
+
+        Must be called on the event loop thread. The result's ``tree`` (when set) is a rebuilt
+        :class:`OutlineNode`, not an analysis CST.
+        """
+        worker = self._route(uri)
+        return asyncio.get_running_loop().run_in_executor(worker.dispatcher, worker.call, text, budget)
+
+    def close(self) -> None:
+        """Kill every worker process and stop the dispatcher threads."""
+        for worker in self._workers:
+            worker.close()
@@ -38,6 +38,7 @@ from fltk.plumbing_types import AstResult, ParseResult, ParserResult, UnparserRe
 from fltk.unparse import gsm2unparser
 from fltk.unparse.combinators import Doc
 from fltk.unparse.fmt_config import FormatterConfig, TriviaConfig, fmt_cst_to_config
+from fltk.unparse.regions import unparse_regions
 from fltk.unparse.renderer import Renderer, RendererConfig
 from fltk.unparse.resolve_specs import resolve_spacing_specs
 from fltk.unparse.unparsefmt_parser import Parser as FmtParser
@@ -46,6 +47,8 @@ if TYPE_CHECKING:
     from collections.abc import Collection
     from typing import Any
 
+    from _typeshed import SupportsWrite
+
     from fltk.fegen import fltk_cst_protocol as cst
 
 
@@ -207,19 +210,32 @@ def generate_parser(
     )
 
 
-def parse_text(parser_result: ParserResult, text: str, rule_name: str | None = None) -> ParseResult:
+def parse_text(
+    parser_result: ParserResult,
+    text: str,
+    rule_name: str | None = None,
+    *,
+    budget: memo.ParseBudget | None = None,
+) -> ParseResult:
     """Parse text using generated parser.
 
     Args:
         parser_result: Result from generate_parser()
         text: Text to parse
         rule_name: Grammar rule to use as start rule. If None, uses first rule in grammar.
+        budget: Optional deadline/cancellation budget; its clock starts here.
 
     Returns:
         ParseResult with the CST and success status
+
+    Raises:
+        memo.ParseCancelledError: ``budget`` was cancelled or ran out mid-parse.
     """
     terminals = terminalsrc.TerminalSource(text)
     parser = parser_result.parser_class(terminals)
+    if budget is not None:
+        budget.start()
+        parser.packrat.budget = budget
 
     if rule_name is None:
         rule_name = parser_result.grammar.rules[0].name
@@ -349,6 +365,8 @@ def _assemble_unparser_module(
     grammar: gsm.Grammar,
     cst_module_name: str,
     formatter_config: FormatterConfig | None,
+    *,
+    mutable_accumulator: bool = False,
 ) -> tuple[str, gsm.Grammar, FormatterConfig]:
     """Run the unparser assembly pipeline; return (source, grammar_with_trivia, formatter_config).
 
@@ -366,6 +384,7 @@ def _assemble_unparser_module(
         context,
         cst_module_name,
         formatter_config=formatter_config,
+        mutable_accumulator=mutable_accumulator,
     )
 
     unparser_ast = compiler.compile_class(unparser_class, context)
@@ -378,6 +397,8 @@ def generate_unparser_source(
     grammar: gsm.Grammar,
     cst_module_name: str,
     formatter_config: FormatterConfig | None = None,
+    *,
+    mutable_accumulator: bool = False,
 ) -> str:
     """Generate the unparser module source from grammar without executing it.
 
@@ -390,12 +411,13 @@ def generate_unparser_source(
         grammar: The grammar to generate unparser for
         cst_module_name: Name of the CST module (from ParserResult)
         formatter_config: Optional formatter configuration
+        mutable_accumulator: Build docs in a mutable DocBuilder rather than a DocAccumulator
 
     Returns:
         The generated unparser module source as a string
     """
     source, _grammar_with_trivia, _formatter_config = _assemble_unparser_module(
-        grammar, cst_module_name, formatter_config
+        grammar, cst_module_name, formatter_config, mutable_accumulator=mutable_accumulator
     )
     return source
 
@@ -404,6 +426,8 @@ def generate_unparser(
     grammar: gsm.Grammar,
     cst_module_name: str,
     formatter_config: FormatterConfig | None = None,
+    *,
+    mutable_accumulator: bool = False,
 ) -> UnparserResult:
     """Generate unparser from grammar.
 
@@ -414,12 +438,13 @@ def generate_unparser(
         grammar: The grammar to generate unparser for
         cst_module_name: Name of the CST module (from ParserResult)
         formatter_config: Optional formatter configuration
+        mutable_accumulator: Build docs in a mutable DocBuilder rather than a DocAccumulator
 
     Returns:
         UnparserResult containing the generated unparser class
     """
     source, grammar_with_trivia, formatter_config = _assemble_unparser_module(
-        grammar, cst_module_name, formatter_config
+        grammar, cst_module_name, formatter_config, mutable_accumulator=mutable_accumulator
     )
 
     exec_globals = {}
@@ -813,7 +838,14 @@ def generate_rust_serde_source(
     )
 
 
-def unparse_cst(unparser_result: UnparserResult, cst: Any, terminals: str, rule_name: str | None = None) -> Doc:
+def unparse_cst(
+    unparser_result: UnparserResult,
+    cst: Any,
+    terminals: str,
+    rule_name: str | None = None,
+    *,
+    jobs: int = 1,
+) -> Doc:
     """Unparse CST to Doc combinators.
 
     Args:
@@ -821,6 +853,8 @@ def unparse_cst(unparser_result: UnparserResult, cst: Any, terminals: str, rule_
         cst: The CST to unparse
         terminals: The original terminal string
         rule_name: Rule to use for unparsing. If None, uses first rule in grammar.
+        jobs: Unparse the top-level children of ``cst`` across this many worker processes
+            (see :mod:`fltk.unparse.regions`). The result is the same for any value.
 
     Returns:
         Doc combinator tree
@@ -838,6 +872,7 @@ def unparse_cst(unparser_result: UnparserResult, cst: Any, terminals: str, rule_
         msg = f"No unparse method for rule '{rule_name}'"
         raise ValueError(msg)
 
+    unparse_regions(unparser, unparser_result.grammar, cst, jobs=jobs)
     result = getattr(unparser, method_name)(cst)
 
     if result is None:
@@ -859,3 +894,16 @@ def render_doc(doc: Doc, config: RendererConfig | None = None) -> str:
     """
     renderer = Renderer(config or RendererConfig())
     return renderer.render(doc)
+
+
+def render_doc_to(doc: Doc, out: SupportsWrite[str], config: RendererConfig | None = None) -> None:
+    """Render Doc combinators straight into a writer, chunk by chunk.
+
+    Unlike :func:`render_doc`, the formatted text is never held in memory as a whole.
+
+    Args:
+        doc: Doc combinator tree
+        out: Anything with a ``write(str)`` method, such as an open text file
+        config: Optional renderer configuration
+    """
+    Renderer(config or RendererConfig()).render_to(doc, out)
@@ -0,0 +1,49 @@
+"""Tests for the helpers shared by the batch CLIs."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from fltk.batch import expand_inputs, header, map_in_workers, sanitize
+
+
+def _touch(root: Path, name: str) -> Path:
+    path = root / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("")
+    return path
+
+
+def test_expand_inputs_sorts_directory_files_and_skips_dot_paths(tmp_path: Path) -> None:
+    b = _touch(tmp_path, "src/b.kv")
+    a = _touch(tmp_path, "src/nested/a.kv")
+    _touch(tmp_path, "src/c.txt")
+    _touch(tmp_path, "src/.d.kv")
+    _touch(tmp_path, "src/.hidden/e.kv")
+    single = _touch(tmp_path, "single.txt")
+
+    assert expand_inputs([single, tmp_path / "src"], [".kv"]) == [single, b, a]
+    assert len(expand_inputs([tmp_path / "src"], [])) == 3
+
+
+def test_header_escapes_control_characters_in_the_path() -> None:
+    name = "a\x1b]0;title\x07.kv"
+
+    assert header(Path(name)) == "==> " + sanitize(name) + " <==\n"
+    assert "\x1b" not in header(Path(name))
+    assert "\x07" not in header(Path(name))
+    assert sanitize("a\tb\nc") == "a\tb\nc"
+
+
+def _square(value: int) -> int:
+    return value * value
+
+
+def _noop() -> None:
+    pass
+
+
+def test_map_in_workers_yields_in_input_order() -> None:
+    assert list(map_in_workers(_square, list(range(20)), jobs=2, initializer=_noop, initargs=())) == [
+        value * value for value in range(20)
+    ]
@@ -1,5 +1,6 @@
 """Unit tests for the FLTK plumbing module."""
 
+import io
 import sys
 import types
 from pathlib import Path
@@ -28,6 +29,7 @@ from fltk.plumbing import (
     parse_grammar_file,
     parse_text,
     render_doc,
+    render_doc_to,
     unparse_cst,
 )
 from fltk.plumbing_types import UnparserResult
@@ -735,6 +737,14 @@ class TestRendering:
         # Should break due to max_width
         assert output == "hello\nworld"
 
+    def test_render_doc_to_writes_what_render_doc_returns(self):
+        """Test streaming a render into a writer."""
+        doc = Concat([Text("hello"), Line(), Text("world")])
+        config = RendererConfig(indent_width=2, max_width=5)
+        out = io.StringIO()
+        render_doc_to(doc, out, config)
+        assert out.getvalue() == render_doc(doc, config)
+
 
 class TestIntegration:
     """Test full pipeline integration."""
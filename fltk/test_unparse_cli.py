@@ -0,0 +1,210 @@
+"""End-to-end tests for the ``unparse`` CLI."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from fltk import unparse_cli
+from fltk.unparse_cli import app
+
+_GRAMMAR = """
+doc := , item+ ;
+item := name:name , ":" , value:name , ";" , ;
+name := name:/[a-z]+/;
+"""
+
+_FORMAT = """
+ws_allowed: nil;
+ws_required: bsp;
+after ":" { bsp; }
+after ";" { hard; }
+
+rule item
+{
+    group;
+}
+"""
+
+_FORMATTED = "a: b;\nc: d;\n"
+
+
+def _write(tmp_path: Path, name: str, text: str) -> Path:
+    path = tmp_path / name
+    path.write_text(text)
+    return path
+
+
+def _specs(tmp_path: Path) -> list[str]:
+    return [str(_write(tmp_path, "lang.fltkg", _GRAMMAR)), str(_write(tmp_path, "lang.fltkfmt", _FORMAT))]
+
+
+def _batch_tree(tmp_path: Path) -> Path:
+    src = tmp_path / "src"
+    (src / "nested").mkdir(parents=True)
+    (src / ".hidden").mkdir()
+    _write(src, "a.kv", "a:b;c:  d;")
+    _write(src, "nested/b.kv", _FORMATTED)
+    _write(src, "nested/c.kv", "a b")
+    _write(src, "skipped.txt", "a:b;")
+    _write(src, ".hidden/d.kv", "a:b;")
+    return src
+
+
+def test_single_file_prints_formatted(tmp_path: Path) -> None:
+    src = _write(tmp_path, "in.kv", "a:b;c:  d;")
+    out = tmp_path / "out.kv"
+
+    printed = CliRunner().invoke(app, [*_specs(tmp_path), str(src)])
+    written = CliRunner().invoke(app, [*_specs(tmp_path), str(src), "-o", str(out)])
+
+    assert printed.exit_code == 0
+    assert printed.stdout == _FORMATTED
+    assert written.exit_code == 0
+    assert out.read_text() == _FORMATTED
+
+
+def test_failed_render_leaves_output_intact(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    src = _write(tmp_path, "in.kv", "a:b;c:  d;")
+    out = _write(tmp_path, "out.kv", "previous")
+    out.chmod(0o640)
+
+    def failing_render(_doc, stream, _config) -> None:
+        stream.write("partial")
+        msg = "render failed"
+        raise RuntimeError(msg)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(unparse_cli.plumbing, "render_doc_to", failing_render)
+        failed = CliRunner().invoke(app, [*_specs(tmp_path), str(src), "-o", str(out)])
+    assert isinstance(failed.exception, RuntimeError)
+    assert out.read_text() == "previous"
+
+    written = CliRunner().invoke(app, [*_specs(tmp_path), str(src), "-o", str(out)])
+    assert written.exit_code == 0
+    assert out.read_text() == _FORMATTED
+    assert out.stat().st_mode & 0o777 == 0o640
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_output_through_a_symlink_replaces_its_target(tmp_path: Path) -> None:
+    src = _write(tmp_path, "in.kv", "a:b;c:  d;")
+    target = _write(tmp_path, "target.kv", "previous")
+    link = tmp_path / "link.kv"
+    link.symlink_to(target)
+
+    result = CliRunner().invoke(app, [*_specs(tmp_path), str(src), "-o", str(link)])
+
+    assert result.exit_code == 0
+    assert link.is_symlink()
+    assert target.read_text() == _FORMATTED
+
+
+def test_batch_directory_headers_each_file_and_reports_failures(tmp_path: Path) -> None:
+    src = _batch_tree(tmp_path)
+
+    result = CliRunner().invoke(app, [*_specs(tmp_path), str(src), "--suffix", ".kv"])
+
+    # The broken file fails the run but does not stop it; dot-directories and other suffixes
+    # are skipped.
+    assert result.exit_code == 1
+    assert result.stdout == f"==> {src / 'a.kv'} <==\n{_FORMATTED}==> {src / 'nested' / 'b.kv'} <==\n{_FORMATTED}"
+    assert result.stderr.startswith(f"{src / 'nested' / 'c.kv'}: Failed to parse input")
+
+
+def test_batch_workers_match_in_process(tmp_path: Path) -> None:
+    src = _batch_tree(tmp_path)
+    args = [*_specs(tmp_path), str(src), "--suffix", ".kv"]
+
+    local = CliRunner().invoke(app, args)
+    pooled = CliRunner().invoke(app, [*args, "--jobs", "2"])
+
+    assert pooled.exit_code == local.exit_code == 1
+    assert pooled.stdout == local.stdout
+    assert pooled.stderr == local.stderr
+
+
+def test_check_reports_files_formatting_would_change(tmp_path: Path) -> None:
+    formatted = _write(tmp_path, "formatted.kv", _FORMATTED)
+    unformatted = _write(tmp_path, "unformatted.kv", "a:b;c:  d;")
+
+    clean = CliRunner().invoke(app, [*_specs(tmp_path), str(formatted), "--check"])
+    dirty = CliRunner().invoke(app, [*_specs(tmp_path), str(formatted), str(unformatted), "--check"])
+
+    assert clean.exit_code == 0
+    assert dirty.exit_code == 1
+    assert dirty.stdout == ""
+    assert dirty.stderr == f"would reformat {unformatted}\n"
+    assert unformatted.read_text() == "a:b;c:  d;"
+
+
+def test_in_place_rewrites_changed_files(tmp_path: Path) -> None:
+    src = _write(tmp_path, "in.kv", "a:b;c:  d;")
+
+    rewritten = CliRunner().invoke(app, [*_specs(tmp_path), str(src), "--in-place"])
+    checked = CliRunner().invoke(app, [*_specs(tmp_path), str(src), "--check"])
+
+    assert rewritten.exit_code == 0
+    assert rewritten.stderr == f"reformatted {src}\n"
+    assert src.read_text() == _FORMATTED
+    assert checked.exit_code == 0
+
+
+def test_failed_in_place_write_leaves_source_intact(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    src = _write(tmp_path, "in.kv", "a:b;c:  d;")
+    # A lone surrogate cannot be encoded, so the write fails after the output file is opened.
+    monkeypatch.setattr(unparse_cli._Pipeline, "format", lambda _self, _text, **_options: "a: b;\ud800")
+
+    result = CliRunner().invoke(app, [*_specs(tmp_path), str(src), "--in-place"])
+
+    assert result.exit_code == 1
+    assert result.stderr.startswith("Error: ")
+    assert src.read_text() == "a:b;c:  d;"
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_cache_skips_files_known_to_be_formatted(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    formatted = _write(tmp_path, "formatted.kv", _FORMATTED)
+    unformatted = _write(tmp_path, "unformatted.kv", "a:b;c:  d;")
+    cache = tmp_path / "cache" / "formatted.json"
+    args = [*_specs(tmp_path), str(formatted), str(unformatted), "--check", "--cache", str(cache)]
+
+    first = CliRunner().invoke(app, args)
+    # Only the content formatting left unchanged is recorded.
+    assert first.exit_code == 1
+    assert len(json.loads(cache.read_text())["formatted"]) == 1
+
+    formatted_texts: list[str] = []
+    original_format = unparse_cli._Pipeline.format
+
+    def counting_format(self, text: str, *, jobs: int = 1) -> str:
+        formatted_texts.append(text)
+        return original_format(self, text, jobs=jobs)
+
+    monkeypatch.setattr(unparse_cli._Pipeline, "format", counting_format)
+    second = CliRunner().invoke(app, args)
+    assert second.exit_code == 1
+    assert second.stderr == f"would reformat {unformatted}\n"
+    assert formatted_texts == ["a:b;c:  d;"]
+
+    # Another width is another fingerprint: nothing recorded under the old one applies.
+    formatted_texts.clear()
+    CliRunner().invoke(app, [*args, "--width", "40"])
+    assert formatted_texts == [_FORMATTED, "a:b;c:  d;"]
+
+
+@pytest.mark.parametrize(
+    "extra",
+    [["--check", "--in-place"], ["--jobs", "0"], ["--in-place", "-o", "out.kv"]],
+)
+def test_conflicting_options_exit_1(tmp_path: Path, extra: list[str]) -> None:
+    src = _write(tmp_path, "in.kv", _FORMATTED)
+
+    result = CliRunner().invoke(app, [*_specs(tmp_path), str(src), *extra])
+
+    assert result.exit_code == 1
+    assert result.stderr.startswith("Error: ")
+    assert src.read_text() == _FORMATTED
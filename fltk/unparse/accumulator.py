@@ -1,7 +1,7 @@
-"""DocAccumulator that prevents consecutive trivia nodes."""
+"""Document accumulators that prevent consecutive trivia nodes."""
 
 from dataclasses import dataclass, replace
-from typing import Optional
+from typing import NamedTuple, Optional
 
 from fltk.unparse.combinators import NIL, Concat, Doc, Group, Join, Nest, concat
 
@@ -124,3 +124,154 @@ class DocAccumulator:
             current = current.tail
         docs.reverse()
         return concat(docs) if docs else NIL
+
+
+class Checkpoint(NamedTuple):
+    """A :class:`DocBuilder` state to roll back to: doc count, trivia flag, and open levels.
+
+    ``top`` is the serial number of the innermost level open when the checkpoint was taken
+    (``-1`` for none), so a rollback can tell that level is still the same one.
+    """
+
+    size: int
+    last_was_trivia: bool
+    depth: int
+    top: int
+
+
+class DocBuilder:
+    """Mutable document accumulator: the :class:`DocAccumulator` API over one growing list.
+
+    Every mutator appends in place and returns ``self``, so generated code that threads
+    ``accumulator = accumulator.add_trivia(...)`` works unchanged, but nothing is allocated
+    per added doc. Since every holder shares the one list, an attempt whose output must be
+    discarded (a failed alternative, an absent optional item) is undone explicitly: take a
+    :meth:`checkpoint` before it and :meth:`rollback` to it afterwards.
+
+    Each open nesting level is a ``(start, nesting_doc, serial)`` entry: popping it wraps the
+    docs from ``start`` on and replaces them with the wrapped doc.
+    """
+
+    __slots__ = ("_levels", "_serial", "docs", "last_was_trivia")
+
+    def __init__(self) -> None:
+        self.docs: list[Doc] = []
+        self.last_was_trivia = False
+        self._levels: list[tuple[int, Doc, int]] = []
+        self._serial = 0
+
+    def add_non_trivia(self, doc: Doc) -> "DocBuilder":
+        """Add non-trivia content"""
+        self.docs.append(doc)
+        self.last_was_trivia = False
+        return self
+
+    def add_trivia(self, doc: Doc) -> "DocBuilder":
+        """Add trivia content"""
+        self.docs.append(doc)
+        self.last_was_trivia = True
+        return self
+
+    def add_accumulator(self, other: "DocBuilder") -> "DocBuilder":
+        """Merge another builder, preserving its trivia state.
+
+        This only works with an already-flattened builder with no open nesting levels.
+        """
+        if other._levels:
+            msg = f"Attempt to merge a non-flattened accumulator: {other}"
+            raise RuntimeError(msg)
+        other_doc = other.doc
+        self.docs.append(other_doc)
+        if other_doc != NIL:
+            self.last_was_trivia = other.last_was_trivia
+        return self
+
+    def push_group(self) -> "DocBuilder":
+        """Start a new group nesting level"""
+        return self._push(Group(NIL))
+
+    def push_nest(self, indent: int) -> "DocBuilder":
+        """Start a new nest nesting level"""
+        return self._push(Nest(content=NIL, indent=indent))
+
+    def push_join(self, separator: Doc) -> "DocBuilder":
+        """Start a new join nesting level"""
+        return self._push(Join(docs=(), separator=separator))
+
+    def pop_group(self) -> "DocBuilder":
+        nesting_doc = self._levels[-1][1] if self._levels else None
+        if not isinstance(nesting_doc, Group):
+            msg = f"Improperly nested tree: Expected Group but have {type(nesting_doc)}"
+            raise RuntimeError(msg)
+        return self._pop()
+
+    def pop_nest(self) -> "DocBuilder":
+        nesting_doc = self._levels[-1][1] if self._levels else None
+        if not isinstance(nesting_doc, Nest):
+            msg = f"Improperly nested tree: Expected Nest but have {type(nesting_doc)}"
+            raise RuntimeError(msg)
+        return self._pop()
+
+    def pop_join(self) -> "DocBuilder":
+        nesting_doc = self._levels[-1][1] if self._levels else None
+        if not isinstance(nesting_doc, Join):
+            msg = f"Improperly nested tree: Expected Join but have {type(nesting_doc)}"
+            raise RuntimeError(msg)
+        return self._pop()
+
+    def _push(self, nesting_doc: Doc) -> "DocBuilder":
+        self._serial += 1
+        self._levels.append((len(self.docs), nesting_doc, self._serial))
+        self.last_was_trivia = False
+        return self
+
+    def _pop(self) -> "DocBuilder":
+        """End the current nesting level, replacing its docs with the wrapped content"""
+        start, nesting_doc, _serial = self._levels.pop()
+        content = self.docs[start:]
+        del self.docs[start:]
+        if isinstance(nesting_doc, Join):
+            # Join wants the level's docs themselves, flattened as concat would.
+            flat = concat(content) if content else NIL
+            if isinstance(flat, Concat):
+                docs = flat.docs
+            elif flat != NIL:
+                docs = (flat,)
+            else:
+                docs = ()
+            wrapped = replace(nesting_doc, docs=tuple(docs))
+        else:
+            wrapped = replace(nesting_doc, content=concat(content) if content else NIL)
+        # The popped level's trivia state carries over to the parent, as in DocAccumulator.
+        self.docs.append(wrapped)
+        return self
+
+    def checkpoint(self) -> Checkpoint:
+        """The current state, for a later :meth:`rollback`."""
+        levels = self._levels
+        return Checkpoint(len(self.docs), self.last_was_trivia, len(levels), levels[-1][2] if levels else -1)
+
+    def rollback(self, mark: Checkpoint) -> "DocBuilder":
+        """Discard everything added since ``mark`` was taken.
+
+        Levels pushed since ``mark`` are dropped with their content. Raises ``RuntimeError``
+        when a level that was open at ``mark`` has been popped since: its content was folded
+        into a wrapper and cannot be restored.
+        """
+        levels = self._levels
+        if len(levels) < mark.depth or (mark.depth and levels[mark.depth - 1][2] != mark.top):
+            msg = "Cannot roll back: a nesting level open at the checkpoint has since been closed"
+            raise RuntimeError(msg)
+        del levels[mark.depth :]
+        del self.docs[mark.size :]
+        self.last_was_trivia = mark.last_was_trivia
+        return self
+
+    @property
+    def doc(self) -> Doc:
+        """Build the doc for the innermost open level (the whole builder when none is open)"""
+        docs = self.docs[self._levels[-1][0] :] if self._levels else self.docs
+        return concat(docs) if docs else NIL
+
+    def __repr__(self) -> str:
+        return f"DocBuilder(docs={self.docs!r}, last_was_trivia={self.last_was_trivia!r}, levels={self._levels!r})"
@@ -0,0 +1,127 @@
+"""Head tests that let a generated unparser skip alternatives that cannot match.
+
+A rule (or sub-expression) with several alternatives is unparsed by trying each alternative in
+order until one accepts the node, and a failed attempt may walk deep into the children before
+it gives up.  Most alternatives, though, are decided by the child at their start position: an
+alternative whose first consumed item is ``add:add`` matches only when that child carries the
+``add`` label.  ``head_test`` derives that necessary condition from the grammar, and both
+unparser generators (Python and Rust) read it from this one implementation to guard each trial
+with a check on the head child.
+
+A head test is a necessary condition only.  A guarded alternative is still tried in grammar
+order and may still fail, so the first alternative that succeeds is the same one the unguarded
+trial would pick.  When the tests are disjoint, exactly one guard passes and dispatch goes
+straight to the only alternative that can match.
+
+The grammar must have had its INLINE items expanded.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+from collections.abc import Sequence
+
+from fltk.fegen import gsm
+from fltk.fegen.grammar_shape import MIN_ALTERNATIVES, TEXT_KIND, child_kind
+
+_WS_SEPARATORS = (gsm.Separator.WS_REQUIRED, gsm.Separator.WS_ALLOWED)
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class HeadTest:
+    """What the child at an alternative's start position must look like for it to match.
+
+    The child carries one of ``labels`` or is of one of ``kinds`` (a rule name, or
+    ``TEXT_KIND`` for a span).  Without such a child, or with no child at all, the alternative
+    fails.  Both tuples are in grammar order with duplicates removed, so generated code is
+    stable across runs.
+    """
+
+    labels: tuple[str, ...]
+    kinds: tuple[str, ...]
+
+
+@dataclasses.dataclass(slots=True)
+class _Head:
+    labels: list[str] = dataclasses.field(default_factory=list)
+    kinds: list[str] = dataclasses.field(default_factory=list)
+
+    def add_label(self, label: str) -> None:
+        if label not in self.labels:
+            self.labels.append(label)
+
+    def add_kind(self, kind: str) -> None:
+        if kind not in self.kinds:
+            self.kinds.append(kind)
+
+
+def _collect_items(items: gsm.Items, head: _Head, trivia_kind: str) -> bool | None:
+    """Add the shapes ``items`` can start with to ``head``; True when it can consume nothing.
+
+    ``None`` means the start cannot be described, and no test applies.
+    """
+    if items.initial_sep in _WS_SEPARATORS:
+        head.add_kind(trivia_kind)
+    for idx, item in enumerate(items.items):
+        term_nullable = _collect_item(item, head, trivia_kind)
+        if term_nullable is None:
+            return None
+        if not (term_nullable or item.quantifier.is_optional()):
+            return False
+        if idx < len(items.sep_after) and items.sep_after[idx] in _WS_SEPARATORS:
+            head.add_kind(trivia_kind)
+    return True
+
+
+def _collect_item(item: gsm.Item, head: _Head, trivia_kind: str) -> bool | None:
+    """Add the shapes one occurrence of ``item`` can start with; True when it consumes nothing."""
+    if item.disposition == gsm.Disposition.SUPPRESS:
+        return True
+    if item.disposition != gsm.Disposition.INCLUDE:
+        # An INLINE literal is emitted from the grammar without a child; anything else
+        # inlined is rejected by the generators.
+        return True if isinstance(item.term, gsm.Literal) else None
+    if isinstance(item.term, Sequence):
+        nullable = False
+        for alternative in item.term:
+            alt_nullable = _collect_items(alternative, head, trivia_kind)
+            if alt_nullable is None:
+                return None
+            nullable = nullable or alt_nullable
+        return nullable
+    if not isinstance(item.term, gsm.Identifier | gsm.Literal | gsm.Regex):
+        return None
+    # An item checks the label only when it has one, so an unlabeled item is told by kind.
+    if item.label is not None:
+        head.add_label(item.label)
+    else:
+        head.add_kind(child_kind(item.term))
+    return False
+
+
+def head_test(items: gsm.Items, *, trivia_rule: bool) -> HeadTest | None:
+    """The head test for one alternative, or ``None`` when none applies.
+
+    No test applies when the alternative can match without consuming a child.  A WS separator
+    before the first consumed item admits a trivia child there: a ``Trivia`` node in a regular
+    rule, an unlabeled whitespace span in a trivia rule (``trivia_rule``).
+    """
+    head = _Head()
+    nullable = _collect_items(items, head, TEXT_KIND if trivia_rule else gsm.TRIVIA_RULE_NAME)
+    if nullable is None or nullable:
+        return None
+    return HeadTest(labels=tuple(head.labels), kinds=tuple(head.kinds))
+
+
+def dispatch_tests(alternatives: Sequence[gsm.Items], *, trivia_rule: bool) -> list[HeadTest | None] | None:
+    """Per-alternative head tests, or ``None`` when guarding the trials would skip nothing.
+
+    That is the case for a single alternative, and when every alternative has the same test
+    (or none), since every guard then passes or fails together.
+    """
+    if len(alternatives) < MIN_ALTERNATIVES:
+        return None
+    tests = [head_test(alternative, trivia_rule=trivia_rule) for alternative in alternatives]
+    if all(test == tests[0] for test in tests):
+        return None
+    return tests
@@ -0,0 +1,90 @@
+"""Scaling benchmark for :class:`~fltk.unparse.renderer.Renderer`.
+
+Renders synthetic documents of doubling size -- each line a group of nested, soft-broken items,
+some too wide for the line and some not -- and reports the time per output line at every size.
+A linear renderer keeps that figure flat as the document grows; a quadratic one doubles it with
+every step.
+
+Usage:
+
+    bazel run //:bench_renderer -- [--lines 100000] [--steps 4] [--width 80]
+
+The largest document has ``--lines`` lines; each smaller one has half the lines of the next.
+Exit code is 0 unless ``--max-slowdown`` is given and the per-line time of the largest document
+exceeds that multiple of the smallest's.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+from fltk.unparse.combinators import Doc, concat, group, hardline, line, nest, softline, text
+from fltk.unparse.renderer import Renderer, RendererConfig
+
+
+def build_document(lines: int) -> Doc:
+    """A document rendering to roughly ``lines`` lines at width 80.
+
+    Every fourth statement is too wide to fit and breaks its argument list, one argument per line,
+    so the document exercises both the flat and the broken paths of group fitting.
+    """
+    statements: list[Doc] = []
+    produced = 0
+    index = 0
+    while produced < lines:
+        wide = index % 4 == 0
+        arguments = [text(f"argument_number_{k}_of_call_{index}" if wide else f"a{k}") for k in range(3)]
+        separated: list[Doc] = []
+        for k, argument in enumerate(arguments):
+            if k:
+                separated.extend([text(","), line()])
+            separated.append(argument)
+        call = group(
+            concat([text(f"call_{index}("), nest(1, concat([softline(), *separated])), softline(), text(");")])
+        )
+        statements.extend([call, hardline()])
+        produced += 5 if wide else 1
+        index += 1
+    return concat(statements)
+
+
+def measure(lines: int, config: RendererConfig) -> tuple[int, float]:
+    """Render a ``lines``-line document once; return its actual line count and the seconds taken."""
+    doc = build_document(lines)
+    renderer = Renderer(config)
+    started = time.perf_counter()
+    output = renderer.render(doc)
+    return output.count("\n"), time.perf_counter() - started
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=100_000, help="Lines in the largest document")
+    parser.add_argument("--steps", type=int, default=4, help="Number of document sizes, halving each time")
+    parser.add_argument("--width", type=int, default=80, help="Renderer max width")
+    parser.add_argument(
+        "--max-slowdown",
+        type=float,
+        default=None,
+        help="Fail if the largest document's time per line exceeds this multiple of the smallest's",
+    )
+    args = parser.parse_args(argv)
+
+    config = RendererConfig(max_width=args.width, indent_width=4)
+    sizes = [max(1, args.lines >> shift) for shift in reversed(range(args.steps))]
+    per_line: list[float] = []
+    for size in sizes:
+        produced, seconds = measure(size, config)
+        per_line.append(seconds / max(produced, 1))
+        sys.stdout.write(f"{produced:>9} lines  {seconds:8.3f} s  {per_line[-1] * 1e6:8.2f} us/line\n")
+    slowdown = per_line[-1] / per_line[0] if per_line[0] > 0 else 1.0
+    sys.stdout.write(f"per-line slowdown, largest vs smallest: {slowdown:.2f}x\n")
+    if args.max_slowdown is not None and slowdown > args.max_slowdown:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
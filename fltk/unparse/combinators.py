@@ -1,5 +1,6 @@
 """Pretty-printing combinators for FLTK formatter."""
 
+import weakref
 from abc import ABC, abstractmethod
 from collections.abc import Sequence
 from dataclasses import dataclass
@@ -16,15 +17,26 @@ class Doc(ABC):
         pass
 
 
-@dataclass(slots=True, frozen=True)
+@dataclass(frozen=True)
 class Text(Doc):
-    """Literal text content."""
+    """Literal text content.
+
+    Build these with :func:`text`, which shares one node between equal contents.  The slots are
+    spelled out, rather than left to ``slots=True``, to make room for the weak reference the
+    sharing needs.
+    """
+
+    __slots__ = ("__weakref__", "content")
 
     content: str
 
     def __repr__(self) -> str:
         return f"Text({self.content!r})"
 
+    def __reduce__(self) -> tuple:
+        # Frozen slots defeat the default unpickling, which assigns each slot
+        return (text, (self.content,))
+
 
 @dataclass(slots=True, frozen=True)
 class Comment(Doc):
@@ -139,10 +151,29 @@ NBSP: Final = Nbsp()
 SOFTLINE: Final = SoftLine()
 
 
+# Live Text nodes by content, so repeated tokens share one node; an entry goes with its node.
+_TEXT_NODES: Final[dict[str, weakref.KeyedRef]] = {}
+# Longer contents (comments, string literals) rarely repeat, and are not worth an entry
+_MAX_SHARED_TEXT: Final = 64
+
+
+def _drop_text_node(ref: weakref.KeyedRef) -> None:
+    if _TEXT_NODES.get(ref.key) is ref:
+        del _TEXT_NODES[ref.key]
+
+
 # Helper functions for building combinators
 def text(s: str) -> Text:
-    """Create a text node."""
-    return Text(s)
+    """Create a text node, reusing the live node for ``s`` if there is one."""
+    ref = _TEXT_NODES.get(s)
+    if ref is not None:
+        node = ref()
+        if node is not None:
+            return node
+    node = Text(s)
+    if len(s) <= _MAX_SHARED_TEXT:
+        _TEXT_NODES[s] = weakref.KeyedRef(node, _drop_text_node, s)
+    return node
 
 
 def line() -> Line:
@@ -19,11 +19,11 @@ from fltk.unparse.combinators import (
     SOFTLINE,
     Doc,
     HardLine,
-    Text,
     concat,
     group,
     join,
     nest,
+    text,
 )
 
 
@@ -449,7 +449,7 @@ def _doc_literal_cst_to_doc(doc_literal: fmt_cst.DocLiteral, terminal_src: Termi
     text_literal = doc_literal.maybe_text_literal()
     if text_literal:
         text_value = _extract_literal_text(text_literal.child_text(), terminal_src)
-        return Text(text_value)
+        return text(text_value)
 
     spacing = doc_literal.maybe_spacing()
     if spacing:
@@ -3,22 +3,29 @@
 from __future__ import annotations
 
 import ast
-from collections.abc import Sequence
+from collections.abc import Callable, Sequence
 from dataclasses import dataclass
 from typing import TYPE_CHECKING, Final
 
+from fltk import pygen
 from fltk.fegen import gsm, naming
+from fltk.fegen.grammar_shape import TEXT_KIND
 from fltk.iir import model as iir
+from fltk.iir.py import compiler
 from fltk.iir.py import reg as pyreg
+from fltk.unparse.alt_dispatch import HeadTest, dispatch_tests
 from fltk.unparse.combinators import (
     HARDLINE,
     LINE,
     NBSP,
     NIL,
     SOFTLINE,
+    AfterSpec,
+    BeforeSpec,
     Concat,
     Doc,
     HardLine,
+    SeparatorSpec,
     Text,
 )
 from fltk.unparse.fmt_config import FormatterConfig, ItemSelector, Normal, Omit, OperationType, RenderAs
@@ -42,6 +49,8 @@ class UnparserGenerator:
         context: CompilerContext,
         cst_module: str,
         formatter_config: FormatterConfig | None = None,
+        *,
+        mutable_accumulator: bool = False,
     ):
         # A labeled literal whose spelling cannot survive the round trip is refused before any
         # emission, so the diagnostic names the grammar rather than surfacing as wrong output.
@@ -51,6 +60,10 @@ class UnparserGenerator:
         self.context = context
         self.cst_module = cst_module
         self.formatter_config = formatter_config or FormatterConfig()
+        # Emit code against the mutable DocBuilder (rolled back to a checkpoint wherever a
+        # failed or discarded attempt must leave no trace) instead of the immutable
+        # DocAccumulator (where keeping the prior value is the rollback).
+        self.mutable_accumulator = mutable_accumulator
 
         self._setup_type_system()
 
@@ -65,6 +78,10 @@ class UnparserGenerator:
         # Track unparsers by path
         self.unparsers: dict[tuple[str, ...], UnparserGenerator.UnparserFn] = {}
 
+        # Docs fixed at generation time (literal text, spacing, spacing specs), built once as
+        # module-level constants rather than on every token: doc -> (name, initializer)
+        self._doc_constants: dict[Doc, tuple[str, iir.Expr]] = {}
+
         for rule in grammar.rules:
             rule_name = rule.name
             self._make_unparser_info(path=(rule_name,), result_type=self.maybe_unparse_result_type)
@@ -108,14 +125,24 @@ class UnparserGenerator:
         )
         self.context.python_type_registry.register_type(doc_list_type_info)
 
-        self.doc_accumulator_type = iir.Type.make(cname="DocAccumulator")
+        self.doc_accumulator_name = "DocBuilder" if self.mutable_accumulator else "DocAccumulator"
+        self.doc_accumulator_type = iir.Type.make(cname=self.doc_accumulator_name)
         doc_accumulator_type_info = pyreg.TypeInfo(
             typ=self.doc_accumulator_type,
             module=pyreg.Module(("fltk", "unparse", "accumulator")),
-            name="DocAccumulator",
+            name=self.doc_accumulator_name,
         )
         self.context.python_type_registry.register_type(doc_accumulator_type_info)
 
+        self.checkpoint_type = iir.Type.make(cname="Checkpoint")
+        if self.mutable_accumulator:
+            checkpoint_type_info = pyreg.TypeInfo(
+                typ=self.checkpoint_type,
+                module=pyreg.Module(("fltk", "unparse", "accumulator")),
+                name="Checkpoint",
+            )
+            self.context.python_type_registry.register_type(checkpoint_type_info)
+
         self.after_spec_type = iir.Type.make(cname="AfterSpec")
         after_spec_type_info = pyreg.TypeInfo(
             typ=self.after_spec_type,
@@ -221,7 +248,7 @@ class UnparserGenerator:
             typ=self.doc_accumulator_type,
             ref_type=iir.RefType.VALUE,
             mutable=True,
-            init=accumulator_module.method.DocAccumulator.call(),
+            init=accumulator_module.method[self.doc_accumulator_name].call(),
         )
 
         start_anchor = self.formatter_config.get_anchor_config(rule_name, "before", ItemSelector.RULE_START, "")
@@ -362,6 +389,27 @@ class UnparserGenerator:
         if_failed = method.block.if_(iir.LogicalNegation(operand=result_var.load()))
         if_failed.block.return_(iir.LiteralNull())
 
+    def _checkpoint(self, block: iir.Block, accumulator_var: iir.Var, name: str) -> iir.Var | None:
+        """Record the accumulator's state before an attempt that may have to be undone.
+
+        Only a mutable accumulator needs this; with the immutable one the caller simply keeps
+        using the prior value, so nothing is emitted and ``None`` is returned.
+        """
+        if not self.mutable_accumulator:
+            return None
+        return block.var(
+            name=name,
+            typ=self.checkpoint_type,
+            ref_type=iir.RefType.VALUE,
+            mutable=False,
+            init=accumulator_var.load().method.checkpoint.call(),
+        )
+
+    def _rollback(self, block: iir.Block, accumulator_var: iir.Var, checkpoint_var: iir.Var | None) -> None:
+        """Undo everything added to the accumulator since ``checkpoint_var`` (if one was taken)."""
+        if checkpoint_var is not None:
+            block.assign(accumulator_var.store(), accumulator_var.load().method.rollback.call(checkpoint_var.load()))
+
     def _extract_result_accumulator(self, result_var: iir.Var) -> iir.Expr:
         """Extract the accumulator from an UnparseResult (assumes it's not None)."""
         return result_var.load().fld.accumulator.load()
@@ -437,17 +485,47 @@ class UnparserGenerator:
             elif doc.blank_lines == 1:
                 return combinators.fld["HARDLINE_BLANK"].load()
             else:
-                return combinators.method.hardline.call(iir.LiteralInt(typ=iir.IndexInt, value=doc.blank_lines))
+                return self._doc_constant(
+                    doc,
+                    lambda: combinators.method.hardline.call(iir.LiteralInt(typ=iir.IndexInt, value=doc.blank_lines)),
+                )
         elif isinstance(doc, Text):
-            return combinators.method.text.call(iir.LiteralString(doc.content))
+            return self._doc_constant(doc, lambda: combinators.method.text.call(iir.LiteralString(doc.content)))
         elif isinstance(doc, Concat):
-            doc_exprs = [self._doc_to_combinator_expr(d) for d in doc.docs]
-            list_expr = iir.LiteralSequence(values=doc_exprs)
-            return combinators.method.concat.call(list_expr)
+            return self._doc_constant(
+                doc,
+                lambda: combinators.method.concat.call(
+                    iir.LiteralSequence(values=[self._doc_to_combinator_expr(d) for d in doc.docs])
+                ),
+            )
         else:
             msg = f"Unknown Doc type: {doc}"
             raise ValueError(msg)
 
+    def _doc_constant(self, doc: Doc, build: Callable[[], iir.Expr]) -> iir.Expr:
+        """Load the module-level constant holding ``doc``, defining it with ``build()`` on first use.
+
+        Docs are immutable, so every token that emits the same fixed doc can share one node.
+        """
+        entry = self._doc_constants.get(doc)
+        if entry is None:
+            # Build first: the initializer may define the constants it refers to
+            init = build()
+            entry = self._doc_constants[doc] = (f"_DOC_{len(self._doc_constants)}", init)
+        return iir.VarByName(
+            name=entry[0],
+            typ=self.doc_type,
+            ref_type=iir.RefType.BORROW,
+            mutable=False,
+        ).load()
+
+    def module_constants(self) -> list[ast.stmt]:
+        """The module-level assignments of the constants the generated methods refer to."""
+        return [
+            pygen.stmt(f"{name} = {compiler.compile_expr(init, self.context)}")
+            for name, init in self._doc_constants.values()
+        ]
+
     def _capped_hardline_expr(self, newline_count: iir.Expr, cap: int) -> iir.Expr:
         """Build ``hardline(capped_blank_lines(<newline_count>, <cap>))``.
 
@@ -463,20 +541,16 @@ class UnparserGenerator:
 
     def _create_after_spec(self, spacing: Doc) -> iir.Expr:
         """Create an AfterSpec control node."""
-        self._get_combinators_module()
-        spacing_expr = self._doc_to_combinator_expr(spacing)
-        return iir.Construct.make(
-            self.after_spec_type,
-            spacing=spacing_expr,
+        return self._doc_constant(
+            AfterSpec(spacing=spacing),
+            lambda: iir.Construct.make(self.after_spec_type, spacing=self._doc_to_combinator_expr(spacing)),
         )
 
     def _create_before_spec(self, spacing: Doc) -> iir.Expr:
         """Create a BeforeSpec control node."""
-        self._get_combinators_module()
-        spacing_expr = self._doc_to_combinator_expr(spacing)
-        return iir.Construct.make(
-            self.before_spec_type,
-            spacing=spacing_expr,
+        return self._doc_constant(
+            BeforeSpec(spacing=spacing),
+            lambda: iir.Construct.make(self.before_spec_type, spacing=self._doc_to_combinator_expr(spacing)),
         )
 
     def _create_separator_spec(
@@ -489,8 +563,25 @@ class UnparserGenerator:
         """Create a SeparatorSpec control node.
 
         ``spacing`` is either a generation-time ``Doc``, an already-built expression for a
-        runtime-computed spacing, or ``None`` for no spacing.
+        runtime-computed spacing, or ``None`` for no spacing.  A spec fixed at generation time
+        is a module-level constant.
         """
+        if not isinstance(spacing, iir.Expr) and (
+            preserved_trivia is None or isinstance(preserved_trivia, iir.LiteralNull)
+        ):
+            return self._doc_constant(
+                SeparatorSpec(spacing=spacing, preserved_trivia=None, required=required),
+                lambda: self._construct_separator_spec(spacing=spacing, preserved_trivia=None, required=required),
+            )
+        return self._construct_separator_spec(spacing=spacing, preserved_trivia=preserved_trivia, required=required)
+
+    def _construct_separator_spec(
+        self,
+        *,
+        spacing: Doc | iir.Expr | None,
+        preserved_trivia: iir.Expr | None,
+        required: bool,
+    ) -> iir.Expr:
         if spacing is None:
             spacing_expr: iir.Expr = iir.LiteralNull()
         elif isinstance(spacing, iir.Expr):
@@ -545,7 +636,6 @@ class UnparserGenerator:
         """
         pos_var = method.get_param("pos")
         accumulator_param = method.get_param("accumulator")
-        combinators = self._get_combinators_module()
 
         if item.quantifier.is_optional():
             # Optional suppressed items: generate nothing - just return the passed accumulator
@@ -555,7 +645,7 @@ class UnparserGenerator:
         elif isinstance(item.term, gsm.Literal):
             # Literals can be regenerated exactly
             literal_text = item.term.value
-            text_call = combinators.method.text.call(iir.LiteralString(literal_text))
+            text_call = self._doc_to_combinator_expr(Text(literal_text))
 
             result_accumulator = accumulator_param.load().method.add_non_trivia.call(text_call)
             result = self._make_unparse_result(result_accumulator, pos_var.load())
@@ -624,6 +714,9 @@ class UnparserGenerator:
 
         while_loop = method.block.while_(loop_condition)
 
+        # A failed occurrence must leave no trace
+        checkpoint_var = self._checkpoint(while_loop.block, accumulator_param, "checkpoint")
+
         # Call inner unparser with current accumulator
         inner_call = (
             iir.SelfExpr()
@@ -655,6 +748,7 @@ class UnparserGenerator:
 
         # On failure, exit loop
         if_failed = while_loop.block.if_(iir.LogicalNegation(operand=result_var.load()))
+        self._rollback(if_failed.block, accumulator_param, checkpoint_var)
         if_failed.block.body.append(iir.Break(parent_block=if_failed.block))
 
         # Check minimum requirements for + quantifier
@@ -796,11 +890,22 @@ class UnparserGenerator:
             pos_var = method.get_param("pos")
             pos_expr = pos_var.load()
 
-        # Try each alternative in order
-        for alt_info in alt_methods:
+        # Try each alternative in order, each from the state the previous one started from,
+        # skipping those whose head test rules out the child at the start position
+        head_tests = dispatch_tests(alternatives, trivia_rule=self.grammar.identifiers[rule_name].is_trivia_rule)
+        guards: list[iir.Expr | None] = [None] * len(alt_methods)
+        if head_tests is not None:
+            guards = self._gen_head_guards(method.block, node_var, pos_expr, rule_name, head_tests)
+        checkpoint_var = self._checkpoint(method.block, accumulator_var, "checkpoint") if len(alt_methods) > 1 else None
+        for alt_idx, alt_info in enumerate(alt_methods):
+            block = method.block
+            if guards[alt_idx] is not None:
+                block = method.block.if_(guards[alt_idx]).block
+            if alt_idx:
+                self._rollback(block, accumulator_var, checkpoint_var)
             alt_call = iir.SelfExpr().method[alt_info.name].call(node_var.load(), pos_expr, accumulator_var.load())
 
-            result_var = method.block.var(
+            result_var = block.var(
                 name=f"result_{alt_info.name.split('__')[-1]}",
                 typ=self.maybe_unparse_result_type,
                 ref_type=iir.RefType.VALUE,
@@ -808,7 +913,7 @@ class UnparserGenerator:
                 init=alt_call,
             )
 
-            if_stmt = method.block.if_(result_var.load())
+            if_stmt = block.if_(result_var.load())
 
             if is_rule_unparser:
                 final_accumulator = self._extract_result_accumulator(result_var)
@@ -839,6 +944,69 @@ class UnparserGenerator:
         method.block.return_(iir.LiteralNull())
         return unparser_info
 
+    def _gen_head_guards(
+        self,
+        block: iir.Block,
+        node_var: iir.Var,
+        pos_expr: iir.Expr,
+        rule_name: str,
+        head_tests: Sequence[HeadTest | None],
+    ) -> list[iir.Expr | None]:
+        """Bind the head child's label and value, and build each alternative's guard from its test.
+
+        An alternative without a test gets ``None`` and is tried unconditionally.  The label and
+        value are bound once (``None`` past the last child) and only when some test reads them.
+        """
+        pyrt_module = self._get_pyrt_module()
+        children = node_var.load().fld.children.load()
+        head_label = head_child = None
+        if any(test is not None and test.labels for test in head_tests):
+            head_label = block.var(
+                name="head_label",
+                typ=iir.Auto,
+                ref_type=iir.RefType.VALUE,
+                mutable=False,
+                init=pyrt_module.method.head_label.call(children, pos_expr),
+            )
+        if any(test is not None and test.kinds for test in head_tests):
+            head_child = block.var(
+                name="head_child",
+                typ=iir.Auto,
+                ref_type=iir.RefType.VALUE,
+                mutable=False,
+                init=pyrt_module.method.head_child.call(children, pos_expr),
+            )
+
+        class_name = self.class_name_for_rule_node(rule_name)
+        guards: list[iir.Expr | None] = []
+        for test in head_tests:
+            if test is None:
+                guards.append(None)
+                continue
+            atoms: list[iir.Expr] = []
+            for label in test.labels:
+                assert head_label is not None
+                label_enum = iir.VarByName(
+                    name=f"{class_name}.Label.{label.upper()}",
+                    typ=iir.Type.make(cname="enum.Enum"),
+                    ref_type=iir.RefType.BORROW,
+                    mutable=False,
+                )
+                atoms.append(iir.BinOp(lhs=head_label.load(), op="==", rhs=label_enum.load()))
+            for kind in test.kinds:
+                assert head_child is not None
+                if kind == TEXT_KIND:
+                    atoms.append(self._make_is_span_check(head_child.load()))
+                elif kind == gsm.TRIVIA_RULE_NAME:
+                    atoms.append(iir.IsInstance(expr=head_child.load(), typ=self._get_trivia_type()))
+                else:
+                    atoms.append(iir.IsInstance(expr=head_child.load(), typ=self.get_node_type_for_rule(kind)))
+            guard = atoms[0]
+            for atom in atoms[1:]:
+                guard = iir.LogicalOr(lhs=guard, rhs=atom)
+            guards.append(guard)
+        return guards
+
     def _get_trivia_type(self) -> iir.Type:
         """Get the Trivia type."""
         if not hasattr(self, "_trivia_type"):
@@ -1694,6 +1862,15 @@ class UnparserGenerator:
             if not isinstance(item_disposition, Omit | RenderAs):
                 self._gen_before_item_spacing(method.block, accumulator_var, grammar_item, rule_name)
 
+            is_required = not grammar_item.quantifier.is_optional()
+            is_normal = isinstance(item_disposition, Normal)
+
+            # An absent optional item must leave no trace, and an Omit/RenderAs item's own
+            # output is always discarded.
+            checkpoint_var = None
+            if not (is_required and is_normal):
+                checkpoint_var = self._checkpoint(method.block, accumulator_var, f"checkpoint_{item_idx}")
+
             item_call = (
                 iir.SelfExpr()
                 .method[item_info.name]
@@ -1708,7 +1885,8 @@ class UnparserGenerator:
                 init=item_call,
             )
 
-            is_required = not grammar_item.quantifier.is_optional()
+            if not is_normal:
+                self._rollback(method.block, accumulator_var, checkpoint_var)
 
             if is_required:
                 self._check_unparse_result(method, unparse_result_var)
@@ -1727,7 +1905,12 @@ class UnparserGenerator:
                     self._gen_after_item_spacing(method.block, accumulator_var, grammar_item, rule_name)
             else:
                 # Optional item - handle None case
-                if_not_none = method.block.if_(unparse_result_var.load())
+                if_not_none = method.block.if_(
+                    unparse_result_var.load(), orelse=is_normal and checkpoint_var is not None
+                )
+                if is_normal and checkpoint_var is not None:
+                    assert isinstance(if_not_none.orelse, iir.Block)
+                    self._rollback(if_not_none.orelse, accumulator_var, checkpoint_var)
 
                 if_not_none.block.assign(current_pos_var.store(), self._extract_result_pos(unparse_result_var))
 
@@ -1826,8 +2009,7 @@ class UnparserGenerator:
                     method, node_var, pos_var=pos_var, item=item, rule_name=rule_name
                 )
 
-            combinators = self._get_combinators_module()
-            text_call = combinators.method.text.call(iir.LiteralString(literal_text))
+            text_call = self._doc_to_combinator_expr(Text(literal_text))
 
             result_accumulator = method.block.var(
                 name="result_accumulator",
@@ -1927,9 +2109,19 @@ def generate_unparser(
     context: CompilerContext,
     cst_module: str,
     formatter_config: FormatterConfig | None = None,
+    *,
+    mutable_accumulator: bool = False,
 ) -> tuple[iir.ClassType, list]:
-    """Generate complete unparser class and imports for a grammar."""
-    generator = UnparserGenerator(grammar, context, cst_module, formatter_config)
+    """Generate complete unparser class and the module statements that precede it.
+
+    Those are the imports, then the constants for the docs fixed at generation time.
+
+    With ``mutable_accumulator`` the unparser builds its docs in a
+    :class:`~fltk.unparse.accumulator.DocBuilder` instead of a ``DocAccumulator``.
+    """
+    generator = UnparserGenerator(
+        grammar, context, cst_module, formatter_config, mutable_accumulator=mutable_accumulator
+    )
 
     # `from __future__ import annotations` (imports[0]) makes the generated unparser's span-typed
     # annotation (`def _count_newlines(self, span: fltk.fegen.pyrt.span_protocol.SpanProtocol)`) a
@@ -1974,4 +2166,4 @@ def generate_unparser(
         )
     )
 
-    return generator.unparser_class, imports
+    return generator.unparser_class, [*imports, *generator.module_constants()]
@@ -15,6 +15,11 @@ The generated pure-Rust layer links against the pyo3-free runtime crate
 into the emitted method bodies, exactly as the Python ``UnparserGenerator`` does --
 the only runtime inputs to the generated unparser are the CST node and the
 render-time width/indent config.
+
+With ``mutable_accumulator`` the walk builds into a ``DocBuilder`` instead: the same
+API, threaded the same way, but a shared growing ``Vec`` that each attempt whose output
+must be discarded (a failed alternative or occurrence, an absent optional item, an
+``Omit``/``RenderAs`` item) rolls back to a checkpoint taken before it.
 """
 
 from __future__ import annotations
@@ -24,9 +29,11 @@ from collections.abc import Sequence
 from typing import Literal
 
 from fltk.fegen import gsm, naming
+from fltk.fegen.grammar_shape import TEXT_KIND
 from fltk.fegen.gsm2parser_rs import cst_module_import
 from fltk.fegen.gsm2tree_rs import RustCstGenerator
 from fltk.fegen.rust_emit import rust_str_lit
+from fltk.unparse.alt_dispatch import dispatch_tests
 from fltk.unparse.combinators import Concat, Doc, HardLine, Line, Nbsp, Nil, SoftLine, Text
 from fltk.unparse.fmt_config import AnchorConfig, FormatterConfig, ItemSelector, Normal, Omit, OperationType, RenderAs
 from fltk.unparse.literal_labels import check_labeled_literal_texts, spellings_for
@@ -46,6 +53,8 @@ class RustUnparserGenerator:
         formatter_config: FormatterConfig | None = None,
         cst_mod_path: str = "super::cst",
         source_name: str | None = None,
+        *,
+        mutable_accumulator: bool = False,
     ):
         self._cst = RustCstGenerator(grammar)
         # Work from the grammar with trivia rules added and classified.
@@ -55,6 +64,10 @@ class RustUnparserGenerator:
         self._cst_mod_path = cst_mod_path
         # None means "omit the 'from <source_name>' clause" in the header.
         self._source_name: str | None = source_name
+        # Build into a DocBuilder (checkpoint/rollback at every discarded attempt) rather than
+        # thread the persistent DocAccumulator (where keeping the prior clone is the rollback).
+        self._mutable_accumulator = mutable_accumulator
+        self._acc_type = "DocBuilder" if mutable_accumulator else "DocAccumulator"
 
         # Memoized result of generate() — set on first call to prevent double-emit
         # (matching RustParserGenerator.generate).
@@ -186,7 +199,12 @@ class RustUnparserGenerator:
         # python_bindings module (via `super::`), so gate their import behind the `python` feature
         # -- otherwise a python-off build sees them as unused imports (the names stay
         # available to the wrapper).
-        lines.append("use fltk_unparser_core::{DocAccumulator, UnparseResult};")
+        if self._mutable_accumulator:
+            # Every method names plain `UnparseResult`; pin it to the builder once here.
+            lines.append("use fltk_unparser_core::DocBuilder;")
+            lines.append("type UnparseResult = fltk_unparser_core::UnparseResult<DocBuilder>;")
+        else:
+            lines.append("use fltk_unparser_core::{DocAccumulator, UnparseResult};")
         if self._uses_doc_type:
             lines.append("use fltk_unparser_core::Doc;")
         lines.append('#[cfg(feature = "python")]')
@@ -324,7 +342,13 @@ class RustUnparserGenerator:
         rule_name = rule.name
         lines: list[str] = []
         lines.append(f"    pub fn unparse_{rule_name}(&self, node: &cst::{class_name}) -> Option<UnparseResult> {{")
-        lines.append("        let acc = DocAccumulator::new();")
+        if self._mutable_accumulator:
+            # Room for every item of the longest alternative plus a separator after each; a
+            # repetition may still outgrow it.
+            capacity = max((2 * len(alt.items) + 1 for alt in rule.alternatives), default=1)
+            lines.append(f"        let acc = DocBuilder::with_capacity({capacity});")
+        else:
+            lines.append("        let acc = DocAccumulator::new();")
 
         # RULE_START anchors: rebind `acc` through the push operations, in config order.
         start_anchor = self._formatter_config.get_anchor_config(rule_name, "before", ItemSelector.RULE_START, "")
@@ -373,34 +397,95 @@ class RustUnparserGenerator:
                     raise ValueError(msg)
 
         # Dispatch alternatives: clone `acc` for every attempt but the last, which moves it.
-        lines.extend(self._gen_alt_dispatch_loop(f"unparse_{rule_name}", len(rule.alternatives), "0", pop_chain))
+        lines.extend(
+            self._gen_alt_dispatch_loop(
+                f"unparse_{rule_name}", rule_name, class_name, rule.alternatives, start_pos="0", pop_chain=pop_chain
+            )
+        )
         lines.append("    }")
         return "\n".join(lines)
 
-    def _gen_alt_dispatch_loop(self, prefix: str, n_alts: int, start_pos: str, pop_chain: str = "") -> list[str]:
+    def _gen_alt_dispatch_loop(
+        self,
+        prefix: str,
+        rule_name: str,
+        class_name: str,
+        alternatives: Sequence[gsm.Items],
+        *,
+        start_pos: str,
+        pop_chain: str = "",
+    ) -> list[str]:
         """Emit the shared "try each ``{prefix}__alt{N}``, return the first success" dispatch loop.
 
         Shared by :meth:`_gen_rule_entry` (rule entry, ``start_pos="0"``, optional RULE_END
         ``pop_chain``) and :meth:`_gen_alts_dispatch` (a sub-expression's nested ``__alts``
         dispatch, ``start_pos="pos"``, no anchors).  ``acc`` is cloned for every attempt but the
         last, which moves it; the loop ends with the ``None`` all-alternatives-failed
-        fall-through.  When ``pop_chain`` is non-empty the success path rebuilds the result
-        accumulator through the RULE_END pops before returning; otherwise it returns the
-        alternative's result unchanged.
+        fall-through.  A ``DocBuilder`` is rolled back to a checkpoint before every attempt
+        but the first, since a failed one leaves its partial output in the shared buffer.  When
+        ``pop_chain`` is non-empty the success path rebuilds the result accumulator through the
+        RULE_END pops before returning; otherwise it returns the alternative's result unchanged.
+
+        An alternative with a head test (:func:`fltk.unparse.alt_dispatch.dispatch_tests`) is
+        tried only when the child at ``start_pos`` passes it, so an alternative that cannot
+        match costs one ``matches!`` instead of a failed walk.
         """
+        n_alts = len(alternatives)
         lines: list[str] = []
-        for alt_idx in range(n_alts):
+        guards = self._head_guards(rule_name, class_name, alternatives)
+        if any(guards):
+            lines.append(f"        let head = node.children().get({start_pos});")
+        rollback = self._mutable_accumulator and n_alts > 1
+        if rollback:
+            # Each alternative starts from the state the first one saw.
+            lines.append("        let mark = acc.checkpoint();")
+        for alt_idx, guard in enumerate(guards):
+            indent = "        "
+            if guard:
+                lines.append(f"        if {guard} {{")
+                indent += "    "
+            if rollback and alt_idx:
+                lines.append(f"{indent}let acc = acc.rollback(&mark);")
             acc_arg = "acc" if alt_idx == n_alts - 1 else "acc.clone()"
-            lines.append(f"        if let Some(r) = self.{prefix}__alt{alt_idx}(node, {start_pos}, {acc_arg}) {{")
+            lines.append(f"{indent}if let Some(r) = self.{prefix}__alt{alt_idx}(node, {start_pos}, {acc_arg}) {{")
             if pop_chain:
-                lines.append(f"            let acc = r.accumulator{pop_chain};")
-                lines.append("            return Some(UnparseResult::new(acc, r.new_pos));")
+                lines.append(f"{indent}    let acc = r.accumulator{pop_chain};")
+                lines.append(f"{indent}    return Some(UnparseResult::new(acc, r.new_pos));")
             else:
-                lines.append("            return Some(r);")
-            lines.append("        }")
+                lines.append(f"{indent}    return Some(r);")
+            lines.append(f"{indent}}}")
+            if guard:
+                lines.append("        }")
         lines.append("        None")
         return lines
 
+    def _head_guards(self, rule_name: str, class_name: str, alternatives: Sequence[gsm.Items]) -> list[str | None]:
+        """Each alternative's head test as a ``matches!`` on ``head``, or ``None`` when untested.
+
+        A label is matched on the child's label, a kind on its child-enum variant: a rule
+        reference by the referenced rule's variant, a span or trivia-rule whitespace by
+        ``Span``, and a regular rule's trivia by its ``Trivia`` node variant.
+        """
+        rule = self._grammar.identifiers[rule_name]
+        tests = dispatch_tests(alternatives, trivia_rule=rule.is_trivia_rule)
+        if tests is None:
+            return [None] * len(alternatives)
+        label_enum = self._cst.label_enum_name(class_name)
+        child_enum = self._cst.child_enum_name(class_name)
+        guards: list[str | None] = []
+        for test in tests:
+            if test is None:
+                guards.append(None)
+                continue
+            patterns = [
+                f"Some((Some(cst::{label_enum}::{naming.snake_to_upper_camel(label)}), _))" for label in test.labels
+            ]
+            for kind in test.kinds:
+                variant = "Span" if kind == TEXT_KIND else self._class_name(kind)
+                patterns.append(f"Some((_, cst::{child_enum}::{variant}(_)))")
+            guards.append(f"matches!(head, {' | '.join(patterns)})")
+        return guards
+
     def _gen_alternative(self, prefix: str, rule_name: str, class_name: str, alt_idx: int, alt: gsm.Items) -> list[str]:
         """Emit the ``{prefix}__alt{N}`` body method plus one ``{prefix}__alt{N}__item{M}`` per item.
 
@@ -472,7 +557,7 @@ class RustUnparserGenerator:
         node_param = "node" if alt.items else "_node"
         lines.append(
             f"    fn {prefix}__alt{alt_idx}"
-            f"(&self, {node_param}: &cst::{class_name}, pos: usize, acc: DocAccumulator) -> Option<UnparseResult> {{"
+            f"(&self, {node_param}: &cst::{class_name}, pos: usize, acc: {self._acc_type}) -> Option<UnparseResult> {{"
         )
         if not alt.items:
             # Degenerate empty alternative: pass the accumulator/position through unchanged.
@@ -500,12 +585,23 @@ class RustUnparserGenerator:
             lines.extend(self._item_anchor_lines(rule_name, item, "before", "        "))
             if is_normal:
                 lines.extend(self._item_spacing_lines(rule_name, item, "before", "        "))
+            # A DocBuilder shares its buffer with the call, so the prior state survives only
+            # through a checkpoint: roll back to it when an optional item is absent and after
+            # an Omit/RenderAs item, whose own output is discarded.
+            rollback = self._mutable_accumulator and not (is_normal and not item.quantifier.is_optional())
+            if rollback:
+                lines.append("        let mark = acc.checkpoint();")
             if item.quantifier.is_optional():
                 # Optional: always clone acc for the call so an absent optional leaves the prior
                 # accumulator intact; the disposition-dependent merge runs only on the matched path.
                 lines.append(f"        if let Some(r) = self.{item_fn}(node, pos, acc.clone()) {{")
+                if rollback and not is_normal:
+                    lines.append("            acc = acc.rollback(&mark);")
                 lines.append("            pos = r.new_pos;")
                 lines.extend(self._item_disposition_success_lines(rule_name, item, item_disposition, "            "))
+                if rollback:
+                    lines.append("        } else {")
+                    lines.append("            acc = acc.rollback(&mark);")
                 lines.append("        }")
             else:
                 # Required: a Normal item moves acc into the call and reassigns it from the
@@ -513,6 +609,8 @@ class RustUnparserGenerator:
                 # unchanged or rebuild it with the render-as spacing), so it clones acc instead.
                 acc_arg = "acc" if is_normal else "acc.clone()"
                 lines.append(f"        let r = self.{item_fn}(node, pos, {acc_arg})?;")
+                if rollback:
+                    lines.append("        acc = acc.rollback(&mark);")
                 lines.append("        pos = r.new_pos;")
                 lines.extend(self._item_disposition_success_lines(rule_name, item, item_disposition, "        "))
             # Item-level after-anchor push/pop — unconditional (8-space indent), *after* the
@@ -746,7 +844,7 @@ class RustUnparserGenerator:
             (
                 f"    fn {item_prefix}"
                 f"(&self, {node_param}: &cst::{class_name}, pos: usize, acc: "
-                "DocAccumulator) -> Option<UnparseResult> {"
+                f"{self._acc_type}) -> Option<UnparseResult> {{"
             )
         ]
         lines.extend(body)
@@ -822,7 +920,8 @@ class RustUnparserGenerator:
         and stopping at the first occurrence that fails or when the children are exhausted.
         ``acc`` is cloned for each attempt (mirroring the optional-item pattern) so a failed
         occurrence leaves the accumulator at its last-successful value, exactly as the Python
-        backend keeps ``accumulator`` unchanged when the inner returns ``None``.
+        backend keeps ``accumulator`` unchanged when the inner returns ``None`` (a
+        ``DocBuilder`` is rolled back to a checkpoint taken before the attempt instead).
 
         For a ``+`` quantifier (``min() == Arity.ONE``) the loop tracks ``match_count`` and the
         whole item fails (``return None``) when nothing matched, reproducing the Python
@@ -838,7 +937,11 @@ class RustUnparserGenerator:
         if is_plus:
             lines.append("        let mut match_count = 0usize;")
         lines.append("        while current_pos < node.children().len() {")
+        if self._mutable_accumulator:
+            lines.append("            let mark = acc.checkpoint();")
         lines.append(f"            let Some(r) = self.{inner_fn}(node, current_pos, acc.clone()) else {{")
+        if self._mutable_accumulator:
+            lines.append("                acc = acc.rollback(&mark);")
         lines.append("                break;")
         lines.append("            };")
         lines.append("            acc = r.accumulator;")
@@ -873,7 +976,7 @@ class RustUnparserGenerator:
             (
                 f"    fn {inner_prefix}"
                 f"(&self, {node_param}: &cst::{class_name}, pos: usize, acc: "
-                "DocAccumulator) -> Option<UnparseResult> {"
+                f"{self._acc_type}) -> Option<UnparseResult> {{"
             )
         ]
         lines.extend(body)
@@ -938,12 +1041,14 @@ class RustUnparserGenerator:
         ``cst::{class_name}`` node — the sub-expression's children are inlined into the parent.
         """
         alts_prefix = f"{item_prefix}__alts"
-        blocks = [self._gen_alts_dispatch(alts_prefix, class_name, len(alternatives))]
+        blocks = [self._gen_alts_dispatch(alts_prefix, rule_name, class_name, alternatives)]
         for alt_idx, sub_alt in enumerate(alternatives):
             blocks.extend(self._gen_alternative(alts_prefix, rule_name, class_name, alt_idx, sub_alt))
         return blocks
 
-    def _gen_alts_dispatch(self, alts_prefix: str, class_name: str, n_alts: int) -> str:
+    def _gen_alts_dispatch(
+        self, alts_prefix: str, rule_name: str, class_name: str, alternatives: Sequence[gsm.Items]
+    ) -> str:
         """Emit the ``{alts_prefix}`` nested-alternatives dispatch method.
 
         Parallels :meth:`_gen_rule_entry`'s alternative dispatch but for a sub-expression: it
@@ -955,10 +1060,10 @@ class RustUnparserGenerator:
         """
         lines: list[str] = []
         lines.append(
-            f"    fn {alts_prefix}(&self, node: &cst::{class_name}, pos: usize, acc: DocAccumulator) "
+            f"    fn {alts_prefix}(&self, node: &cst::{class_name}, pos: usize, acc: {self._acc_type}) "
             f"-> Option<UnparseResult> {{"
         )
-        lines.extend(self._gen_alt_dispatch_loop(alts_prefix, n_alts, "pos"))
+        lines.extend(self._gen_alt_dispatch_loop(alts_prefix, rule_name, class_name, alternatives, start_pos="pos"))
         lines.append("    }")
         return "\n".join(lines)
 
@@ -32,12 +32,31 @@ class UnparseResult:
         return self.accumulator.doc
 
 
+def _span_source(span: Span, terminals: str) -> str:
+    """The string a Python-backend span's offsets index: its attached source, else ``terminals``.
+
+    The parser attaches the terminals string itself, so reading through it copies nothing. A
+    source-bearing span whose offsets fall outside its source raises, as ``extract_span_text``
+    does for any backend.
+    """
+    source = span.source()
+    if source is None:
+        return terminals
+    if span.start < 0 or span.end < 0 or span.start > span.end or span.end > len(source):
+        msg = f"span offsets out of range for its attached source: {span!r} (source length {len(source)})"
+        raise ValueError(msg)
+    return source
+
+
 def extract_span_text(span: Span, terminals: str) -> str:
     """Extract the text content from a span using the terminals string.
 
     Handles both Python-backend terminalsrc.Span (uses .start/.end slice) and
     Rust-backend fltk._native.Span (uses .text() which carries its own source).
     """
+    # A Python-backend span is sliced directly, without probing for the native surface
+    if type(span) is Span:
+        return _span_source(span, terminals)[span.start : span.end]
     text = span.text() if hasattr(span, "text") else None
     if text is not None:
         return text
@@ -93,8 +112,11 @@ def raise_preserved_trivia_failure(rule_name: str, pos: int) -> NoReturn:
 def count_span_newlines(span: Span, terminals: str) -> int:
     """Count newline characters in a span's text.
 
-    Uses extract_span_text to handle both Python and Rust backends.
+    A Python-backend span is counted in place in its source, without slicing out its text;
+    other backends go through extract_span_text.
     """
+    if type(span) is Span:
+        return _span_source(span, terminals).count("\n", span.start, span.end)
     return extract_span_text(span, terminals).count("\n")
 
 
@@ -165,6 +187,20 @@ def preceding_comment_trailing_newline(children: Sequence[tuple[object, object]]
     return 0 if _is_unicode_whitespace_only(text) else 1
 
 
+def head_label(children: Sequence[tuple[object, object]], pos: int) -> object:
+    """The label of the child at ``pos``, or ``None`` past the last child.
+
+    Read once by a generated alternatives dispatch to pick which alternatives to try; ``None``
+    satisfies no label test, so past the end only alternatives without a test are tried.
+    """
+    return children[pos][0] if pos < len(children) else None
+
+
+def head_child(children: Sequence[tuple[object, object]], pos: int) -> object:
+    """The child at ``pos``, or ``None`` past the last child (the companion of ``head_label``)."""
+    return children[pos][1] if pos < len(children) else None
+
+
 def capped_blank_lines(newline_count: int, cap: int) -> int:
     """Blank lines to emit for a gap holding ``newline_count`` newlines, capped at ``cap``.
 
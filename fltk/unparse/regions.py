@@ -0,0 +1,129 @@
+"""Unparse the top-level regions of a document in worker processes.
+
+A document whose start node is a sequence of independent top-level items (the rules of a
+grammar, the declarations of a schema) spends nearly all of its unparse time inside those
+items.  :func:`unparse_regions` unparses each such child of the start node in a worker
+process, and finishes its Groups and Nests there too (:func:`~fltk.unparse.resolve_specs.prepare_region`).
+The results are recorded on the unparser, so the start rule's own generated method, run
+afterwards in this process as usual, stitches them together. It emits the same separators,
+spacing specs and preserved trivia between them that it always would.  The document, and so
+the rendered text, is byte-for-byte the one the sequential path builds.
+
+Resolving the top-level sequence and rendering stay in this process: spacing resolves across
+region boundaries, and the renderer's column carries from one region into the next.
+
+Workers are forked, so they share the parsed CST and the generated unparser (whose CST module
+exists only in this process) instead of receiving them pickled.  Where ``fork`` is not
+available, the regions are unparsed in-process.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Final
+
+from fltk.fegen import gsm, naming
+from fltk.unparse.combinators import Doc
+from fltk.unparse.pyrt import UnparseResult, is_span
+from fltk.unparse.resolve_specs import prepare_region
+
+# Below two jobs or two regions there is nothing to run side by side
+_MIN_SPLIT: Final = 2
+# Chunks per worker: enough to even out regions of different sizes, few enough to keep the
+# per-task overhead small
+_CHUNKS_PER_JOB: Final = 4
+
+# What a worker sends back for one region: the accumulator type, the prepared doc, whether it
+# ended in trivia, and the new position; None when the region failed to unparse
+_Recorded = tuple[type, Doc, bool, int] | None
+
+# The unparser and the regions of the document being unparsed, inherited by forked workers
+_fork_state: dict[str, Any] = {}
+
+
+def top_level_regions(grammar: gsm.Grammar, cst: Any) -> list[tuple[str, Any]]:
+    """The children of ``cst`` that are nodes of non-trivia rules, each with its rule name."""
+    rule_names = {
+        naming.snake_to_upper_camel(rule.name): rule.name
+        for rule in grammar.rules
+        if isinstance(rule, gsm.Rule) and not rule.is_trivia_rule
+    }
+    regions = []
+    for _label, child in cst.children:
+        rule_name = None if is_span(child) else rule_names.get(type(child).__name__)
+        if rule_name is not None:
+            regions.append((rule_name, child))
+    return regions
+
+
+def _unparse_chunk(chunk: range) -> list[_Recorded]:
+    unparser = _fork_state["unparser"]
+    regions = _fork_state["regions"]
+    recorded: list[_Recorded] = []
+    for index in chunk:
+        rule_name, node = regions[index]
+        result = getattr(unparser, f"unparse_{rule_name}")(node)
+        if result is None:
+            recorded.append(None)
+            continue
+        accumulator = result.accumulator
+        recorded.append(
+            (type(accumulator), prepare_region(accumulator.doc), accumulator.last_was_trivia, result.new_pos)
+        )
+    return recorded
+
+
+def _replaying(
+    method: Callable[[Any], UnparseResult | None], by_span: dict[tuple[int, int], _Recorded]
+) -> Callable[[Any], UnparseResult | None]:
+    """Wrap a rule's unparse method to answer for the recorded nodes from their records.
+
+    A node is found by its span: the parser produces one node per rule and start position, so
+    any node of this rule with a recorded span is the recorded node, or an equal one.
+    """
+
+    def unparse(node: Any) -> UnparseResult | None:
+        key = (node.span.start, node.span.end)
+        if key not in by_span:
+            return method(node)
+        recorded = by_span[key]
+        if recorded is None:
+            return None
+        accumulator_type, doc, last_was_trivia, new_pos = recorded
+        # A fresh accumulator per call: a DocBuilder is mutable, and a failed trial may ask again
+        accumulator = accumulator_type()
+        accumulator = accumulator.add_trivia(doc) if last_was_trivia else accumulator.add_non_trivia(doc)
+        return UnparseResult(accumulator=accumulator, new_pos=new_pos)
+
+    return unparse
+
+
+def unparse_regions(unparser: Any, grammar: gsm.Grammar, cst: Any, *, jobs: int) -> None:
+    """Unparse the top-level regions of ``cst`` across ``jobs`` forked worker processes.
+
+    Each region rule's ``unparse_<rule>`` method on ``unparser`` is then replaced, for this
+    instance only, by one that answers for the region nodes from the workers' results; the
+    caller unparses ``cst`` as usual.  Nothing changes with fewer than two jobs or regions, or
+    without ``fork``.
+    """
+    regions = top_level_regions(grammar, cst)
+    if jobs < _MIN_SPLIT or len(regions) < _MIN_SPLIT or "fork" not in multiprocessing.get_all_start_methods():
+        return
+    chunk_size = -(-len(regions) // (jobs * _CHUNKS_PER_JOB))
+    chunks = [range(start, min(start + chunk_size, len(regions))) for start in range(0, len(regions), chunk_size)]
+    _fork_state.update(unparser=unparser, regions=regions)
+    try:
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(min(jobs, len(chunks)), mp_context=context) as pool:
+            recorded = [record for records in pool.map(_unparse_chunk, chunks) for record in records]
+    finally:
+        _fork_state.clear()
+
+    by_rule: dict[str, dict[tuple[int, int], _Recorded]] = {}
+    for (rule_name, node), record in zip(regions, recorded, strict=True):
+        by_rule.setdefault(rule_name, {})[(node.span.start, node.span.end)] = record
+    for rule_name, by_span in by_rule.items():
+        method_name = f"unparse_{rule_name}"
+        setattr(unparser, method_name, _replaying(getattr(unparser, method_name), by_span))
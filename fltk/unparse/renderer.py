@@ -1,7 +1,11 @@
 """Wadler-Lindig pretty-printing algorithm implementation."""
 
+from __future__ import annotations
+
+import math
 from dataclasses import dataclass
 from enum import Enum
+from typing import TYPE_CHECKING, Any, NamedTuple
 
 from fltk.unparse.combinators import (
     Comment,
@@ -17,6 +21,14 @@ from fltk.unparse.combinators import (
     Text,
 )
 
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+
+    from _typeshed import SupportsWrite
+
+# Characters buffered before a streaming render hands a chunk to its consumer.
+DEFAULT_CHUNK_SIZE = 1 << 16
+
 
 @dataclass
 class RendererConfig:
@@ -46,35 +58,66 @@ class Renderer:
 
     def render(self, doc: Doc) -> str:
         """Render a document with the given maximum width."""
-        result = []
+        return "".join(self.iter_render(doc, chunk_size=None))
+
+    def render_to(self, doc: Doc, out: SupportsWrite[str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        """Render ``doc`` into ``out`` in chunks of about ``chunk_size`` characters.
+
+        The whole output is never held in memory at once, only the current chunk.
+        """
+        for chunk in self.iter_render(doc, chunk_size):
+            out.write(chunk)
+
+    def iter_render(self, doc: Doc, chunk_size: int | None = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+        """Yield the rendering of ``doc`` in chunks of at least ``chunk_size`` characters.
+
+        A chunk is yielded once the buffered output reaches ``chunk_size``, so it can exceed that
+        by at most one text fragment; the last chunk may be shorter. With ``chunk_size=None`` the
+        whole output is one chunk. An empty rendering yields nothing.
+        """
+        result: list[str] = []
+        buffered = 0
+        limit = math.inf if chunk_size is None else chunk_size
         current_column = 0
         at_beginning_of_line = True
 
         # Helper functions that capture local state
         def break_line() -> None:
             """Append a newline and mark that we're at beginning of line."""
-            nonlocal at_beginning_of_line, current_column
+            nonlocal at_beginning_of_line, current_column, buffered
             result.append("\n")
+            buffered += 1
             at_beginning_of_line = True
             current_column = 0
 
         def append_content(text: str, indent: int) -> None:
             """Append text, adding indentation if at beginning of line."""
-            nonlocal at_beginning_of_line, current_column
+            nonlocal at_beginning_of_line, current_column, buffered
             if text and at_beginning_of_line:
                 indentation = " " * indent
                 result.append(indentation)
+                buffered += indent
                 current_column = indent
                 at_beginning_of_line = False
             if text:
                 result.append(text)
+                buffered += len(text)
                 current_column += len(text)
 
-        # Queue of items to process: (indent, mode, doc)
-        queue: list[RenderItem] = [(0, Mode.FLAT, Group(doc))]
+        # Pending items, next item last: (indent, mode, doc). Appending and popping at the end
+        # are O(1), so each doc node costs constant work however large the document is.
+        stack: list[RenderItem] = [(0, Mode.FLAT, Group(doc))]
+        # Flat widths measured so far, by node id; every doc they describe stays alive until
+        # the render returns, so no id is reused while the cache is in use.
+        widths: dict[int, FlatWidth] = {}
 
-        while queue:
-            indent, mode, doc = queue.pop(0)
+        while stack:
+            if buffered >= limit:
+                yield "".join(result)
+                result.clear()
+                buffered = 0
+
+            indent, mode, doc = stack.pop()
 
             if isinstance(doc, Nil):
                 continue
@@ -120,72 +163,128 @@ class Renderer:
                     break_line()
 
             elif isinstance(doc, Concat):
-                # Expand concat docs in reverse order to maintain order
-                for d in reversed(doc.docs):
-                    queue.insert(0, (indent, mode, d))
+                # Push children last-first so the first child is popped next
+                stack.extend((indent, mode, d) for d in reversed(doc.docs))
 
             elif isinstance(doc, Nest):
                 new_indent = indent + doc.indent * self.config.indent_width
-                queue.insert(0, (new_indent, mode, doc.content))
+                stack.append((new_indent, mode, doc.content))
 
             elif isinstance(doc, Group):
                 # Check if group fits on current line
                 remaining_width = self.config.max_width - current_column
-                test_queue = [(indent, Mode.FLAT, doc.content)]
-
-                if self._fits(remaining_width, test_queue.copy()):
-                    queue.insert(0, (indent, Mode.FLAT, doc.content))
-                else:
-                    queue.insert(0, (indent, Mode.BREAK, doc.content))
+                fits = self._fits(remaining_width, doc.content, widths)
+                stack.append((indent, Mode.FLAT if fits else Mode.BREAK, doc.content))
 
             else:
                 error_msg = f"Unknown document type: {type(doc)}"
                 raise ValueError(error_msg)
 
-        return "".join(result)
+        if result:
+            yield "".join(result)
 
-    def _fits(self, width: int, items: list[tuple[int, Mode, Doc]]) -> bool:
-        """Check if documents fit in remaining width when rendered flat."""
+    def _fits(self, width: int, doc: Doc, widths: dict[int, FlatWidth] | None = None) -> bool:
+        """Check if ``doc`` fits in the remaining width when rendered flat.
+
+        ``widths`` caches each measured node's :class:`FlatWidth` by ``id``; :meth:`render` passes
+        one cache for the whole render, so the content of nested groups is measured once rather
+        than once per enclosing group. The cache is only valid while the measured docs are alive.
+        """
         if width < 0:
             return False
-
-        column = 0  # Current column position
-
-        while items:
-            indent, mode, doc = items.pop(0)
-
-            if isinstance(doc, Nil):
-                continue
-            elif isinstance(doc, Text | Comment):
-                # Both Text and Comment are newline-aware for width calculation
-                lines = doc.content.split("\n")
-                for i, line in enumerate(lines):
-                    if i > 0:
-                        # Newline resets column to 0
-                        column = 0
-                    column += len(line)
-                    if column > width:
-                        return False
-            elif isinstance(doc, Line):
-                column += 1  # Space in flat mode
-                if column > width:
-                    return False
-            elif isinstance(doc, SoftLine):
-                # Nothing in flat mode
-                pass
-            elif isinstance(doc, Nbsp):
-                column += 1
-                if column > width:
-                    return False
-            elif isinstance(doc, HardLine):
-                return False  # Forces break
-            elif isinstance(doc, Concat):
-                for d in reversed(doc.docs):
-                    items.insert(0, (indent, mode, d))
-            elif isinstance(doc, Nest):
-                new_indent = indent + doc.indent * self.config.indent_width
-                items.insert(0, (new_indent, mode, doc.content))
-            elif isinstance(doc, Group):
-                items.insert(0, (indent, Mode.FLAT, doc.content))
-
-        return True
+        return flat_width(doc, {} if widths is None else widths).fits(width)
+
+
+class FlatWidth(NamedTuple):
+    """The widths of a doc's lines when rendered flat.
+
+    Flat mode breaks only at newlines embedded in ``Text`` and ``Comment`` content, so a doc's flat
+    rendering is one line or several. ``first`` and ``last`` are the widths of its first and last
+    lines (equal, for one line) and ``widest`` the widest of all of them; ``hard`` records a
+    ``HardLine``, which no flat rendering fits around.
+    """
+
+    hard: bool
+    multiline: bool
+    first: int
+    widest: int
+    last: int
+
+    def then(self, following: FlatWidth) -> FlatWidth:
+        """The flat width of this doc followed by ``following`` on the same line."""
+        joined = self.last + following.first
+        if not (self.multiline or following.multiline):
+            return FlatWidth(self.hard or following.hard, False, joined, joined, joined)
+        return FlatWidth(
+            self.hard or following.hard,
+            True,
+            self.first if self.multiline else joined,
+            max(self.widest, following.widest, joined),
+            following.last if following.multiline else joined,
+        )
+
+    def fits(self, width: int) -> bool:
+        return not self.hard and self.widest <= width
+
+
+_EMPTY = FlatWidth(False, False, 0, 0, 0)
+_SPACE = FlatWidth(False, False, 1, 1, 1)
+_HARD = FlatWidth(True, False, 0, 0, 0)
+
+
+def _leaf_width(doc: Doc) -> FlatWidth:
+    if isinstance(doc, Text | Comment):
+        lines = [len(line) for line in doc.content.split("\n")]
+        return FlatWidth(False, len(lines) > 1, lines[0], max(lines), lines[-1])
+    if isinstance(doc, Line | Nbsp):
+        return _SPACE
+    if isinstance(doc, HardLine):
+        return _HARD
+    # Nil and SoftLine are empty flat; so are the spacing specs and Join the renderer rejects.
+    return _EMPTY
+
+
+def _children(doc: Doc) -> Sequence[Doc] | None:
+    if isinstance(doc, Concat):
+        return doc.docs
+    if isinstance(doc, Nest | Group):
+        # Indentation only applies after a line break, and flat mode has none
+        return (doc.content,)
+    return None
+
+
+def flat_width(doc: Doc, widths: dict[int, FlatWidth]) -> FlatWidth:
+    """Measure ``doc`` flat, reusing and filling ``widths`` (composite node ``id`` to measurement).
+
+    Children are folded left to right with an explicit stack, so deep documents do not recurse,
+    and a fold stops at its first hard line: a hard measurement's widths cover only the prefix
+    before it, which is all a fit decision needs.
+    """
+    found = widths.get(id(doc))
+    if found is not None:
+        return found
+    children = _children(doc)
+    if children is None:
+        return _leaf_width(doc)
+    # Frames of [composite node, its children, index of the next child, width of those before it]
+    stack: list[list[Any]] = [[doc, children, 0, _EMPTY]]
+    while stack:
+        frame = stack[-1]
+        node, children, index, measured = frame
+        while index < len(children) and not measured.hard:
+            child = children[index]
+            child_width = widths.get(id(child))
+            if child_width is None:
+                grandchildren = _children(child)
+                if grandchildren is not None:
+                    break
+                child_width = _leaf_width(child)
+            measured = measured.then(child_width)
+            index += 1
+        else:
+            widths[id(node)] = measured
+            stack.pop()
+            continue
+        frame[2], frame[3] = index, measured
+        stack.append([child, grandchildren, 0, _EMPTY])
+    return widths[id(doc)]
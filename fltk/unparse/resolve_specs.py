@@ -4,6 +4,7 @@ from __future__ import annotations
 
 from collections import deque
 from collections.abc import Callable, Sequence
+from dataclasses import dataclass
 from typing import Final
 
 from fltk.unparse.combinators import (
@@ -20,6 +21,7 @@ from fltk.unparse.combinators import (
     Line,
     Nbsp,
     Nest,
+    Nil,
     SeparatorSpec,
     SoftLine,
     Text,
@@ -27,6 +29,8 @@ from fltk.unparse.combinators import (
 )
 
 _MIN_COLLAPSIBLE_LENGTH: Final = 2
+# The node types a resolution pattern can start with
+_PATTERN_HEADS: Final = (AfterSpec, BeforeSpec, SeparatorSpec, Text)
 
 
 def resolve_spacing_specs(doc: Doc) -> Doc:
@@ -40,152 +44,165 @@ def resolve_spacing_specs(doc: Doc) -> Doc:
     3. If there is no SeparatorSpec, then After/Before are ignored
     4. If there is preserved trivia, that overrides everything
 
-    This is done in three passes:
-    - Initial pass: Expand Join nodes into docs with SeparatorSpecs
-    - First pass: Extract all boundary specs recursively
-    - Second pass: Apply pattern-based resolution
+    This is done in one bottom-up pass. Each sequence (the content of a Group
+    or Nest, or the whole document) is flattened with its Join nodes expanded
+    into SeparatorSpecs; the specs at its boundaries are hoisted into the
+    enclosing sequence; and, once complete, it is pattern-resolved and its
+    HardLine + Line/SoftLine pairs collapsed. Every surviving Concat, Group,
+    and Nest is built once, already final.
     """
-    # Initial pass: Expand Join nodes
-    expanded_doc = _expand_joins(doc)
-
-    # First pass: Extract all boundary specs recursively
-    extracted_doc, leading, trailing = _extract_all_boundary_specs(expanded_doc)
-    # Second pass: Pattern-based resolution
+    body, leading, trailing = _sequence(doc)
     if leading or trailing:
-        # If we have boundary specs at the top level, flatten and process them
-        all_docs = [*leading, extracted_doc, *trailing]
-        resolved_doc = _resolve_patterns(concat(all_docs))
-    else:
-        resolved_doc = _resolve_patterns(extracted_doc)
+        # Boundary specs at the top level have nowhere further to go: resolve them in place
+        body = [*leading, *body, *trailing]
+    return _finish(body)
+
+
+@dataclass(slots=True, frozen=True)
+class _Finished(Doc):
+    """A Group or Nest that :func:`prepare_region` has already finished.
+
+    Finishing is not idempotent (each pass collapses one more soft break after a hard line), so
+    the enclosing sequence takes the wrapped item as it is rather than finishing it again.
+    """
 
-    # Final pass: Collapse HardLine + Line/SoftLine sequences throughout the tree
-    final_doc = _collapse_hardline_sequences(resolved_doc)
+    item: Doc
 
-    return final_doc
+    def __repr__(self) -> str:
+        return f"_Finished({self.item!r})"
 
 
-def _expand_joins(doc: Doc) -> Doc:
-    """Initial pass: Expand Join nodes into docs with SeparatorSpecs.
+def prepare_region(doc: Doc) -> Doc:
+    """Do the part of resolving ``doc`` that does not depend on the sequence it ends up in.
 
-    Join nodes are expanded into their constituent docs with SeparatorSpec
-    nodes between them. The separator is placed in the preserved_trivia field
-    to give it priority over other separators.
+    ``doc`` is a region of a larger document that has not been assembled yet, such as the doc
+    for one top-level child of a CST.  Its Groups and Nests are finished here, and the specs
+    they hoist are placed around them.  Resolving the assembled document then produces what
+    it would have produced from the original ``doc``, but never walks into the region's
+    Groups and Nests again.  The result is for :func:`resolve_spacing_specs` only.
     """
-    if isinstance(doc, Join):
-        # Expand Join into docs with separators between
-        if not doc.docs:
-            return concat([])
+    items: list[Doc] = []
+    _expand(doc, items)
+    prepared: list[Doc] = []
+    for child in items:
+        if isinstance(child, Group | Nest):
+            finished, leading, trailing = _item(child)
+            prepared.extend(leading)
+            prepared.append(_Finished(finished))
+            prepared.extend(trailing)
+        else:
+            prepared.append(child)
+    # A doc that expands to nothing stays as it is: an accumulator tells NIL apart
+    return concat(prepared) if prepared else doc
+
 
-        expanded = []
+def _expand(doc: Doc, out: list[Doc]) -> None:
+    """Append the items ``doc`` contributes to its enclosing sequence.
+
+    Concats are flattened into the sequence and Nils dropped. A Join is expanded
+    into its docs with SeparatorSpec nodes between them; the separator is placed
+    in the preserved_trivia field to give it priority over other separators.
+    Groups, Nests, and leaves are items themselves.
+    """
+    if isinstance(doc, Join):
         trailing_separators = []
         need_sep = False
         for d in doc.docs:
             if isinstance(d, SeparatorSpec) and d.preserved_trivia is None:
                 if not need_sep:
                     # Leading separators are preserved
-                    expanded.append(d)
+                    out.append(d)
                 else:
                     # This might be a trailing separator
                     trailing_separators.append(d)
                 continue
-            expanded_child = _expand_joins(d)
-
             if need_sep and not isinstance(d, AfterSpec | BeforeSpec):
                 # Put the separator in preserved_trivia so it takes priority
-                separator_spec = SeparatorSpec(spacing=None, preserved_trivia=doc.separator, required=False)
-                expanded.append(separator_spec)
-            expanded.append(expanded_child)
+                out.append(SeparatorSpec(spacing=None, preserved_trivia=doc.separator, required=False))
+            _expand(d, out)
             trailing_separators.clear()
             if not isinstance(d, AfterSpec | BeforeSpec):
                 need_sep = True
-        expanded.extend(trailing_separators)
-
-        return concat(expanded)
+        out.extend(trailing_separators)
 
     elif isinstance(doc, Concat):
-        # Recursively expand joins in all child docs
-        expanded_docs = [_expand_joins(d) for d in doc.docs]
-        return concat(expanded_docs)
-
-    elif isinstance(doc, Group):
-        return Group(_expand_joins(doc.content))
-
-    elif isinstance(doc, Nest):
-        return Nest(content=_expand_joins(doc.content), indent=doc.indent)
+        for d in doc.docs:
+            _expand(d, out)
 
-    else:
-        # Leaf nodes pass through unchanged
-        return doc
+    elif not isinstance(doc, Nil):
+        out.append(doc)
 
 
-def _extract_all_boundary_specs(doc: Doc) -> tuple[Doc, list[Doc], list[Doc]]:
-    """First pass: Recursively extract all boundary specs.
+def _sequence(doc: Doc) -> tuple[list[Doc], list[Doc], list[Doc]]:
+    """Flatten ``doc`` into a sequence and extract its boundary specs.
 
     Returns:
-        A tuple of (processed_doc, leading_specs, trailing_specs)
+        A tuple of (items, leading_specs, trailing_specs). A lone item is not a
+        sequence of its own: its specs stay in place, but a Group or Nest still
+        passes up the specs hoisted out of its content.
     """
-    if isinstance(doc, Concat):
-        # Recursively process remaining docs
-        processed_docs = []
-        for child in doc.docs:
-            processed_child, child_leading, child_trailing = _extract_all_boundary_specs(child)
-            # Add extracted specs inline
-            processed_docs.extend(child_leading)
-            processed_docs.append(processed_child)
-            processed_docs.extend(child_trailing)
-
-        leading_specs, remaining_docs, trailing_specs = _extract_boundary_specs(processed_docs)
-        return concat(remaining_docs), leading_specs, trailing_specs
-
-    elif isinstance(doc, Group | Nest):
-        processed_content, inner_leading, inner_trailing = _extract_all_boundary_specs(doc.content)
-
-        if isinstance(doc, Group):
-            return Group(processed_content), inner_leading, inner_trailing
-        else:
-            return Nest(content=processed_content, indent=doc.indent), inner_leading, inner_trailing
-    else:
-        # Leaf nodes pass through unchanged
-        return doc, [], []
+    items: list[Doc] = []
+    _expand(doc, items)
+    if len(items) == 1:
+        item, leading, trailing = _item(items[0])
+        return [item], leading, trailing
+
+    processed_docs: list[Doc] = []
+    for child in items:
+        processed_child, child_leading, child_trailing = _item(child)
+        # Add extracted specs inline
+        processed_docs.extend(child_leading)
+        processed_docs.append(processed_child)
+        processed_docs.extend(child_trailing)
+    leading_specs, remaining_docs, trailing_specs = _extract_boundary_specs(processed_docs)
+    return remaining_docs, leading_specs, trailing_specs
+
+
+def _item(doc: Doc) -> tuple[Doc, list[Doc], list[Doc]]:
+    """Finish a sequence item, returning the specs hoisted out of a Group's or Nest's content."""
+    if isinstance(doc, _Finished):
+        # Its hoisted specs were placed beside it by prepare_region
+        return doc.item, [], []
+    if isinstance(doc, Group):
+        body, leading, trailing = _sequence(doc.content)
+        return Group(_finish(body)), leading, trailing
+    if isinstance(doc, Nest):
+        body, leading, trailing = _sequence(doc.content)
+        return Nest(content=_finish(body), indent=doc.indent), leading, trailing
+    # Leaf nodes pass through unchanged
+    return doc, [], []
 
 
 def _extract_boundary_specs(docs: list[Doc]) -> tuple[list[Doc], list[Doc], list[Doc]]:
     """Extract leading BeforeSpecs/SeparatorSpecs and trailing AfterSpecs/SeparatorSpecs from a list of docs.
 
+    Trailing specs are taken first, so a run of SeparatorSpecs with nothing else is trailing.
+
     Returns:
         A tuple of (leading_specs, remaining_docs, trailing_specs)
     """
-    # Extract trailing AfterSpecs and SeparatorSpecs
-    trailing_specs = []
-    while docs and isinstance(docs[-1], AfterSpec | SeparatorSpec):
-        trailing_specs.insert(0, docs.pop())
+    end = len(docs)
+    while end and isinstance(docs[end - 1], AfterSpec | SeparatorSpec):
+        end -= 1
+    start = 0
+    while start < end and isinstance(docs[start], BeforeSpec | SeparatorSpec):
+        start += 1
+    return docs[:start], docs[start:end], docs[end:]
 
-    # Extract leading BeforeSpecs and SeparatorSpecs
-    leading_specs = []
-    while docs and isinstance(docs[0], BeforeSpec | SeparatorSpec):
-        leading_specs.append(docs.pop(0))
 
-    return leading_specs, docs, trailing_specs
+def _finish(docs: list[Doc]) -> Doc:
+    """Resolve a complete sequence's specs, collapse its hardline pairs, and build its node.
 
-
-def _resolve_patterns(doc: Doc) -> Doc:
-    """Second pass: Apply pattern-based resolution to spacing specs.
-
-    This processes the document after all boundary specs have been extracted
-    and applies the pattern matching rules to resolve them into actual spacing.
+    Items that are Groups or Nests were finished when they were built; resolved
+    preserved trivia that is a Concat is flattened into the sequence.
     """
-    if isinstance(doc, Concat):
-        # Apply pattern resolution to the sequence
-        resolved_docs = _resolve_concat_patterns(doc.docs)
-        return concat(resolved_docs)
-    elif isinstance(doc, Group):
-        return Group(_resolve_patterns(doc.content))
-    elif isinstance(doc, Nest):
-        return Nest(content=_resolve_patterns(doc.content), indent=doc.indent)
-    else:
-        # Leaf nodes pass through
-        resolved_docs = _resolve_concat_patterns([doc])
-        return concat(resolved_docs)
+    flattened: list[Doc] = []
+    for resolved in _resolve_concat_patterns(docs):
+        if isinstance(resolved, Concat):
+            flattened.extend(resolved.docs)
+        elif not isinstance(resolved, Nil):
+            flattened.append(resolved)
+    return concat(_collapse_hardline_list(flattened))
 
 
 # Type for pattern mutator functions
@@ -198,8 +215,8 @@ PatternMutator = Callable[[deque[Doc]], list[Doc] | None]
 def _resolve_concat_patterns(docs: Sequence[Doc]) -> list[Doc]:
     """Resolve control nodes in a sequence of docs using pattern matching.
 
-    This is the second pass - all boundary specs have already been extracted,
-    so we just need to apply the pattern matching rules.
+    The sequence's boundary specs have already been extracted and its Group and
+    Nest items finished, so we just need to apply the pattern matching rules.
     """
     # Validate all docs are instances
     for i, doc in enumerate(docs):
@@ -236,11 +253,7 @@ def _resolve_concat_patterns(docs: Sequence[Doc]) -> list[Doc]:
         # that might span beyond the largest pattern
         while len(working_set) < max_pattern_size + 1:
             try:
-                next_doc = next(doc_iter)
-                # Recursively process Group and Nest nodes
-                if isinstance(next_doc, Group | Nest | Concat):
-                    next_doc = _resolve_patterns(next_doc)
-                working_set.append(next_doc)
+                working_set.append(next(doc_iter))
             except StopIteration:
                 break
 
@@ -256,9 +269,10 @@ def _resolve_concat_patterns(docs: Sequence[Doc]) -> list[Doc]:
             working_set.extend(result)
             continue  # Go back to start of loop
 
-        # Step 3: Try each other mutator in order
+        # Step 3: Try each other mutator in order. Every pattern starts with a spec or a Text,
+        # so any other head is produced as is.
         mutated = False
-        for pattern_size, mutator in mutators:
+        for pattern_size, mutator in mutators if isinstance(working_set[0], _PATTERN_HEADS) else ():
             # Only try mutator if we have enough items
             if len(working_set) >= pattern_size:
                 # Extract the items this mutator will examine
@@ -282,20 +296,24 @@ def _resolve_concat_patterns(docs: Sequence[Doc]) -> list[Doc]:
     return output
 
 
-def _collapse_hardline_sequences(doc: Doc) -> Doc:
-    """Recursively collapse HardLine + Line/SoftLine sequences throughout a Doc tree.
+def _resolve_trivia(trivia: Doc) -> Doc:
+    """Resolve preserved trivia on its own, for the sequence it replaces a separator in.
 
-    When a HardLine is followed by a soft line break, the soft break is redundant
-    because the HardLine already provides a line break. This commonly occurs when
-    preserved trivia (like a line comment) ends with a newline, and the formatter
-    adds its own separator afterward.
+    The sequence collapses hardline pairs in the trivia's top-level docs once they are
+    flattened into it; the Groups and Nests inside the trivia are collapsed once more
+    here, as the enclosing tree's collapse used to reach them a second time (and the
+    Rust port in ``fltk-unparser-core`` still does).
     """
+    resolved = resolve_spacing_specs(trivia)
+    if isinstance(resolved, Concat):
+        return concat([_collapse_hardline_sequences(d) for d in resolved.docs])
+    return _collapse_hardline_sequences(resolved)
+
+
+def _collapse_hardline_sequences(doc: Doc) -> Doc:
+    """Recursively collapse HardLine + Line/SoftLine sequences throughout a Doc tree."""
     if isinstance(doc, Concat):
-        # First, recursively process children
-        processed_docs = [_collapse_hardline_sequences(d) for d in doc.docs]
-        # Then collapse HardLine + Line/SoftLine sequences
-        collapsed = _collapse_hardline_list(processed_docs)
-        return concat(collapsed)
+        return concat(_collapse_hardline_list([_collapse_hardline_sequences(d) for d in doc.docs]))
     elif isinstance(doc, Group):
         return Group(_collapse_hardline_sequences(doc.content))
     elif isinstance(doc, Nest):
@@ -306,7 +324,13 @@ def _collapse_hardline_sequences(doc: Doc) -> Doc:
 
 
 def _collapse_hardline_list(docs: list[Doc]) -> list[Doc]:
-    """Collapse HardLine + Line/SoftLine sequences in a list of docs."""
+    """Collapse HardLine + Line/SoftLine sequences in a list of docs.
+
+    When a HardLine is followed by a soft line break, the soft break is redundant
+    because the HardLine already provides a line break. This commonly occurs when
+    preserved trivia (like a line comment) ends with a newline, and the formatter
+    adds its own separator afterward.
+    """
     if len(docs) < _MIN_COLLAPSIBLE_LENGTH:
         return docs
 
@@ -359,7 +383,7 @@ def _mutate_after_sep(working_set: deque[Doc]) -> list[Doc] | None:
 
         if sep_spec.preserved_trivia:
             # Recursively resolve the preserved trivia
-            resolved_trivia = resolve_spacing_specs(sep_spec.preserved_trivia)
+            resolved_trivia = _resolve_trivia(sep_spec.preserved_trivia)
             return [resolved_trivia]
         elif sep_spec.spacing is not None or sep_spec.required:
             # Use after spacing, but preserve blank_lines from separator if it has more
@@ -392,7 +416,7 @@ def _mutate_sep_before(working_set: deque[Doc]) -> list[Doc] | None:
 
         if sep_spec.preserved_trivia:
             # Recursively resolve the preserved trivia
-            resolved_trivia = resolve_spacing_specs(sep_spec.preserved_trivia)
+            resolved_trivia = _resolve_trivia(sep_spec.preserved_trivia)
             return [resolved_trivia]
         elif sep_spec.spacing is not None or sep_spec.required:
             # Use before spacing, but preserve blank_lines from separator if it has more
@@ -423,7 +447,7 @@ def _mutate_standalone_sep(working_set: deque[Doc]) -> list[Doc] | None:
 
         if sep_spec.preserved_trivia:
             # Recursively resolve the preserved trivia
-            resolved_trivia = resolve_spacing_specs(sep_spec.preserved_trivia)
+            resolved_trivia = _resolve_trivia(sep_spec.preserved_trivia)
             return [resolved_trivia]
         elif sep_spec.spacing is not None:
             # Return the spacing instance
@@ -494,7 +518,7 @@ def _mutate_consecutive_specs(working_set: deque[Doc]) -> list[Doc] | None:
                     merged_spacing = _merge_spacing(merged_spacing, nxt.spacing)
                     j += 1
                 if merged_spacing:
-                    result.append(BeforeSpec(spacing=merged_spacing))
+                    result.append(curr if merged_spacing is curr.spacing else BeforeSpec(spacing=merged_spacing))
                 i = j
 
             # For AfterSpec: merge consecutive AfterSpecs
@@ -505,7 +529,7 @@ def _mutate_consecutive_specs(working_set: deque[Doc]) -> list[Doc] | None:
                     merged_spacing = _merge_spacing(merged_spacing, nxt.spacing)
                     j += 1
                 if merged_spacing:
-                    result.append(AfterSpec(spacing=merged_spacing))
+                    result.append(curr if merged_spacing is curr.spacing else AfterSpec(spacing=merged_spacing))
                 i = j
 
             # For SeparatorSpec: handle consecutive SeparatorSpecs
@@ -532,8 +556,13 @@ def _mutate_consecutive_specs(working_set: deque[Doc]) -> list[Doc] | None:
                         merged_spacing = _merge_spacing(curr.spacing, next_item.spacing)
                         merged_required = curr.required or next_item.required
                         if merged_spacing is not None or merged_required:
+                            unchanged = merged_spacing is curr.spacing and merged_required == curr.required
                             result.append(
-                                SeparatorSpec(spacing=merged_spacing, preserved_trivia=None, required=merged_required)
+                                curr
+                                if unchanged
+                                else SeparatorSpec(
+                                    spacing=merged_spacing, preserved_trivia=None, required=merged_required
+                                )
                             )
                         i = j + 1
                 else:
@@ -555,7 +584,7 @@ def _resolve_spacing(after_spec: AfterSpec, before_spec: BeforeSpec, sep_spec: S
     """
     # If there's preserved trivia, use it (recursively resolved)
     if sep_spec.preserved_trivia:
-        return resolve_spacing_specs(sep_spec.preserved_trivia)
+        return _resolve_trivia(sep_spec.preserved_trivia)
 
     # If separator doesn't allow spacing, ignore both specs
     if sep_spec.spacing is None:
@@ -575,7 +604,8 @@ def _merge_spacing(spacing1: Doc | None, spacing2: Doc | None) -> Doc | None:
     if spacing2 is None:
         return spacing1
 
-    if spacing1 == spacing2:
+    # Generated unparsers share one node per fixed spacing, so identity settles most cases
+    if spacing1 is spacing2 or spacing1 == spacing2:
         return spacing1
 
     # Handle specific combinations
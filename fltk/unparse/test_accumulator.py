@@ -0,0 +1,120 @@
+"""Tests for the mutable DocBuilder against the persistent DocAccumulator."""
+
+import random
+
+import pytest
+
+from fltk.unparse.accumulator import DocAccumulator, DocBuilder
+from fltk.unparse.combinators import Group, Nest, concat, text
+
+
+def _random_ops(rng: random.Random, count: int) -> list[tuple]:
+    """A well-nested sequence of accumulator operations, with checkpoint/rollback pairs.
+
+    A rollback only ever targets a checkpoint whose open levels are all still open, the
+    contract generated unparsers keep.
+    """
+    ops: list[tuple] = []
+    levels: list[str] = []
+    marks: list[int] = []  # depth at each live checkpoint
+    for _ in range(count):
+        choice = rng.random()
+        if choice < 0.35:
+            ops.append(("add_non_trivia", text(f"t{len(ops)}")))
+        elif choice < 0.5:
+            ops.append(("add_trivia", text(" ")))
+        elif choice < 0.6:
+            kind = rng.choice(["group", "nest", "join"])
+            levels.append(kind)
+            ops.append((f"push_{kind}", *({"group": (), "nest": (2,), "join": (text(","),)}[kind])))
+        elif choice < 0.72 and levels and (not marks or len(levels) > marks[-1]):
+            ops.append((f"pop_{levels.pop()}",))
+        elif choice < 0.8:
+            ops.append(("add_accumulator", f"m{len(ops)}"))
+        elif choice < 0.9:
+            marks.append(len(levels))
+            ops.append(("checkpoint",))
+        elif marks:
+            depth = marks.pop()
+            del levels[depth:]
+            ops.append(("rollback",))
+    while levels:
+        if marks and len(levels) <= marks[-1]:
+            marks.pop()
+            continue
+        ops.append((f"pop_{levels.pop()}",))
+    return ops
+
+
+def _run(acc, ops: list[tuple], fresh):
+    """Apply ``ops``; a persistent accumulator rolls back by reusing its saved value."""
+    saved = []
+    for name, *args in ops:
+        if name == "checkpoint":
+            saved.append((acc, acc.checkpoint()) if isinstance(acc, DocBuilder) else (acc, None))
+        elif name == "rollback":
+            prior, mark = saved.pop()
+            acc = acc.rollback(mark) if mark is not None else prior
+        elif name == "add_accumulator":
+            acc = acc.add_accumulator(fresh().add_trivia(text(args[0])))
+        else:
+            acc = getattr(acc, name)(*args)
+    return acc
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_builder_matches_accumulator(seed: int) -> None:
+    rng = random.Random(seed)  # noqa: S311 -- reproducible test data, not security
+    ops = _random_ops(rng, 200)
+    persistent = _run(DocAccumulator(), ops, DocAccumulator)
+    builder = _run(DocBuilder(), ops, DocBuilder)
+    assert builder.doc == persistent.doc
+    assert builder.last_was_trivia == persistent.last_was_trivia
+
+
+def test_mutators_return_the_same_builder() -> None:
+    builder = DocBuilder()
+    assert builder.add_non_trivia(text("a")).push_group().add_trivia(text(" ")).pop_group() is builder
+
+
+def test_rollback_discards_docs_and_levels() -> None:
+    builder = DocBuilder().add_trivia(text(" "))
+    mark = builder.checkpoint()
+    builder.add_non_trivia(text("x")).push_group().add_non_trivia(text("y"))
+    builder.rollback(mark)
+    assert builder.last_was_trivia
+    assert builder.add_non_trivia(text("z")).doc == concat([text(" "), text("z")])
+
+
+def test_rollback_inside_open_level_keeps_it() -> None:
+    builder = DocBuilder().push_group().add_non_trivia(text("a"))
+    mark = builder.checkpoint()
+    builder.add_non_trivia(text("b")).push_nest(2)
+    builder.rollback(mark).pop_group()
+    assert builder.doc == Group(text("a"))
+
+
+def test_rollback_rejects_level_closed_since_checkpoint() -> None:
+    builder = DocBuilder().push_nest(2)
+    mark = builder.checkpoint()
+    builder.pop_nest().push_nest(2)
+    with pytest.raises(RuntimeError, match="Cannot roll back"):
+        builder.rollback(mark)
+
+
+def test_doc_is_the_innermost_open_level() -> None:
+    builder = DocBuilder().add_non_trivia(text("a")).push_nest(4).add_non_trivia(text("b"))
+    assert builder.doc == text("b")
+    assert builder.pop_nest().doc == concat([text("a"), Nest(content=text("b"), indent=4)])
+
+
+def test_add_accumulator_rejects_open_levels() -> None:
+    with pytest.raises(RuntimeError, match="non-flattened"):
+        DocBuilder().add_accumulator(DocBuilder().push_group())
+
+
+def test_pop_rejects_wrong_nesting() -> None:
+    with pytest.raises(RuntimeError, match="Expected Join"):
+        DocBuilder().push_group().pop_join()
+    with pytest.raises(RuntimeError, match="Expected Group"):
+        DocBuilder().pop_group()
@@ -0,0 +1,63 @@
+"""Tests for the head tests that guard a generated unparser's alternative trials."""
+
+import pytest
+
+from fltk.fegen import gsm
+from fltk.fegen.grammar_shape import TEXT_KIND
+from fltk.plumbing import parse_grammar
+from fltk.unparse.alt_dispatch import HeadTest, dispatch_tests, head_test
+
+
+def _alternatives(grammar_text: str, rule_name: str = "r") -> list[gsm.Items]:
+    return list(parse_grammar(grammar_text).identifiers[rule_name].alternatives)
+
+
+def _tests(grammar_text: str, rule_name: str = "r") -> list[HeadTest | None] | None:
+    return dispatch_tests(_alternatives(grammar_text, rule_name), trivia_rule=False)
+
+
+def test_labeled_alternatives_are_told_by_label() -> None:
+    tests = _tests("r := add:x | mul:x | num:/[0-9]+/; x := /x/;")
+    assert tests == [HeadTest(("add",), ()), HeadTest(("mul",), ()), HeadTest(("num",), ())]
+
+
+def test_unlabeled_terms_are_told_by_kind() -> None:
+    # An unlabeled term is a child only when included (`$`); the item then checks its kind.
+    tests = _tests('r := $"k" , key:/[a-z]+/ | key:/[a-z]+/;')
+    assert tests == [HeadTest((), (TEXT_KIND,)), HeadTest(("key",), ())]
+
+
+def test_suppressed_and_optional_items_extend_the_head() -> None:
+    tests = _tests('r := "(" . inner:x . ")" | sign:"-"? . num:/[0-9]+/; x := /x/;')
+    assert tests == [HeadTest(("inner",), ()), HeadTest(("sign", "num"), ())]
+
+
+def test_whitespace_separator_admits_trivia() -> None:
+    tests = _tests('r := "(" , inner:x , ")" | num:/[0-9]+/; x := /x/;')
+    assert tests == [HeadTest(("inner",), (gsm.TRIVIA_RULE_NAME,)), HeadTest(("num",), ())]
+    trivia = dispatch_tests(_alternatives('r := "(" , inner:x , ")" | num:/[0-9]+/; x := /x/;'), trivia_rule=True)
+    assert trivia is not None
+    assert trivia[0] == HeadTest(("inner",), (TEXT_KIND,))
+
+
+def test_subexpression_contributes_every_alternative() -> None:
+    tests = _tests("r := (a:x | b:x) . c:x | d:x; x := /x/;")
+    assert tests == [HeadTest(("a", "b"), ()), HeadTest(("d",), ())]
+
+
+def test_alternative_that_can_consume_nothing_is_untested() -> None:
+    tests = _tests("r := a:x* | b:x; x := /x/;")
+    assert tests == [None, HeadTest(("b",), ())]
+    assert head_test(_alternatives('r := "k";')[0], trivia_rule=False) is None
+
+
+@pytest.mark.parametrize(
+    "grammar_text",
+    [
+        "r := a:x; x := /x/;",
+        "r := a:x . b:x | a:x . c:x; x := /x/;",
+        "r := a:x* | b:x?; x := /x/;",
+    ],
+)
+def test_no_dispatch_when_guards_would_skip_nothing(grammar_text: str) -> None:
+    assert _tests(grammar_text) is None
@@ -0,0 +1,34 @@
+"""Tests for Doc combinator construction."""
+
+import gc
+import pickle
+
+from fltk.unparse import combinators
+from fltk.unparse.combinators import Text, text
+
+
+def test_text_reuses_the_live_node_for_equal_content() -> None:
+    first = text("name")
+    assert text("name") is first
+    assert text("other") is not first
+    assert text("name") == Text("name")
+
+
+def test_text_forgets_a_node_once_it_is_collected() -> None:
+    content = "no-longer-used"
+    node = text(content)
+    assert content in combinators._TEXT_NODES
+    del node
+    gc.collect()
+    assert content not in combinators._TEXT_NODES
+
+
+def test_long_text_is_not_shared() -> None:
+    content = "x" * (combinators._MAX_SHARED_TEXT + 1)
+    assert text(content) == text(content)
+    assert content not in combinators._TEXT_NODES
+
+
+def test_text_survives_pickling_as_the_shared_node() -> None:
+    node = text("pickled")
+    assert pickle.loads(pickle.dumps(node)) is node  # noqa: S301 -- round trip of our own data
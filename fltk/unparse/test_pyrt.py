@@ -13,7 +13,11 @@ import pytest
 from fltk.fegen.pyrt import terminalsrc
 from fltk.unparse.pyrt import (
     capped_blank_lines,
+    count_span_newlines,
     count_whitespace_newlines,
+    extract_span_text,
+    head_child,
+    head_label,
     literal_span_matches,
     preceding_comment_trailing_newline,
     raise_preserved_trivia_failure,
@@ -31,6 +35,53 @@ def _span(text: str) -> terminalsrc.Span:
     return terminalsrc.Span.with_source(0, len(text), text)
 
 
+@dataclass
+class _OtherBackendSpan:
+    """A span of another backend: reached only through ``text()`` and ``has_source()``."""
+
+    start: int
+    end: int
+    source: str | None
+
+    def text(self) -> str | None:
+        if self.source is None or self.end > len(self.source):
+            return None
+        return self.source[self.start : self.end]
+
+    def has_source(self) -> bool:
+        return self.source is not None
+
+
+class TestSpanText:
+    """Span text and newline counts, read in place for Python spans and via ``text()`` otherwise."""
+
+    @pytest.mark.parametrize(
+        "span",
+        [
+            terminalsrc.Span.with_source(2, 6, "a:\nb\n\nc"),
+            terminalsrc.Span(2, 6),
+            _OtherBackendSpan(2, 6, "a:\nb\n\nc"),
+            _OtherBackendSpan(2, 6, None),
+        ],
+        ids=["python", "python-sourceless", "other", "other-sourceless"],
+    )
+    def test_text_and_newlines_of_the_span_range(self, span):
+        # A sourceless span reads the terminals the unparser was given.
+        assert extract_span_text(span, "a:\nb\n\nc") == "\nb\n\n"
+        assert count_span_newlines(span, "a:\nb\n\nc") == 3
+
+    @pytest.mark.parametrize(
+        "span",
+        [terminalsrc.Span.with_source(2, 9, "short"), _OtherBackendSpan(2, 9, "short")],
+        ids=["python", "other"],
+    )
+    def test_source_bearing_span_out_of_range_raises(self, span):
+        with pytest.raises(ValueError, match="out of range"):
+            extract_span_text(span, "terminals long enough")
+        with pytest.raises(ValueError, match="out of range"):
+            count_span_newlines(span, "terminals long enough")
+
+
 class TestCountWhitespaceNewlines:
     """`count_whitespace_newlines` counts spans and whitespace-only nodes, nothing else."""
 
@@ -154,3 +205,16 @@ class TestCappedBlankLines:
 
     def test_a_zero_cap_yields_no_blanks(self):
         assert capped_blank_lines(5, 0) == 0
+
+
+class TestHead:
+    """The head child and its label, or ``None`` past the last child."""
+
+    def test_reads_the_child_at_pos(self):
+        children = [("a", 1), (None, 2)]
+        assert (head_label(children, 0), head_child(children, 0)) == ("a", 1)
+        assert (head_label(children, 1), head_child(children, 1)) == (None, 2)
+
+    def test_past_the_end_is_none(self):
+        assert head_label([("a", 1)], 1) is None
+        assert head_child([], 0) is None
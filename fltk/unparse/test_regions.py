@@ -0,0 +1,163 @@
+"""Tests for unparsing top-level regions in worker processes."""
+
+import multiprocessing
+import sys
+
+import pytest
+
+from fltk.plumbing import (
+    generate_parser,
+    generate_unparser,
+    parse_format_config,
+    parse_grammar,
+    parse_text,
+    render_doc,
+    unparse_cst,
+)
+from fltk.unparse.combinators import (
+    LINE,
+    SOFTLINE,
+    AfterSpec,
+    BeforeSpec,
+    Comment,
+    Concat,
+    Group,
+    HardLine,
+    Join,
+    Nest,
+    SeparatorSpec,
+    Text,
+)
+from fltk.unparse.regions import top_level_regions, unparse_regions
+from fltk.unparse.resolve_specs import prepare_region, resolve_spacing_specs
+
+needs_fork = pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="regions are unparsed in forked workers"
+)
+
+_GRAMMAR = """
+doc := , item+ ;
+item := name:name , ":" , value:value , ";" , | name:name , "{" , item* , "}" , ;
+value := name:name | "[" , (value , ("," , value)*)? , "]";
+name := name:/[a-z]+/;
+_trivia := ( line_comment | line_comment? : )+ ;
+line_comment := prefix:"#" . content:/[^\\n]*/ . "\\n" ;
+"""
+
+_FORMAT = """
+trivia_preserve: LineComment;
+preserve_blanks: 1;
+ws_allowed: nil;
+ws_required: bsp;
+after ":" { bsp; }
+after "," { bsp; }
+after ";" { hard; }
+
+rule item
+{
+    after "{" { hard; }
+    nest from after "{" to "}";
+}
+
+rule value
+{
+    group;
+}
+"""
+
+_INPUT = """a: b;
+# keep this comment
+c { d: [e, f, [g]]; h: i; }
+
+
+j: [k,
+  l];
+m { }
+"""
+
+
+def _doc_with_hoisted_specs() -> Concat:
+    """A region whose Group hoists specs at both ends, and whose content collapses twice."""
+    return Concat(
+        [
+            BeforeSpec(LINE),
+            Group(
+                Concat(
+                    [
+                        SeparatorSpec(spacing=SOFTLINE, preserved_trivia=None, required=False),
+                        Text("x"),
+                        Comment("# c"),
+                        HardLine(),
+                        LINE,
+                        LINE,
+                        AfterSpec(LINE),
+                    ]
+                )
+            ),
+            Nest(content=Join([Text("a"), Text("b")], Text(",")), indent=2),
+            Text("y"),
+        ]
+    )
+
+
+@pytest.mark.parametrize("context", ["top", "group", "join"])
+def test_prepared_region_resolves_like_the_original(context: str) -> None:
+    region = _doc_with_hoisted_specs()
+
+    def enclose(doc):
+        inner = [Text("("), SeparatorSpec(spacing=LINE, preserved_trivia=None, required=False), doc, Text(")")]
+        if context == "group":
+            return Group(Concat(inner))
+        if context == "join":
+            return Join([Text("("), doc, Text(")")], Concat([Text(";"), LINE]))
+        return Concat(inner)
+
+    assert resolve_spacing_specs(enclose(prepare_region(region))) == resolve_spacing_specs(enclose(region))
+
+
+def test_prepared_region_keeps_a_doc_that_expands_to_nothing() -> None:
+    empty = Join([], Text(","))
+    assert prepare_region(empty) is empty
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    parser_result = generate_parser(parse_grammar(_GRAMMAR), capture_trivia=True)
+    try:
+        yield parser_result, parse_format_config(_FORMAT)
+    finally:
+        if parser_result.cst_module_name in sys.modules:
+            del sys.modules[parser_result.cst_module_name]
+
+
+def test_top_level_regions_are_the_non_trivia_children(pipeline) -> None:
+    parser_result, _fmt_config = pipeline
+    cst = parse_text(parser_result, _INPUT, "doc").cst
+    regions = top_level_regions(parser_result.grammar, cst)
+    assert [rule_name for rule_name, _node in regions] == ["item"] * 4
+    assert [_INPUT[node.span.start] for _rule_name, node in regions] == ["a", "c", "j", "m"]
+
+
+@needs_fork
+@pytest.mark.parametrize("mutable_accumulator", [False, True])
+@pytest.mark.parametrize("jobs", [2, 3])
+def test_parallel_unparse_matches_sequential(pipeline, jobs: int, *, mutable_accumulator: bool) -> None:
+    parser_result, fmt_config = pipeline
+    unparser = generate_unparser(
+        parser_result.grammar, parser_result.cst_module_name, fmt_config, mutable_accumulator=mutable_accumulator
+    )
+    cst = parse_text(parser_result, _INPUT, "doc").cst
+    sequential = unparse_cst(unparser, cst, _INPUT, "doc")
+    parallel = unparse_cst(unparser, cst, _INPUT, "doc", jobs=jobs)
+    assert parallel == sequential
+    assert render_doc(parallel) == render_doc(sequential)
+
+
+@needs_fork
+def test_single_region_is_unparsed_in_process(pipeline) -> None:
+    parser_result, fmt_config = pipeline
+    unparser_result = generate_unparser(parser_result.grammar, parser_result.cst_module_name, fmt_config)
+    cst = parse_text(parser_result, "a: b;", "doc").cst
+    unparser = unparser_result.unparser_class("a: b;")
+    unparse_regions(unparser, parser_result.grammar, cst, jobs=4)
+    assert "unparse_item" not in vars(unparser)
@@ -1,11 +1,15 @@
 """Tests for the renderer."""
 
-from typing import cast
+import io
+import random
+import sys
 
 import pytest
 
+from fltk.unparse import bench_renderer
 from fltk.unparse.combinators import (
     Doc,
+    HardLine,
     comment,
     concat,
     group,
@@ -17,7 +21,7 @@ from fltk.unparse.combinators import (
     softline,
     text,
 )
-from fltk.unparse.renderer import Mode, Renderer, RendererConfig
+from fltk.unparse.renderer import FlatWidth, Renderer, RendererConfig, flat_width
 
 
 def test_simple_text():
@@ -458,25 +462,17 @@ def test_fits_function_behavior():
     renderer = Renderer(RendererConfig(max_width=0))
 
     # Test empty content
-    empty_items = cast(list[tuple[int, Mode, Doc]], [(0, Mode.FLAT, nil())])
-    fits_empty = renderer._fits(0, empty_items.copy())
-    assert fits_empty, "Nil should fit in width 0"
+    assert renderer._fits(0, nil()), "Nil should fit in width 0"
 
     # Test single character
-    single_char_items = cast(list[tuple[int, Mode, Doc]], [(0, Mode.FLAT, text("x"))])
-    fits_single = renderer._fits(0, single_char_items.copy())
-    assert not fits_single, "Single char should NOT fit in width 0"
+    assert not renderer._fits(0, text("x")), "Single char should NOT fit in width 0"
 
     # Test empty text
-    empty_text_items = cast(list[tuple[int, Mode, Doc]], [(0, Mode.FLAT, text(""))])
-    fits_empty_text = renderer._fits(0, empty_text_items.copy())
-    assert fits_empty_text, "Empty text should fit in width 0"
+    assert renderer._fits(0, text("")), "Empty text should fit in width 0"
 
     # Test the problematic case: "a" + nil() + "b"
     concat_doc = concat([text("a"), nil(), text("b")])
-    concat_items = cast(list[tuple[int, Mode, Doc]], [(0, Mode.FLAT, concat_doc)])
-    fits_concat = renderer._fits(0, concat_items.copy())
-    assert not fits_concat, "Text 'a' + nil() + 'b' should NOT fit in width 0"
+    assert not renderer._fits(0, concat_doc), "Text 'a' + nil() + 'b' should NOT fit in width 0"
 
 
 def test_exact_width_with_softline_and_nil():
@@ -717,5 +713,133 @@ def test_break_at_nest_boundaries():
     assert result2 == expected2
 
 
+def test_long_sibling_sequence_renders_in_order():
+    """A document with many siblings renders them first to last, each group fitted on its own."""
+    renderer = Renderer(RendererConfig(max_width=12, indent_width=2))
+    items = []
+    for i in range(5000):
+        items.extend([group(concat([text(f"x{i}"), line(), text("wide" if i % 2 else "y")])), hardline()])
+    result = renderer.render(concat(items))
+    lines = result.split("\n")
+    assert lines[0] == "x0 y"
+    assert lines[1] == "x1 wide"
+    assert lines[-2] == "x4999 wide"
+    assert len(lines) == 5001
+
+
+def test_deeply_nested_doc_renders_without_recursion():
+    """Nesting deeper than the recursion limit renders: both walks keep explicit stacks."""
+    doc = concat([text("core"), line(), text("end")])
+    for _ in range(sys.getrecursionlimit() * 2):
+        doc = nest(0, doc)
+    assert Renderer().render(group(doc)) == "core end"
+
+
+def _flat_lines(doc) -> list[str] | None:
+    """The lines of ``doc`` rendered flat, or None when it holds a hard line: the reference model.
+
+    Without hard lines, everything fits an unbounded width, and zero-width indentation leaves the
+    lines after embedded newlines unindented, as flat measurement assumes.
+    """
+    if _has_hardline(doc):
+        return None
+    return Renderer(RendererConfig(max_width=10**9, indent_width=0)).render(doc).split("\n")
+
+
+def _has_hardline(doc) -> bool:
+    if isinstance(doc, HardLine):
+        return True
+    children = getattr(doc, "docs", None) or [getattr(doc, "content", None)]
+    return any(isinstance(child, Doc) and _has_hardline(child) for child in children)
+
+
+def _random_doc(rng: random.Random, depth: int):
+    choice = rng.randrange(9 if depth else 6)
+    if choice == 0:
+        return text(rng.choice(["", "a", "bcd", "ef\ng", "h\n\nijkl", "\n"]))
+    if choice == 1:
+        return comment(rng.choice(["# x", "# y\n#zz"]))
+    if choice == 2:
+        return line()
+    if choice == 3:
+        return softline()
+    if choice == 4:
+        return nbsp() if rng.random() < 0.8 else hardline()
+    if choice == 5:
+        return nil()
+    children = [_random_doc(rng, depth - 1) for _ in range(rng.randrange(4))]
+    if choice == 6:
+        return concat(children)
+    if choice == 7:
+        return group(concat(children))
+    return nest(1, concat(children))
+
+
+def test_flat_width_matches_the_flat_rendering():
+    """Measured first/widest/last line widths agree with the lines of the doc rendered flat."""
+    rng = random.Random(42)  # noqa: S311 -- reproducible test docs, not security
+    for _ in range(500):
+        doc = _random_doc(rng, 4)
+        measured = flat_width(doc, {})
+        lines = _flat_lines(doc)
+        if lines is None:
+            assert measured.hard
+            continue
+        assert not measured.hard
+        widths = [len(line) for line in lines]
+        assert measured == FlatWidth(False, len(widths) > 1, widths[0], max(widths), widths[-1])
+
+
+def test_shared_subdoc_is_measured_once_per_cache():
+    shared = group(concat([text("ab"), line(), text("cd")]))
+    widths: dict = {}
+    measured = flat_width(concat([shared, nbsp(), shared]), widths)
+    assert measured.widest == len("ab cd ab cd")
+    assert widths[id(shared)] == FlatWidth(False, False, 5, 5, 5)
+    assert len(widths) == 3  # the root, the shared group, and its inner concat
+
+
+def test_deeply_nested_groups_decide_from_cached_widths():
+    """Each nested group's fit is decided without re-walking its content: the render stays fast."""
+    depth = 3000
+    doc = concat([text("x" * 10), line(), text("y")])
+    for _ in range(depth):
+        doc = group(concat([text("("), doc, text(")")]))
+    renderer = Renderer(RendererConfig(max_width=depth * 2 + 12))
+    assert renderer.render(doc) == "(" * depth + "xxxxxxxxxx y" + ")" * depth
+    narrow = Renderer(RendererConfig(max_width=depth + 12))
+    assert narrow.render(doc) == "(" * depth + "xxxxxxxxxx\ny" + ")" * depth
+
+
+def test_iter_render_yields_bounded_chunks_that_join_to_the_render():
+    doc = bench_renderer.build_document(300)
+    renderer = Renderer(RendererConfig(max_width=40, indent_width=2))
+    whole = renderer.render(doc)
+    chunks = list(renderer.iter_render(doc, chunk_size=256))
+    assert "".join(chunks) == whole
+    assert len(chunks) > 1
+    # Each chunk but the last reaches the threshold, overshooting it by at most one fragment
+    longest_fragment = max(len(line) for line in whole.split("\n"))
+    assert all(256 <= len(chunk) <= 256 + longest_fragment for chunk in chunks[:-1])
+    assert list(renderer.iter_render(doc, chunk_size=None)) == [whole]
+
+
+def test_iter_render_of_an_empty_doc_yields_nothing():
+    assert list(Renderer().iter_render(nil())) == []
+
+
+def test_render_to_writes_the_render_into_the_writer():
+    doc = bench_renderer.build_document(200)
+    renderer = Renderer()
+    out = io.StringIO()
+    renderer.render_to(doc, out, chunk_size=100)
+    assert out.getvalue() == renderer.render(doc)
+
+
+def test_benchmark_document_renders_the_requested_lines():
+    produced, _seconds = bench_renderer.measure(400, RendererConfig(max_width=80, indent_width=4))
+    assert produced == 400
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
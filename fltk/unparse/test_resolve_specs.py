@@ -1,20 +1,24 @@
 """Tests for resolve_spacing_specs function."""
 
+from collections import deque
+
 from fltk.unparse.combinators import (
     LINE,
     NIL,
     SOFTLINE,
     AfterSpec,
     BeforeSpec,
+    Comment,
     Concat,
     Doc,
     Group,
     HardLine,
+    Join,
     Nest,
     SeparatorSpec,
     Text,
 )
-from fltk.unparse.resolve_specs import _extract_boundary_specs, resolve_spacing_specs
+from fltk.unparse.resolve_specs import _extract_boundary_specs, _mutate_consecutive_specs, resolve_spacing_specs
 
 
 def test_problematic_sequence():
@@ -740,3 +744,51 @@ def test_text_newline_before_separator_keeps_separator_blank_lines():
     resolved = resolve_spacing_specs(doc)
 
     assert resolved == Concat((HardLine(blank_lines=2), Text("x")))
+
+
+def test_specs_hoisted_out_of_nested_groups_resolve_in_the_enclosing_sequence():
+    """A Join inside a Group inside a Concat resolves in one pass, at every level."""
+    doc = Concat(
+        [
+            Text("f("),
+            Group(
+                Concat(
+                    [
+                        Join(
+                            [Text("a"), Group(Concat([Text("b"), AfterSpec(LINE)])), Text("c")],
+                            Concat([Text(","), LINE]),
+                        ),
+                        SeparatorSpec(spacing=SOFTLINE, preserved_trivia=None, required=False),
+                    ]
+                )
+            ),
+            Text(")"),
+        ]
+    )
+
+    resolved = resolve_spacing_specs(doc)
+
+    inner = Concat((Text("a"), Text(","), LINE, Group(Text("b")), Text(","), LINE, Text("c")))
+    assert resolved == Concat((Text("f("), Group(inner), SOFTLINE, Text(")")))
+
+
+def test_preserved_trivia_groups_collapse_every_redundant_soft_break():
+    """Groups inside preserved trivia lose every soft break after a hard line, as in the Rust port."""
+    trivia = Group(Concat([Comment("# c"), HardLine(), LINE, LINE]))
+    doc = Concat([Text("x"), SeparatorSpec(spacing=LINE, preserved_trivia=trivia, required=False), Text("y")])
+
+    resolved = resolve_spacing_specs(doc)
+
+    assert resolved == Concat((Text("x"), Group(Concat((Comment("# c"), HardLine()))), Text("y")))
+
+
+def test_merging_equal_consecutive_specs_keeps_the_first_node():
+    """A merge that changes nothing reuses the spec rather than building an equal one."""
+    after = AfterSpec(LINE)
+    sep = SeparatorSpec(spacing=SOFTLINE, preserved_trivia=None, required=False)
+    merged = _mutate_consecutive_specs(deque([after, AfterSpec(LINE), sep, sep, Text("x")]))
+
+    assert merged is not None
+    assert merged[0] is after
+    assert merged[1] is sep
+    assert merged[2:] == [Text("x")]
@@ -10,6 +10,7 @@ from fltk.fegen.pyrt import terminalsrc
 from fltk.plumbing import (
     generate_parser,
     generate_unparser,
+    generate_unparser_source,
     parse_format_config,
     parse_format_config_file,
     parse_grammar,
@@ -18,6 +19,7 @@ from fltk.plumbing import (
     render_doc,
     unparse_cst,
 )
+from fltk.unparse import gsm2unparser
 from fltk.unparse.combinators import LINE, Concat, Line, Text, concat
 from fltk.unparse.fmt_config import FormatterConfig, TriviaConfig
 from fltk.unparse.renderer import RendererConfig
@@ -1426,5 +1428,82 @@ def test_preserve_blanks_same_arm_comment_and_whitespace():
             del sys.modules[parser_result.cst_module_name]
 
 
+# A failed alternative after partial output (`pair`), an absent optional item (`args?`), and
+# Omit/RenderAs items: every spot where a DocBuilder must roll back to a checkpoint.
+_ROLLBACK_GRAMMAR = """
+stmt := pair | call | block;
+pair := key:/[a-z]+/ , ":" , num:/[0-9]+/ , ";" | key:/[a-z]+/ , ":" , word:/[a-z]+/ , ";";
+call := name:/[a-z]+/ , "(" , args? , ")" , end:";";
+args := num:/[0-9]+/ , ("," , num:/[0-9]+/)*;
+block := "{" , stmt* , "}";
+"""
+
+
+def test_mutable_accumulator_unparser_matches_persistent():
+    """An unparser generated against DocBuilder produces the same docs as the default one."""
+    parser_result = generate_parser(parse_grammar(_ROLLBACK_GRAMMAR), capture_trivia=True)
+    try:
+        fmt_config = parse_format_config('omit end;\nrender "," as nbsp;\nafter "{" { hard; }\n')
+        persistent = generate_unparser(parser_result.grammar, parser_result.cst_module_name, fmt_config)
+        builder = generate_unparser(
+            parser_result.grammar, parser_result.cst_module_name, fmt_config, mutable_accumulator=True
+        )
+        for test_input in ["a: 1;", "a: b;", "f(1, 2);", "f();", "{a: b;f(3);{c: 4;}}", "{}"]:
+            parse_result = parse_text(parser_result, test_input, "stmt")
+            assert parse_result.success, f"Failed to parse {test_input!r}: {parse_result.error_message}"
+            expected = unparse_cst(persistent, parse_result.cst, test_input, "stmt")
+            assert unparse_cst(builder, parse_result.cst, test_input, "stmt") == expected, test_input
+    finally:
+        if parser_result.cst_module_name in sys.modules:
+            del sys.modules[parser_result.cst_module_name]
+
+
+# Alternatives told apart by label, by an included unlabeled literal's kind, after a
+# suppressed literal and whitespace, and through a sub-expression.
+_DISPATCH_GRAMMAR = """
+expr := add:term , "+" , rhs:expr | neg:"-" . expr:expr | term:term;
+term := num:/[0-9]+/ | $"x" | "(" , inner:expr , ")" | (method:/[a-z]+/ . "!" | call:/[a-z]+/) . "()";
+"""
+
+
+def test_head_dispatch_matches_ordered_trial(monkeypatch):
+    """Guarding each alternative with its head test changes no output."""
+    parser_result = generate_parser(parse_grammar(_DISPATCH_GRAMMAR), capture_trivia=True)
+    try:
+        guarded_source = generate_unparser_source(parser_result.grammar, parser_result.cst_module_name)
+        assert "head_label = fltk.unparse.pyrt.head_label(node.children, 0)" in guarded_source
+        guarded = generate_unparser(parser_result.grammar, parser_result.cst_module_name)
+        monkeypatch.setattr(gsm2unparser, "dispatch_tests", lambda *_args, **_kwargs: None)
+        trial = generate_unparser(parser_result.grammar, parser_result.cst_module_name)
+        for test_input in ["1", "x", "1 + x", "-(x + 2)", "( 1 + ( x ) ) + -3", "f()", "g!()", "-f() + x"]:
+            parse_result = parse_text(parser_result, test_input, "expr")
+            assert parse_result.success, f"Failed to parse {test_input!r}: {parse_result.error_message}"
+            expected = unparse_cst(trial, parse_result.cst, test_input, "expr")
+            assert unparse_cst(guarded, parse_result.cst, test_input, "expr") == expected, test_input
+    finally:
+        if parser_result.cst_module_name in sys.modules:
+            del sys.modules[parser_result.cst_module_name]
+
+
+def test_fixed_docs_are_module_constants():
+    """Literal text and fixed spacing specs are built once, at import, and shared by every token."""
+    parser_result = generate_parser(parse_grammar(_DISPATCH_GRAMMAR), capture_trivia=True)
+    try:
+        fmt_config = parse_format_config('after "+" { nbsp; }\n')
+        source = generate_unparser_source(parser_result.grammar, parser_result.cst_module_name, fmt_config)
+        assert source.count("fltk.unparse.combinators.text('(')") == 1
+        assert source.count("fltk.unparse.combinators.AfterSpec(spacing=fltk.unparse.combinators.NBSP)") == 1
+        unparser = generate_unparser(parser_result.grammar, parser_result.cst_module_name, fmt_config)
+        parse_result = parse_text(parser_result, "(1) + (2)", "expr")
+        assert parse_result.success, parse_result.error_message
+        doc = unparse_cst(unparser, parse_result.cst, "(1) + (2)", "expr")
+        assert isinstance(doc, Concat)
+        assert doc.docs[0] == Text("(")
+        assert doc.docs[5] is doc.docs[0]
+    finally:
+        if parser_result.cst_module_name in sys.modules:
+            del sys.modules[parser_result.cst_module_name]
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
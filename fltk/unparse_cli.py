@@ -2,21 +2,53 @@
 
 This tool takes a grammar file, format specification, and input file to produce
 formatted output using the FLTK unparsing and rendering pipeline.
+
+Given several inputs or a directory, it formats every file with one pipeline: the grammar and
+format specification are read, and the parser and unparser generated, once per run (or, with
+``--jobs N``, once per worker process). Outputs are written in input order under a
+``==> path <==`` header per file. ``--check`` writes nothing and reports each file formatting
+would change; ``--in-place`` rewrites those files. Errors are reported per file, prefixed by its
+path, and a failed file does not stop the batch. The exit status is 1 if any file failed, or,
+with ``--check``, would change.
+
+``--cache FILE`` records the content digests of files found already formatted, under a
+fingerprint of the grammar, format specification, start rule, width, indent and fltk version.
+A later run skips any file whose content is recorded there, as long as that fingerprint still
+matches.
 """
 
+from __future__ import annotations
+
 import ast
+import dataclasses
+import enum
+import functools
+import hashlib
+import importlib.metadata
+import json
+import os
+import secrets
+import shutil
 import sys
+import tempfile
 from pathlib import Path
-from typing import Annotated
+from typing import TYPE_CHECKING, Annotated, TextIO
 
 import typer
 
 from fltk import plumbing
+from fltk.batch import expand_inputs, header, map_in_workers
 from fltk.iir.context import create_default_context
 from fltk.iir.py import compiler
 from fltk.unparse import gsm2unparser
 from fltk.unparse.renderer import RendererConfig
 
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+
+    from fltk.plumbing_types import ParserResult, UnparserResult
+    from fltk.unparse.combinators import Doc
+
 app = typer.Typer(
     name="unparse",
     help="Unparse and render source files using FLTK grammar and format specifications",
@@ -24,19 +56,338 @@ app = typer.Typer(
     pretty_exceptions_enable=False,  # Disable rich exception formatting
 )
 
+# The --cache file layout; part of every fingerprint, so bumping it orphans old entries.
+_CACHE_FORMAT = 1
+
+
+class _Mode(enum.Enum):
+    PRINT = "print"
+    CHECK = "check"
+    IN_PLACE = "in-place"
+
+
+@dataclasses.dataclass(frozen=True)
+class _Pipeline:
+    """A generated parser and unparser, and the renderer settings to format with."""
+
+    parser_result: ParserResult
+    unparser_result: UnparserResult
+    rule: str | None
+    renderer_config: RendererConfig
+
+    def unparse(self, text: str, *, jobs: int = 1) -> Doc:
+        """The resolved Doc for ``text``; a parse or unparse failure raises ValueError."""
+        parse_result = plumbing.parse_text(self.parser_result, text, rule_name=self.rule)
+        if not parse_result.success:
+            msg = f"Failed to parse input: {parse_result.error_message}"
+            raise ValueError(msg)
+        return plumbing.unparse_cst(self.unparser_result, parse_result.cst, text, rule_name=self.rule, jobs=jobs)
+
+    def format(self, text: str, *, jobs: int = 1) -> str:
+        return plumbing.render_doc(self.unparse(text, jobs=jobs), self.renderer_config)
+
+
+@dataclasses.dataclass(frozen=True)
+class _PipelineSpec:
+    """The picklable inputs that rebuild a :class:`_Pipeline` inside a worker process."""
+
+    grammar_path: Path
+    format_path: Path
+    rule: str | None
+    width: int
+    indent: int
+
+    def build(self) -> _Pipeline:
+        # Trivia capture is required for unparsing
+        parser_result = plumbing.generate_parser(plumbing.parse_grammar_file(self.grammar_path), capture_trivia=True)
+        unparser_result = plumbing.generate_unparser(
+            parser_result.grammar,
+            parser_result.cst_module_name,
+            formatter_config=plumbing.parse_format_config_file(self.format_path),
+        )
+        renderer_config = RendererConfig(max_width=self.width, indent_width=self.indent)
+        return _Pipeline(parser_result, unparser_result, self.rule, renderer_config)
+
+    def fingerprint(self) -> str:
+        """A digest of everything a file's formatted text depends on besides the file itself."""
+        try:
+            version = importlib.metadata.version("fltk")
+        except importlib.metadata.PackageNotFoundError:
+            version = "unknown"
+        digest = hashlib.sha256()
+        parts: list[bytes] = [
+            str(_CACHE_FORMAT).encode(),
+            version.encode(),
+            self.grammar_path.read_bytes(),
+            self.format_path.read_bytes(),
+            (self.rule or "").encode(),
+            f"{self.width}:{self.indent}".encode(),
+        ]
+        for part in parts:
+            digest.update(len(part).to_bytes(8, "little"))
+            digest.update(part)
+        return digest.hexdigest()
+
+
+def _content_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class _FormattedCache:
+    """The ``--cache`` file: digests of contents known to be formatted under one fingerprint.
+
+    A missing or corrupt file, or one written under another fingerprint, starts empty. The file
+    is written to a temporary name and renamed into place; a failed write is reported and
+    dropped, since the cache can only save work, never change an answer.
+    """
+
+    def __init__(self, path: Path, fingerprint: str) -> None:
+        self._path = path
+        self._fingerprint = fingerprint
+        self.known: frozenset[str] = frozenset()
+        try:
+            with path.open(encoding="utf-8") as stream:
+                stored = json.load(stream)
+        except (OSError, ValueError):
+            return
+        if isinstance(stored, dict) and stored.get("fingerprint") == fingerprint:
+            formatted = stored.get("formatted")
+            if isinstance(formatted, list):
+                self.known = frozenset(digest for digest in formatted if isinstance(digest, str))
+
+    def save(self, digests: Iterable[str]) -> None:
+        """Persist ``digests`` along with the ones already known, if that adds any."""
+        formatted = self.known.union(digests)
+        if formatted == self.known:
+            return
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=self._path.parent, suffix=".tmp", delete=False
+            ) as stream:
+                json.dump({"fingerprint": self._fingerprint, "formatted": sorted(formatted)}, stream)
+            os.replace(stream.name, self._path)
+        except OSError as exc:
+            typer.echo(f"Warning: could not write the cache {self._path}: {exc}", err=True)
+
+
+@dataclasses.dataclass(frozen=True)
+class _Formatted:
+    """One input's formatting outcome.
+
+    ``output`` is the formatted text in print mode (empty otherwise); ``changed`` whether
+    formatting changes the file; ``formatted_digest`` the file's content digest when that content
+    is known to be formatted (a cache hit, or left unchanged by formatting); ``error`` the read,
+    parse, unparse, or write failure, if any.
+    """
+
+    path: Path
+    output: str
+    changed: bool
+    formatted_digest: str | None
+    error: str | None
+
+
+def _replace_file(path: Path, write: Callable[[TextIO], object]) -> None:
+    """Have ``write`` fill a temporary file beside ``path``, then move it into place.
+
+    ``path`` is only replaced once ``write`` returns, so a failure leaves any previous contents
+    intact. A symlinked ``path`` is followed and its target replaced. A replaced file keeps its
+    permission bits; a new one gets the umask's defaults, as an ordinary write would.
+    """
+    target = path.resolve()
+    temporary = target.with_name(f"{target.name}.{secrets.token_hex(8)}.tmp")
+    # Created with the default mode rather than a temporary file's 0o600, so the umask applies
+    descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(descriptor, "w") as stream:
+            write(stream)
+        if target.exists():
+            shutil.copymode(target, temporary)
+        os.replace(temporary, target)
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
+
+
+def _format_file(pipeline: _Pipeline, path: Path, mode: _Mode, known: frozenset[str], jobs: int) -> _Formatted:
+    """Read and format ``path``, rewriting it in place mode; failures are reported, not raised."""
+    try:
+        text = path.read_text()
+    except (ValueError, OSError) as exc:
+        return _Formatted(path, "", changed=False, formatted_digest=None, error=str(exc))
+    digest = _content_digest(text)
+    if digest in known:
+        return _Formatted(path, text if mode is _Mode.PRINT else "", changed=False, formatted_digest=digest, error=None)
+    try:
+        formatted = pipeline.format(text, jobs=jobs)
+    except ValueError as exc:
+        return _Formatted(path, "", changed=False, formatted_digest=None, error=str(exc))
+    changed = formatted != text
+    if changed and mode is _Mode.IN_PLACE:
+        try:
+            _replace_file(path, lambda stream: stream.write(formatted))
+        except (ValueError, OSError) as exc:
+            return _Formatted(path, "", changed=True, formatted_digest=None, error=str(exc))
+    # Only content that formatting leaves as it is counts as formatted: formatting a file's
+    # output again is not guaranteed to leave that output unchanged.
+    return _Formatted(
+        path,
+        formatted if mode is _Mode.PRINT else "",
+        changed=changed,
+        formatted_digest=None if changed else digest,
+        error=None,
+    )
+
+
+# The pipeline and cache entries of a batch worker process, set up once by `_init_worker`.
+_worker_pipeline: _Pipeline | None = None
+_worker_known: frozenset[str] = frozenset()
+
+
+def _init_worker(spec: _PipelineSpec, known: frozenset[str]) -> None:
+    global _worker_pipeline, _worker_known  # noqa: PLW0603 -- one pipeline per worker process, built at startup
+    _worker_pipeline = spec.build()
+    _worker_known = known
+
+
+def _format_in_worker(path: Path, *, mode: _Mode) -> _Formatted:
+    assert _worker_pipeline is not None
+    return _format_file(_worker_pipeline, path, mode, _worker_known, 1)
+
+
+def _format_all(
+    spec: _PipelineSpec, files: list[Path], mode: _Mode, known: frozenset[str], jobs: int
+) -> Iterator[_Formatted]:
+    """Format ``files`` in order, in this process or across ``jobs`` worker processes.
+
+    A single file is formatted here, with ``jobs`` splitting its top-level items instead.
+    """
+    if len(files) <= 1 or jobs == 1:
+        pipeline = spec.build()
+        region_jobs = jobs if len(files) == 1 else 1
+        return (_format_file(pipeline, path, mode, known, region_jobs) for path in files)
+    return map_in_workers(
+        functools.partial(_format_in_worker, mode=mode),
+        files,
+        jobs=min(jobs, len(files)),
+        initializer=_init_worker,
+        initargs=(spec, known),
+    )
+
+
+def _write_results(results: Iterable[_Formatted], mode: _Mode, *, batch: bool) -> tuple[bool, list[str]]:
+    """Write each result and report its errors and changes.
+
+    Return whether the run succeeded, and the digests of the contents found to be formatted. In
+    ``batch`` mode each printed output gets a ``==> path <==`` header and each error its path as a
+    prefix.
+    """
+    ok = True
+    formatted: list[str] = []
+    for result in results:
+        if mode is _Mode.PRINT and result.error is None:
+            if batch:
+                sys.stdout.write(header(result.path))
+            sys.stdout.write(result.output)
+            if batch and result.output and not result.output.endswith("\n"):
+                sys.stdout.write("\n")
+        if result.error is not None:
+            ok = False
+            typer.echo(f"{result.path}: {result.error}" if batch else f"Error: {result.error}", err=True)
+        elif result.changed and mode is _Mode.CHECK:
+            ok = False
+            typer.echo(f"would reformat {result.path}", err=True)
+        elif result.changed and mode is _Mode.IN_PLACE:
+            typer.echo(f"reformatted {result.path}", err=True)
+        if result.formatted_digest is not None:
+            formatted.append(result.formatted_digest)
+    return ok, formatted
+
+
+def _write_unparser_source(
+    grammar: Path, format_spec: Path, destination: Path, cst_module: str, parser_module: str | None
+) -> None:
+    # Generate parser with trivia capture enabled (required for unparsing)
+    parser_result = plumbing.generate_parser(plumbing.parse_grammar_file(grammar), capture_trivia=True)
+    context = create_default_context(capture_trivia=True)
+
+    # Generate unparser class and imports
+    unparser_class, imports = gsm2unparser.generate_unparser(
+        parser_result.grammar,
+        context,
+        cst_module,
+        formatter_config=plumbing.parse_format_config_file(format_spec),
+    )
+
+    # Add parser module import if specified
+    if parser_module:
+        parser_import = ast.Import(names=[ast.alias(name=parser_module, asname=None)])
+        imports.append(parser_import)
+
+    # Compile to AST
+    unparser_ast = compiler.compile_class(unparser_class, context)
+    module = ast.fix_missing_locations(ast.Module(body=[*imports, unparser_ast], type_ignores=[]))
+
+    # Write the source to file
+    with destination.open("w") as f:
+        f.write(ast.unparse(module))
+
+
+def _format_single(spec: _PipelineSpec, text: str, name: str, *, mode: _Mode, output: Path | None, jobs: int) -> None:
+    """Format one input's ``text``, printing it to ``output`` or checking it."""
+    pipeline = spec.build()
+    try:
+        doc = pipeline.unparse(text, jobs=jobs)
+    except ValueError as exc:
+        typer.echo(f"Error: {exc}", err=True)
+        raise typer.Exit(1) from exc
+
+    if mode is _Mode.CHECK:
+        if plumbing.render_doc(doc, pipeline.renderer_config) != text:
+            typer.echo(f"would reformat {name}", err=True)
+            raise typer.Exit(1)
+        return
+
+    # Render straight into the output, chunk by chunk, rather than building the whole text first
+    if output:
+        _replace_file(output, lambda stream: plumbing.render_doc_to(doc, stream, pipeline.renderer_config))
+    else:
+        plumbing.render_doc_to(doc, sys.stdout, pipeline.renderer_config)
+
 
 @app.command()
 def main(
     grammar: Annotated[Path, typer.Argument(help="Path to the grammar file (.fltkg)")],
     format_spec: Annotated[Path, typer.Argument(help="Path to the format specification file (.fltkfmt)")],
     *,
-    input_file: Annotated[
-        Path | None, typer.Argument(help="Path to the input file (omit or use '-' for stdin)")
+    inputs: Annotated[
+        list[Path] | None,
+        typer.Argument(help="Input files, or directories to format the files of (omit or use '-' for stdin)"),
     ] = None,
     output: Annotated[Path | None, typer.Option("--output", "-o", help="Output file path (default: stdout)")] = None,
     width: Annotated[int, typer.Option("--width", "-w", help="Maximum line width")] = 80,
     indent: Annotated[int, typer.Option("--indent", "-i", help="Indent spacing")] = 2,
     rule: Annotated[str | None, typer.Option("--rule", "-r", help="Start rule name")] = None,
+    jobs: Annotated[
+        int,
+        typer.Option(
+            "--jobs",
+            "-j",
+            help="Format the inputs across this many worker processes (for a single input, its top-level items)",
+        ),
+    ] = 1,
+    check: Annotated[
+        bool, typer.Option("--check", help="Write nothing; exit 1 if formatting would change any input")
+    ] = False,
+    in_place: Annotated[bool, typer.Option("--in-place", help="Rewrite each input that formatting changes")] = False,
+    suffix: Annotated[
+        list[str] | None,
+        typer.Option("--suffix", help="Only format directory files with this suffix, e.g. .fltkg (repeatable)"),
+    ] = None,
+    cache: Annotated[
+        Path | None, typer.Option("--cache", help="Skip inputs this file records as already formatted, and record more")
+    ] = None,
     generate_unparser: Annotated[
         Path | None, typer.Option("--generate-unparser", help="Write generated unparser code to file")
     ] = None,
@@ -52,87 +403,52 @@ def main(
         typer.Option("--parser-module", help="Parser module import path for generated unparser (optional)"),
     ] = None,
 ):
-    """Unparse and render a source file using FLTK grammar and format specifications."""
-    # Parse the grammar
-    grammar_obj = plumbing.parse_grammar_file(grammar)
-
-    # Parse the format specification
-    formatter_config = plumbing.parse_format_config_file(format_spec)
-
-    # Generate parser with trivia capture enabled (required for unparsing)
-    parser_result = plumbing.generate_parser(grammar_obj, capture_trivia=True)
-
+    """Unparse and render source files using FLTK grammar and format specifications."""
     if generate_unparser:
         if not cst_module:
             typer.echo("Error: --cst-module is required when using --generate-unparser", err=True)
             raise typer.Exit(1)
-
-        # Generate and write unparser code to file
-        context = create_default_context(capture_trivia=True)
-        grammar_with_trivia = parser_result.grammar
-
-        # Generate unparser class and imports
-        unparser_class, imports = gsm2unparser.generate_unparser(
-            grammar_with_trivia,
-            context,
-            cst_module,
-            formatter_config=formatter_config,
-        )
-
-        # Add parser module import if specified
-        if parser_module:
-            parser_import = ast.Import(names=[ast.alias(name=parser_module, asname=None)])
-            imports.append(parser_import)
-
-        # Compile to AST
-        unparser_ast = compiler.compile_class(unparser_class, context)
-        module = ast.fix_missing_locations(ast.Module(body=[*imports, unparser_ast], type_ignores=[]))
-
-        # Convert to source code
-        unparser_source = ast.unparse(module)
-
-        # Write to file
-        with generate_unparser.open("w") as f:
-            f.write(unparser_source)
-
+        _write_unparser_source(grammar, format_spec, generate_unparser, cst_module, parser_module)
         typer.echo(f"Generated unparser code written to: {generate_unparser}")
         return
 
-    # Read input
-    if input_file is None or (isinstance(input_file, str) and input_file == "-"):
-        input_text = sys.stdin.read()
-    else:
-        with input_file.open() as f:
-            input_text = f.read()
-
-    # Parse the input
-    parse_result = plumbing.parse_text(parser_result, input_text, rule_name=rule)
-    if not parse_result.success:
-        typer.echo(f"Error: Failed to parse input: {parse_result.error_message}", err=True)
+    if jobs < 1:
+        typer.echo(f"Error: --jobs must be positive, got {jobs}", err=True)
         raise typer.Exit(1)
+    if check and in_place:
+        typer.echo("Error: --check and --in-place cannot be combined", err=True)
+        raise typer.Exit(1)
+    mode = _Mode.CHECK if check else _Mode.IN_PLACE if in_place else _Mode.PRINT
+    spec = _PipelineSpec(grammar, format_spec, rule, width, indent)
 
-    # Generate unparser
-    unparser_result = plumbing.generate_unparser(
-        parser_result.grammar,
-        parser_result.cst_module_name,
-        formatter_config=formatter_config,
-    )
-
-    # Unparse to Doc combinators
-    doc = plumbing.unparse_cst(unparser_result, parse_result.cst, input_text, rule_name=rule)
-
-    # Configure renderer
-    renderer_config = RendererConfig(max_width=width, indent_width=indent)
+    if not inputs or inputs == [Path("-")]:
+        if mode is _Mode.IN_PLACE:
+            typer.echo("Error: --in-place needs input files", err=True)
+            raise typer.Exit(1)
+        _format_single(spec, sys.stdin.read(), "<stdin>", mode=mode, output=output, jobs=jobs)
+        return
 
-    # Render to formatted text
-    output_text = plumbing.render_doc(doc, renderer_config)
+    batch = len(inputs) > 1 or inputs[0].is_dir()
+    if not batch and mode is not _Mode.IN_PLACE and cache is None:
+        try:
+            text = inputs[0].read_text()
+        except (ValueError, OSError) as exc:
+            typer.echo(f"Error: {exc}", err=True)
+            raise typer.Exit(1) from exc
+        _format_single(spec, text, str(inputs[0]), mode=mode, output=output, jobs=jobs)
+        return
+    if output is not None:
+        typer.echo("Error: --output takes a single input, without --in-place or --cache", err=True)
+        raise typer.Exit(1)
 
-    # Write output
-    if output:
-        with output.open("w") as f:
-            f.write(output_text)
-    else:
-        sys.stdout.write(output_text)
+    files = expand_inputs(inputs, suffix or [])
+    formatted_cache = _FormattedCache(cache, spec.fingerprint()) if cache is not None else None
+    known = formatted_cache.known if formatted_cache is not None else frozenset()
+    ok, formatted = _write_results(_format_all(spec, files, mode, known, jobs), mode, batch=batch)
+    if formatted_cache is not None:
+        formatted_cache.save(formatted)
+    if not ok:
+        raise typer.Exit(1)
 
 
 if __name__ == "__main__":
@@ -1812,6 +1812,104 @@ def test_item_disposition_success_lines_rejects_unknown_disposition() -> None:
         gen._item_disposition_success_lines("r", item, object(), "        ")  # type: ignore[arg-type]
 
 
+# ---------------------------------------------------------------------------
+# Mutable accumulator mode (mutable_accumulator=True)
+# ---------------------------------------------------------------------------
+
+
+def test_mutable_accumulator_uses_doc_builder() -> None:
+    """Builder mode threads a ``DocBuilder`` handle, sized per rule, instead of a ``DocAccumulator``."""
+    src = RustUnparserGenerator(parse_grammar('r := foo:"x" . bar:"y";'), mutable_accumulator=True).generate()
+    assert "use fltk_unparser_core::DocBuilder;" in src
+    assert "type UnparseResult = fltk_unparser_core::UnparseResult<DocBuilder>;" in src
+    assert "DocBuilder::with_capacity(" in src
+    assert "acc: DocAccumulator" not in src
+
+
+def test_mutable_accumulator_rolls_back_between_alternatives() -> None:
+    """Each alternative after the first starts from a rollback to the dispatch checkpoint."""
+    src = RustUnparserGenerator(parse_grammar('choice := "a" | "b";'), mutable_accumulator=True).generate()
+    assert "let mark = acc.checkpoint();" in src
+    assert "let acc = acc.rollback(&mark);" in src
+
+
+def test_mutable_accumulator_rolls_back_absent_optional_item() -> None:
+    """An optional item that does not match rolls back whatever its attempt appended."""
+    src = RustUnparserGenerator(parse_grammar('opt := "a"? . "b";'), mutable_accumulator=True).generate()
+    body = _method_body(src, "unparse_opt__alt0")
+    assert "let mark = acc.checkpoint();" in body
+    assert "} else {" in body
+    assert "acc = acc.rollback(&mark);" in body
+
+
+def test_mutable_accumulator_rolls_back_failed_loop_iteration() -> None:
+    """A failed occurrence in a quantified loop is rolled back before the loop exits."""
+    src = RustUnparserGenerator(parse_grammar('r := foo:"x"+;'), mutable_accumulator=True).generate()
+    body = _method_body(src, "unparse_r__alt0__item0")
+    assert "let mark = acc.checkpoint();" in body
+    assert body.index("acc = acc.rollback(&mark);") < body.index("break;")
+
+
+def test_mutable_accumulator_rolls_back_omitted_item() -> None:
+    """An Omit item's output lands in the shared buffer, so it is rolled back after the call."""
+    fmt_config = _disposition_config(selector_value="foo", disposition=OMIT)
+    src = RustUnparserGenerator(
+        parse_grammar('r := foo:"x";'), formatter_config=fmt_config, mutable_accumulator=True
+    ).generate()
+    body = _method_body(src, "unparse_r__alt0")
+    call = body.index("let r = self.unparse_r__alt0__item0(node, pos, acc.clone())?;")
+    assert body.index("acc = acc.rollback(&mark);") > call
+
+
+def test_persistent_accumulator_emits_no_checkpoints() -> None:
+    """The default mode is unchanged: no checkpoints, no rollbacks, no DocBuilder."""
+    src = RustUnparserGenerator(parse_grammar('choice := "a" | "b"?;')).generate()
+    assert "checkpoint" not in src
+    assert "rollback" not in src
+    assert "DocBuilder" not in src
+
+
+# ---------------------------------------------------------------------------
+# Head-test dispatch (_gen_alt_dispatch_loop / _head_guards)
+# ---------------------------------------------------------------------------
+
+
+def test_head_dispatch_guards_each_alternative_by_label() -> None:
+    """Labeled alternatives are each tried only when the head child carries their label."""
+    src = RustUnparserGenerator(parse_grammar("r := add:x | num:/[0-9]+/; x := v:/x/;")).generate()
+    body = _method_body(src, "unparse_r")
+    assert "let head = node.children().get(0);" in body
+    assert "if matches!(head, Some((Some(cst::RLabel::Add), _))) {" in body
+    assert "if matches!(head, Some((Some(cst::RLabel::Num), _))) {" in body
+    assert "if let Some(r) = self.unparse_r__alt1(node, 0, acc) {" in body
+
+
+def test_head_dispatch_matches_kinds_by_child_variant() -> None:
+    """An included unlabeled span and the trivia before a labeled item match child variants."""
+    src = RustUnparserGenerator(parse_grammar('r := $"k" | "(" , inner:x , ")"; x := v:/x/;')).generate()
+    body = _method_body(src, "unparse_r")
+    assert "if matches!(head, Some((_, cst::RChild::Span(_)))) {" in body
+    assert "if matches!(head, Some((Some(cst::RLabel::Inner), _)) | Some((_, cst::RChild::Trivia(_)))) {" in body
+
+
+def test_head_dispatch_in_subexpression_reads_passed_pos() -> None:
+    """A sub-expression's dispatch reads the head child at its own start position."""
+    src = RustUnparserGenerator(parse_grammar("r := (a:x | b:x) . c:x; x := v:/x/;")).generate()
+    body = _method_body(src, "unparse_r__alt0__item0__alts")
+    assert "let head = node.children().get(pos);" in body
+    assert "if matches!(head, Some((Some(cst::RLabel::A), _))) {" in body
+
+
+def test_head_dispatch_leaves_untested_alternative_unguarded() -> None:
+    """An alternative that can consume nothing is always tried; identical tests emit no guards."""
+    src = RustUnparserGenerator(parse_grammar("r := a:x* | b:x; x := v:/x/;")).generate()
+    body = _method_body(src, "unparse_r")
+    assert "        if let Some(r) = self.unparse_r__alt0(node, 0, acc.clone()) {" in body
+    assert "if matches!(head, Some((Some(cst::RLabel::B), _))) {" in body
+    same = RustUnparserGenerator(parse_grammar("r := a:x . b:x | a:x . c:x; x := v:/x/;")).generate()
+    assert "head" not in _method_body(same, "unparse_r")
+
+
 # ---------------------------------------------------------------------------
 # Separator / trivia processing (trivia-rule branch of _gen_trivia_processing)
 # ---------------------------------------------------------------------------
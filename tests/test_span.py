@@ -90,6 +90,11 @@ def test_has_source_false():
     assert Span(1, 5).has_source() is False
 
 
+def test_source_returns_whole_attached_string():
+    assert Span.with_source(1, 3, "hello").source() == "hello"
+    assert Span(1, 5).source() is None
+
+
 def test_equality_ignores_source():
     assert Span.with_source(1, 5, "x" * 10) == Span(1, 5)
 